@@ -3,8 +3,10 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from collections.abc import Iterator
 from enum import Enum
-from zlib import decompress
+from typing import Final, Protocol
+from zlib import decompress, decompressobj
 from zlib import error as zlibError
 
 
@@ -12,6 +14,20 @@ class DecompressionError(Exception):
     ...
 
 
+class DecompressionSizeExceededError(DecompressionError):
+    ...
+
+
+class StreamDecompressor(Protocol):
+    size: int
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        ...
+
+    def finalize(self) -> bytes:
+        ...
+
+
 class Decompressor(Enum):
     ZLIB = "zlib"
 
@@ -23,6 +39,15 @@ class Decompressor(Enum):
         """
         return {Decompressor.ZLIB: Decompressor._zlib_decompress}[self](data)
 
+    def stream(self, max_size: int) -> StreamDecompressor:
+        """
+        >>> from zlib import compress
+        >>> stream = Decompressor("zlib").stream(max_size=1024)
+        >>> b"".join(stream.feed(compress(b"blablub"))) + stream.finalize()
+        b'blablub'
+        """
+        return {Decompressor.ZLIB: _ZlibStreamDecompressor}[self](max_size)
+
     @staticmethod
     def _zlib_decompress(data: bytes) -> bytes:
         """
@@ -38,3 +63,66 @@ class Decompressor(Enum):
             return decompress(data)
         except zlibError as e:
             raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+
+
+class _ZlibStreamDecompressor:
+    """Incrementally decompress zlib data without ever holding the full output in memory
+
+    The output is produced in bounded pieces, such that highly compressed input cannot blow up
+    the memory before the size limit is checked.
+
+    >>> from zlib import compress
+    >>> data = compress(b"blablub" * 3)
+    >>> stream = _ZlibStreamDecompressor(max_size=1024)
+    >>> b"".join([*stream.feed(data[:5]), *stream.feed(data[5:]), stream.finalize()])
+    b'blablubblablubblablub'
+    >>> stream.size
+    21
+    >>> stream = _ZlibStreamDecompressor(max_size=10)
+    >>> list(stream.feed(data))
+    Traceback (most recent call last):
+        ...
+    agent_receiver.decompression.DecompressionSizeExceededError: ...
+    >>> stream = _ZlibStreamDecompressor(max_size=1024)
+    >>> b"".join(stream.feed(data[:-3]))
+    b'blablubblablubblablub'
+    >>> stream.finalize()
+    Traceback (most recent call last):
+        ...
+    agent_receiver.decompression.DecompressionError: ...
+    """
+
+    _OUTPUT_CHUNK_SIZE: Final = 1024 * 1024
+
+    def __init__(self, max_size: int) -> None:
+        self._decompressobj = decompressobj()
+        self._max_size: Final = max_size
+        self.size = 0
+
+    def feed(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            try:
+                chunk = self._decompressobj.decompress(data, self._OUTPUT_CHUNK_SIZE)
+            except zlibError as e:
+                raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+            yield self._account(chunk)
+            data = self._decompressobj.unconsumed_tail
+
+    def finalize(self) -> bytes:
+        try:
+            tail = self._decompressobj.flush()
+        except zlibError as e:
+            raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+        if not self._decompressobj.eof:
+            raise DecompressionError(
+                "Decompression with zlib failed: incomplete or truncated stream"
+            )
+        return self._account(tail)
+
+    def _account(self, chunk: bytes) -> bytes:
+        self.size += len(chunk)
+        if self.size > self._max_size:
+            raise DecompressionSizeExceededError(
+                f"Decompressed data exceeds the maximum size of {self._max_size} bytes"
+            )
+        return chunk
@@ -5,9 +5,11 @@
 
 import os
 import tempfile
+import time
+from dataclasses import dataclass
 from functools import cache
 from pathlib import Path
-from typing import assert_never
+from typing import assert_never, Final, IO
 
 from agent_receiver.apps_and_routers import AGENT_RECEIVER_APP, UUID_VALIDATION_ROUTER
 from agent_receiver.checkmk_rest_api import (
@@ -20,7 +22,12 @@ from agent_receiver.checkmk_rest_api import (
     post_csr,
     register,
 )
-from agent_receiver.decompression import DecompressionError, Decompressor
+from agent_receiver.decompression import (
+    DecompressionError,
+    DecompressionSizeExceededError,
+    Decompressor,
+    StreamDecompressor,
+)
 from agent_receiver.log import logger
 from agent_receiver.models import (
     CertificateRenewalBody,
@@ -55,11 +62,13 @@ from cryptography.x509 import Certificate
 from fastapi import Depends, File, Header, HTTPException, Response, UploadFile
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from pydantic import UUID4
+from starlette.concurrency import run_in_threadpool
 from starlette.status import (
     HTTP_204_NO_CONTENT,
     HTTP_400_BAD_REQUEST,
     HTTP_403_FORBIDDEN,
     HTTP_404_NOT_FOUND,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
     HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_501_NOT_IMPLEMENTED,
 )
@@ -77,6 +86,11 @@ from .certs import (
 
 security = HTTPBasic()
 
+# Agent data is read from the upload in chunks of this size, such that neither the compressed nor
+# the decompressed agent output has to be held in memory as a whole.
+_AGENT_DATA_CHUNK_SIZE: Final = 1024 * 1024
+_AGENT_DATA_MAX_SIZE: Final = 512 * 1024 * 1024
+
 
 def _validate_uuid_against_csr(uuid: UUID4, csr_field: CsrField) -> None:
     if str(uuid) != (cn := extract_cn_from_csr(csr_field.csr)):
@@ -337,21 +351,62 @@ def _validate_is_cce(credentials: HTTPBasicCredentials, uuid: UUID4) -> None:
         )
 
 
-def _store_agent_data(
-    target_dir: Path,
-    decompressed_data: bytes,
+@dataclass(frozen=True)
+class _IngestionStats:
+    received_bytes: int
+    stored_bytes: int
+    duration: float
+
+    @property
+    def rate(self) -> float:
+        """Stored bytes per second"""
+        return self.stored_bytes / self.duration if self.duration > 0 else 0.0
+
+
+def _decompress_into(
+    stream: StreamDecompressor,
+    compressed_chunk: bytes,
+    target: IO[bytes],
 ) -> None:
+    for chunk in stream.feed(compressed_chunk):
+        target.write(chunk)
+
+
+async def _store_agent_data(
+    target_dir: Path,
+    monitoring_data: UploadFile,
+    decompressor: Decompressor,
+) -> _IngestionStats:
+    """Decompress the uploaded agent data chunk by chunk into the agent output file
+
+    The CPU bound decompression and the blocking writes are offloaded to the thread pool, so the
+    event loop keeps serving other agents meanwhile.
+    """
+    start = time.monotonic()
+    stream = decompressor.stream(_AGENT_DATA_MAX_SIZE)
+    received_bytes = 0
+
     target_dir.resolve().mkdir(parents=True, exist_ok=True)
     with tempfile.NamedTemporaryFile(
         dir=target_dir,
         delete=False,
     ) as temp_file:
         try:
-            temp_file.write(decompressed_data)
+            while compressed_chunk := await monitoring_data.read(_AGENT_DATA_CHUNK_SIZE):
+                received_bytes += len(compressed_chunk)
+                await run_in_threadpool(_decompress_into, stream, compressed_chunk, temp_file)
+            temp_file.write(stream.finalize())
+            temp_file.flush()
             os.rename(temp_file.name, target_dir / "agent_output")
         finally:
             Path(temp_file.name).unlink(missing_ok=True)
 
+    return _IngestionStats(
+        received_bytes=received_bytes,
+        stored_bytes=stream.size,
+        duration=time.monotonic() - start,
+    )
+
 
 @UUID_VALIDATION_ROUTER.post(
     "/agent_data/{uuid}",
@@ -398,7 +453,21 @@ async def agent_data(
         )
 
     try:
-        decompressed_agent_data = decompressor(monitoring_data.file.read())
+        stats = await _store_agent_data(
+            host.source_path,
+            monitoring_data,
+            decompressor,
+        )
+    except DecompressionSizeExceededError as e:
+        logger.error(
+            "uuid=%s Agent data too large: %s",
+            uuid,
+            e,
+        )
+        raise HTTPException(
+            status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Decompressed agent data exceeds the maximum size of {_AGENT_DATA_MAX_SIZE} bytes",
+        ) from e
     except DecompressionError as e:
         logger.error(
             "uuid=%s Decompression of agent data failed: %s",
@@ -410,14 +479,13 @@ async def agent_data(
             detail="Decompression of agent data failed",
         ) from e
 
-    _store_agent_data(
-        host.source_path,
-        decompressed_agent_data,
-    )
-
     logger.info(
-        "uuid=%s Agent data saved",
+        "uuid=%s Agent data saved (received: %d bytes, stored: %d bytes, duration: %.3f s, rate: %.0f bytes/s)",
         uuid,
+        stats.received_bytes,
+        stats.stored_bytes,
+        stats.duration,
+        stats.rate,
     )
     return Response(status_code=HTTP_204_NO_CONTENT)
 
@@ -67,6 +67,7 @@ from cmk.checkengine.sectionparserutils import (
 from cmk.checkengine.submitters import Submittee, Submitter
 from cmk.checkengine.summarize import SummarizerFunction
 
+import cmk.base.profiling as profiling
 from cmk.base.api.agent_based import cluster_mode, value_store
 from cmk.base.api.agent_based.checking_classes import consume_check_results, IgnoreResultsError
 from cmk.base.api.agent_based.checking_classes import Result as CheckFunctionResult
@@ -117,12 +118,14 @@ def execute_checkmk_checks(
     submitter: Submitter,
     exit_spec: ExitSpec,
 ) -> ActiveCheckResult:
-    host_sections = parser((f[0], f[1]) for f in fetched)
-    host_sections_by_host = group_by_host(
-        (HostKey(s.hostname, s.source_type), r.ok) for s, r in host_sections if r.is_ok()
-    )
-    store_piggybacked_sections(host_sections_by_host)
-    providers = make_providers(host_sections_by_host, section_plugins)
+    phase_totals = profiling.phase_totals()
+    with profiling.phase("parse"):
+        host_sections = parser((f[0], f[1]) for f in fetched)
+        host_sections_by_host = group_by_host(
+            (HostKey(s.hostname, s.source_type), r.ok) for s, r in host_sections if r.is_ok()
+        )
+        store_piggybacked_sections(host_sections_by_host)
+        providers = make_providers(host_sections_by_host, section_plugins)
     with CPUTracker() as tracker:
         service_results = check_host_services(
             hostname,
@@ -163,6 +166,7 @@ def execute_checkmk_checks(
         _timing_results(
             tracker.duration,
             tuple((f[0], f[2]) for f in fetched),
+            profiling.phase_durations_since(phase_totals),
             perfdata_with_times=perfdata_with_times,
         ),
     )
@@ -198,6 +202,7 @@ def _do_inventory_actions_during_checking_for(
 def _timing_results(
     total_times: Snapshot,
     fetched: Sequence[tuple[SourceInfo, Snapshot]],
+    phase_times: Mapping[str, float],
     *,
     perfdata_with_times: bool,
 ) -> ActiveCheckResult:
@@ -233,6 +238,11 @@ def _timing_results(
     for phase, duration in summary.items():
         perfdata.append(f"cmk_time_{phase}={duration.idle:.3f}")
 
+    # Wall clock times of the phases after fetching
+    for phase in ("parse", "check", "value_store_save", "submit"):
+        if phase in phase_times:
+            perfdata.append(f"cmk_time_{phase}={phase_times[phase]:.3f}")
+
     return ActiveCheckResult(0, infotext, (), perfdata)
 
 
@@ -305,46 +315,55 @@ def check_host_services(
     * examines the result and sends it to the core (unless `dry_run` is True).
     """
     with plugin_contexts.current_host(host_name):
+        # The value store is saved explicitly to measure the saving
         with value_store.load_host_value_store(
-            host_name, store_changes=not submitter.dry_run
+            host_name, store_changes=False
         ) as value_store_manager:
             submittables: list[_AggregatedResult] = []
-            for service in (
-                s
-                for s in services
-                if s.check_plugin_name in run_plugin_names
-                and not service_outside_check_period(s.description, get_check_period(s.description))
-            ):
-                if service.check_plugin_name not in check_plugins:
-                    submittable = _AggregatedResult(
-                        service=service,
-                        submit=True,
-                        data_received=True,
-                        result=ServiceCheckResult.check_not_implemented(),
-                        cache_info=None,
+            with profiling.phase("check"):
+                for service in (
+                    s
+                    for s in services
+                    if s.check_plugin_name in run_plugin_names
+                    and not service_outside_check_period(
+                        s.description, get_check_period(s.description)
                     )
-                else:
-                    submittable = get_aggregated_result(
-                        host_name,
-                        is_cluster,
-                        cluster_nodes,
-                        config_cache,
-                        providers,
-                        service,
-                        check_plugins[service.check_plugin_name],
-                        value_store_manager=value_store_manager,
-                        rtc_package=rtc_package,
-                        get_effective_host=get_effective_host,
-                    )
-                submittables.append(submittable)
+                ):
+                    if service.check_plugin_name not in check_plugins:
+                        submittable = _AggregatedResult(
+                            service=service,
+                            submit=True,
+                            data_received=True,
+                            result=ServiceCheckResult.check_not_implemented(),
+                            cache_info=None,
+                        )
+                    else:
+                        submittable = get_aggregated_result(
+                            host_name,
+                            is_cluster,
+                            cluster_nodes,
+                            config_cache,
+                            providers,
+                            service,
+                            check_plugins[service.check_plugin_name],
+                            value_store_manager=value_store_manager,
+                            rtc_package=rtc_package,
+                            get_effective_host=get_effective_host,
+                        )
+                    submittables.append(submittable)
+
+            if not submitter.dry_run:
+                with profiling.phase("value_store_save"):
+                    value_store_manager.save()
 
     if submittables:
-        submitter.submit(
-            submittees=[
-                Submittee(s.service.description, s.result, s.cache_info, pending=not s.submit)
-                for s in submittables
-            ],
-        )
+        with profiling.phase("submit"):
+            submitter.submit(
+                submittees=[
+                    Submittee(s.service.description, s.result, s.cache_info, pending=not s.submit)
+                    for s in submittables
+                ],
+            )
 
     return submittables
 
@@ -93,11 +93,14 @@ class CMKParser:
         selected_sections: SectionNameCollection,
         keep_outdated: bool,
         logger: logging.Logger,
+        only_needed_sections: bool = False,
     ) -> None:
         self.config_cache: Final = config_cache
         self.selected_sections: Final = selected_sections
         self.keep_outdated: Final = keep_outdated
         self.logger: Final = logger
+        # Skip the agent sections no check plugin of the host needs, only for checking
+        self.only_needed_sections: Final = only_needed_sections
 
     def __call__(
         self,
@@ -123,6 +126,11 @@ class CMKParser:
                     ),
                     keep_outdated=self.keep_outdated,
                     logger=self.logger,
+                    needed_sections=(
+                        self.config_cache.needed_sections(source.hostname)
+                        if self.only_needed_sections
+                        else NO_SELECTION
+                    ),
                 ),
                 raw_data,
                 selection=self.selected_sections,
@@ -138,6 +138,7 @@ from cmk.checkengine.type_defs import AgentRawDataSectionElem
 import cmk.base.api.agent_based.register as agent_based_register
 import cmk.base.default_config as default_config
 import cmk.base.ip_lookup as ip_lookup
+import cmk.base.profiling as profiling
 from cmk.base.api.agent_based.cluster_mode import ClusterMode
 from cmk.base.api.agent_based.register.check_plugins_legacy import create_check_plugin_from_legacy
 from cmk.base.api.agent_based.register.section_plugins_legacy import (
@@ -550,18 +551,19 @@ def load(
     *,
     changed_vars_handler: Callable[[set[str]], None] | None = None,
 ) -> None:
-    _initialize_config()
+    with profiling.phase("config_load"):
+        _initialize_config()
 
-    changed_var_names = _load_config(with_conf_d, exclude_parents_mk)
-    if changed_vars_handler is not None:
-        changed_vars_handler(changed_var_names)
+        changed_var_names = _load_config(with_conf_d, exclude_parents_mk)
+        if changed_vars_handler is not None:
+            changed_vars_handler(changed_var_names)
 
-    _initialize_derived_config_variables()
+        _initialize_derived_config_variables()
 
-    _perform_post_config_loading_actions()
+        _perform_post_config_loading_actions()
 
-    if validate_hosts:
-        _verify_non_duplicate_hosts()
+        if validate_hosts:
+            _verify_non_duplicate_hosts()
 
 
 def load_packed_config(config_path: ConfigPath) -> None:
@@ -578,9 +580,10 @@ def load_packed_config(config_path: ConfigPath) -> None:
         cmk.base.core_nagios._dump_precompiled_hostcheck()
 
     """
-    _initialize_config()
-    globals().update(PackedConfigStore.from_serial(config_path).read())
-    _perform_post_config_loading_actions()
+    with profiling.phase("config_load"):
+        _initialize_config()
+        globals().update(PackedConfigStore.from_serial(config_path).read())
+        _perform_post_config_loading_actions()
 
 
 def _initialize_config() -> None:
@@ -2401,6 +2404,7 @@ class ConfigCache:
         *,
         keep_outdated: bool,
         logger: logging.Logger,
+        needed_sections: SectionNameCollection = NO_SELECTION,
     ) -> AgentParser:
         return AgentParser(
             host_name,
@@ -2411,6 +2415,7 @@ class ConfigCache:
             encoding_fallback=fallback_agent_output_encoding,
             simulation=agent_simulator,  # name mismatch
             logger=logger,
+            needed_sections=needed_sections,
         )
 
     def _discovered_labels_of_service(
@@ -2508,6 +2513,33 @@ class ConfigCache:
             if agent_based_register.is_registered_snmp_section_plugin(s)
         )
 
+    def needed_sections(self, hostname: HostName) -> frozenset[SectionName]:
+        """The raw sections used when checking the host
+
+        These are the sections of the check plugins of the services and, if enabled, of the
+        status data inventory, together with the sections superseding them.
+        """
+        needed_sections = agent_based_register.get_relevant_raw_sections(
+            check_plugin_names=self.check_table(
+                hostname,
+                filter_mode=FilterMode.INCLUDE_CLUSTERED,
+                skip_ignored=True,
+            ).needed_check_names(),
+            inventory_plugin_names=(
+                (plugin.name for plugin in agent_based_register.iter_all_inventory_plugins())
+                if self.hwsw_inventory_parameters(hostname).status_data_inventory
+                else ()
+            ),
+        )
+        return frozenset(needed_sections).union(
+            section.name
+            for section in itertools.chain(
+                agent_based_register.iter_all_agent_sections(),
+                agent_based_register.iter_all_snmp_sections(),
+            )
+            if not section.supersedes.isdisjoint(needed_sections)
+        )
+
     def invalidate_host_config(self) -> None:
         self.__enforced_services_table.clear()
         self.__is_piggyback_host.clear()
@@ -27,6 +27,8 @@ notification_rules: list[EventRule] = []
 # Check every 10 seconds for ripe bulks
 notification_bulk_interval = 10
 notification_plugin_timeout = 60
+# Worker threads executing the HTTP based plugins in process, 0 starts a script for each plugin call
+notification_plugin_workers = 0
 
 # Notification Spooling.
 
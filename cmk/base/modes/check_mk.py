@@ -168,6 +168,19 @@ modes.register_general_option(
 )
 
 
+def option_profile_sampling() -> None:
+    profiling.enable_sampling()
+
+
+modes.register_general_option(
+    Option(
+        long_option="profile-sampling",
+        short_help="Enable the sampling profiler (also switched on and off by SIGUSR2)",
+        handler_function=option_profile_sampling,
+    )
+)
+
+
 def option_fake_dns(a: HostAddress) -> None:
     ip_lookup.enforce_fake_dns(a)
 
@@ -2043,6 +2056,7 @@ def mode_check(
         selected_sections=selected_sections,
         keep_outdated=file_cache_options.keep_outdated,
         logger=logging.getLogger("cmk.base.checking"),
+        only_needed_sections=True,
     )
     summarizer = CMKSummarizer(
         config_cache,
@@ -2061,7 +2075,8 @@ def mode_check(
     state, text = (3, "unknown error")
     with error_handler:
         console.vverbose("Checkmk version %s\n", cmk_version.__version__)
-        fetched = fetcher(hostname, ip_address=ipaddress)
+        with profiling.phase("fetch"):
+            fetched = fetcher(hostname, ip_address=ipaddress)
         check_result = checking.execute_checkmk_checks(
             hostname=hostname,
             is_cluster=config_cache.is_cluster(hostname),
@@ -2102,6 +2117,7 @@ def mode_check(
         with suppress(IOError):
             sys.stdout.write(text + "\n")
             sys.stdout.flush()
+    profiling.export_stats()
     return state
 
 
@@ -33,6 +33,7 @@ import cmk.utils.debug
 import cmk.utils.log as log
 import cmk.utils.paths
 import cmk.utils.store as store
+from cmk.utils.caching import config_cache as _config_cache
 from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.log import console
 from cmk.utils.macros import replace_macros_in_str
@@ -75,8 +76,11 @@ from cmk.utils.timeperiod import timeperiod_active
 import cmk.base.config as config
 import cmk.base.core
 import cmk.base.events as events
+import cmk.base.notify_bulks as notify_bulks
+import cmk.base.notify_pool as notify_pool
 import cmk.base.obsolete_output as out
 import cmk.base.utils
+from cmk.base.notify_rule_index import NotificationRuleIndex
 
 try:
     import cmk.base.cee.keepalive as keepalive
@@ -89,6 +93,8 @@ logger = logging.getLogger("cmk.base.notify")
 
 _log_to_stdout = False
 notify_mode = "notify"
+_plugin_pool: notify_pool.PluginPool | None = None
+_bulk_index: notify_bulks.BulkIndex | None = None
 
 NotificationTableEntry = dict[str, Union[NotificationPluginNameStr, list]]
 NotificationTable = list[NotificationTableEntry]
@@ -257,6 +263,7 @@ def do_notify(  # pylint: disable=too-many-branches
             send_ripe_bulks()
         else:
             notify_notify(raw_context_from_env(os.environ))
+        wait_for_pooled_notification_scripts()
 
     except Exception:
         crash_dir = Path(cmk.utils.paths.var_dir) / "notify"
@@ -396,6 +403,7 @@ def notify_keepalive() -> None:
         event_function=notify_notify,
         call_every_loop=send_ripe_bulks,
         loop_interval=config.notification_bulk_interval,
+        shutdown_function=wait_for_pooled_notification_scripts,
     )
 
 
@@ -428,7 +436,14 @@ def notify_rulebased(raw_context: EventContext, analyse: bool = False) -> Notify
     num_rule_matches = 0
     rule_info = []
 
-    for rule in config.notification_rules + user_notification_rules():
+    index = _notification_rule_index()
+    # The analysis and the verbose log show why each of the other rules does not match
+    rules = (
+        index.rules
+        if analyse or logger.isEnabledFor(log.VERBOSE)
+        else index.candidates(raw_context)
+    )
+    for rule in rules:
         contact_info = _get_contact_info_text(rule)
 
         why_not = rbn_match_rule(rule, raw_context)
@@ -450,6 +465,18 @@ def notify_rulebased(raw_context: EventContext, analyse: bool = False) -> Notify
     return rule_info, plugin_info
 
 
+def _notification_rule_index() -> NotificationRuleIndex:
+    """The global and user rules, indexed once per configuration"""
+    cache = _config_cache.get("notification_rule_index")
+    key = (id(config.notification_rules), id(config.contacts))
+    if (index := cache.get(key)) is None:
+        cache.clear()
+        index = cache[key] = NotificationRuleIndex(
+            config.notification_rules + user_notification_rules()
+        )
+    return index
+
+
 def _get_contact_info_text(rule: EventRule) -> str:
     if "contact" in rule:
         return "User {}'s rule '{}'...".format(rule["contact"], rule["description"])
@@ -554,7 +581,7 @@ def _process_notifications(  # pylint: disable=too-many-branches
                     else rbn_split_plugin_context(plugin_context)
                 )
                 for context in plugin_contexts:
-                    call_notification_script(plugin_name, context)
+                    _call_notification_script_pooled(plugin_name, context)
             else:
                 logger.info("No rule matched, would notify fallback contacts, but none configured")
     else:
@@ -605,7 +632,7 @@ def _process_notifications(  # pylint: disable=too-many-branches
                             NotificationViaPlugin({"context": context, "plugin": plugin_name}),
                         )
                     else:
-                        call_notification_script(plugin_name, context)
+                        _call_notification_script_pooled(plugin_name, context)
 
             except Exception as e:
                 if cmk.utils.debug.enabled():
@@ -942,19 +969,9 @@ def rbn_rule_contacts(  # pylint: disable=too-many-branches
     rule: EventRule,
     context: EventContext,
 ) -> ContactNames:
-    the_contacts = set()
+    the_contacts = set(_rbn_rule_static_contacts(rule))
     if rule.get("contact_object"):
         the_contacts.update(rbn_object_contact_names(context))
-    if rule.get("contact_all"):
-        the_contacts.update(rbn_all_contacts())
-    if rule.get("contact_all_with_email"):
-        the_contacts.update(rbn_all_contacts(with_email=True))
-    if "contact_users" in rule:
-        the_contacts.update(rule["contact_users"])
-    if "contact_groups" in rule:
-        the_contacts.update(rbn_groups_contacts(rule["contact_groups"]))
-    if "contact_emails" in rule:
-        the_contacts.update(rbn_emails_contacts(rule["contact_emails"]))
 
     all_enabled = []
     for contactname in the_contacts:
@@ -1000,6 +1017,29 @@ def rbn_rule_contacts(  # pylint: disable=too-many-branches
     return frozenset(all_enabled)  # has to be hashable
 
 
+def _rbn_rule_static_contacts(rule: EventRule) -> frozenset[ContactName]:
+    """The contacts of the rule which do not depend on the notified object"""
+    cache = _config_cache.get("notification_rule_contacts")
+    if (cached := cache.get(id(rule))) is not None and cached[0] is rule:
+        return cached[1]
+
+    the_contacts: set[ContactName] = set()
+    if rule.get("contact_all"):
+        the_contacts.update(rbn_all_contacts())
+    if rule.get("contact_all_with_email"):
+        the_contacts.update(rbn_all_contacts(with_email=True))
+    if "contact_users" in rule:
+        the_contacts.update(rule["contact_users"])
+    if "contact_groups" in rule:
+        the_contacts.update(rbn_groups_contacts(rule["contact_groups"]))
+    if "contact_emails" in rule:
+        the_contacts.update(rbn_emails_contacts(rule["contact_emails"]))
+
+    # The rule is kept to detect reused ids
+    cache[id(rule)] = rule, frozenset(the_contacts)
+    return cache[id(rule)][1]
+
+
 def rbn_match_contact_macros(
     rule: EventRule, contactname: ContactName, contact: Contact
 ) -> str | None:
@@ -1258,7 +1298,8 @@ def path_to_notification_script(plugin_name: NotificationPluginNameStr) -> str |
 
 # This is the function that finally sends the actual notification.
 # It does this by calling an external script are creating a
-# plain email and calling bin/mail.
+# plain email and calling bin/mail. The HTTP based plugins may
+# also be executed in process (see notify_pool).
 #
 # It also does the central logging of the notifications
 # that are actually sent out.
@@ -1276,16 +1317,51 @@ def call_notification_script(
         )
     )
 
-    def plugin_log(s: str) -> None:
-        logger.info("     %s", s)
-
     # Call actual script without any arguments
     path = path_to_notification_script(plugin_name)
     if not path:
         return 2
 
-    plugin_log("executing %s" % path)
+    _plugin_log("executing %s" % path)
+
+    if _execute_in_process(plugin_name):
+        exitcode, output_lines = notify_pool.execute_plugin(
+            plugin_name,
+            _plugin_context_of_env(notification_script_env(plugin_context)),
+            config.notification_plugin_timeout,
+        )
+        for output in output_lines:
+            _plugin_log("Output: %s" % output)
+            if _log_to_stdout:
+                out.output(output + "\n")
+    else:
+        exitcode, output_lines = _run_notification_script(path, plugin_context)
+
+    if exitcode:
+        _plugin_log("Plugin exited with code %d" % exitcode)
+
+    # Result is already logged to history for spoolfiles by
+    # mknotifyd.spool_handler
+    if not is_spoolfile:
+        log_to_history(
+            notification_result_message(
+                NotificationPluginName(plugin_name),
+                NotificationContext(plugin_context),
+                NotificationResultCode(exitcode),
+                output_lines,
+            )
+        )
+
+    return exitcode
+
+
+def _plugin_log(s: str) -> None:
+    logger.info("     %s", s)
+
 
+def _run_notification_script(
+    path: str, plugin_context: NotificationContext
+) -> tuple[int, list[str]]:
     with subprocess.Popen(
         [path],
         stdout=subprocess.PIPE,
@@ -1308,33 +1384,74 @@ def call_notification_script(
                     if not (line := p.stdout.readline()):
                         break
                     output = line.rstrip()
-                    plugin_log("Output: %s" % output)
+                    _plugin_log("Output: %s" % output)
                     output_lines.append(output)
                     if _log_to_stdout:
                         out.output(line)
             except MKTimeout:
-                plugin_log(
+                _plugin_log(
                     "Notification plugin did not finish within %d seconds. Terminating."
                     % config.notification_plugin_timeout
                 )
                 p.kill()
 
-    if exitcode := 1 if timeout_guard.signaled else p.returncode:
-        plugin_log("Plugin exited with code %d" % exitcode)
+    return 1 if timeout_guard.signaled else p.returncode, output_lines
 
-    # Result is already logged to history for spoolfiles by
-    # mknotifyd.spool_handler
-    if not is_spoolfile:
+
+def _execute_in_process(plugin_name: NotificationPluginNameStr) -> bool:
+    """Whether the shipped plugin can be executed in process
+
+    Plugins customized in local/ are always executed as scripts."""
+    return (
+        config.notification_plugin_workers > 0
+        and plugin_name in notify_pool.IN_PROCESS_PLUGINS
+        and not (cmk.utils.paths.local_notifications_dir / plugin_name).exists()
+    )
+
+
+def _plugin_context_of_env(env: Mapping[str, str]) -> PluginNotificationContext:
+    """The context a plugin script would read from its environment"""
+    return {var[7:]: value for var, value in env.items() if var.startswith("NOTIFY_")}
+
+
+def _call_notification_script_pooled(
+    plugin_name: NotificationPluginNameStr, plugin_context: NotificationContext
+) -> None:
+    """Call the plugin in the worker pool, if it can be executed in process
+
+    All other plugins are called synchronously, as before."""
+    if not _execute_in_process(plugin_name):
+        call_notification_script(plugin_name, plugin_context)
+        return
+
+    global _plugin_pool
+    if _plugin_pool is None:
+        _plugin_pool = notify_pool.PluginPool(config.notification_plugin_workers)
+    _plugin_pool.submit(lambda: _call_pooled_notification_script(plugin_name, plugin_context))
+
+
+def _call_pooled_notification_script(
+    plugin_name: NotificationPluginNameStr, plugin_context: NotificationContext
+) -> None:
+    try:
+        call_notification_script(plugin_name, plugin_context)
+    except Exception as e:
+        logger.exception("    ERROR:")
         log_to_history(
             notification_result_message(
                 NotificationPluginName(plugin_name),
-                NotificationContext(plugin_context),
-                NotificationResultCode(exitcode),
-                output_lines,
+                plugin_context,
+                NotificationResultCode(2),
+                [str(e)],
             )
         )
 
-    return exitcode
+
+def wait_for_pooled_notification_scripts() -> None:
+    global _plugin_pool
+    if _plugin_pool is not None:
+        _plugin_pool.shutdown()
+        _plugin_pool = None
 
 
 # Construct the environment for the notification script
@@ -1571,6 +1688,7 @@ def do_bulk_notify(  # pylint: disable=too-many-branches
     filename_final = bulk_dir / notify_uuid
     filename_new.write_text(f"{(params, plugin_context)!r}\n")
     filename_new.rename(filename_final)  # We need an atomic creation!
+    _get_bulk_index().add(str(bulk_dir), notify_uuid, filename_final.stat().st_mtime)
     logger.info("        - stored in %s", filename_final)
 
 
@@ -1587,148 +1705,83 @@ def _create_bulk_dir(bulk_path: Sequence[str]) -> Path:
     return bulk_dir
 
 
-def bulk_parts(method_dir: str, bulk: str) -> tuple[int | None, str | None, int] | None:
-    parts = bulk.split(",")
-
-    try:
-        interval: int | None = int(parts[0])
-        timeperiod: str | None = None
-    except ValueError:
-        entry = parts[0].split(":")
-        if entry[0] == "timeperiod" and len(entry) == 2:
-            interval, timeperiod = None, entry[1]
-        else:
-            logger.info("Skipping invalid bulk directory %s", method_dir)
-            return None
-
-    try:
-        count = int(parts[1])
-    except ValueError:
-        logger.info("Skipping invalid bulk directory %s", method_dir)
-        return None
-
-    return interval, timeperiod, count
-
-
-def bulk_uuids(bulk_dir: str) -> tuple[UUIDs, float]:
-    uuids, oldest = [], time.time()
-    for notify_uuid in os.listdir(bulk_dir):  # 4ded0fa2-f0cd-4b6a-9812-54374a04069f
-        if notify_uuid.endswith(".new"):
-            continue
-        if len(notify_uuid) != 36:
-            logger.info(
-                "Skipping invalid notification file %s", os.path.join(bulk_dir, notify_uuid)
-            )
-            continue
-
-        mtime = os.stat(os.path.join(bulk_dir, notify_uuid)).st_mtime
-        uuids.append((mtime, notify_uuid))
-        oldest = min(oldest, mtime)
-    uuids.sort()
-    return uuids, oldest
-
-
-def remove_if_orphaned(bulk_dir: str, max_age: float, ref_time: float | None = None) -> None:
-    if not ref_time:
-        ref_time = time.time()
-
-    dirage = ref_time - os.stat(bulk_dir).st_mtime
-    if dirage > max_age:
-        logger.info("Warning: removing orphaned empty bulk directory %s", bulk_dir)
-        try:
-            os.rmdir(bulk_dir)
-        except Exception as e:
-            logger.info("    -> Error removing it: %s", e)
-
-
 def find_bulks(only_ripe: bool) -> NotifyBulks:  # pylint: disable=too-many-branches
-    if not os.path.exists(notification_bulkdir):
-        return []
-
-    def listdir_visible(path: str) -> list[str]:
-        return [x for x in os.listdir(path) if not x.startswith(".")]
+    index = _get_bulk_index()
+    now = time.time()
+    index.refresh(now)
 
     bulks: NotifyBulks = []
-    now = time.time()
-    for contact in listdir_visible(notification_bulkdir):
-        contact_dir = os.path.join(notification_bulkdir, contact)
-        for method in listdir_visible(contact_dir):
-            method_dir = os.path.join(contact_dir, method)
-            for bulk in listdir_visible(method_dir):
-                bulk_dir = os.path.join(method_dir, bulk)
-
-                uuids, oldest = bulk_uuids(bulk_dir)
-                if not uuids:
-                    remove_if_orphaned(bulk_dir, max_age=60, ref_time=now)
+    for bulk_dir in index.ripe_candidates(now) if only_ripe else sorted(index.bulks()):
+        bulk = index.bulks()[bulk_dir]
+        uuids = bulk.uuids()
+        age = now - uuids[0][0]
+        interval, timeperiod, count = bulk.interval, bulk.timeperiod, bulk.count
+
+        if interval is not None:
+            if age >= interval:
+                logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
+            elif len(uuids) >= count:
+                logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
+            else:
+                logger.info(
+                    "Bulk %s is not ripe yet (age: %d, count: %d)!",
+                    bulk_dir,
+                    age,
+                    len(uuids),
+                )
+                if only_ripe:
                     continue
-                age = now - oldest
 
-                # e.g. 60,10,host,localhost OR timeperiod:late_night,1000,host,localhost
-                parts = bulk_parts(method_dir, bulk)
-                if parts is None:
-                    continue
-                interval, timeperiod, count = parts
+            bulks.append((bulk_dir, age, interval, "n.a.", count, uuids))
+        else:
+            try:
+                active = timeperiod_active(str(timeperiod))
+            except Exception:
+                # This prevents sending bulk notifications if a
+                # livestatus connection error appears. It also implies
+                # that an ongoing connection error will hold back bulk
+                # notifications.
+                logger.info(
+                    "Error while checking activity of time period %s: assuming active",
+                    timeperiod,
+                )
+                active = True
 
-                if interval is not None:
-                    if age >= interval:
-                        logger.info("Bulk %s is ripe: age %d >= %d", bulk_dir, age, interval)
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
-                        logger.info(
-                            "Bulk %s is not ripe yet (age: %d, count: %d)!",
-                            bulk_dir,
-                            age,
-                            len(uuids),
-                        )
-                        if only_ripe:
-                            continue
+            if active is True and len(uuids) < count:
+                # Only add a log entry every 10 minutes since timeperiods
+                # can be very long (The default would be 10s).
+                if now % 600 <= config.notification_bulk_interval:
+                    logger.info(
+                        "Bulk %s is not ripe yet (time period %s: active, count: %d)",
+                        bulk_dir,
+                        timeperiod,
+                        len(uuids),
+                    )
 
-                    bulks.append((bulk_dir, age, interval, "n.a.", count, uuids))
-                else:
-                    try:
-                        active = timeperiod_active(str(timeperiod))
-                    except Exception:
-                        # This prevents sending bulk notifications if a
-                        # livestatus connection error appears. It also implies
-                        # that an ongoing connection error will hold back bulk
-                        # notifications.
-                        logger.info(
-                            "Error while checking activity of time period %s: assuming active",
-                            timeperiod,
-                        )
-                        active = True
-
-                    if active is True and len(uuids) < count:
-                        # Only add a log entry every 10 minutes since timeperiods
-                        # can be very long (The default would be 10s).
-                        if now % 600 <= config.notification_bulk_interval:
-                            logger.info(
-                                "Bulk %s is not ripe yet (time period %s: active, count: %d)",
-                                bulk_dir,
-                                timeperiod,
-                                len(uuids),
-                            )
-
-                        if only_ripe:
-                            continue
-                    elif active is False:
-                        logger.info(
-                            "Bulk %s is ripe: time period %s has ended", bulk_dir, timeperiod
-                        )
-                    elif len(uuids) >= count:
-                        logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
-                    else:
-                        logger.info(
-                            "Bulk %s is ripe: time period %s is not known anymore",
-                            bulk_dir,
-                            timeperiod,
-                        )
+                if only_ripe:
+                    continue
+            elif active is False:
+                logger.info("Bulk %s is ripe: time period %s has ended", bulk_dir, timeperiod)
+            elif len(uuids) >= count:
+                logger.info("Bulk %s is ripe: count %d >= %d", bulk_dir, len(uuids), count)
+            else:
+                logger.info(
+                    "Bulk %s is ripe: time period %s is not known anymore",
+                    bulk_dir,
+                    timeperiod,
+                )
 
-                    bulks.append((bulk_dir, age, "n.a.", timeperiod, count, uuids))
+            bulks.append((bulk_dir, age, "n.a.", timeperiod, count, uuids))
     return bulks
 
 
+def _get_bulk_index() -> notify_bulks.BulkIndex:
+    global _bulk_index
+    if _bulk_index is None or _bulk_index.bulk_dir != Path(notification_bulkdir):
+        _bulk_index = notify_bulks.BulkIndex(Path(notification_bulkdir), logger)
+    return _bulk_index
+
+
 def send_ripe_bulks() -> None:
     ripe = find_bulks(True)
     if ripe:
@@ -1807,13 +1860,16 @@ def notify_bulk(dirname: str, uuids: UUIDs) -> None:  # pylint: disable=too-many
         logger.info("No valid notification file left. Skipping this bulk.")
 
     # Remove sent notifications
+    removed = []
     for mtime, notify_uuid in uuids:
         if (mtime, notify_uuid) not in unhandled_uuids:
             path = os.path.join(dirname, notify_uuid)
+            removed.append(notify_uuid)
             try:
                 os.remove(path)
             except Exception as e:
                 logger.info("Cannot remove %s: %s", path, e)
+    _get_bulk_index().remove(dirname, removed)
 
     # Repeat with unhandled uuids (due to different parameters)
     if unhandled_uuids:
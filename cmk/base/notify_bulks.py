@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Index of the pending bulk notifications
+
+The bulk notifications are stored in the directory hierarchy
+<bulk dir>/<contact>/<method>/<bulk>/<uuid>, which stays the durable storage. Scanning it for
+ripe bulks costs file system operations for each bulk and notification. Instead, the pending
+notifications are indexed in memory. The index is built by scanning the directories once and
+then kept up to date by a journal: each process storing or sending bulk notifications appends
+them to the journal, each process using an index replays the records it has not seen yet.
+
+The times the bulks with an interval become ripe are kept in a heap, so finding the ripe ones
+does not need to look at the others. The bulks depending on a time period have to be checked
+each time, only the core knows the state of the time periods.
+"""
+
+import fcntl
+import heapq
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from logging import Logger
+from pathlib import Path
+from typing import Final
+
+from cmk.utils.notify_types import UUIDs
+
+# Hidden, so it is not taken for a contact
+JOURNAL_NAME: Final = ".journal"
+# Replaying is cheap, but the journal is truncated from time to time
+_MAX_JOURNAL_SIZE: Final = 1024 * 1024
+# Repairs the index after crashes between storing a notification and journaling it
+_RESCAN_INTERVAL: Final = 3600
+
+_ADD: Final = "+"
+_REMOVE: Final = "-"
+
+
+@dataclass
+class Bulk:
+    interval: int | None
+    timeperiod: str | None
+    count: int
+    # notification UUID -> time of storing
+    notifications: dict[str, float] = field(default_factory=dict)
+
+    def uuids(self) -> UUIDs:
+        return sorted((mtime, notify_uuid) for notify_uuid, mtime in self.notifications.items())
+
+    def ripe_time(self) -> float | None:
+        """The time a bulk with an interval becomes ripe"""
+        if self.interval is None or not self.notifications:
+            return None
+        if len(self.notifications) >= self.count:
+            return 0.0
+        return min(self.notifications.values()) + self.interval
+
+
+def bulk_parts(
+    method_dir: str, bulk: str, logger: Logger
+) -> tuple[int | None, str | None, int] | None:
+    parts = bulk.split(",")
+
+    try:
+        interval: int | None = int(parts[0])
+        timeperiod: str | None = None
+    except ValueError:
+        entry = parts[0].split(":")
+        if entry[0] == "timeperiod" and len(entry) == 2:
+            interval, timeperiod = None, entry[1]
+        else:
+            logger.info("Skipping invalid bulk directory %s", method_dir)
+            return None
+
+    try:
+        count = int(parts[1])
+    except ValueError:
+        logger.info("Skipping invalid bulk directory %s", method_dir)
+        return None
+
+    return interval, timeperiod, count
+
+
+def bulk_uuids(bulk_dir: str, logger: Logger) -> tuple[UUIDs, float]:
+    uuids, oldest = [], time.time()
+    for notify_uuid in os.listdir(bulk_dir):  # 4ded0fa2-f0cd-4b6a-9812-54374a04069f
+        if notify_uuid.endswith(".new"):
+            continue
+        if len(notify_uuid) != 36:
+            logger.info(
+                "Skipping invalid notification file %s", os.path.join(bulk_dir, notify_uuid)
+            )
+            continue
+
+        mtime = os.stat(os.path.join(bulk_dir, notify_uuid)).st_mtime
+        uuids.append((mtime, notify_uuid))
+        oldest = min(oldest, mtime)
+    uuids.sort()
+    return uuids, oldest
+
+
+def remove_if_orphaned(
+    bulk_dir: str, max_age: float, logger: Logger, ref_time: float | None = None
+) -> None:
+    if not ref_time:
+        ref_time = time.time()
+
+    dirage = ref_time - os.stat(bulk_dir).st_mtime
+    if dirage > max_age:
+        logger.info("Warning: removing orphaned empty bulk directory %s", bulk_dir)
+        try:
+            os.rmdir(bulk_dir)
+        except Exception as e:
+            logger.info("    -> Error removing it: %s", e)
+
+
+class BulkIndex:
+    """The pending bulk notifications of all contacts and methods
+
+    The bulks are identified by their directories."""
+
+    def __init__(self, bulk_dir: Path, logger: Logger) -> None:
+        self.bulk_dir: Final = bulk_dir
+        self._journal_path: Final = bulk_dir / JOURNAL_NAME
+        self._logger = logger
+        self._bulks: dict[str, Bulk] = {}
+        self._ripe_times: list[tuple[float, str]] = []
+        self._timeperiod_bulks: set[str] = set()
+        self._journal_inode: int | None = None
+        self._journal_offset = 0
+        self._last_scan: float | None = None
+
+    def bulks(self) -> dict[str, Bulk]:
+        return self._bulks
+
+    def add(self, bulk_dir: str, notify_uuid: str, mtime: float) -> None:
+        """Journal a stored notification"""
+        self._append_record([_ADD, bulk_dir, notify_uuid, mtime])
+        self._add(bulk_dir, notify_uuid, mtime)
+
+    def remove(self, bulk_dir: str, notify_uuids: list[str]) -> None:
+        """Journal removed notifications"""
+        self._append_record([_REMOVE, bulk_dir, notify_uuids])
+        self._remove(bulk_dir, notify_uuids)
+
+    def refresh(self, now: float) -> None:
+        """Take over the changes made by all processes"""
+        try:
+            stat = self._journal_path.stat()
+        except FileNotFoundError:
+            stat = None
+        if (
+            self._last_scan is None
+            or now - self._last_scan >= _RESCAN_INTERVAL
+            or (stat is not None and self._journal_inode not in (None, stat.st_ino))
+            or (stat is not None and stat.st_size < self._journal_offset)
+        ):
+            self._scan(now)
+        elif stat is not None and stat.st_size > self._journal_offset:
+            self._replay()
+
+        if self._journal_offset > _MAX_JOURNAL_SIZE:
+            self._truncate_journal()
+
+    def ripe_candidates(self, now: float) -> list[str]:
+        """The bulks which may be ripe: the ones ripe by interval or count and all depending
+        on a time period"""
+        ripe: dict[str, float] = {}
+        while self._ripe_times and self._ripe_times[0][0] <= now:
+            _ripe_time, bulk_dir = heapq.heappop(self._ripe_times)
+            if (bulk := self._bulks.get(bulk_dir)) is None or (
+                ripe_time := bulk.ripe_time()
+            ) is None:
+                continue  # Already sent
+            if ripe_time > now:
+                # Outdated entry, notifications have been sent meanwhile
+                heapq.heappush(self._ripe_times, (ripe_time, bulk_dir))
+                continue
+            ripe[bulk_dir] = ripe_time
+
+        # They stay ripe until they have been sent
+        for bulk_dir, ripe_time in ripe.items():
+            heapq.heappush(self._ripe_times, (ripe_time, bulk_dir))
+        return sorted(ripe.keys() | self._timeperiod_bulks)
+
+    def _add(self, bulk_dir: str, notify_uuid: str, mtime: float) -> None:
+        if (bulk := self._bulks.get(bulk_dir)) is None:
+            method_dir, bulk_name = os.path.split(bulk_dir)
+            if (parts := bulk_parts(method_dir, bulk_name, self._logger)) is None:
+                return
+            bulk = self._bulks[bulk_dir] = Bulk(*parts)
+            if bulk.timeperiod is not None:
+                self._timeperiod_bulks.add(bulk_dir)
+
+        previous_ripe_time = bulk.ripe_time()
+        bulk.notifications[notify_uuid] = mtime
+        if (ripe_time := bulk.ripe_time()) is not None and ripe_time != previous_ripe_time:
+            heapq.heappush(self._ripe_times, (ripe_time, bulk_dir))
+
+    def _remove(self, bulk_dir: str, notify_uuids: list[str]) -> None:
+        if (bulk := self._bulks.get(bulk_dir)) is None:
+            return
+        for notify_uuid in notify_uuids:
+            bulk.notifications.pop(notify_uuid, None)
+        if not bulk.notifications:
+            del self._bulks[bulk_dir]
+            self._timeperiod_bulks.discard(bulk_dir)
+        elif (ripe_time := bulk.ripe_time()) is not None:
+            heapq.heappush(self._ripe_times, (ripe_time, bulk_dir))
+
+    def _scan(self, now: float) -> None:
+        """Build the index from the directories"""
+        self._bulks = {}
+        self._ripe_times = []
+        self._timeperiod_bulks = set()
+        # Notifications stored during the scan are taken from the journal afterwards
+        try:
+            stat = self._journal_path.stat()
+            self._journal_inode, self._journal_offset = stat.st_ino, stat.st_size
+        except FileNotFoundError:
+            self._journal_inode, self._journal_offset = None, 0
+        self._last_scan = now
+
+        if not self.bulk_dir.exists():
+            return
+
+        def listdir_visible(path: str) -> list[str]:
+            return [x for x in os.listdir(path) if not x.startswith(".")]
+
+        for contact in listdir_visible(str(self.bulk_dir)):
+            contact_dir = os.path.join(self.bulk_dir, contact)
+            for method in listdir_visible(contact_dir):
+                method_dir = os.path.join(contact_dir, method)
+                for bulk in listdir_visible(method_dir):
+                    bulk_dir = os.path.join(method_dir, bulk)
+                    uuids, _oldest = bulk_uuids(bulk_dir, self._logger)
+                    if not uuids:
+                        remove_if_orphaned(bulk_dir, max_age=60, logger=self._logger, ref_time=now)
+                        continue
+                    for mtime, notify_uuid in uuids:
+                        self._add(bulk_dir, notify_uuid, mtime)
+
+        self._replay()
+
+    def _replay(self) -> None:
+        try:
+            with self._journal_path.open("rb") as f:
+                if os.fstat(f.fileno()).st_ino != self._journal_inode:
+                    if self._journal_inode is not None:
+                        return  # Replaced meanwhile, the next refresh scans again
+                    self._journal_inode = os.fstat(f.fileno()).st_ino
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        # A record may just being written, only complete lines are replayed
+        complete = data[: data.rfind(b"\n") + 1]
+        self._journal_offset += len(complete)
+        for line in complete.splitlines():
+            try:
+                op, bulk_dir, *args = json.loads(line)
+            except ValueError:
+                self._logger.info("Skipping invalid record in %s", self._journal_path)
+                continue
+            if op == _ADD:
+                self._add(bulk_dir, *args)
+            elif op == _REMOVE:
+                self._remove(bulk_dir, *args)
+
+    def _append_record(self, record: list[object]) -> None:
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        while True:
+            fd = os.open(self._journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o660)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                # The journal may have been replaced while waiting for the lock
+                if os.fstat(fd).st_ino == os.stat(self._journal_path).st_ino:
+                    os.write(fd, line)
+                    return
+            except FileNotFoundError:
+                pass
+            finally:
+                os.close(fd)
+
+    def _truncate_journal(self) -> None:
+        """Start a new journal, the other processes scan the directories once"""
+        fd = os.open(self._journal_path, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_ino != self._journal_inode:
+                return
+            # The records appended until now
+            self._replay()
+            path_new = self._journal_path.with_name(JOURNAL_NAME + ".new")
+            path_new.touch()
+            path_new.rename(self._journal_path)
+            self._journal_inode = self._journal_path.stat().st_ino
+            self._journal_offset = 0
+        finally:
+            os.close(fd)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Execution of notification plugins within the notification process
+
+Starting a Python interpreter for each notification costs more than most plugins need for
+sending it. The plugins which send a notification with a single HTTP request (see
+post_request()) can be executed in process instead, either in the calling thread or in a
+bounded pool of worker threads. Their HTTP sessions persist between the notifications.
+
+The plugins communicate with their caller by their output and their exit code, just like the
+scripts do. The output of each call is captured separately, so calls can run concurrently.
+"""
+
+import importlib
+import io
+import sys
+import threading
+import traceback
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Final, NamedTuple, TextIO
+
+from cmk.utils.notify import in_process_call
+from cmk.utils.notify_types import NotificationPluginNameStr, PluginNotificationContext
+
+# The plugins using post_request(), others stay in their own process
+IN_PROCESS_PLUGINS: Final = {
+    "cisco_webex_teams": "cmk.notification_plugins.cisco_webex_teams",
+    "ilert": "cmk.notification_plugins.ilert",
+    "msteams": "cmk.notification_plugins.msteams",
+    "pagerduty": "cmk.notification_plugins.pagerduty",
+    "signl4": "cmk.notification_plugins.signl4",
+    "slack": "cmk.notification_plugins.slack",
+    "victorops": "cmk.notification_plugins.victorops",
+}
+
+
+class PluginResult(NamedTuple):
+    exitcode: int
+    output: list[str]
+
+
+_output: ContextVar[io.StringIO | None] = ContextVar("plugin_output", default=None)
+_install_lock = threading.Lock()
+
+
+class _CapturedStream:
+    """Redirects writes to the output of the plugin call running in the current thread"""
+
+    def __init__(self, stream: TextIO) -> None:
+        self._stream = stream
+
+    def write(self, s: str) -> int:
+        if (output := _output.get()) is not None:
+            return output.write(s)
+        return self._stream.write(s)
+
+    def __getattr__(self, name: str) -> object:
+        return getattr(self._stream, name)
+
+
+def _capture_output() -> None:
+    with _install_lock:
+        if not isinstance(sys.stdout, _CapturedStream):
+            sys.stdout = _CapturedStream(sys.stdout)  # type: ignore[assignment]
+        if not isinstance(sys.stderr, _CapturedStream):
+            sys.stderr = _CapturedStream(sys.stderr)  # type: ignore[assignment]
+
+
+def execute_plugin(
+    plugin_name: NotificationPluginNameStr, context: PluginNotificationContext, timeout: float
+) -> PluginResult:
+    """Call the main() of the plugin like its script would do"""
+    main: Callable[[], object] = importlib.import_module(IN_PROCESS_PLUGINS[plugin_name]).main
+    _capture_output()
+    output = io.StringIO()
+    token = _output.set(output)
+    try:
+        with in_process_call(context, timeout):
+            exitcode = _exitcode(main(), output)
+    except SystemExit as e:
+        exitcode = _exitcode(e.code, output)
+    except Exception:
+        # Like an uncaught exception terminates the interpreter
+        output.write(traceback.format_exc())
+        exitcode = 1
+    finally:
+        _output.reset(token)
+    return PluginResult(exitcode, [line.rstrip() for line in output.getvalue().splitlines()])
+
+
+def _exitcode(code: object, output: io.StringIO) -> int:
+    """The exit code of sys.exit(code)"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    output.write(f"{code}\n")
+    return 1
+
+
+class PluginPool:
+    """Bounded pool of worker threads calling the plugins
+
+    Submitting blocks while twice as many calls as workers are pending, so a burst of
+    notifications can not pile up in memory."""
+
+    def __init__(self, workers: int) -> None:
+        self._executor: Final = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="notification-plugin"
+        )
+        self._slots: Final = threading.BoundedSemaphore(2 * workers)
+
+    def submit(self, call: Callable[[], object]) -> None:
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(call)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+
+    def _release(self, _future: Future) -> None:
+        self._slots.release()
+
+    def shutdown(self) -> None:
+        """Wait for all pending calls"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Preselection of the notification rules which may match a notification
+
+Matching a notification against each global and user notification rule takes a chain of
+matcher calls per rule. Most rules can be ruled out by a few of their conditions alone: the
+kind of the notification (host or service, from the Event Console or not), the host names and
+the sites. These conditions are indexed once, so only the remaining candidates need to be
+matched.
+
+The preselection is conservative: a rule is only left out if the matchers would reject it
+anyway. The candidates keep the order of the rules, which matters for cancelling rules.
+"""
+
+import heapq
+from collections.abc import Iterator, Sequence
+from typing import Final
+
+from cmk.utils.notify_types import EventContext, EventRule
+from cmk.utils.site import omd_site
+
+# Kind of notification: WHAT and whether it has been created by the Event Console
+_Kind = tuple[str, bool]
+
+_WHATS: Final = ("HOST", "SERVICE")
+
+
+class NotificationRuleIndex:
+    def __init__(self, rules: Sequence[EventRule]) -> None:
+        self.rules: Final = rules
+        # Indexes of the rules, for each kind of notification
+        self._any_host: dict[_Kind, list[int]] = {}
+        self._by_host: dict[_Kind, dict[str, list[int]]] = {}
+        self._sites: dict[int, frozenset[str]] = {}
+
+        for idx, rule in enumerate(rules):
+            if rule.get("disabled"):
+                continue
+            if "match_site" in rule:
+                self._sites[idx] = frozenset(rule["match_site"])
+            for kind in _kinds(rule):
+                if "match_hosts" in rule:
+                    by_host = self._by_host.setdefault(kind, {})
+                    for host_name in set(rule["match_hosts"]):
+                        by_host.setdefault(host_name, []).append(idx)
+                else:
+                    self._any_host.setdefault(kind, []).append(idx)
+
+    def candidates(self, context: EventContext) -> Sequence[EventRule]:
+        """The rules which may match the notification, in their original order"""
+        if (what := context.get("WHAT")) not in _WHATS:
+            return self.rules
+        kind = (what, "EC_ID" in context)
+        # Same fallback as the site matcher
+        site_id = context.get("OMD_SITE", omd_site())
+        return [
+            self.rules[idx]
+            for idx in _merged(
+                self._any_host.get(kind, []),
+                self._by_host.get(kind, {}).get(context.get("HOSTNAME", ""), []),
+            )
+            if (sites := self._sites.get(idx)) is None or site_id in sites
+        ]
+
+
+def _kinds(rule: EventRule) -> Iterator[_Kind]:
+    whats: Sequence[str] = _WHATS
+    if "match_host_event" in rule and "match_service_event" not in rule:
+        whats = ("HOST",)
+    elif "match_service_event" in rule and "match_host_event" not in rule:
+        whats = ("SERVICE",)
+    if "match_services" in rule or "match_checktype" in rule:
+        whats = [w for w in whats if w == "SERVICE"]
+
+    ec_flags: Sequence[bool] = (False, True)
+    if "match_ec" in rule:
+        ec_flags = (False,) if rule["match_ec"] is False else (True,)
+
+    for what in whats:
+        for is_ec in ec_flags:
+            yield what, is_ec
+
+
+def _merged(first: list[int], second: list[int]) -> Iterator[int]:
+    if not second:
+        return iter(first)
+    return heapq.merge(first, second)
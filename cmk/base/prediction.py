@@ -6,11 +6,12 @@
 
 import json
 import logging
-import math
 import time
 from collections.abc import Callable
 from typing import Final, NamedTuple
 
+import numpy as np
+
 import livestatus
 
 import cmk.utils.dateutils as dateutils
@@ -34,6 +35,7 @@ from cmk.utils.prediction import (
     TimeSeriesValues,
     Timestamp,
     TimeWindow,
+    values_to_array,
 )
 from cmk.utils.servicename import ServiceName
 
@@ -151,7 +153,10 @@ def _retrieve_grouped_data_from_rrd(
     "Collect all time slices and up-sample them to same resolution"
     from_time = time_windows[0][0]
 
-    slices = [(rrd_column(start, end), from_time - start) for start, end in time_windows]
+    slices = [
+        (timeseries, from_time - start)
+        for timeseries, (start, _end) in zip(rrd_column(time_windows), time_windows)
+    ]
 
     # The resolutions of the different time ranges differ. We upsample
     # to the best resolution. We assume that the youngest slice has the
@@ -165,25 +170,37 @@ def _retrieve_grouped_data_from_rrd(
 
 def _data_stats(slices: list[TimeSeriesValues]) -> DataStats:
     "Statistically summarize all the upsampled RRD data"
+    num_points = min((len(s) for s in slices), default=0)
+    points = np.array([values_to_array(s[:num_points]) for s in slices]).reshape(
+        len(slices), num_points
+    )
 
-    descriptors: DataStats = []
-
-    for time_column in zip(*slices):
-        point_line = [x for x in time_column if x is not None]
-        if point_line:
-            average = sum(point_line) / float(len(point_line))
-            descriptors.append(
-                [
-                    average,
-                    min(point_line),
-                    max(point_line),
-                    _std_dev(point_line, average),
-                ]
-            )
-        else:
-            descriptors.append([None, None, None, None])
-
-    return descriptors
+    samples = np.count_nonzero(~np.isnan(points), axis=0)
+    with np.errstate(all="ignore"):
+        average = np.nansum(points, axis=0) / samples
+        # In the case of a single data-point an unbiased standard deviation is
+        # undefined. In this case we take the magnitude of the measured value
+        # itself as a measure of the dispersion.
+        std_dev = np.where(
+            samples == 1,
+            np.abs(average),
+            np.sqrt(
+                np.abs(np.nansum(points**2, axis=0) - average**2 * samples) / (samples - 1)
+            ),
+        )
+    minimum = np.fmin.reduce(points, axis=0) if len(slices) else average
+    maximum = np.fmax.reduce(points, axis=0) if len(slices) else average
+
+    return [
+        [avg, min_, max_, stdev] if count else [None, None, None, None]
+        for count, avg, min_, max_, stdev in zip(
+            samples.tolist(),
+            average.tolist(),
+            minimum.tolist(),
+            maximum.tolist(),
+            std_dev.tolist(),
+        )
+    ]
 
 
 def _calculate_data_for_prediction(
@@ -203,18 +220,6 @@ def _calculate_data_for_prediction(
     )
 
 
-def _std_dev(point_line: list[float], average: float) -> float:
-    samples = len(point_line)
-    # In the case of a single data-point an unbiased standard deviation is
-    # undefined. In this case we take the magnitude of the measured value
-    # itself as a measure of the dispersion.
-    if samples == 1:
-        return abs(average)
-    return math.sqrt(
-        abs(sum(p**2 for p in point_line) - average**2 * samples) / float(samples - 1)
-    )
-
-
 def _is_prediction_up_to_date(
     last_info: PredictionInfo | None,
     timegroup: Timegroup,
@@ -2,10 +2,35 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
+"""Profiling of Checkmk base
 
+There are two kinds of profiling:
+
+* The deterministic profiling of one call with cProfile, enabled with --profile.
+
+* The always-on profiling of long-running processes: the durations of the phases of the work
+  (config loading, fetching, parsing, checking, submitting and saving the value stores) are always
+  aggregated. Additionally, a sampling profiler can be enabled with --profile-sampling or switched
+  on and off at runtime by sending SIGUSR2 to the process. The aggregated data is exported
+  periodically to a stats file per process in tmp/check_mk/profiling. The files of processes
+  which have terminated are removed with the next export.
+"""
+
+import json
+import os
+import signal
 import sys
+import time
+from collections import Counter
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from types import FrameType
+from typing import Final
 
+import cmk.utils.paths
+import cmk.utils.store as store
 from cmk.utils.log import console
 
 import cmk.base.obsolete_output as out
@@ -13,6 +38,11 @@ import cmk.base.obsolete_output as out
 _profile = None
 _profile_path = Path("profile.out")
 
+# The sampled CPU time between two samples. Taking a sample takes some 10 microseconds.
+_SAMPLING_INTERVAL: Final = 0.01
+_MAX_STACK_DEPTH: Final = 64
+_EXPORT_INTERVAL: Final = 60.0
+
 
 def enable() -> None:
     global _profile
@@ -28,6 +58,8 @@ def enabled() -> bool:
 
 
 def output_profile() -> None:
+    export_stats(force=_sampler.used)
+
     if not _profile:
         return
 
@@ -53,3 +85,182 @@ stats.sort_stats('cumtime').print_stats()"""
         f"Profile '{_profile_path}' written. Please run {show_profile}.\n",
         stream=sys.stderr,
     )
+
+
+@dataclass
+class PhaseStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+
+_phase_stats: dict[str, PhaseStats] = {}
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Measure the wall clock time of a phase of the work
+
+    The phases should not be nested, e.g. the checking phase does not include the submission of
+    the results.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phase_stats.setdefault(name, PhaseStats()).add(time.perf_counter() - start)
+
+
+def phase_stats() -> Mapping[str, PhaseStats]:
+    return _phase_stats
+
+
+def phase_totals() -> dict[str, float]:
+    return {name: stats.total for name, stats in _phase_stats.items()}
+
+
+def phase_durations_since(totals: Mapping[str, float]) -> dict[str, float]:
+    """The durations of the phases run since the totals were taken, e.g. for a single host"""
+    return {
+        name: stats.total - totals.get(name, 0.0)
+        for name, stats in _phase_stats.items()
+        if stats.total != totals.get(name, 0.0)
+    }
+
+
+class SamplingProfiler:
+    """Count the stacks found in intervals of the CPU time of the process
+
+    The stacks are kept in the folded format of the flame graph tools: the functions from the
+    outermost to the innermost frame, separated by semicolons. The profiler uses SIGPROF, so
+    it only works in the main thread.
+    """
+
+    def __init__(self, interval: float = _SAMPLING_INTERVAL) -> None:
+        self.interval: Final = interval
+        self.stacks: Counter[str] = Counter()
+        self.running = False
+        self.used = False
+
+    def start(self) -> None:
+        if self.running:
+            return
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.running = self.used = True
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+        self.running = False
+
+    def toggle(self) -> None:
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def _sample(self, signum: int, frame: FrameType | None) -> None:
+        functions = []
+        while frame is not None and len(functions) < _MAX_STACK_DEPTH:
+            code = frame.f_code
+            functions.append(f"{code.co_filename}:{code.co_name}")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(functions))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+_sampler = SamplingProfiler()
+
+
+def enable_sampling() -> None:
+    _sampler.start()
+    console.verbose("Enabled sampling profiler.\n")
+
+
+def _toggle_sampling(signum: int, frame: FrameType | None) -> None:
+    global _force_export
+    _sampler.toggle()
+    # Write the samples as soon as possible when the sampling is stopped
+    _force_export = not _sampler.running
+
+
+def register_signal_handler() -> None:
+    """Switch the sampling profiler on and off with SIGUSR2"""
+    signal.signal(signal.SIGUSR2, _toggle_sampling)
+
+
+_started: Final = time.time()
+_last_export = time.monotonic()
+_force_export = False
+
+
+def stats_dir() -> Path:
+    return Path(cmk.utils.paths.tmp_dir, "profiling")
+
+
+def export_stats(force: bool = False) -> None:
+    """Write the aggregated data at most once per export interval
+
+    Short-lived processes only write their data when forced to.
+    """
+    global _last_export, _force_export
+    if not (force or _force_export or time.monotonic() - _last_export >= _EXPORT_INTERVAL):
+        return
+    _last_export = time.monotonic()
+    _force_export = False
+
+    name = f"{Path(sys.argv[0]).name}.{os.getpid()}"
+    store.makedirs(stats_dir())
+    _remove_stale_stats()
+    store.save_text_to_file(
+        stats_dir() / f"{name}.json",
+        json.dumps(
+            {
+                "pid": os.getpid(),
+                "argv": sys.argv,
+                "started": _started,
+                "exported": time.time(),
+                "phases": {
+                    phase_name: asdict(stats) for phase_name, stats in sorted(_phase_stats.items())
+                },
+                "sampling": {
+                    "running": _sampler.running,
+                    "interval": _sampler.interval,
+                    "samples": sum(_sampler.stacks.values()),
+                },
+            }
+        ),
+    )
+    if _sampler.used:
+        store.save_text_to_file(stats_dir() / f"{name}.folded", _sampler.folded())
+
+
+def _remove_stale_stats() -> None:
+    """Remove the files of the processes which do not exist anymore"""
+    for path in stats_dir().iterdir():
+        try:
+            pid = int(path.name.split(".")[-2])
+        except (ValueError, IndexError):
+            continue
+        if not _process_exists(pid):
+            path.unlink(missing_ok=True)
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -59,6 +59,7 @@ def make_parser(
     checking_sections: frozenset[SectionName],
     keep_outdated: bool,
     logger: logging.Logger,
+    needed_sections: SectionNameCollection = NO_SELECTION,
 ) -> Parser:
     hostname = source.hostname
     if source.fetcher_type is FetcherType.SNMP:
@@ -90,6 +91,7 @@ def make_parser(
         ),
         keep_outdated=keep_outdated,
         logger=logger,
+        needed_sections=needed_sections,
     )
 
 
@@ -6,7 +6,10 @@
 from __future__ import annotations
 
 import abc
+import functools
+import itertools
 import logging
+import re
 import time
 from collections.abc import Iterator, Mapping, MutableMapping, Sequence
 from typing import final, Final, NamedTuple
@@ -35,6 +38,16 @@ class SectionWithHeader(NamedTuple):
 MutableSection = list[SectionWithHeader]
 ImmutableSection = Sequence[SectionWithHeader]
 
+# All lines the state machine may handle as markers, the lines in between are content
+_MARKER_LINE: Final = re.compile(rb"^<<<[^\n]*>>>\r*$", re.MULTILINE)
+# The output of a piggybacked host written as one frame of the given number of bytes, see
+# cmk.special_agents.utils.agent_common.ConditionalPiggybackFrame
+_FRAME_HEADER: Final = re.compile(rb"<<<<([^\n]+):length\((\d+)\)>>>>\r?")
+_SECTION_HEADER: Final = re.compile(rb"^<<<[^\n]*>>>$", re.MULTILINE)
+# Frames with these lines are parsed line by line, as they are dropped or change the state. The
+# first line of a frame is checked separately.
+_FRAME_SPECIAL_LINES: Final = re.compile(rb"\r|\n[ \t\v\f]*(?:\n|$)|\n<<<(?:<|>>>|:)")
+
 
 class ParserState(abc.ABC):
     """Base class for the state machine.
@@ -95,6 +108,10 @@ class ParserState(abc.ABC):
     def do_action(self, line: bytes) -> ParserState:
         raise NotImplementedError()
 
+    def do_actions(self, data: bytes) -> ParserState:
+        """Handle all content lines of data at once, data contains no marker lines"""
+        return self
+
     @abc.abstractmethod
     def on_section_header(self, line: bytes) -> ParserState:
         raise NotImplementedError()
@@ -257,7 +274,7 @@ class NOOPParser(ParserState):
         return self
 
     def on_section_header(self, line: bytes) -> ParserState:
-        return self.to_host_section_parser(SectionMarker.from_headerline(line))
+        return self.to_host_section_parser(_section_marker(line))
 
     def on_section_footer(self, line: bytes) -> ParserState:
         # Optional
@@ -307,7 +324,7 @@ class PiggybackParser(ParserState):
     def on_section_header(self, line: bytes) -> ParserState:
         return self.to_piggyback_section_parser(
             self.current_host,
-            SectionMarker.from_headerline(line),
+            _section_marker(line),
         )
 
     def on_section_footer(self, line: bytes) -> ParserState:
@@ -344,6 +361,13 @@ class PiggybackSectionParser(ParserState):
         self.piggyback_sections[self.current_host][-1].section.append(AgentRawData(line))
         return self
 
+    def do_actions(self, data: bytes) -> ParserState:
+        assert self.piggyback_sections[self.current_host][-1].header == self.current_section
+        self.piggyback_sections[self.current_host][-1].section.extend(
+            AgentRawData(line.rstrip(b"\r")) for line in data.split(b"\n") if line.strip()
+        )
+        return self
+
     def on_piggyback_header(self, line: bytes) -> ParserState:
         piggyback_header = PiggybackMarker.from_headerline(
             line,
@@ -358,7 +382,7 @@ class PiggybackSectionParser(ParserState):
     def on_section_header(self, line: bytes) -> ParserState:
         return self.to_piggyback_section_parser(
             self.current_host,
-            SectionMarker.from_headerline(line),
+            _section_marker(line),
         )
 
     def on_section_footer(self, line: bytes) -> ParserState:
@@ -408,7 +432,7 @@ class PiggybackNOOPParser(ParserState):
     def on_section_header(self, line: bytes) -> ParserState:
         return self.to_piggyback_section_parser(
             self.current_host,
-            SectionMarker.from_headerline(line),
+            _section_marker(line),
         )
 
     def on_section_footer(self, line: bytes) -> ParserState:
@@ -446,6 +470,13 @@ class HostSectionParser(ParserState):
         self.sections[-1].section.append(AgentRawData(line))
         return self
 
+    def do_actions(self, data: bytes) -> ParserState:
+        # The lines are only split when the section is decoded, see `_section_lines`
+        assert self.sections[-1].header == self.current_section
+        if data:
+            self.sections[-1].section.append(AgentRawData(data))
+        return self
+
     def on_piggyback_header(self, line: bytes) -> ParserState:
         piggyback_header = PiggybackMarker.from_headerline(
             line,
@@ -461,7 +492,7 @@ class HostSectionParser(ParserState):
         return self.to_noop_parser()
 
     def on_section_header(self, line: bytes) -> ParserState:
-        return self.to_host_section_parser(SectionMarker.from_headerline(line))
+        return self.to_host_section_parser(_section_marker(line))
 
     def on_section_footer(self, line: bytes) -> ParserState:
         # Optional
@@ -482,6 +513,7 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
         encoding_fallback: str,
         simulation: bool,
         logger: logging.Logger,
+        needed_sections: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__()
         self.hostname: Final = hostname
@@ -493,6 +525,9 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
         self.encoding_fallback: Final = encoding_fallback
         self.simulation: Final = simulation
         self._logger = logger
+        # The other sections of the host are neither decoded nor returned. Unlike the
+        # selection, this does not apply to piggybacked hosts.
+        self.needed_sections: Final = needed_sections
 
     def parse(
         self,
@@ -506,20 +541,22 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
         now = int(time.time())
 
         raw_sections, piggyback_sections = self._parse_host_section(raw_data)
-        section_info = {
-            header.name: header
-            for header, _ in raw_sections
-            if selection is NO_SELECTION or header.name in selection
-        }
+        raw_sections = self._select_host_sections(raw_sections, selection)
+        section_info = {header.name: header for header, _ in raw_sections}
 
         def decode_sections(
             sections: ImmutableSection,
         ) -> MutableSectionMap[list[AgentRawDataSectionElem]]:
             out: MutableSectionMap[list[AgentRawDataSectionElem]] = {}
             for header, content in sections:
-                out.setdefault(header.name, []).extend(header.parse_line(line) for line in content)
+                out.setdefault(header.name, []).extend(
+                    header.parse_lines(_section_lines(header, content))
+                )
             return out
 
+        # The piggybacked hosts mostly have the same sections
+        header_lines: dict[SectionMarker, bytes] = {}
+
         def flatten_piggyback_section(
             sections: ImmutableSection,
             *,
@@ -531,27 +568,28 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
                 if not (selection is NO_SELECTION or header.name in selection):
                     continue
 
-                if header.cached is not None or header.persist is not None:
-                    yield str(header).encode(header.encoding)
+                if (header_line := header_lines.get(header)) is not None:
+                    yield header_line
+                elif header.cached is not None or header.persist is not None:
+                    yield header_lines.setdefault(header, str(header).encode(header.encoding))
                 else:
                     # Add cache information.
-                    yield str(
-                        SectionMarker(
-                            header.name,
-                            (cached_at, cache_for),
-                            header.encoding,
-                            header.nostrip,
-                            header.persist,
-                            header.separator,
-                        )
-                    ).encode(header.encoding)
+                    yield header_lines.setdefault(
+                        header,
+                        str(
+                            SectionMarker(
+                                header.name,
+                                (cached_at, cache_for),
+                                header.encoding,
+                                header.nostrip,
+                                header.persist,
+                                header.separator,
+                            )
+                        ).encode(header.encoding),
+                    )
                 yield from (bytes(line) for line in content)
 
-        sections = {
-            name: content
-            for name, content in decode_sections(raw_sections).items()
-            if selection is NO_SELECTION or name in selection
-        }
+        sections = decode_sections(raw_sections)
         piggybacked_raw_data = {
             header.hostname: list(
                 flatten_piggyback_section(
@@ -588,6 +626,32 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             piggybacked_raw_data=piggybacked_raw_data,
         )
 
+    def _select_host_sections(
+        self, raw_sections: ImmutableSection, selection: SectionNameCollection
+    ) -> ImmutableSection:
+        """The selected sections that are needed, sections to be persisted are always needed"""
+        selected: MutableSection = []
+        skipped: MutableSection = []
+        for header, content in raw_sections:
+            if not (selection is NO_SELECTION or header.name in selection):
+                continue
+            if (
+                self.needed_sections is NO_SELECTION
+                or header.name in self.needed_sections
+                or header.persist is not None
+            ):
+                selected.append(SectionWithHeader(header, content))
+            else:
+                skipped.append(SectionWithHeader(header, content))
+
+        if skipped:
+            self._logger.debug(
+                "Skipped %d bytes of sections that are not needed: %s",
+                sum(len(data) for _header, content in skipped for data in content),
+                ", ".join(sorted({str(header.name) for header, _content in skipped})),
+            )
+        return selected
+
     def _parse_host_section(
         self,
         raw_data: AgentRawData,
@@ -601,7 +665,82 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
         )
-        for line in raw_data.split(b"\n"):
-            parser = parser(line.rstrip(b"\r"))
-
+        parser = self._parse_lines(parser, raw_data, frames=True)
         return parser.sections, parser.piggyback_sections
+
+    def _parse_lines(self, parser: ParserState, data: bytes, *, frames: bool) -> ParserState:
+        """Feed the marker lines to the state machine and the content in between at once
+
+        This is equivalent to feeding all lines one by one.
+        """
+        pos = 0
+        while (marker := _MARKER_LINE.search(data, pos)) is not None:
+            parser = parser.do_actions(data[pos : marker.start()])
+            pos = marker.end() + 1
+            if frames and (frame := _FRAME_HEADER.fullmatch(marker.group())) is not None:
+                end = pos + int(frame.group(2))
+                parser = self._parse_piggyback_frame(parser, frame.group(1), data[pos:end])
+                pos = end
+            else:
+                parser = parser(marker.group().rstrip(b"\r"))
+        return parser.do_actions(data[pos:])
+
+    def _parse_piggyback_frame(
+        self, parser: ParserState, raw_hostname: bytes, payload: bytes
+    ) -> ParserState:
+        """Add the sections of a frame without handling them line by line
+
+        Frames the line by line parsing would change, e.g. by dropping empty lines, are parsed
+        line by line. The frame ends like a piggyback footer.
+        """
+        header_line = b"<<<<%s>>>>" % raw_hostname
+        content = payload.removesuffix(b"\n")
+        if (
+            _SECTION_HEADER.match(content)
+            and not content.startswith((b"<<<<", b"<<<>>>", b"<<<:"))
+            and not _FRAME_SPECIAL_LINES.search(content)
+        ):
+            try:
+                piggyback_header = PiggybackMarker.from_headerline(
+                    header_line,
+                    self.translation,
+                    encoding_fallback=self.encoding_fallback,
+                )
+                sections = list(_split_frame(content))
+            except Exception:
+                if cmk.utils.debug.enabled():
+                    raise
+                sections = []
+            if sections and piggyback_header.hostname != self.hostname:
+                piggyback_sections = parser.piggyback_sections.setdefault(piggyback_header, [])
+                for section_header, lines in sections:
+                    if not piggyback_sections or piggyback_sections[-1].header != section_header:
+                        piggyback_sections.append(SectionWithHeader(section_header, []))
+                    if lines:
+                        piggyback_sections[-1].section.append(AgentRawData(lines))
+                return parser.to_noop_parser()
+
+        parser = self._parse_lines(parser(header_line), payload, frames=False)
+        return parser.to_noop_parser()
+
+
+def _split_frame(content: bytes) -> Iterator[tuple[SectionMarker, bytes]]:
+    """The section headers of a frame and the lines of the sections, as one piece of data"""
+    headers = list(_SECTION_HEADER.finditer(content))
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        end = len(content) if next_header is None else next_header.start() - 1
+        yield _section_marker(header.group()), content[header.end() + 1 : end]
+
+
+def _section_lines(header: SectionMarker, content: Sequence[bytes]) -> list[bytes]:
+    """The non-empty lines of the section, the content may hold several lines per element"""
+    lines = itertools.chain.from_iterable(data.split(b"\n") for data in content)
+    if header.nostrip:
+        return [line.rstrip(b"\r") for line in lines if line.strip()]
+    return [stripped for line in lines if (stripped := line.strip())]
+
+
+@functools.lru_cache(maxsize=1024)
+def _section_marker(headerline: bytes) -> SectionMarker:
+    # Most agents send the same headers on every run
+    return SectionMarker.from_headerline(headerline)
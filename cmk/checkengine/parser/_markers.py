@@ -170,3 +170,15 @@ class SectionMarker(NamedTuple):
         if not self.nostrip:
             line_str = line_str.strip()
         return line_str.split(self.separator)
+
+    def parse_lines(self, lines: Sequence[bytes]) -> list[Sequence[str]]:
+        """Same as `parse_line` for each line, but decodes all lines at once if possible"""
+        if not lines or self.encoding not in ("utf-8", "ascii"):
+            return [self.parse_line(line) for line in lines]
+        try:
+            text = b"\n".join(lines).decode(self.encoding)
+        except UnicodeDecodeError:
+            return [self.parse_line(line) for line in lines]
+        if self.nostrip:
+            return [line.split(self.separator) for line in text.split("\n")]
+        return [line.strip().split(self.separator) for line in text.split("\n")]
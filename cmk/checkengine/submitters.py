@@ -7,9 +7,10 @@ from __future__ import annotations
 
 import abc
 import os
+import select
 import time
-from collections.abc import Iterable, Iterator
-from contextlib import contextmanager
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager, suppress
 from random import Random
 from typing import Final, IO, Literal, NamedTuple
 
@@ -30,13 +31,29 @@ ServiceDetails = str
 ServiceAdditionalDetails = str
 
 
+class _SerializedValues(dict[float, str]):
+    """The serialized metric values of the results of a host
+
+    The thresholds and boundaries of the metrics of the services of a host repeat a lot.
+    """
+
+    def __missing__(self, value: float) -> str:
+        serialized = ("%.6f" % value).rstrip("0").rstrip(".")
+        if value:
+            # 0.0 == -0.0, but the sign is serialized
+            self[value] = serialized
+        return serialized
+
+
 def _sanitize_perftext(
-    result: ServiceCheckResult, perfdata_format: Literal["pnp", "standard"]
+    result: ServiceCheckResult,
+    perfdata_format: Literal["pnp", "standard"],
+    values: _SerializedValues,
 ) -> str:
     if not result.metrics:
         return ""
 
-    perftexts = [_serialize_metric(*mt) for mt in result.metrics]
+    perftexts = [_serialize_metric(*mt, values=values) for mt in result.metrics]
 
     if perfdata_format == "pnp" and (check_command := _extract_check_command(result.output)):
         perftexts.append("[%s]" % check_command)
@@ -51,22 +68,21 @@ def _serialize_metric(
     crit: float | None,
     min_: float | None,
     max_: float | None,
+    *,
+    values: _SerializedValues,
 ) -> str:
     """
-    >>> _serialize_metric("hot_chocolate", 2.3, None, 42.0, 0.0, None)
-    'hot_chocolate=2.3;;42;0;'
+    >>> _serialize_metric("hot_chocolate", 2.3, None, 42.0, -0.0, None, values=_SerializedValues())
+    'hot_chocolate=2.3;;42;-0;'
 
     """
     return (
-        f"{name}={_serialize_value(value)};{_serialize_value(warn)};{_serialize_value(crit)};"
-        f"{_serialize_value(min_)};{_serialize_value(max_)}"
+        f"{name}={values[value]};{'' if warn is None else values[warn]};"
+        f"{'' if crit is None else values[crit]};{'' if min_ is None else values[min_]};"
+        f"{'' if max_ is None else values[max_]}"
     )
 
 
-def _serialize_value(x: float | None) -> str:
-    return "" if x is None else ("%.6f" % x).rstrip("0").rstrip(".")
-
-
 def _extract_check_command(infotext: str) -> str | None:
     """
     Check may append the name of the check command to the
@@ -103,6 +119,8 @@ def get_submitter(
             dry_run=dry_run,
             perfdata_format=perfdata_format,
             show_perfdata=show_perfdata,
+            # Nagios also reads the check result spool files
+            spool_fallback=monitoring_core == "nagios",
         )
 
     if check_submission == "file":
@@ -145,6 +163,7 @@ class Submitter(abc.ABC):
         self.show_perfdata: Final = show_perfdata
 
     def submit(self, submittees: Iterable[Submittee]) -> None:
+        values = _SerializedValues()
         formatted_submittees = [
             (
                 FormattedSubmittee(
@@ -155,7 +174,7 @@ class Submitter(abc.ABC):
                         # The vertical bar indicates end of service output and start of metrics.
                         # Replace the ones in the output by a Uniocode "Light vertical bar"
                         s.result.output.replace("|", "\u2758"),
-                        _sanitize_perftext(s.result, self.perfdata_format),
+                        _sanitize_perftext(s.result, self.perfdata_format, values),
                     ),
                     cache_info=s.cache_info,
                 ),
@@ -164,25 +183,50 @@ class Submitter(abc.ABC):
             for s in submittees
         ]
 
-        for submittee, pending in formatted_submittees:
-            _output_check_result(submittee, show_perfdata=self.show_perfdata, pending=pending)
+        if console.isEnabledFor(console.VERBOSE):
+            for submittee, pending in formatted_submittees:
+                _output_check_result(submittee, show_perfdata=self.show_perfdata, pending=pending)
 
-        self._submit((submittee for submittee, pending in formatted_submittees if not pending))
+        self._submit([submittee for submittee, pending in formatted_submittees if not pending])
 
     @abc.abstractmethod
-    def _submit(self, formatted_submittees: Iterable[FormattedSubmittee]) -> None:
+    def _submit(self, formatted_submittees: Sequence[FormattedSubmittee]) -> None:
         ...
 
 
 class NoOpSubmitter(Submitter):
-    def _submit(self, formatted_submittees: Iterable[FormattedSubmittee]) -> None:
+    def _submit(self, formatted_submittees: Sequence[FormattedSubmittee]) -> None:
         pass
 
 
 class PipeSubmitter(Submitter):
+    """Write the results to the command pipe of the core, several commands per write
+
+    The core reads the commands line by line. Writes of up to PIPE_BUF bytes are atomic, so
+    the commands of concurrent checks do not interleave.
+    """
+
     # Filedescriptor to open nagios command pipe.
     _nagios_command_pipe: Literal[False] | IO[bytes] | None = None
 
+    def __init__(
+        self,
+        host_name: HostName,
+        *,
+        dry_run: bool,
+        perfdata_format: Literal["pnp", "standard"],
+        show_perfdata: bool,
+        spool_fallback: bool = False,
+    ):
+        super().__init__(
+            host_name,
+            dry_run=dry_run,
+            perfdata_format=perfdata_format,
+            show_perfdata=show_perfdata,
+        )
+        # Write the results to a check result file if the pipe is not usable
+        self.spool_fallback: Final = spool_fallback
+
     @classmethod
     def _open_command_pipe(cls) -> Literal[False] | IO[bytes]:
         if cls._nagios_command_pipe is not None:
@@ -205,22 +249,71 @@ class PipeSubmitter(Submitter):
 
         return cls._nagios_command_pipe
 
-    def _submit(self, formatted_submittees: Iterable[FormattedSubmittee]) -> None:
-        if not (pipe := PipeSubmitter._open_command_pipe()):
-            return
-
-        for service, state, output, _cache_info in formatted_submittees:
-            msg = "[%d] PROCESS_SERVICE_CHECK_RESULT;%s;%s;%d;%s\n" % (
-                time.time(),
+    def _submit(self, formatted_submittees: Sequence[FormattedSubmittee]) -> None:
+        try:
+            pipe = PipeSubmitter._open_command_pipe()
+        except MKGeneralException:
+            if not self.spool_fallback:
+                raise
+            pipe = False
+
+        written = 0
+        if pipe:
+            now = int(time.time())
+            commands = [
+                (
+                    "[%d] PROCESS_SERVICE_CHECK_RESULT;%s;%s;%d;%s\n"
+                    % (now, self.host_name, service, state, output.replace("\n", "\\n"))
+                ).encode()
+                for service, state, output, _cache_info in formatted_submittees
+            ]
+            try:
+                for batch, count in _batches(commands, select.PIPE_BUF):
+                    # Important: Nagios needs the complete command in one single write() block!
+                    # Unbuffered writes of up to PIPE_BUF bytes are written completely or not at
+                    # all, so the commands of a failed batch have not been processed by the core
+                    # and are not submitted twice. Only a single command longer than that may
+                    # have been written in part.
+                    _write(pipe.fileno(), batch)
+                    written += count
+            except OSError:
+                # E.g. the core has been restarted, open the pipe again on the next call
+                PipeSubmitter._nagios_command_pipe = None
+                with suppress(OSError):
+                    pipe.close()
+                if not self.spool_fallback:
+                    raise
+
+        if written < len(formatted_submittees) and self.spool_fallback:
+            FileSubmitter(
                 self.host_name,
-                service,
-                state,
-                output.replace("\n", "\\n"),
-            )
-            pipe.write(msg.encode())
-            # Important: Nagios needs the complete command in one single write() block!
-            # Python buffers and sends chunks of 4096 bytes, if we do not flush.
-            pipe.flush()
+                dry_run=self.dry_run,
+                perfdata_format=self.perfdata_format,
+                show_perfdata=self.show_perfdata,
+            )._submit(formatted_submittees[written:])
+
+
+def _write(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _batches(commands: Sequence[bytes], size: int) -> Iterator[tuple[bytes, int]]:
+    """Join the commands to batches of at most size bytes and the number of commands in them
+
+    Longer commands make a batch of their own.
+    """
+    start = 0
+    length = 0
+    for index, command in enumerate(commands):
+        if index > start and length + len(command) > size:
+            yield b"".join(commands[start:index]), index - start
+            start = index
+            length = 0
+        length += len(command)
+    if start < len(commands):
+        yield b"".join(commands[start:]), len(commands) - start
 
 
 class _RandomNameSequence:
@@ -254,28 +347,29 @@ class _RandomNameSequence:
 class FileSubmitter(Submitter):
     _names = _RandomNameSequence()
 
-    def _submit(self, formatted_submittees: Iterable[FormattedSubmittee]) -> None:
+    def _submit(self, formatted_submittees: Sequence[FormattedSubmittee]) -> None:
         now = time.time()
 
+        entries = []
+        for service, state, output, _cache_info in formatted_submittees:
+            output = output.replace("\n", "\\n")
+            entries.append(
+                f"host_name={self.host_name}\n"
+                f"service_description={service}\n"
+                "check_type=1\n"
+                "check_options=0\n"
+                "reschedule_check\n"
+                "latency=0.0\n"
+                f"start_time={now:.1f}\n"
+                f"finish_time={now:.1f}\n"
+                f"return_code={state}\n"
+                f"output={output}\n"
+                "\n"
+            )
+
         with self._open_checkresult_file() as fd:
-            for service, state, output, _cache_info in formatted_submittees:
-                output = output.replace("\n", "\\n")
-                os.write(
-                    fd,
-                    (
-                        f"host_name={self.host_name}\n"
-                        f"service_description={service}\n"
-                        "check_type=1\n"
-                        "check_options=0\n"
-                        "reschedule_check\n"
-                        "latency=0.0\n"
-                        f"start_time={now:.1f}\n"
-                        f"finish_time={now:.1f}\n"
-                        f"return_code={state}\n"
-                        f"output={output}\n"
-                        "\n"
-                    ).encode(),
-                )
+            # All results in a single write
+            os.write(fd, "".join(entries).encode())
 
     @classmethod
     @contextmanager
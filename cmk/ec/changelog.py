@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Change sequence of the open events, used for the delta replication to slaves
+
+The changes are found by comparing each serialized event to the one of the previous commit, so
+changes made in place to the lists and dicts of an event are found, too. Each
+commit with changes gets the next sequence number. A slave requests the changes since the
+sequence number of its last sync. The epoch identifies the sequence: a restarted master starts
+a new one, so the slave falls back to a full sync.
+"""
+
+import marshal
+import uuid
+from collections import deque
+from collections.abc import Mapping
+from typing import Final, TypedDict
+
+from .event import Event
+
+# epoch, sequence number
+ReplicationPosition = tuple[str, int]
+
+# Commits are done on each sync request, this covers hours of sync intervals
+_MAX_ENTRIES: Final = 1000
+
+
+class PackedEventChanges(TypedDict):
+    events: list[Event]
+    deleted: list[int]
+    next_event_id: int
+    rule_stats: dict[str, int]
+    interval_starts: dict[str, int]
+
+
+class ChangeLog:
+    def __init__(self) -> None:
+        self.epoch: Final = uuid.uuid4().hex
+        self.sequence = 0
+        # Each serialized event as of the last commit
+        self._versions: dict[int, bytes] = {}
+        self._entries: deque[tuple[int, frozenset[int]]] = deque(maxlen=_MAX_ENTRIES)
+
+    def commit(self, events: Mapping[int, Event]) -> int:
+        """Record the IDs of the events changed since the last commit"""
+        versions = {event_id: _version(event) for event_id, event in events.items()}
+        changed = {
+            event_id
+            for event_id, version in versions.items()
+            if self._versions.get(event_id) != version
+        }
+        changed.update(self._versions.keys() - versions.keys())
+        if changed:
+            self.sequence += 1
+            self._entries.append((self.sequence, frozenset(changed)))
+        self._versions = versions
+        return self.sequence
+
+    def has_changes(self, events: Mapping[int, Event]) -> bool:
+        """Whether the events have been changed since the last commit"""
+        return len(events) != len(self._versions) or any(
+            self._versions.get(event_id) != _version(event) for event_id, event in events.items()
+        )
+
+    def changed_since(self, position: ReplicationPosition) -> set[int] | None:
+        """IDs of the events changed after the given position, None if they are not known"""
+        epoch, sequence = position
+        if epoch != self.epoch or sequence > self.sequence:
+            return None
+        if sequence == self.sequence:
+            return set()
+        if not self._entries or self._entries[0][0] > sequence + 1:
+            return None  # Too old, the log does not reach back that far
+        return set().union(
+            *(ids for entry_sequence, ids in self._entries if entry_sequence > sequence)
+        )
+
+
+def _version(event: Event) -> bytes:
+    # Version 2 has no references to objects serialized before. They depend on the reference
+    # counts of the values and would make equal events look different.
+    return marshal.dumps(event, 2)
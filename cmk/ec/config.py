@@ -341,6 +341,7 @@ class ConfigFromWATO(TypedDict):
     rules: Collection[Rule]
     snmp_credentials: Iterable[SNMPCredential]
     socket_queue_len: int
+    state_persistence: Literal["full", "journal"]
     statistics_interval: int
     translate_snmptraps: SNMPTrapTranslation
 
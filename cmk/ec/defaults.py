@@ -46,6 +46,7 @@ def default_config() -> ConfigFromWATO:
         "log_rulehits": False,
         "log_messages": False,
         "retention_interval": 60,
+        "state_persistence": "journal",
         "housekeeping_interval": 60,
         "statistics_interval": 5,
         "history_lifetime": 365,  # days
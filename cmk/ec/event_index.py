@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Secondary indexes on the open events
+
+Cancelling, counting and the event limits need the open events of a rule or a host. Looking
+them up in an index instead of scanning all open events keeps the costs of a message independent
+of the number of open events.
+
+The events of each key are ordered by their ID, which is the order of their creation. The first
+event of a key is thus the oldest one.
+"""
+
+from collections.abc import Callable, Hashable, Sequence
+from typing import Final, Generic, TypeVar
+
+from .event import Event
+
+_K = TypeVar("_K", bound=Hashable)
+
+
+class EventIndex(Generic[_K]):
+    """Open events grouped by a key computed from the event
+
+    Events are changed in place, so the key an event has been indexed with is remembered. Call
+    update() after changing fields the key depends on."""
+
+    def __init__(self, key: Callable[[Event], _K]) -> None:
+        self._key: Final = key
+        self._groups: dict[_K, dict[int, Event]] = {}
+        self._keys: dict[int, _K] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, event: Event) -> None:
+        self._keys[event_id := event["id"]] = key = self._key(event)
+        if (group := self._groups.get(key)) is None:
+            self._groups[key] = {event_id: event}
+        elif event_id > next(reversed(group)):
+            group[event_id] = event
+        else:
+            # Only happens when an older event changes its key
+            group[event_id] = event
+            self._groups[key] = dict(sorted(group.items()))
+
+    def remove(self, event: Event) -> None:
+        key = self._keys.pop(event_id := event["id"])
+        group = self._groups[key]
+        del group[event_id]
+        if not group:
+            del self._groups[key]
+
+    def update(self, event: Event) -> None:
+        if self._key(event) != self._keys[event["id"]]:
+            self.remove(event)
+            self.add(event)
+
+    def get(self, key: _K) -> Sequence[Event]:
+        """The events of the given key, the caller may remove them from the index meanwhile"""
+        return list(group.values()) if (group := self._groups.get(key)) else []
+
+    def oldest(self, key: _K) -> Event | None:
+        return next(iter(group.values())) if (group := self._groups.get(key)) else None
+
+    def count(self, key: _K) -> int:
+        return len(self._groups.get(key, ()))
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Journaled persistence of the event status
+
+Instead of writing the complete event status on each save, only the events which have been
+created, changed or deleted since the last save are appended to a binary journal (a write ahead
+log). From time to time the journal is compacted into a snapshot of the complete status.
+
+The event status reports the IDs of the events it created, changed or deleted since the last save,
+only these are serialized (with marshal). The work per save depends on the number of changes, not
+on the number of events. The snapshot is written at least once an hour, so a change which has not
+been reported is not kept back for long.
+
+Snapshot and journal carry a generation number. A journal is only replayed on top of the snapshot
+with the same generation, so a crash during compaction can not apply outdated changes.
+"""
+
+import marshal
+import os
+import struct
+import time
+import zlib
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from logging import Logger
+from pathlib import Path
+from typing import Final, IO, TypedDict
+
+from .event import Event
+
+
+class PackedEventStatus(TypedDict):
+    next_event_id: int
+    events: list[Event]
+    rule_stats: dict[str, int]
+    interval_starts: dict[str, int]
+
+
+_MAGIC: Final = b"ECJ1"
+# operation, payload length, CRC32 of the payload
+_RECORD_HEADER: Final = struct.Struct("<cII")
+_UPSERT: Final = b"U"
+_DELETE: Final = b"D"
+_COUNTERS: Final = b"C"
+_GENERATION: Final = struct.Struct("<Q")
+
+# Don't bother compacting small journals
+_MIN_COMPACTION_SIZE: Final = 1024 * 1024
+# Write a snapshot at least this often, it contains the changes of all events
+_MAX_SNAPSHOT_AGE: Final = 3600
+
+
+@dataclass(frozen=True)
+class JournalStats:
+    records: int
+    bytes_written: int
+    compacted: bool
+    duration: float
+
+
+class StatusJournal:
+    """Snapshot and write ahead log of the event status
+
+    Not thread safe, the caller has to hold the lock of the event status."""
+
+    def __init__(self, snapshot_path: Path, journal_path: Path, logger: Logger) -> None:
+        self._snapshot_path: Final = snapshot_path
+        self._journal_path: Final = journal_path
+        self._logger = logger
+        self._generation = 0
+        self._journal: IO[bytes] | None = None
+        self._journal_intact = False
+        self._journal_size = 0
+        self._snapshot_size = 0
+        self._snapshot_time = 0.0
+        self._counters: tuple[int, dict[str, int], dict[str, int]] | None = None
+
+    def exists(self) -> bool:
+        return self._snapshot_path.exists()
+
+    def load(self) -> PackedEventStatus:
+        """Read the snapshot and replay the journal on top of it"""
+        snapshot = marshal.loads(self._snapshot_path.read_bytes())
+        stat = self._snapshot_path.stat()
+        self._snapshot_size = stat.st_size
+        self._snapshot_time = stat.st_mtime
+        self._generation = snapshot["generation"]
+        next_event_id = snapshot["next_event_id"]
+        rule_stats = snapshot["rule_stats"]
+        interval_starts = snapshot["interval_starts"]
+        events = {event["id"]: event for event in snapshot["events"]}
+
+        num_records = 0
+        self._journal_intact = False
+        for op, payload in self._read_journal():
+            num_records += 1
+            if op == _UPSERT:
+                event = marshal.loads(payload)
+                events[event["id"]] = event
+            elif op == _DELETE:
+                events.pop(marshal.loads(payload), None)
+            elif op == _COUNTERS:
+                next_event_id, rule_stats, interval_starts = marshal.loads(payload)
+
+        self._logger.info(
+            "Loaded %d events from %s and replayed %d changes from %s",
+            len(events),
+            self._snapshot_path,
+            num_records,
+            self._journal_path,
+        )
+        status = PackedEventStatus(
+            next_event_id=next_event_id,
+            events=list(events.values()),
+            rule_stats=rule_stats,
+            interval_starts=interval_starts,
+        )
+        self._counters = _counters(status)
+        if self._journal_intact:
+            # Continue the journal. Otherwise the next save starts with a new snapshot.
+            self._journal = self._journal_path.open("ab")
+            self._journal_size = self._journal.tell()
+        return status
+
+    def _read_journal(self) -> Iterator[tuple[bytes, bytes]]:
+        try:
+            with self._journal_path.open("rb") as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    return
+                if _GENERATION.unpack(f.read(_GENERATION.size))[0] != self._generation:
+                    self._logger.info("Ignoring outdated journal %s", self._journal_path)
+                    return
+                while header := f.read(_RECORD_HEADER.size):
+                    if len(header) < _RECORD_HEADER.size:
+                        self._logger.warning("Ignoring truncated record in %s", self._journal_path)
+                        return
+                    op, length, crc = _RECORD_HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        self._logger.warning("Ignoring damaged record in %s", self._journal_path)
+                        return
+                    yield op, payload
+            self._journal_intact = True
+        except (FileNotFoundError, struct.error):
+            return
+
+    def save(
+        self, status: PackedEventStatus, changed: Mapping[int, Event | None] | None
+    ) -> JournalStats:
+        """Append the changes since the last save to the journal
+
+        changed contains the events created or changed since the last save by their ID, None for
+        the deleted ones. If it is None, all events may have changed and a snapshot is written.
+
+        The journal is compacted into a new snapshot once replaying it would be more expensive
+        than reading a fresh snapshot, or once the snapshot is older than an hour."""
+        start = time.time()
+        if (
+            changed is None
+            or self._journal is None
+            or self._journal_size > max(self._snapshot_size, _MIN_COMPACTION_SIZE)
+            or start - self._snapshot_time > _MAX_SNAPSHOT_AGE
+        ):
+            return self.compact(status)
+
+        records = [
+            _record(_DELETE, marshal.dumps(event_id))
+            if event is None
+            else _record(_UPSERT, marshal.dumps(event))
+            for event_id, event in changed.items()
+        ]
+        if (counters := _counters(status)) != self._counters:
+            records.append(_record(_COUNTERS, marshal.dumps(counters)))
+
+        if records:
+            data = b"".join(records)
+            try:
+                self._journal.write(data)
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            except OSError:
+                # The records may have been written partially, start over with a snapshot
+                self.close()
+                raise
+            self._journal_size += len(data)
+
+        self._counters = counters
+        return JournalStats(
+            records=len(records),
+            bytes_written=sum(len(r) for r in records),
+            compacted=False,
+            duration=time.time() - start,
+        )
+
+    def compact(self, status: PackedEventStatus) -> JournalStats:
+        """Write a new snapshot of the complete status and start a new journal"""
+        start = time.time()
+        generation = self._generation + 1
+        data = marshal.dumps(
+            {
+                "generation": generation,
+                "next_event_id": status["next_event_id"],
+                "events": status["events"],
+                "rule_stats": status["rule_stats"],
+                "interval_starts": status["interval_starts"],
+            }
+        )
+        _write_atomically(self._snapshot_path, data)
+
+        # From now on a journal of the previous generation is ignored
+        _write_atomically(self._journal_path, _MAGIC + _GENERATION.pack(generation))
+        self.close()
+        self._journal = self._journal_path.open("ab")
+        self._journal_size = self._journal.tell()
+        self._snapshot_size = len(data)
+        self._snapshot_time = start
+        self._generation = generation
+        self._counters = _counters(status)
+        return JournalStats(
+            records=0,
+            bytes_written=len(data),
+            compacted=True,
+            duration=time.time() - start,
+        )
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def remove(self) -> None:
+        self.close()
+        self._snapshot_path.unlink(missing_ok=True)
+        self._journal_path.unlink(missing_ok=True)
+        self._counters = None
+
+
+def _counters(status: PackedEventStatus) -> tuple[int, dict[str, int], dict[str, int]]:
+    return (
+        status["next_event_id"],
+        dict(status["rule_stats"]),
+        dict(status["interval_starts"]),
+    )
+
+
+def _record(op: bytes, payload: bytes) -> bytes:
+    return _RECORD_HEADER.pack(op, len(payload), zlib.crc32(payload)) + payload
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    path_new = path.parent / (path.name + ".new")
+    with path_new.open(mode="wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    path_new.rename(path)
@@ -52,10 +52,12 @@ from cmk.utils.timeperiod import TimeperiodName
 from cmk.utils.translations import translate_hostname
 
 from .actions import do_event_action, do_event_actions, do_notify, event_has_opened
+from .changelog import ChangeLog, PackedEventChanges, ReplicationPosition
 from .config import Config, ConfigFromWATO, Count, ECRulePack, MatchGroups, Rule
 from .core_queries import HostInfo, query_hosts_scheduled_downtime_depth, query_timeperiods_in
 from .crash_reporting import CrashReportStore, ECCrashReport
 from .event import create_event_from_line, Event
+from .event_index import EventIndex
 from .helpers import ECLock
 from .history import (
     ActiveHistoryPeriod,
@@ -67,8 +69,9 @@ from .history import (
     scrub_string,
 )
 from .host_config import HostConfig
+from .journal import PackedEventStatus, StatusJournal
 from .perfcounters import Perfcounters
-from .query import filter_operator_in, MKClientError, Query, QueryCOMMAND, QueryGET, QueryREPLICATE
+from .query import MKClientError, Query, QueryCOMMAND, QueryGET, QueryREPLICATE
 from .rule_matcher import compile_rule, match, MatchFailure, MatchResult, MatchSuccess, RuleMatcher
 from .rule_packs import load_config as load_config_using
 from .settings import FileDescriptor, PortNumber, Settings
@@ -76,13 +79,6 @@ from .settings import settings as create_settings
 from .snmp import SNMPTrapEngine
 
 
-class PackedEventStatus(TypedDict):
-    next_event_id: int
-    events: list[Event]
-    rule_stats: dict[str, int]
-    interval_starts: dict[str, int]
-
-
 class SlaveStatus(TypedDict):
     last_master_down: float | None
     last_sync: float
@@ -473,6 +469,7 @@ class EventServer(ECServerThread):
                 Perfcounters.status_columns(),
                 cls._replication_columns(),
                 cls._event_limit_columns(),
+                cls._persistence_columns(),
             )
         )
 
@@ -503,12 +500,20 @@ class EventServer(ECServerThread):
             ("status_event_limit_active_overall", False),
         ]
 
+    @classmethod
+    def _persistence_columns(cls) -> Columns:
+        return [
+            ("status_state_save_time", 0.0),
+            ("status_state_load_time", 0.0),
+        ]
+
     def get_status(self) -> list[list[object]]:
         row: list[object] = []
         row += self._add_general_status()
         row += self._perfcounters.get_status()
         row += self._add_replication_status()
         row += self._add_event_limit_status()
+        row += self._add_persistence_status()
         return [row]
 
     def _add_general_status(self) -> list[object]:
@@ -541,6 +546,12 @@ class EventServer(ECServerThread):
             self.is_overall_event_limit_active(),
         ]
 
+    def _add_persistence_status(self) -> list[object]:
+        return [
+            self._event_status.save_duration,
+            self._event_status.load_duration,
+        ]
+
     def create_pipe(self) -> None:
         path = self.settings.paths.event_pipe.value
         with contextlib.suppress(Exception):
@@ -985,6 +996,7 @@ class EventServer(ECServerThread):
                             event["last_token"] = (
                                 last_token + new_tokens * secs_per_token
                             )  # not now! would be unfair
+                            self._event_status.touch(event)
                             if event["count"] == 0:
                                 self._logger.info(
                                     "Rule %s/%s, event %d: again without allowed rate, dropping event",
@@ -1039,6 +1051,7 @@ class EventServer(ECServerThread):
                         self._logger.info(
                             "Cannot do rule action: rule %s not present anymore.", event["rule_id"]
                         )
+                    self._event_status.touch(event)
 
             # Handle events with a limited lifetime
             elif "live_until" in event and now >= event["live_until"]:
@@ -1099,9 +1112,8 @@ class EventServer(ECServerThread):
                 # First look for case 1: rule that already have at least one hit
                 # and this events in the state "counting" exist.
                 events_to_delete: list[tuple[Event, HistoryWhat]] = []
-                events = self._event_status.events()
-                for event in events:
-                    if event["rule_id"] == rule["id"] and event["phase"] == "counting":
+                for event in self._event_status.events_of_rule(rule["id"]):
+                    if event["phase"] == "counting":
                         # time has elapsed. Now lets see if we have reached
                         # the necessary count:
                         if event["count"] < expected_count:  # no -> trigger alarm
@@ -1154,10 +1166,8 @@ class EventServer(ECServerThread):
             merge, reset_ack = merge
 
         if merge != "never":
-            for event in self._event_status.events():
-                if event["rule_id"] == rule["id"] and (
-                    event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked")
-                ):
+            for event in self._event_status.events_of_rule(rule["id"]):
+                if event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked"):
                     merge_event = event
                     break
 
@@ -1177,6 +1187,7 @@ class EventServer(ECServerThread):
             # the text and the user might have his own text added via set_text.
             self.rewrite_event(rule, merge_event, {}, set_first=False)
             self._history.add(merge_event, "COUNTFAILED")
+            self._event_status.touch(merge_event)
         else:
             # Create artificial event from scratch. Make sure that all important
             # fields are defined.
@@ -1214,6 +1225,7 @@ class EventServer(ECServerThread):
                 rule,
                 event,
             )
+            self._event_status.touch(event)
             if rule.get("autodelete"):
                 event["phase"] = "closed"
                 self._event_status.remove_event(event, "AUTODELETE")
@@ -1479,6 +1491,7 @@ class EventServer(ECServerThread):
                             )
 
                         self._history.add(existing_event, "COUNTREACHED")
+                        self._event_status.touch(existing_event)
 
                         if "delay" not in rule and rule.get("autodelete"):
                             existing_event["phase"] = "closed"
@@ -1508,6 +1521,7 @@ class EventServer(ECServerThread):
                             rule,
                             event,
                         )
+                        self._event_status.touch(event)
                         if rule.get("autodelete"):
                             event["phase"] = "closed"
                             with self._event_status.lock:
@@ -2040,22 +2054,52 @@ class StatusTableEvents(StatusTable):
         super().__init__(logger)
         self._event_status = event_status
 
-    def _enumerate(self, query: QueryGET) -> Iterable[list[object]]:
-        for event in self._event_status.get_events():
-            # Optimize filters that are set by the check_mkevents active check. Since users
-            # may have a lot of those checks running, it is a good idea to optimize this.
-            if query.only_host and not filter_operator_in(event["host"], query.only_host):
-                continue
+    def query(self, query: QueryGET) -> Iterable[list[object]]:
+        """Evaluate the filters on the events and only build the requested columns
 
-            row = []
-            for column_name in self.column_names:
-                try:
-                    row.append(event[column_name[6:]])
-                except KeyError:
-                    # The row does not have this value. Use the columns default value
-                    row.append(self.column_defaults[column_name])
+        The GUI and the check_mkevents active checks send lots of small queries for single
+        hosts or events, so the candidates are looked up in the indexes of the event status."""
+        yield query.requested_columns
 
-            yield row
+        filters = [
+            (column_name[6:], self.column_defaults[column_name], predicate)
+            for column_name, _operator_name, predicate, _argument in query.filters
+        ]
+        # Unknown columns are answered with None. The key None is never found in an event.
+        columns = [
+            (column_name[6:], self.column_defaults[column_name])
+            if column_name in self.column_defaults
+            else (None, None)
+            for column_name in query.requested_columns
+        ]
+        num_rows = 0
+        for event in self._candidates(query):
+            if query.limit is not None and num_rows >= query.limit:
+                break  # The maximum number of rows has been reached
+            if all(predicate(event.get(key, default)) for key, default, predicate in filters):
+                # The event may not have all values. Use the columns default value then.
+                yield [event.get(key, default) for key, default in columns]
+                num_rows += 1
+
+    def _candidates(self, query: QueryGET) -> Sequence[Event]:
+        """The events possibly matching the filters, in the order of their creation"""
+        for column_name, operator_name, _predicate, argument in query.filters:
+            if column_name == "event_id" and operator_name == "=":
+                return [event] if (event := self._event_status.event(argument)) else []
+        for column_name, operator_name, _predicate, argument in query.filters:
+            # "=" is case sensitive, but the filter is evaluated on the candidates anyway
+            if column_name == "event_host" and operator_name in ("=", "=~", "in"):
+                return self._event_status.events_of_hosts(
+                    argument if operator_name == "in" else [argument]
+                )
+        for column_name, operator_name, _predicate, argument in query.filters:
+            if column_name == "event_rule_id" and operator_name == "=":
+                return self._event_status.events_of_rule(argument)
+        return self._event_status.get_events()
+
+    def _enumerate(self, query: QueryGET) -> Iterable[list[object]]:
+        for event in self._candidates(query):
+            yield [event.get(column_name[6:], default) for column_name, default in self.columns]
 
 
 class StatusTableHistory(StatusTable):
@@ -2362,10 +2406,10 @@ class StatusServer(ECServerThread):
                 client_socket.sendall(b"\t".join([quote_tab(c) for c in row]) + b"\n")
 
         elif query.output_format == "json":
-            client_socket.sendall((json.dumps(list(response)) + "\n").encode("utf-8"))
+            self._answer_query_chunked(client_socket, (json.dumps(row) for row in response))
 
         elif query.output_format == "python":
-            self._answer_query_python(client_socket, list(response))
+            self._answer_query_chunked(client_socket, (repr(row) for row in response))
 
         else:
             raise NotImplementedError()
@@ -2375,6 +2419,18 @@ class StatusServer(ECServerThread):
     ) -> None:
         client_socket.sendall((repr(response) + "\n").encode("utf-8"))
 
+    def _answer_query_chunked(self, client_socket: socket.socket, rows: Iterable[str]) -> None:
+        """Send the serialized rows as list, without building the complete response first
+
+        The result is the same as serializing the list of rows at once."""
+        rows = iter(rows)
+        client_socket.sendall(b"[")
+        separator = ""
+        while chunk := list(itertools.islice(rows, 1000)):
+            client_socket.sendall((separator + ", ".join(chunk)).encode("utf-8"))
+            separator = ", "
+        client_socket.sendall(b"]\n")
+
     # All commands are already locked with self._event_status.lock
     def handle_command_request(  # pylint: disable=too-many-branches
         self, commandline: str, allow_commands: bool
@@ -2448,6 +2504,7 @@ class StatusServer(ECServerThread):
             if user:
                 event["owner"] = user
             self._history.add(event, "UPDATE", user)
+            self._event_status.touch(event)
 
     def handle_command_create(self, arguments: list[str]) -> None:
         # Would rather use process_raw_line(), but we are already
@@ -2468,6 +2525,7 @@ class StatusServer(ECServerThread):
             if user:
                 event["owner"] = user
             self._history.add(event, "CHANGESTATE", user)
+            self._event_status.touch(event)
 
     def handle_command_reload(self) -> None:
         reload_configuration(
@@ -2514,6 +2572,7 @@ class StatusServer(ECServerThread):
         event: Event | None = self._event_status.event(int(event_id))
         if user and event is not None:
             event["owner"] = user
+            self._event_status.touch(event)
 
         # TODO: De-duplicate code from do_event_actions()
         if action_id == "@NOTIFY" and event is not None:
@@ -2558,9 +2617,15 @@ class StatusServer(ECServerThread):
         self._logger.info("Switched replication mode to '%s' by external command.", new_mode)
 
     def handle_replicate(self, argument: str, client_ip: str) -> Response:
-        # Last time our slave got a config update
+        # Last time our slave got a config update, optionally followed by the position of the
+        # slaves' event state
         try:
-            last_update = int(argument)
+            last_update_arg, *position_args = argument.split()
+            last_update = int(last_update_arg)
+            position = None
+            if position_args:
+                epoch, sequence = position_args
+                position = (epoch, int(sequence))
             if self.settings.options.debug:
                 self._logger.info(
                     "Replication: sync request from %s, last update %d seconds ago",
@@ -2571,7 +2636,7 @@ class StatusServer(ECServerThread):
         except (ValueError, OverflowError) as e:
             raise MKClientError("Invalid arguments to command REPLICATE") from e
         return replication_send(
-            self._config, self._lock_configuration, self._event_status, last_update
+            self._config, self._lock_configuration, self._event_status, last_update, position
         )
 
 
@@ -2717,18 +2782,33 @@ class EventStatus:
         self.lock = threading.Lock()
         self._history = history
         self._logger = logger
+        self._journal = StatusJournal(
+            settings.paths.status_snapshot_file.value,
+            settings.paths.status_journal_file.value,
+            logger,
+        )
+        # Durations of the last save and of loading the state on startup
+        self.save_duration = 0.0
+        self.load_duration = 0.0
+        self._changes = ChangeLog()
+        # Guards the touched events, they are touched without holding self.lock, too
+        self._touched_lock = threading.Lock()
         self.flush()
 
     def reload_configuration(self, config: Config) -> None:
         self._config = config
 
     def flush(self) -> None:
-        # TODO: Improve types!
-        self._events: list[Event] = []
+        # The open events by their ID, in the order of their creation
+        self._events: dict[int, Event] = {}
         self._next_event_id = 1
         self._rule_stats: dict[str, int] = {}
         # needed for expecting rules
         self._interval_starts: dict[str, int] = {}
+        # Position of the state replicated from the master (only used on slaves)
+        self._replication_position: ReplicationPosition | None = None
+        # The IDs of the events created, changed or deleted since the last save, None if unknown
+        self._touched: set[int] | None = None
         self._initialize_event_limit_status()
 
         # TODO: might introduce some performance counters, like:
@@ -2738,13 +2818,32 @@ class EventStatus:
 
     def events(self) -> list[Event]:
         # TODO: Improve type!
-        return self._events
+        return list(self._events.values())
 
     def event(self, eid: int) -> Event | None:
-        for event in self._events:
-            if event["id"] == eid:
-                return event
-        return None
+        return self._events.get(eid)
+
+    def touch(self, event: Event) -> None:
+        """Remember that an event has been changed, it is journaled on the next save
+
+        Events are changed in place all over the Event Console, this has to be called after
+        changing one. Changes which are not reported are only saved with the next snapshot."""
+        with self._touched_lock:
+            if self._touched is not None:
+                self._touched.add(event["id"])
+
+    def events_of_rule(self, rule_id: str) -> Sequence[Event]:
+        return self._events_by_rule.get(rule_id)
+
+    def events_of_hosts(self, host_names: Iterable[str]) -> Sequence[Event]:
+        """The events of the given hosts (case insensitive), in the order of their creation"""
+        keys = {host_name.lower() for host_name in host_names}
+        if len(keys) == 1:
+            return self._events_by_host.get(keys.pop())
+        return sorted(
+            (event for key in keys for event in self._events_by_host.get(key)),
+            key=lambda event: event["id"],
+        )
 
     def interval_start(self, rule_id: str, interval: int) -> int:
         """
@@ -2793,20 +2892,85 @@ class EventStatus:
     def pack_status(self) -> PackedEventStatus:
         return {
             "next_event_id": self._next_event_id,
-            "events": self._events,
+            "events": list(self._events.values()),
             "rule_stats": self._rule_stats,
             "interval_starts": self._interval_starts,
         }
 
     def unpack_status(self, status: PackedEventStatus) -> None:
         self._next_event_id = status["next_event_id"]
-        self._events = status["events"]
+        self._events = {event["id"]: event for event in status["events"]}
         self._rule_stats = status["rule_stats"]
         self._interval_starts = status["interval_starts"]
+        self._initialize_event_limit_status()
+        with self._touched_lock:
+            self._touched = None
+
+    def pack_changes(self, position: ReplicationPosition | None) -> dict[str, object]:
+        """The changes since the given position of a slave, the complete status if unknown"""
+        sequence = self._changes.commit(self._events)
+        response: dict[str, object] = {"position": (self._changes.epoch, sequence)}
+        changed = None if position is None else self._changes.changed_since(position)
+        if changed is None or len(changed) > len(self._events) // 2:
+            response["status"] = self.pack_status()
+            return response
+        response["changes"] = PackedEventChanges(
+            events=[self._events[event_id] for event_id in sorted(changed & self._events.keys())],
+            deleted=sorted(changed - self._events.keys()),
+            next_event_id=self._next_event_id,
+            rule_stats=self._rule_stats,
+            interval_starts=self._interval_starts,
+        )
+        return response
+
+    def unpack_changes(self, changes: PackedEventChanges) -> None:
+        for event_id in changes["deleted"]:
+            if (event := self._events.pop(event_id, None)) is not None:
+                self._count_event_remove(event)
+                self._unindex_event(event)
+                self.touch(event)
+        for event in changes["events"]:
+            if (previous := self._events.get(event["id"])) is not None:
+                self._count_event_remove(previous)
+                self._unindex_event(previous)
+            self._events[event["id"]] = event
+            self.num_existing_events += 1
+            self._count_event_add(event)
+            self._index_event(event)
+            self.touch(event)
+        self._next_event_id = changes["next_event_id"]
+        self._rule_stats = changes["rule_stats"]
+        self._interval_starts = changes["interval_starts"]
+
+    def replication_position(self) -> ReplicationPosition | None:
+        """Where to continue replicating from the master, None if a full sync is needed
+
+        Housekeeping and a takeover change the replicated events locally, the changes of the
+        master can not be applied on top of that."""
+        if self._replication_position is None or self._changes.has_changes(self._events):
+            return None
+        return self._replication_position
+
+    def set_replication_position(self, position: ReplicationPosition | None) -> None:
+        self._replication_position = position
+        if position is not None:
+            self._changes.commit(self._events)
 
     def save_status(self) -> None:
         now = time.time()
         status = self.pack_status()
+        with self._touched_lock:
+            touched, self._touched = self._touched, set()
+        if self._config["state_persistence"] == "journal":
+            try:
+                self._save_status_journaled(status, touched)
+                self.save_duration = time.time() - now
+                return
+            except ValueError:
+                # marshal refuses to serialize unexpected types. Never lose the state because
+                # of that, the complete state file can handle them.
+                self._logger.exception("Cannot journal event state, saving complete state")
+
         path = self.settings.paths.status_file.value
         path_new = path.parent / (path.name + ".new")
         # Believe it or not: cPickle is more than two times slower than repr()
@@ -2815,8 +2979,37 @@ class EventStatus:
             f.flush()
             os.fsync(f.fileno())
         path_new.rename(path)
-        elapsed = time.time() - now
-        self._logger.log(VERBOSE, "Saved event state to %s in %.3fms.", path, elapsed * 1000)
+        # The snapshot would take precedence over the state file on the next start
+        self._journal.remove()
+        self.save_duration = time.time() - now
+        self._logger.log(
+            VERBOSE, "Saved event state to %s in %.3fms.", path, self.save_duration * 1000
+        )
+
+    def _save_status_journaled(self, status: PackedEventStatus, touched: set[int] | None) -> None:
+        stats = self._journal.save(
+            status,
+            None
+            if touched is None
+            else {event_id: self._events.get(event_id) for event_id in touched},
+        )
+        if stats.compacted:
+            # The snapshot replaces a complete state file written before
+            self.settings.paths.status_file.value.unlink(missing_ok=True)
+            self._logger.log(
+                VERBOSE,
+                "Saved event state snapshot (%d bytes) in %.3fms.",
+                stats.bytes_written,
+                stats.duration * 1000,
+            )
+        else:
+            self._logger.log(
+                VERBOSE,
+                "Journaled %d event state changes (%d bytes) in %.3fms.",
+                stats.records,
+                stats.bytes_written,
+                stats.duration * 1000,
+            )
 
     def reset_counters(self, rule_id: str | None) -> None:
         if rule_id:
@@ -2827,21 +3020,33 @@ class EventStatus:
         self.save_status()
 
     def load_status(self, event_server: EventServer) -> None:
+        now = time.time()
         path = self.settings.paths.status_file.value
-        if path.exists():
+        if self._journal.exists():
+            try:
+                self.unpack_status(self._journal.load())
+            except Exception:
+                self._logger.exception(
+                    "Error loading event state from %s",
+                    self.settings.paths.status_snapshot_file.value,
+                )
+                raise
+        elif path.exists():
             try:
                 status = ast.literal_eval(path.read_text(encoding="utf-8"))
                 self._next_event_id = status["next_event_id"]
-                self._events = status["events"]
+                self._events = {event["id"]: event for event in status["events"]}
                 self._rule_stats = status["rule_stats"]
                 self._interval_starts = status.get("interval_starts", {})
                 self._logger.info("Loaded event state from %s.", path)
             except Exception:
                 self._logger.exception(f"Error loading event state from {path}")
                 raise
+        self.load_duration = time.time() - now
 
         # Add new columns and fix broken events
-        for event in self._events:
+        for event in self._events.values():
+            num_fields = len(event)
             event.setdefault("ipaddress", "")
             event.setdefault("host", HostName(""))
             event.setdefault("application", "")
@@ -2851,21 +3056,59 @@ class EventStatus:
                 event_server.add_core_host_to_event(event)
                 event["host_in_downtime"] = False
 
+            if len(event) != num_fields:
+                self.touch(event)
+
         # core_host is needed to initialize the status
         self._initialize_event_limit_status()
 
     def _initialize_event_limit_status(self) -> None:
         """
         Called on Event Console initialization from status file to initialize
-        the current event limit state -> Sets internal counters which are
-        updated during runtime.
+        the current event limit state -> Sets internal counters and indexes which
+        are updated during runtime.
         """
         self.num_existing_events = len(self._events)
 
         self.num_existing_events_by_host: dict[tuple[str, HostName | None], int] = {}
         self.num_existing_events_by_rule: dict[Any, int] = {}
-        for event in self._events:
+        self._events_by_rule: EventIndex[str | None] = EventIndex(lambda e: e["rule_id"])
+        # Case insensitive, like the host filters of the status queries
+        self._events_by_host: EventIndex[str] = EventIndex(lambda e: (e["host"] or "").lower())
+        # Cancelling only considers events of the same host
+        self._events_by_rule_and_host: EventIndex[tuple[str | None, HostName]] = EventIndex(
+            lambda e: (e["rule_id"], e["host"])
+        )
+        # Counting may separate events by their match groups
+        self._events_by_rule_and_match_groups: EventIndex[
+            tuple[str | None, tuple[str, ...]]
+        ] = EventIndex(lambda e: (e["rule_id"], tuple(e.get("match_groups", ()))))
+        for event in self._events.values():
             self._count_event_add(event)
+            self._index_event(event)
+
+    def _index_event(self, event: Event) -> None:
+        self._events_by_rule.add(event)
+        self._events_by_host.add(event)
+        self._events_by_rule_and_host.add(event)
+        self._events_by_rule_and_match_groups.add(event)
+
+    def _unindex_event(self, event: Event) -> None:
+        self._events_by_rule.remove(event)
+        self._events_by_host.remove(event)
+        self._events_by_rule_and_host.remove(event)
+        self._events_by_rule_and_match_groups.remove(event)
+
+    def _reindex_event(self, event: Event, previous_host_key: tuple[str, HostName | None]) -> None:
+        """Counting up an event may change its host and match groups"""
+        if (host_key := (event["host"], event["core_host"])) != previous_host_key:
+            self.num_existing_events_by_host[previous_host_key] -= 1
+            self.num_existing_events_by_host[host_key] = (
+                self.num_existing_events_by_host.get(host_key, 0) + 1
+            )
+        self._events_by_host.update(event)
+        self._events_by_rule_and_host.update(event)
+        self._events_by_rule_and_match_groups.update(event)
 
     def _count_event_add(self, event: Event) -> None:
         host_key = (event["host"], event["core_host"])
@@ -2890,10 +3133,12 @@ class EventStatus:
         self._perfcounters.count("events")
         event["id"] = self._next_event_id
         self._next_event_id += 1
-        self._events.append(event)
+        self._events[event["id"]] = event
         self.num_existing_events += 1
         self._count_event_add(event)
+        self._index_event(event)
         self._history.add(event, "NEW")
+        self.touch(event)
 
     def archive_event(self, event: Event) -> None:
         self._perfcounters.count("events")
@@ -2903,18 +3148,20 @@ class EventStatus:
         self._history.add(event, "ARCHIVED")
 
     def remove_event(self, event: Event, delete_reason: HistoryWhat, user: str = "") -> None:
-        try:
-            self._events.remove(event)
-            self._history.add(event, delete_reason, user)
-            self._count_event_remove(event)
-        except ValueError:
-            self._logger.exception("Cannot remove event %d: not present", event["id"])
+        if self._events.get(event["id"]) is not event:
+            self._logger.error("Cannot remove event %d: not present", event["id"])
+            return
+        del self._events[event["id"]]
+        self._history.add(event, delete_reason, user)
+        self._count_event_remove(event)
+        self._unindex_event(event)
+        self.touch(event)
 
     # protected by self.lock
     def remove_oldest_event(self, ty: LimitKind, event: Event) -> None:
         if ty == "overall":
             self._logger.log(VERBOSE, "  Removing oldest event")
-            oldest_event = self._events[0]
+            oldest_event = next(iter(self._events.values()))
             self.remove_event(oldest_event, "AUTODELETE")
         elif ty == "by_rule" and event["rule_id"] is not None:
             self._logger.log(VERBOSE, '  Removing oldest event of rule "%s"', event["rule_id"])
@@ -2925,14 +3172,12 @@ class EventStatus:
 
     # protected by self.lock
     def _remove_oldest_event_of_rule(self, rule_id: str) -> None:
-        for event in self._events:
-            if event["rule_id"] == rule_id:
-                self.remove_event(event, "AUTODELETE")
-                return
+        if (event := self._events_by_rule.oldest(rule_id)) is not None:
+            self.remove_event(event, "AUTODELETE")
 
     # protected by self.lock
-    def _remove_oldest_event_of_host(self, hostname: str) -> None:
-        for event in self._events:
+    def _remove_oldest_event_of_host(self, hostname: HostName) -> None:
+        for event in self._events_by_host.get(hostname.lower()):
             if event["host"] == hostname:
                 self.remove_event(event, "AUTODELETE")
                 return
@@ -2959,12 +3204,12 @@ class EventStatus:
         Cancel all events the belong to a certain rule id and are
         of the same "breed" as a new event.
         """
+        host = self._cancelling_host(match_groups, new_event, rule)
         with self.lock:
             to_delete = []
-            for event in self._events:
-                if event["rule_id"] == rule["id"] and self.cancelling_match(
-                    match_groups, new_event, event, rule
-                ):
+            # Events of other hosts are never cancelled, see cancelling_match()
+            for event in self._events_by_rule_and_host.get((rule["id"], host)):
+                if self.cancelling_match(match_groups, new_event, event, rule):
                     # Fill a few fields of the cancelled event with data from
                     # the cancelling event so that action scripts have useful
                     # values and the logfile entry if more relevant.
@@ -3016,21 +3261,7 @@ class EventStatus:
     ) -> bool:
         debug = self._config["debug_rules"]
 
-        # The match_groups of the canceling match only contain the *_ok match groups
-        # Since the rewrite definitions are based on the positive match, we need to
-        # create some missing keys. O.o
-        match_groups["match_groups_message"] = match_groups.get("match_groups_message_ok", ())
-        match_groups["match_groups_syslog_application"] = match_groups.get(
-            "match_groups_syslog_application_ok", ()
-        )
-
-        # Note: before we compare host and application we need to
-        # apply the rewrite rules to the event. Because if in the previous
-        # the hostname was rewritten, it wouldn't match anymore here.
-        host = new_event["host"]
-        if "set_host" in rule:
-            host = HostName(replace_groups(rule["set_host"], host, match_groups))
-
+        host = self._cancelling_host(match_groups, new_event, rule)
         if event["host"] != host:
             if debug:
                 self._logger.info(
@@ -3116,6 +3347,24 @@ class EventStatus:
 
         return True
 
+    @staticmethod
+    def _cancelling_host(match_groups: MatchGroups, new_event: Event, rule: Rule) -> HostName:
+        # The match_groups of the canceling match only contain the *_ok match groups
+        # Since the rewrite definitions are based on the positive match, we need to
+        # create some missing keys. O.o
+        match_groups["match_groups_message"] = match_groups.get("match_groups_message_ok", ())
+        match_groups["match_groups_syslog_application"] = match_groups.get(
+            "match_groups_syslog_application_ok", ()
+        )
+
+        # Note: before we compare host and application we need to
+        # apply the rewrite rules to the event. Because if in the previous
+        # the hostname was rewritten, it wouldn't match anymore here.
+        host = new_event["host"]
+        if "set_host" in rule:
+            host = HostName(replace_groups(rule["set_host"], host, match_groups))
+        return host
+
     def count_rule_match(self, rule_id: str) -> None:
         with self.lock:
             self._rule_stats.setdefault(rule_id, 0)
@@ -3141,10 +3390,16 @@ class EventStatus:
         found.update(event)
         found.update(preserve)
 
+    def _count_indexed_event_up(self, found: Event, event: Event) -> None:
+        previous_host_key = (found["host"], found["core_host"])
+        self.count_event_up(found, event)
+        self._reindex_event(found, previous_host_key)
+        self.touch(found)
+
     def count_expected_event(self, event_server: EventServer, event: Event) -> None:
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"] and ev["phase"] == "counting":
-                self.count_event_up(ev, event)
+        for ev in self._events_by_rule.get(event["rule_id"]):
+            if ev["phase"] == "counting":
+                self._count_indexed_event_up(ev, event)
                 return
 
         # None found, create one
@@ -3162,31 +3417,38 @@ class EventStatus:
         since the event has been created because the count was too
         low in the specified period of time.
         """
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"]:
-                if ev["phase"] == "ack" and not count["count_ack"]:
-                    continue  # skip acknowledged events
+        if count["separate_match_groups"]:
+            candidates = self._events_by_rule_and_match_groups.get(
+                (event["rule_id"], tuple(event.get("match_groups", ())))
+            )
+        elif count["separate_host"]:
+            candidates = self._events_by_rule_and_host.get((event["rule_id"], event["host"]))
+        else:
+            candidates = self._events_by_rule.get(event["rule_id"])
+        for ev in candidates:
+            if ev["phase"] == "ack" and not count["count_ack"]:
+                continue  # skip acknowledged events
 
-                if count["separate_host"] and ev["host"] != event["host"]:
-                    continue  # treat events with separated hosts separately
+            if count["separate_host"] and ev["host"] != event["host"]:
+                continue  # treat events with separated hosts separately
 
-                if count["separate_application"] and ev["application"] != event["application"]:
-                    continue  # same for application
+            if count["separate_application"] and ev["application"] != event["application"]:
+                continue  # same for application
 
-                if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
-                    continue
+            if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
+                continue
 
-                count_duration = count.get("count_duration")
-                if count_duration is not None and ev["first"] + count_duration < event["time"]:
-                    # Counting has been discontinued on this event after a certain time
-                    continue
+            count_duration = count.get("count_duration")
+            if count_duration is not None and ev["first"] + count_duration < event["time"]:
+                # Counting has been discontinued on this event after a certain time
+                continue
 
-                if ev["host_in_downtime"] != event["host_in_downtime"]:
-                    continue  # treat events with different downtime states separately
+            if ev["host_in_downtime"] != event["host_in_downtime"]:
+                continue  # treat events with different downtime states separately
 
-                found = ev
-                self.count_event_up(found, event)
-                break
+            found = ev
+            self._count_indexed_event_up(found, event)
+            break
         else:
             event["count"] = 1
             event["phase"] = "counting"
@@ -3196,11 +3458,12 @@ class EventStatus:
         # Did we just count the event that was just one too much?
         if found["phase"] == "counting" and found["count"] >= count["count"]:
             found["phase"] = "open"
+            self.touch(found)
             return found  # do event action, return found copy of event
         return None  # do not do event action
 
     def delete_events_by(self, predicate: Callable[[Event], bool], user: str) -> None:
-        for event in self._events[:]:
+        for event in list(self._events.values()):
             if predicate(event):
                 event["phase"] = "closed"
                 if user:
@@ -3208,7 +3471,7 @@ class EventStatus:
                 self.remove_event(event, "DELETE", user)
 
     def get_events(self) -> list[Any]:
-        return self._events
+        return list(self._events.values())
 
     def get_rule_stats(self) -> Iterable[Any]:
         return sorted(self._rule_stats.items(), key=lambda x: x[0])
@@ -3244,11 +3507,15 @@ def replication_allow_command(config: Config, command: str, slave_status: SlaveS
 
 
 def replication_send(
-    config: Config, lock_configuration: ECLock, event_status: EventStatus, last_update: int
+    config: Config,
+    lock_configuration: ECLock,
+    event_status: EventStatus,
+    last_update: int,
+    position: ReplicationPosition | None = None,
 ) -> dict[str, object]:
-    response: dict[str, object] = {}
     with lock_configuration:
-        response["status"] = event_status.pack_status()
+        # Only the changes if the slave is known to be in sync with an earlier state
+        response = event_status.pack_changes(position)
         if last_update < config["last_reload"]:
             response["rules"] = config[
                 "rules"
@@ -3296,7 +3563,9 @@ def replication_pull(  # pylint: disable=too-many-branches
     if need_sync:
         with event_status.lock, lock_configuration:
             try:
-                new_state = get_state_from_master(config, slave_status)
+                new_state = get_state_from_master(
+                    config, slave_status, event_status.replication_position()
+                )
                 replication_update_state(settings, config, event_status, event_server, new_state)
                 if repl_settings.get("logging"):
                     logger.info("Successfully synchronized with master")
@@ -3323,6 +3592,7 @@ def replication_pull(  # pylint: disable=too-many-branches
 
             except Exception:
                 logger.warning("Replication: cannot sync with master", exc_info=True)
+                event_status.set_replication_position(None)
                 slave_status["success"] = False
                 if slave_status["last_master_down"] is None:
                     slave_status["last_master_down"] = now
@@ -3367,7 +3637,12 @@ def replication_update_state(
         config["actions"] = new_state["actions"]
 
     # Update to the masters' event state
-    event_status.unpack_status(new_state["status"])
+    if "changes" in new_state:
+        event_status.unpack_changes(new_state["changes"])
+    else:
+        event_status.unpack_status(new_state["status"])
+    # Masters not supporting the delta replication don't send a position
+    event_status.set_replication_position(new_state.get("position"))
 
 
 def save_master_config(settings: Settings, new_state: dict[str, object]) -> None:
@@ -3405,7 +3680,9 @@ def load_master_config(settings: Settings, config: ConfigFromWATO, logger: Logge
             logger.error("Replication: no previously saved master state available")
 
 
-def get_state_from_master(config: Config, slave_status: SlaveStatus) -> Any:
+def get_state_from_master(
+    config: Config, slave_status: SlaveStatus, position: ReplicationPosition | None = None
+) -> Any:
     repl_settings = config["replication"]
     if repl_settings is None:
         raise ValueError("no replication settings")
@@ -3413,9 +3690,7 @@ def get_state_from_master(config: Config, slave_status: SlaveStatus) -> Any:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.settimeout(repl_settings["connect_timeout"])
         sock.connect(repl_settings["master"])
-        sock.sendall(
-            b"REPLICATE %d\n" % (slave_status["last_sync"] if slave_status["last_sync"] else 0)
-        )
+        sock.sendall(replication_request(slave_status, position))
         sock.shutdown(socket.SHUT_WR)
 
         response_text = b""
@@ -3438,6 +3713,14 @@ def get_state_from_master(config: Config, slave_status: SlaveStatus) -> Any:
         raise Exception("Cannot connect to event daemon") from e
 
 
+def replication_request(slave_status: SlaveStatus, position: ReplicationPosition | None) -> bytes:
+    request = b"REPLICATE %d" % (slave_status["last_sync"] if slave_status["last_sync"] else 0)
+    if position is not None:
+        # Request the changes since the given position
+        request += b" %s %d" % (position[0].encode("ascii"), position[1])
+    return request + b"\n"
+
+
 def save_slave_status(settings: Settings, slave_status: SlaveStatus) -> None:
     settings.paths.slave_status_file.value.write_text(repr(slave_status) + "\n", encoding="utf-8")
 
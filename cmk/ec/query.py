@@ -88,8 +88,6 @@ class QueryGET(Query):
         # NOTE: history's _get_mongodb and _get_files access filters and limits directly.
         self.filters: list[tuple[str, OperatorName, Callable[[Any], bool], Any]] = []
         self.limit: int | None = None
-        # NOTE: StatusTableEvents uses only_host for optimization.
-        self.only_host: set[Any] | None = None
         self._parse_header_lines(raw_query, logger)
 
     def _parse_header_lines(self, raw_query: list[str], logger: Logger) -> None:
@@ -110,11 +108,7 @@ class QueryGET(Query):
         elif header == "Columns":
             self.requested_columns = argument.split(" ")
         elif header == "Filter":
-            column_name, operator_name, predicate, argument = self._parse_filter(argument)
-            # Needed for later optimization (check_mkevents)
-            if column_name == "event_host" and operator_name == "in":
-                self.only_host = set(argument)
-            self.filters.append((column_name, operator_name, predicate, argument))
+            self.filters.append(self._parse_filter(argument))
         elif header == "Limit":
             self.limit = int(argument)
         else:
@@ -79,7 +79,8 @@ class SectionStore(Generic[_T]):
         # TODO: This is not race condition free when modifying the data. Either remove
         # the possible write here and simply ignore the outdated sections or lock when
         # reading and unlock after writing
-        persisted_sections = self.load()
+        stored_sections = self.load()
+        persisted_sections = dict(stored_sections)
         persisted_sections.update(
             {
                 section_name: persist_info + (section_content,)
@@ -93,7 +94,8 @@ class SectionStore(Generic[_T]):
                 if valid_until < now:
                     del persisted_sections[section_name]
 
-        self.store(persisted_sections)
+        if persisted_sections != stored_sections:
+            self.store(persisted_sections)
         return persisted_sections
 
     def _add_persisted_sections(
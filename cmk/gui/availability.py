@@ -23,6 +23,7 @@ from cmk.utils.hostaddress import HostName
 from cmk.utils.prediction import lq_logic
 from cmk.utils.servicename import ServiceName
 
+import cmk.gui.availability_rollups as availability_rollups
 import cmk.gui.sites as sites
 from cmk.gui.bi import BIManager
 from cmk.gui.exceptions import MKUserError
@@ -966,7 +967,7 @@ def get_availability_rawdata(
 
     time_range: AVTimeRange = avoptions["range"][0]
 
-    av_filter = "Filter: time >= %d\nFilter: time < %d\n" % time_range
+    av_filter = ""
     if av_object:
         tl_site, tl_host, tl_service = av_object
         av_filter += "Filter: host_name = {}\nFilter: service_description = {}\n".format(
@@ -980,7 +981,9 @@ def get_availability_rawdata(
     else:
         av_filter += "Filter: service_description =\n"
 
-    query = "GET statehist\n" + av_filter
+    query = "GET statehist\n"
+    query += "Filter: time >= %d\nFilter: time < %d\n" % time_range
+    query += av_filter
     query += "Timelimit: %d\n" % avoptions["timelimit"]
 
     # Add Columns needed for object identification
@@ -1016,10 +1019,20 @@ def get_availability_rawdata(
     query += filterheaders
     logrow_limit = avoptions["logrow_limit"]
 
-    with sites.only_sites(only_sites), sites.prepend_site(), sites.set_limit(
-        logrow_limit or None
-    ), CPUTracker() as fetch_rows_tracker:
-        data = sites.live().query(query)
+    with CPUTracker() as fetch_rows_tracker:
+        # Long time ranges are composed from the materialized spans, unless the limit is exceeded
+        data = availability_rollups.query_statehist(
+            only_sites,
+            av_filter + "Columns: %s\n" % " ".join(columns) + filterheaders,
+            columns,
+            time_range,
+            avoptions["timelimit"],
+        )
+        if data is None or (logrow_limit and len(data) > logrow_limit):
+            with sites.only_sites(only_sites), sites.prepend_site(), sites.set_limit(
+                logrow_limit or None
+            ):
+                data = sites.live().query(query)
 
     columns = ["site"] + columns
     spans: list[AVSpan] = [dict(zip(columns, span)) for span in data]
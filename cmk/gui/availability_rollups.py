@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Materialized state history for availability reports over long time ranges
+
+Each availability page makes the core replay the monitoring history of the whole time range.
+For long time ranges, e.g. the SLA report of the last year, this takes minutes. Such reports
+register their statehist query here. A background job, started by the GUI cron job, materializes
+the spans of the query for each completed day, one file per day. The reports compose the spans of
+the materialized days and only fetch the spans of the remaining time ranges from the core, e.g.
+the ones since the last midnight.
+
+The composed spans are exactly the ones the core computes for the whole time range:
+
+* The core starts all spans of a query at its start time and ends the spans still open at the end
+  of the query one second before its end time. The open spans of a time range are continued by
+  the first spans of the following time range. This also holds for state changes at the boundary,
+  which the core reports as spans of zero duration.
+* The spans of a shorter time range are cut from the spans of a longer one the same way.
+
+The filters and some columns of the queries, e.g. the aliases and the groups, refer to the current
+configuration of the core. The days are materialized per program start of the core, which changes
+when the core loads a new configuration. The days of a previous program start are not used and
+materialized again. Annotations are applied to the spans afterwards, they do not affect the
+materialized days. As the spans are shared by all users, only users who may see all objects use
+them.
+"""
+
+import datetime
+import hashlib
+import os
+import pickle
+import shutil
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Final
+
+from livestatus import OnlySites, SiteId
+
+import cmk.utils.paths
+import cmk.utils.store as store
+
+import cmk.gui.sites as sites
+from cmk.gui.background_job import (
+    BackgroundJob,
+    BackgroundProcessInterface,
+    InitialStatusArgs,
+    job_registry,
+)
+from cmk.gui.http import request
+from cmk.gui.i18n import _
+from cmk.gui.log import logger
+from cmk.gui.logged_in import user
+
+StatehistRow = list[Any]
+
+# Shorter time ranges are fetched from the core directly
+_MIN_TIME_RANGE: Final = 7 * 86400
+# Materialized queries are removed when they have not been used for this time. Long enough to
+# keep the ones of monthly reports.
+_MAX_UNUSED: Final = 40 * 86400
+# The core updates the output of a span without starting a new one
+_OUTPUT_COLUMNS: Final = frozenset({"log_output", "long_log_output"})
+# Time limit of the query of a single day. Days exceeding it are not materialized.
+_DAY_TIMELIMIT: Final = 120
+# The background job stops after this time and continues with the next run
+_MAX_DURATION: Final = 600
+
+
+@dataclass(frozen=True)
+class _StatehistQuery:
+    """A statehist query of an availability report without its time range
+
+    The headers contain the columns and the filters. The first two columns identify the objects.
+    The program start identifies the configuration of the core the spans refer to.
+    """
+
+    site: SiteId
+    headers: str
+    columns: Sequence[str]
+    program_start: int
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha256(f"{self.site}\n{self.headers}".encode()).hexdigest()
+
+    def query(self, since: int, until: int) -> str:
+        return "GET statehist\nFilter: time >= %d\nFilter: time < %d\n%s" % (
+            since,
+            until,
+            self.headers,
+        )
+
+
+def rollups_dir() -> Path:
+    return Path(cmk.utils.paths.var_dir, "availability_rollups")
+
+
+def _request_path(statehist_query: _StatehistQuery) -> Path:
+    return rollups_dir() / statehist_query.site / f"{statehist_query.key}.request"
+
+
+def _query_dir(statehist_query: _StatehistQuery) -> Path:
+    return rollups_dir() / statehist_query.site / statehist_query.key
+
+
+def _days_dir(statehist_query: _StatehistQuery) -> Path:
+    return _query_dir(statehist_query) / str(statehist_query.program_start)
+
+
+def _day_path(statehist_query: _StatehistQuery, day: int) -> Path:
+    return _days_dir(statehist_query) / f"{day}.rollup"
+
+
+def _load_day(statehist_query: _StatehistQuery, day: int) -> list[StatehistRow] | None:
+    return store.load_object_from_pickle_file(_day_path(statehist_query, day), default=None)
+
+
+def _last_midnight(now: float) -> int:
+    return int(
+        datetime.datetime.fromtimestamp(now)
+        .replace(hour=0, minute=0, second=0, microsecond=0)
+        .timestamp()
+    )
+
+
+def _days(since: int, until: int) -> Iterator[tuple[int, int]]:
+    """The start and end of the days from the one containing since, ending until at the latest"""
+    start = _last_midnight(since)
+    while (end := _last_midnight(start + 86400 + 7200)) <= until:
+        yield start, end
+        start = end
+
+
+def _program_start(site_id: SiteId) -> int:
+    return sites.states().get(site_id, {}).get("program_start", 0)
+
+
+def _sees_all_objects() -> bool:
+    return bool(
+        user.may("general.see_all")
+        and not user.get_attribute("force_authuser")
+        and not request.var("force_authuser")
+    )
+
+
+def query_statehist(
+    only_sites: OnlySites,
+    headers: str,
+    columns: Sequence[str],
+    time_range: tuple[float, float],
+    timelimit: int,
+) -> list[StatehistRow] | None:
+    """Compose the rows of a statehist query from the materialized spans
+
+    The rows have the site prepended, just like the rows of the query. Returns None in case no day
+    has been materialized (yet). Long queries are registered to be materialized.
+    """
+    since, until = int(time_range[0]), int(time_range[1])
+    if until - since < _MIN_TIME_RANGE or not _sees_all_objects():
+        return None
+
+    queries = [
+        _StatehistQuery(site_id, headers, columns, _program_start(site_id))
+        for site_id in sites.live().alive_sites()
+        if not only_sites or site_id in only_sites
+    ]
+    for statehist_query in queries:
+        _register(statehist_query, since)
+
+    days = list(_days(since, min(until, _last_midnight(time.time()))))
+    segments = {
+        statehist_query.site: _segments(statehist_query, days, since, until)
+        for statehist_query in queries
+    }
+    if all(rows is None for site_segments in segments.values() for _s, _u, rows in site_segments):
+        return None
+
+    missing_rows = _query_missing_rows(queries, segments, timelimit)
+
+    rows: list[StatehistRow] = []
+    for statehist_query in queries:
+        site_rows = _concatenate(
+            (
+                missing_rows.get((statehist_query.site, segment_since), [])
+                if segment_rows is None
+                else segment_rows
+                for segment_since, _segment_until, segment_rows in segments[statehist_query.site]
+            ),
+            columns,
+        )
+        rows += ([statehist_query.site] + row for row in _cut(site_rows, since, until, columns))
+    return rows
+
+
+_Segment = tuple[int, int, list[StatehistRow] | None]
+
+
+def _segments(
+    statehist_query: _StatehistQuery, days: Sequence[tuple[int, int]], since: int, until: int
+) -> list[_Segment]:
+    """The materialized days and the time ranges in between, which have to be fetched (None)"""
+    segments: list[_Segment] = []
+    for day, day_end in days:
+        if (rows := _load_day(statehist_query, day)) is not None:
+            segments.append((day, day_end, rows))
+        elif segments and segments[-1][2] is None:
+            segments[-1] = (segments[-1][0], day_end, None)
+        else:
+            segments.append((max(day, since), day_end, None))
+
+    end = segments[-1][1] if segments else since
+    if end < until:
+        if segments and segments[-1][2] is None:
+            segments[-1] = (segments[-1][0], until, None)
+        else:
+            segments.append((end, until, None))
+    return segments
+
+
+def _query_missing_rows(
+    queries: Sequence[_StatehistQuery],
+    segments: dict[SiteId, list[_Segment]],
+    timelimit: int,
+) -> dict[tuple[SiteId, int], list[StatehistRow]]:
+    """Fetch the spans of the time ranges not materialized, with one query for all sites alike"""
+    sites_by_range: dict[tuple[int, int], list[SiteId]] = {}
+    for site_id, site_segments in segments.items():
+        for since, until, rows in site_segments:
+            if rows is None:
+                sites_by_range.setdefault((since, until), []).append(site_id)
+
+    missing_rows: dict[tuple[SiteId, int], list[StatehistRow]] = {}
+    for (since, until), site_ids in sites_by_range.items():
+        query = queries[0].query(since, until) + "Timelimit: %d\n" % timelimit
+        with sites.only_sites(site_ids), sites.prepend_site():
+            for site_id, *row in sites.live().query(query):
+                missing_rows.setdefault((site_id, since), []).append(row)
+    return missing_rows
+
+
+def _register(statehist_query: _StatehistQuery, since: int) -> None:
+    """Register the query to be materialized, the time of the last use is the modification time"""
+    path = _request_path(statehist_query)
+    registered = store.load_object_from_file(path, default=None)
+    if registered is not None and registered["since"] <= since:
+        os.utime(path)
+        return
+
+    store.makedirs(path.parent)
+    store.save_object_to_file(
+        path,
+        {
+            "site": statehist_query.site,
+            "headers": statehist_query.headers,
+            "columns": list(statehist_query.columns),
+            "since": since,
+        },
+    )
+
+
+def _span_indices(columns: Sequence[str]) -> tuple[int, int, int]:
+    return columns.index("from"), columns.index("until"), columns.index("duration")
+
+
+def _concatenate(parts: Iterable[list[StatehistRow]], columns: Sequence[str]) -> list[StatehistRow]:
+    """Concatenate the spans of adjacent time ranges
+
+    The last span of each object is continued by its first span of the following time range. The
+    output of a span is the last output within the span.
+    """
+    idx_from, idx_until, idx_duration = span_indices = _span_indices(columns)
+    state_columns = [
+        idx
+        for idx, column in enumerate(columns)
+        if idx >= 2 and idx not in span_indices and column not in _OUTPUT_COLUMNS
+    ]
+
+    concatenated: list[StatehistRow] = []
+    open_spans: dict[tuple[Any, Any], int] = {}
+    for rows in parts:
+        previous_spans, open_spans = open_spans, {}
+        for row in rows:
+            index = previous_spans.pop((row[0], row[1]), None)
+            if index is None or any(concatenated[index][idx] != row[idx] for idx in state_columns):
+                index = len(concatenated)
+                concatenated.append(row)
+            else:
+                span = list(row)
+                span[idx_from] = concatenated[index][idx_from]
+                span[idx_duration] = span[idx_until] - span[idx_from]
+                concatenated[index] = span
+            open_spans[row[0], row[1]] = index
+    return concatenated
+
+
+def _cut(
+    rows: list[StatehistRow], since: int, until: int, columns: Sequence[str]
+) -> list[StatehistRow]:
+    """The spans of a shorter time range, the end of the spans is inclusive"""
+    idx_from, idx_until, idx_duration = _span_indices(columns)
+    last = until - 1
+
+    cut = []
+    for row in rows:
+        if row[idx_until] < since or row[idx_from] > last:
+            continue
+        if row[idx_from] < since or row[idx_until] > last:
+            row = list(row)
+            row[idx_from] = max(row[idx_from], since)
+            row[idx_until] = min(row[idx_until], last)
+            row[idx_duration] = row[idx_until] - row[idx_from]
+        cut.append(row)
+    return cut
+
+
+@job_registry.register
+class AvailabilityRollupBackgroundJob(BackgroundJob):
+    job_prefix = "availability_rollups"
+
+    @staticmethod
+    def last_run_path() -> Path:
+        return Path(cmk.utils.paths.var_dir, "wato", "last_availability_rollups.mk")
+
+    @classmethod
+    def gui_title(cls) -> str:
+        return _("Materialize availability history")
+
+    def __init__(self) -> None:
+        super().__init__(
+            self.job_prefix,
+            InitialStatusArgs(
+                title=self.gui_title(),
+                lock_wato=False,
+                stoppable=False,
+            ),
+        )
+
+    def do_execute(self, job_interface: BackgroundProcessInterface) -> None:
+        try:
+            update_availability_rollups(time.time() + _MAX_DURATION)
+            job_interface.send_result_message(_("Job finished"))
+        finally:
+            AvailabilityRollupBackgroundJob.last_run_path().touch(exist_ok=True)
+
+
+def execute_availability_rollup_job() -> None:
+    """This function is called by the GUI cron job once a minute.
+
+    Errors are logged to var/log/web.log."""
+    if not rollups_dir().exists():
+        return
+
+    job = AvailabilityRollupBackgroundJob()
+    if job.is_active():
+        logger.debug("Job is already running: Skipping this time")
+        return
+
+    interval = 300
+    with suppress(FileNotFoundError):
+        if time.time() - AvailabilityRollupBackgroundJob.last_run_path().stat().st_mtime < interval:
+            logger.debug("Job was already executed within last %d seconds", interval)
+            return
+
+    job.start(job.do_execute)
+
+
+def update_availability_rollups(deadline: float) -> None:
+    """Materialize the missing days of the registered statehist queries, the most recent first"""
+    now = time.time()
+    alive_sites = set(sites.live().alive_sites())
+    for path in sorted(rollups_dir().glob("*/*.request")):
+        registered = store.load_object_from_file(path, default=None)
+        if registered is None:
+            continue
+        statehist_query = _StatehistQuery(
+            registered["site"],
+            registered["headers"],
+            registered["columns"],
+            _program_start(registered["site"]),
+        )
+        if now - path.stat().st_mtime > _MAX_UNUSED:
+            path.unlink(missing_ok=True)
+            shutil.rmtree(_query_dir(statehist_query), ignore_errors=True)
+            continue
+        if statehist_query.site not in alive_sites:
+            continue
+
+        _remove_previous_program_starts(statehist_query)
+        days = list(_days(registered["since"], _last_midnight(now)))
+        _remove_days_before(statehist_query, days[0][0] if days else _last_midnight(now))
+
+        for day, day_end in reversed(days):
+            if time.time() > deadline:
+                return
+            if _day_path(statehist_query, day).exists():
+                continue
+            try:
+                _update_day(statehist_query, day, day_end)
+            except Exception:
+                logger.exception("Failed to materialize the availability of %s", path.stem)
+                break
+
+
+def _remove_previous_program_starts(statehist_query: _StatehistQuery) -> None:
+    days_dir = _days_dir(statehist_query)
+    for path in _query_dir(statehist_query).glob("*"):
+        if path != days_dir:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _remove_days_before(statehist_query: _StatehistQuery, since: int) -> None:
+    for day_path in _days_dir(statehist_query).glob("*.rollup"):
+        with suppress(ValueError):
+            if int(day_path.stem) < since:
+                day_path.unlink(missing_ok=True)
+
+
+def _update_day(statehist_query: _StatehistQuery, day: int, day_end: int) -> None:
+    query = statehist_query.query(day, day_end) + "Timelimit: %d\n" % _DAY_TIMELIMIT
+    started = time.monotonic()
+    with sites.only_sites(statehist_query.site):
+        rows = [list(row) for row in sites.live().query(query)]
+    # The core returns the spans computed so far when the time limit is exceeded
+    if time.monotonic() - started >= _DAY_TIMELIMIT:
+        raise TimeoutError(f"The query of {day} exceeded the time limit")
+
+    store.makedirs(_days_dir(statehist_query))
+    store.save_bytes_to_file(_day_path(statehist_query, day), pickle.dumps(rows))
@@ -215,6 +215,7 @@ def register(
     config_var_registry.register(ConfigVariableEventConsoleRemoteStatus)
     config_var_registry.register(ConfigVariableEventConsoleReplication)
     config_var_registry.register(ConfigVariableEventConsoleRetentionInterval)
+    config_var_registry.register(ConfigVariableEventConsoleStatePersistence)
     config_var_registry.register(ConfigVariableEventConsoleHousekeepingInterval)
     config_var_registry.register(ConfigVariableEventConsoleStatisticsInterval)
     config_var_registry.register(ConfigVariableEventConsoleLogMessages)
@@ -3898,6 +3899,34 @@ class ConfigVariableEventConsoleRetentionInterval(ConfigVariable):
         )
 
 
+class ConfigVariableEventConsoleStatePersistence(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupEventConsoleGeneric
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainEventConsole
+
+    def ident(self) -> str:
+        return "state_persistence"
+
+    def valuespec(self) -> ValueSpec:
+        return DropdownChoice(
+            title=_("State persistence"),
+            help=_(
+                "How the event daemon saves its state to disk. With <i>Journal</i> only the "
+                "events which have been created, changed or deleted since the last save are "
+                "appended to a journal file, which is compacted into a snapshot of the complete "
+                "state from time to time. This keeps saving and restarting fast even with a large "
+                "number of open events. With <i>Complete state file</i> the whole state is "
+                "written on each save."
+            ),
+            choices=[
+                ("journal", _("Journal")),
+                ("full", _("Complete state file")),
+            ],
+        )
+
+
 class ConfigVariableEventConsoleHousekeepingInterval(ConfigVariable):
     def group(self) -> type[ConfigVariableGroup]:
         return ConfigVariableGroupEventConsoleGeneric
@@ -165,6 +165,30 @@ metric_info["cmk_time_ds"] = {
     "color": "34/a",
 }
 
+metric_info["cmk_time_parse"] = {
+    "title": _l("Time spent parsing the monitoring data"),
+    "unit": "s",
+    "color": "41/a",
+}
+
+metric_info["cmk_time_check"] = {
+    "title": _l("Time spent executing the checks"),
+    "unit": "s",
+    "color": "43/a",
+}
+
+metric_info["cmk_time_value_store_save"] = {
+    "title": _l("Time spent saving the value store"),
+    "unit": "s",
+    "color": "45/a",
+}
+
+metric_info["cmk_time_submit"] = {
+    "title": _l("Time spent submitting the check results"),
+    "unit": "s",
+    "color": "46/a",
+}
+
 metric_info["log_message_rate"] = {
     "title": _l("Log messages"),
     "unit": "1/s",
@@ -484,6 +484,17 @@ graph_info["cmk_cpu_time_by_phase"] = {
     "optional_metrics": ["cmk_time_agent", "cmk_time_snmp", "cmk_time_ds"],
 }
 
+graph_info["cmk_time_by_checking_phase"] = {
+    "title": _l("Time usage by checking phase"),
+    "metrics": [
+        ("cmk_time_parse", "stack"),
+        ("cmk_time_check", "stack"),
+        ("cmk_time_value_store_save", "stack"),
+        ("cmk_time_submit", "stack"),
+    ],
+    "optional_metrics": ["cmk_time_value_store_save", "cmk_time_submit"],
+}
+
 graph_info["cpu_time"] = {
     "title": _l("CPU Time"),
     "metrics": [
@@ -24,7 +24,7 @@ from cmk.gui.exceptions import MKUnauthenticatedException, MKUserError
 from cmk.gui.http import request, response
 from cmk.gui.i18n import _
 from cmk.gui.log import logger
-from cmk.gui.plugins.metrics import artwork, html_render
+from cmk.gui.plugins.metrics import artwork, html_render, rrd_fetch
 from cmk.gui.plugins.metrics.artwork import GraphArtwork
 from cmk.gui.plugins.metrics.graph_pdf import (
     compute_pdf_graph_data_range,
@@ -114,6 +114,11 @@ def _answer_graph_image_request(
         )
         num_graphs = request.get_integer_input("num_graphs") or len(graph_recipes)
 
+        rrd_fetch.prefetch_rrd_data_for_graphs(
+            ((graph_recipe, graph_data_range) for graph_recipe in graph_recipes[:num_graphs]),
+            resolve_combined_single_metric_spec,
+        )
+
         graphs = []
         for graph_recipe in graph_recipes[:num_graphs]:
             graph_artwork = artwork.compute_graph_artwork(
@@ -24,7 +24,7 @@ from cmk.gui.http import request, response
 from cmk.gui.i18n import _, _u
 from cmk.gui.log import logger
 from cmk.gui.logged_in import user
-from cmk.gui.plugins.metrics import artwork
+from cmk.gui.plugins.metrics import artwork, rrd_fetch
 from cmk.gui.plugins.metrics.artwork import (
     graph_curves_to_be_painted,
     GraphArtwork,
@@ -722,6 +722,12 @@ def render_graphs_from_definitions(
         "step", estimate_graph_step_for_html(graph_data_range["time_range"], graph_render_options)
     )
 
+    if not render_async:
+        rrd_fetch.prefetch_rrd_data_for_graphs(
+            ((graph_recipe, graph_data_range) for graph_recipe in graph_recipes),
+            resolve_combined_single_metric_spec,
+        )
+
     output = HTML()
     for graph_recipe in graph_recipes:
         if render_async:
@@ -877,12 +883,12 @@ def render_time_range_selection(
     graph_display_id: str,
 ) -> HTML:
     now = int(time.time())
-    graph_render_options = copy.deepcopy(graph_render_options)
-    rows = []
+    previews = []
     for timerange_attrs in active_config.graph_timeranges:
         duration = timerange_attrs["duration"]
         assert isinstance(duration, int)
-        graph_render_options.update(
+        preview_render_options = copy.deepcopy(graph_render_options)
+        preview_render_options.update(
             {
                 "size": (20, 4),
                 "font_size": 6.0,  # pt
@@ -901,21 +907,29 @@ def render_time_range_selection(
         graph_data_range = GraphDataRange(
             {
                 "time_range": timerange,
-                "step": 2 * estimate_graph_step_for_html(timerange, graph_render_options),
+                "step": 2 * estimate_graph_step_for_html(timerange, preview_render_options),
             }
         )
+        previews.append((timerange_attrs["title"], preview_render_options, graph_data_range))
 
+    rrd_fetch.prefetch_rrd_data_for_graphs(
+        ((graph_recipe, graph_data_range) for _title, _options, graph_data_range in previews),
+        resolve_combined_single_metric_spec,
+    )
+
+    rows = []
+    for title, preview_render_options, graph_data_range in previews:
         graph_artwork = artwork.compute_graph_artwork(
             graph_recipe,
             graph_data_range,
-            graph_render_options,
+            preview_render_options,
             resolve_combined_single_metric_spec,
             graph_display_id=graph_display_id,
         )
         rows.append(
             HTMLWriter.render_td(
-                render_graph_html(graph_artwork, graph_data_range, graph_render_options),
-                title=_("Change graph timerange to: %s") % timerange_attrs["title"],
+                render_graph_html(graph_artwork, graph_data_range, preview_render_options),
+                title=_("Change graph timerange to: %s") % title,
             )
         )
     return HTMLWriter.render_table(
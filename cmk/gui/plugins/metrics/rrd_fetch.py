@@ -5,14 +5,11 @@
 """Core for getting the actual raw data points via Livestatus from RRD"""
 
 
-import collections
-import contextlib
 import time
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
-from typing import Any
+from typing import Any, Final
 
-import livestatus
-from livestatus import SiteId
+from livestatus import lqencode, MKLivestatusNotFoundError, SiteId
 
 import cmk.utils.version as cmk_version
 from cmk.utils.exceptions import MKGeneralException
@@ -20,10 +17,14 @@ from cmk.utils.hostaddress import HostName
 from cmk.utils.metrics import MetricName
 from cmk.utils.prediction import livestatus_lql, TimeSeries, TimeSeriesValues
 from cmk.utils.servicename import ServiceName
+from cmk.utils.user import UserId
 
 import cmk.gui.plugins.metrics.timeseries as ts
 import cmk.gui.sites as sites
+from cmk.gui.ctx_stack import g
 from cmk.gui.i18n import _
+from cmk.gui.log import logger
+from cmk.gui.logged_in import user
 from cmk.gui.plugins.metrics.utils import (
     CheckMetricEntry,
     CombinedGraphMetricRecipe,
@@ -47,41 +48,217 @@ def fetch_rrd_data_for_graph(
         [CombinedSingleMetricSpec], Sequence[CombinedGraphMetricRecipe]
     ],
 ) -> RRDData:
-    needed_rrd_data = get_needed_sources(
-        graph_recipe["metrics"], resolve_combined_single_metric_spec
+    planner = _request_planner()
+    needed_series = planner.add_graph(
+        graph_recipe, graph_data_range, resolve_combined_single_metric_spec
     )
+    planner.fetch()
+
     unit_conversion = unit_info[graph_recipe["unit"]].get(
         "conversion",
         lambda v: v,
     )
+    # The series of services not found are omitted
+    rrd_data: RRDData = {
+        key: TimeSeries(data, conversion=unit_conversion)
+        for key, series_key in needed_series.items()
+        if (data := planner.series(series_key)) is not None
+    }
+    align_and_resample_rrds(rrd_data, graph_recipe["consolidation_function"])
+    chop_last_empty_step(graph_data_range, rrd_data)
 
-    by_service = group_needed_rrd_data_by_service(
-        (
-            (
-                entry[0],
-                entry[1],
-                entry[2],
-                entry[3],
-                entry[4],
-                entry[5],
+    return rrd_data
+
+
+def prefetch_rrd_data_for_graphs(
+    graphs: Iterable[tuple[GraphRecipe, GraphDataRange]],
+    resolve_combined_single_metric_spec: Callable[
+        [CombinedSingleMetricSpec], Sequence[CombinedGraphMetricRecipe]
+    ],
+) -> None:
+    """Fetch the RRD data of all graphs of a page at once, before the graphs are computed
+
+    Errors are left to the graphs, which fetch their data again.
+    """
+    planner = _request_planner()
+    try:
+        for graph_recipe, graph_data_range in graphs:
+            planner.add_graph(graph_recipe, graph_data_range, resolve_combined_single_metric_spec)
+        planner.fetch()
+    except Exception:
+        logger.debug("Failed to prefetch the RRD data of graphs", exc_info=True)
+
+
+# The data of an RRD column of a service
+RRDSeriesKey = tuple[SiteId, HostName, ServiceName, ColumnName]
+
+# The series fetched for a user are reused for a short time, e.g. by the hover requests of a
+# graph or by the dashlets of a dashboard showing the same series
+_SERIES_CACHE_LIFETIME: Final = 30.0
+_MAX_CACHED_SERIES: Final = 10000
+_series_cache: dict[tuple[UserId | None, RRDSeriesKey], tuple[float, TimeSeriesValues | None]] = {}
+
+
+class RRDFetchPlanner:
+    """Fetch the RRD data of several graphs with as few Livestatus queries as possible
+
+    The graphs are added to the planner before their series are fetched at once. Series needed
+    by several graphs are only fetched once. The services needing the same columns share a
+    query and all sites are queried concurrently.
+    """
+
+    def __init__(self) -> None:
+        # None for the series of services not found
+        self._series: dict[RRDSeriesKey, TimeSeriesValues | None] = {}
+        self._pending: set[RRDSeriesKey] = set()
+        # Resolving the sources of combined graphs needs queries, so it is done once per graph
+        self._needed_series: dict[str, dict[RRDDataKey, RRDSeriesKey]] = {}
+
+    def add_graph(
+        self,
+        graph_recipe: GraphRecipe,
+        graph_data_range: GraphDataRange,
+        resolve_combined_single_metric_spec: Callable[
+            [CombinedSingleMetricSpec], Sequence[CombinedGraphMetricRecipe]
+        ],
+    ) -> dict[RRDDataKey, RRDSeriesKey]:
+        """Add the series of a graph to be fetched, returns the series of the RRD data"""
+        point_range = _point_range(graph_data_range)
+        graph_key = repr(
+            (graph_recipe["metrics"], graph_recipe["consolidation_function"], point_range)
+        )
+        if (needed_series := self._needed_series.get(graph_key)) is None:
+            needed_series = self._needed_series[graph_key] = _needed_series(
+                graph_recipe, point_range, resolve_combined_single_metric_spec
             )
-            for entry in needed_rrd_data
+
+        self._pending.update(
+            series_key for series_key in needed_series.values() if series_key not in self._series
         )
-    )
-    rrd_data: RRDData = {}
-    for (site, host_name, service_description), metrics in by_service.items():
-        with contextlib.suppress(livestatus.MKLivestatusNotFoundError):
-            for (perfvar, cf, scale), data in fetch_rrd_data(
-                site, host_name, service_description, metrics, graph_recipe, graph_data_range
-            ):
-                rrd_data[(site, host_name, service_description, perfvar, cf, scale)] = TimeSeries(
-                    data,
-                    conversion=unit_conversion,
+        return needed_series
+
+    def series(self, series_key: RRDSeriesKey) -> TimeSeriesValues | None:
+        return self._series.get(series_key)
+
+    def fetch(self) -> None:
+        pending, self._pending = self._pending, set()
+        now = time.time()
+        for series_key in list(pending):
+            cached = _series_cache.get((user.id, series_key))
+            if cached is not None and cached[0] > now:
+                self._series[series_key] = cached[1]
+                pending.discard(series_key)
+
+        columns_by_service: dict[tuple[SiteId, HostName, ServiceName], list[ColumnName]] = {}
+        for site, host_name, service_description, column in sorted(pending):
+            columns_by_service.setdefault((site, host_name, service_description), []).append(column)
+
+        services_by_columns: dict[
+            tuple[bool, tuple[ColumnName, ...]], list[tuple[SiteId, HostName, ServiceName]]
+        ] = {}
+        for service, columns in columns_by_service.items():
+            services_by_columns.setdefault((service[2] == "_HOST_", tuple(columns)), []).append(
+                service
+            )
+
+        fetched: dict[RRDSeriesKey, TimeSeriesValues | None] = {}
+        for (_is_host, columns), services in services_by_columns.items():
+            fetched.update(
+                _query_series(services, columns)
+                if len(services) > 1
+                else _query_service_series(services[0], columns)
+            )
+
+        self._series.update(fetched)
+        _cache_series(fetched, now)
+
+
+def _request_planner() -> RRDFetchPlanner:
+    return g.setdefault("rrd_fetch_planner", RRDFetchPlanner())
+
+
+def _needed_series(
+    graph_recipe: GraphRecipe,
+    point_range: str,
+    resolve_combined_single_metric_spec: Callable[
+        [CombinedSingleMetricSpec], Sequence[CombinedGraphMetricRecipe]
+    ],
+) -> dict[RRDDataKey, RRDSeriesKey]:
+    return {
+        (site, host_name, service_description, perfvar, cf, scale): (
+            site,
+            host_name,
+            service_description,
+            next(
+                rrd_columns(
+                    [(perfvar, cf, scale)], graph_recipe["consolidation_function"], point_range
                 )
-    align_and_resample_rrds(rrd_data, graph_recipe["consolidation_function"])
-    chop_last_empty_step(graph_data_range, rrd_data)
+            ),
+        )
+        for site, host_name, service_description, perfvar, cf, scale in get_needed_sources(
+            graph_recipe["metrics"], resolve_combined_single_metric_spec
+        )
+    }
 
-    return rrd_data
+
+def _query_service_series(
+    service: tuple[SiteId, HostName, ServiceName], columns: Sequence[ColumnName]
+) -> dict[RRDSeriesKey, TimeSeriesValues | None]:
+    site, host_name, service_description = service
+    query = livestatus_lql([host_name], list(columns), service_description)
+    try:
+        with sites.only_sites(site):
+            row = sites.live().query_row(query)
+    except MKLivestatusNotFoundError:
+        row = [None] * len(columns)
+    return {(*service, column): data for column, data in zip(columns, row)}
+
+
+def _query_series(
+    services: Sequence[tuple[SiteId, HostName, ServiceName]], columns: Sequence[ColumnName]
+) -> dict[RRDSeriesKey, TimeSeriesValues | None]:
+    """Fetch the same columns of several services, of hosts or of services, from their sites"""
+    is_host = services[0][2] == "_HOST_"
+    if is_host:
+        query = "GET hosts\nColumns: host_name %s\n" % " ".join(columns)
+        query += "".join(
+            "Filter: host_name = %s\n" % lqencode(host_name) for _site, host_name, _svc in services
+        )
+    else:
+        query = "GET services\nColumns: host_name service_description %s\n" % " ".join(columns)
+        query += "".join(
+            "Filter: host_name = %s\nFilter: service_description = %s\nAnd: 2\n"
+            % (lqencode(host_name), lqencode(service_description))
+            for _site, host_name, service_description in services
+        )
+    query += "Or: %d\n" % len(services)
+
+    series: dict[RRDSeriesKey, TimeSeriesValues | None] = {
+        (*service, column): None for service in services for column in columns
+    }
+    with sites.only_sites(
+        sorted({site for site, _host_name, _svc in services})
+    ), sites.prepend_site():
+        rows = sites.live().query(query)
+    for row in rows:
+        service = (row[0], row[1], "_HOST_") if is_host else (row[0], row[1], row[2])
+        for column, data in zip(columns, row[2 if is_host else 3 :]):
+            # Hosts of the same name on other sites are not asked for
+            if (series_key := (*service, column)) in series:
+                series[series_key] = data
+    return series
+
+
+def _cache_series(series: Mapping[RRDSeriesKey, TimeSeriesValues | None], now: float) -> None:
+    if len(_series_cache) + len(series) > _MAX_CACHED_SERIES:
+        for key, (valid_until, _data) in list(_series_cache.items()):
+            if valid_until <= now:
+                del _series_cache[key]
+        if len(_series_cache) + len(series) > _MAX_CACHED_SERIES:
+            _series_cache.clear()
+
+    valid_until = now + _SERIES_CACHE_LIFETIME
+    _series_cache.update(((user.id, key), (valid_until, data)) for key, data in series.items())
 
 
 def align_and_resample_rrds(rrd_data: RRDData, cf: GraphConsoldiationFunction | None) -> None:
@@ -199,26 +376,7 @@ def get_needed_sources(
 MetricProperties = tuple[str, GraphConsoldiationFunction | None, float]
 
 
-def group_needed_rrd_data_by_service(
-    needed_rrd_data: Iterable[RRDDataKey],
-) -> dict[tuple[SiteId, HostName, ServiceName], set[MetricProperties],]:
-    by_service: dict[
-        tuple[SiteId, HostName, ServiceName],
-        set[MetricProperties],
-    ] = collections.defaultdict(set)
-    for site, host_name, service_description, perfvar, cf, scale in needed_rrd_data:
-        by_service[(site, host_name, service_description)].add((perfvar, cf, scale))
-    return by_service
-
-
-def fetch_rrd_data(
-    site: SiteId,
-    host_name: HostName,
-    service_description: ServiceName,
-    metrics: set[MetricProperties],
-    graph_recipe: GraphRecipe,
-    graph_data_range: GraphDataRange,
-) -> list[tuple[MetricProperties, TimeSeriesValues]]:
+def _point_range(graph_data_range: GraphDataRange) -> str:
     start_time, end_time = graph_data_range["time_range"]
 
     step = graph_data_range["step"]
@@ -226,12 +384,7 @@ def fetch_rrd_data(
     if not isinstance(step, str):
         step = max(1, step)
 
-    point_range = ":".join(map(str, (start_time, end_time, step)))
-    lql_columns = list(rrd_columns(metrics, graph_recipe["consolidation_function"], point_range))
-    query = livestatus_lql([host_name], lql_columns, service_description)
-
-    with sites.only_sites(site):
-        return list(zip(metrics, sites.live().query_row(query)))
+    return ":".join(map(str, (start_time, end_time, step)))
 
 
 def rrd_columns(
@@ -302,12 +455,12 @@ def translate_and_merge_rrd_columns(
     if not relevant_ts:
         return TimeSeries([0, 0, 0])
 
-    _op_title, op_func = ts.time_series_operators()["MERGE"]
-    single_value_series = [ts.op_func_wrapper(op_func, list(tsp)) for tsp in zip(*relevant_ts)]
+    merged = ts.time_series_math("MERGE", relevant_ts)
+    assert merged is not None
 
     return TimeSeries(
-        single_value_series,
-        time_window=relevant_ts[0].twindow,
+        merged.values,
+        time_window=merged.twindow,
         conversion=_retrieve_unit_conversion_function(target_metric),
     )
 
@@ -3,15 +3,15 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-import functools
-import operator
 from collections.abc import Callable, Sequence
 from itertools import chain
-from typing import Literal, TypeVar
+from typing import Literal
+
+import numpy as np
 
 import cmk.utils.version as cmk_version
 from cmk.utils.exceptions import MKGeneralException
-from cmk.utils.prediction import TimeSeries, TimeSeriesValues
+from cmk.utils.prediction import TimeSeries, TimeSeriesArray, TimeSeriesValues
 
 import cmk.gui.utils.escaping as escaping
 from cmk.gui.i18n import _
@@ -163,27 +163,17 @@ def time_series_math(
         # Silently return so to get an empty graph slot
         return None
 
-    _op_title, op_func = operators[operator_id]
-    twindow = operands_evaluated[0].twindow
-
-    return TimeSeries(
-        [op_func_wrapper(op_func, list(tsp)) for tsp in zip(*operands_evaluated)], twindow
+    num_points = min(len(ts) for ts in operands_evaluated)
+    operands = np.array([ts.as_array()[:num_points] for ts in operands_evaluated]).reshape(
+        len(operands_evaluated), num_points
     )
+    _op_title, op_func = operators[operator_id]
+    with np.errstate(all="ignore"):
+        result = op_func(operands)
 
-
-_TOperatorReturn = TypeVar("_TOperatorReturn")
-
-
-def op_func_wrapper(
-    op_func: Callable[[TimeSeries | TimeSeriesValues], _TOperatorReturn],
-    tsp: TimeSeries | TimeSeriesValues,
-) -> _TOperatorReturn | None:
-    if tsp.count(None) < len(tsp):  # At least one non-None value
-        try:
-            return op_func(tsp)
-        except ZeroDivisionError:
-            pass
-    return None
+    # Points without any value stay empty
+    result[np.isnan(operands).all(axis=0)] = np.nan
+    return TimeSeries.from_array(result, operands_evaluated[0].twindow)
 
 
 def clean_time_series_point(tsp: TimeSeries | TimeSeriesValues) -> list[float]:
@@ -191,61 +181,34 @@ def clean_time_series_point(tsp: TimeSeries | TimeSeriesValues) -> list[float]:
     return [x for x in tsp if x is not None]
 
 
-def time_series_operator_sum(tsp: TimeSeries | TimeSeriesValues) -> float:
-    return sum(clean_time_series_point(tsp))
-
-
-def time_series_operator_product(tsp: TimeSeries | TimeSeriesValues) -> float | None:
-    if None in tsp:
-        return None
-    return functools.reduce(operator.mul, tsp, 1)
-
-
-def time_series_operator_difference(tsp: TimeSeries | TimeSeriesValues) -> float | None:
-    if None in tsp:
-        return None
-    assert tsp[0] is not None
-    assert tsp[1] is not None
-    return tsp[0] - tsp[1]
-
-
-def time_series_operator_fraction(tsp: TimeSeries | TimeSeriesValues) -> float | None:
-    if None in tsp or tsp[1] == 0:
-        return None
-    assert tsp[0] is not None
-    assert tsp[1] is not None
-    return tsp[0] / tsp[1]
-
-
-def time_series_operator_maximum(tsp: TimeSeries | TimeSeriesValues) -> float:
-    return max(clean_time_series_point(tsp))
-
-
-def time_series_operator_minimum(tsp: TimeSeries | TimeSeriesValues) -> float:
-    return min(clean_time_series_point(tsp))
+def time_series_operators() -> (
+    dict[Operator, tuple[str, Callable[[TimeSeriesArray], TimeSeriesArray]]]
+):
+    """The operators of the graph expressions, evaluated point wise on all points at once
 
+    The operands are passed as one row per time series, None values being NaN. A point of the
+    result is NaN in case the operator is undefined for the point."""
 
-def time_series_operator_average(tsp: TimeSeries | TimeSeriesValues) -> float:
-    tsp_clean = clean_time_series_point(tsp)
-    return sum(tsp_clean) / len(tsp_clean)
+    def _where_complete(operands: TimeSeriesArray, result: TimeSeriesArray) -> TimeSeriesArray:
+        return np.where(np.isnan(operands).any(axis=0), np.nan, result)
 
+    def _merge(operands: TimeSeriesArray) -> TimeSeriesArray:
+        first_valid = np.argmax(~np.isnan(operands), axis=0)
+        return operands[first_valid, np.arange(operands.shape[1])]
 
-def time_series_operators() -> (
-    dict[
-        Operator,
-        tuple[
-            str,
-            Callable[[TimeSeries | TimeSeriesValues], float | None],
-        ],
-    ]
-):
     return {
-        "+": (_("Sum"), time_series_operator_sum),
-        "*": (_("Product"), time_series_operator_product),
-        "-": (_("Difference"), time_series_operator_difference),
-        "/": (_("Fraction"), time_series_operator_fraction),
-        "MAX": (_("Maximum"), time_series_operator_maximum),
-        "MIN": (_("Minimum"), time_series_operator_minimum),
-        "AVERAGE": (_("Average"), time_series_operator_average),
-        "MERGE": ("First non None", lambda x: next(iter(clean_time_series_point(x)))),
+        "+": (_("Sum"), lambda o: np.nansum(o, axis=0)),
+        "*": (_("Product"), lambda o: _where_complete(o, np.prod(o, axis=0))),
+        "-": (_("Difference"), lambda o: _where_complete(o, o[0] - o[1])),
+        "/": (
+            _("Fraction"),
+            lambda o: np.where(o[1] == 0, np.nan, _where_complete(o, o[0] / o[1])),
+        ),
+        "MAX": (_("Maximum"), lambda o: np.fmax.reduce(o, axis=0)),
+        "MIN": (_("Minimum"), lambda o: np.fmin.reduce(o, axis=0)),
+        "AVERAGE": (
+            _("Average"),
+            lambda o: np.nansum(o, axis=0) / np.count_nonzero(~np.isnan(o), axis=0),
+        ),
+        "MERGE": ("First non None", _merge),
     }
@@ -52,6 +52,7 @@ from cmk.gui.type_defs import (
     MetricDefinitionWithoutTitle,
     MetricExpression,
     Perfdata,
+    PerfdataTuple,
     PerfometerSpec,
     RenderableRecipe,
     RGBColor,
@@ -492,6 +493,30 @@ def parse_perf_data(
     elif hasattr(check_command, "split"):
         check_command = check_command.split("!")[0]
 
+    try:
+        valid_perf_data = _parse_valid_perf_data(perf_data_string, check_command)
+    except Exception:
+        valid_perf_data = None
+
+    if valid_perf_data is None:
+        # Parse as far as possible, logging the invalid parts
+        return _parse_perf_data(perf_data_string, check_command)
+    return list(valid_perf_data[0]), valid_perf_data[1]
+
+
+# The perf-o-meters and graphs of a view parse the perf data of the same services again and again
+@lru_cache(maxsize=16384)
+def _parse_valid_perf_data(
+    perf_data_string: str, check_command: str
+) -> tuple[tuple[PerfdataTuple, ...], str]:
+    """Parse the perf data, invalid perf data is not cached but raises"""
+    perf_data, check_command = _parse_perf_data(perf_data_string, check_command, strict=True)
+    return tuple(perf_data), check_command
+
+
+def _parse_perf_data(
+    perf_data_string: str, check_command: str, strict: bool = False
+) -> tuple[Perfdata, str]:
     # Split the perf data string into parts. Preserve quoted strings!
     parts = _split_perf_data(perf_data_string)
 
@@ -526,6 +551,8 @@ def parse_perf_data(
                 )
             )
         except Exception as exc:
+            if strict:
+                raise
             logger.exception("Failed to parse perfdata '%s'", perf_data_string)
             if active_config.debug:
                 raise exc
@@ -547,9 +574,16 @@ def _float_or_int(val: str | None) -> int | float | None:
             return None
 
 
+_SHLEX_SPECIAL_CHARS: Final = re.compile(r"[\\'\"]")
+_SHLEX_WORDS: Final = re.compile(r"[^ \t\r\n]+")
+
+
 def _split_perf_data(perf_data_string: str) -> list[str]:
     """Split the perf data string into parts. Preserve quoted strings!"""
-    return shlex.split(perf_data_string)
+    if _SHLEX_SPECIAL_CHARS.search(perf_data_string):
+        return shlex.split(perf_data_string)
+    # Without quotes and escapes, shlex only splits at its whitespace
+    return _SHLEX_WORDS.findall(perf_data_string)
 
 
 def perfvar_translation(
@@ -557,15 +591,48 @@ def perfvar_translation(
     check_command: str | None,  # None due to CMK-13883
 ) -> TranslationInfo:
     """Get translation info for one performance var."""
-    translation_entry = find_matching_translation(
-        MetricName_(perfvar_name),
-        lookup_metric_translations_for_check_command(check_metrics, check_command) or {},
+    return TranslationInfo(**_compiled_translations(check_command).lookup(perfvar_name))
+
+
+class _CompiledTranslations:
+    """The metric translations of a check command, with the regex entries compiled"""
+
+    def __init__(self, translations: Mapping[MetricName_, CheckMetricEntry]) -> None:
+        self._translations: Final = translations
+        self._regex_translations: Final = [
+            (cmk.utils.regex.regex(orig_metric_name[1:]), translation)
+            for orig_metric_name, translation in translations.items()
+            if orig_metric_name.startswith("~")
+        ]
+        self._translation_infos: dict[str, TranslationInfo] = {}
+
+    def lookup(self, perfvar_name: str) -> TranslationInfo:
+        if (translation_info := self._translation_infos.get(perfvar_name)) is not None:
+            return translation_info
+
+        translation_entry = self._find(perfvar_name)
+        translation_info = self._translation_infos[perfvar_name] = {
+            "name": translation_entry.get("name", perfvar_name),
+            "scale": translation_entry.get("scale", 1.0),
+            "auto_graph": translation_entry.get("auto_graph", True),
+        }
+        return translation_info
+
+    def _find(self, perfvar_name: str) -> CheckMetricEntry:
+        """Same as find_matching_translation"""
+        if translation := self._translations.get(MetricName_(perfvar_name)):
+            return translation
+        for regex, translation in self._regex_translations:
+            if regex.match(perfvar_name):
+                return translation
+        return {}
+
+
+@lru_cache(maxsize=1024)
+def _compiled_translations(check_command: str | None) -> _CompiledTranslations:
+    return _CompiledTranslations(
+        lookup_metric_translations_for_check_command(check_metrics, check_command) or {}
     )
-    return {
-        "name": translation_entry.get("name", perfvar_name),
-        "scale": translation_entry.get("scale", 1.0),
-        "auto_graph": translation_entry.get("auto_graph", True),
-    }
 
 
 def lookup_metric_translations_for_check_command(
@@ -823,12 +890,28 @@ def _evaluate_rpn(
     expression: MetricExpression,
     translated_metrics: TranslatedMetrics,
 ) -> tuple[float, UnitInfo, str]:
-    # stack of (value, unit, color)
+    return _compile_rpn(expression)(translated_metrics)
+
+
+_CompiledExpression = Callable[[TranslatedMetrics], tuple[Any, UnitInfo, str]]
+
+
+@lru_cache(maxsize=4096)
+def _compile_rpn(expression: MetricExpression) -> _CompiledExpression:
+    """Compile the expression once into closures evaluating it for the metrics of a row"""
+
+    def compile_operator(
+        op: str, op1: _CompiledExpression, op2: _CompiledExpression
+    ) -> _CompiledExpression:
+        operator = rpn_operators[op]
+        return lambda translated_metrics: operator(op1(translated_metrics), op2(translated_metrics))
+
+    # stack of (value, unit, color) functions
     return stack_resolver(
         expression.split(","),
         lambda x: x in rpn_operators,
-        lambda op, a, b: rpn_operators[op](a, b),
-        lambda x: _evaluate_literal(x, translated_metrics),
+        compile_operator,
+        _compile_literal,
     )
 
 
@@ -964,6 +1047,49 @@ def _evaluate_literal(
     return value, unit, color
 
 
+def _compile_literal(expression: str) -> _CompiledExpression:
+    """Same as _evaluate_literal, with the parsing of the expression done once"""
+    varname = drop_metric_consolidation_advice(expression)
+
+    percent = varname.endswith("(%)")
+    if percent:
+        varname = varname[:-3]
+
+    scalarname = None
+    scalar_color = ""
+    if ":" in varname:
+        varname, scalarname = varname.split(":")
+        scalar_color = scalar_colors.get(scalarname, "#808080")
+
+    def evaluate_metric(translated_metrics: TranslatedMetrics) -> tuple[Any, UnitInfo, str]:
+        metric = translated_metrics[varname]
+        if scalarname is None:
+            value = metric["value"]
+            value_color = metric["color"]
+        else:
+            value = metric["scalar"].get(scalarname)
+            value_color = scalar_color
+
+        if percent and value is not None:
+            maxvalue = metric["scalar"]["max"]
+            return (
+                (100.0 * float(value) / maxvalue if maxvalue != 0 else 0.0),
+                unit_info["%"],
+                value_color,
+            )
+        return value, metric["unit"], value_color
+
+    if not (val := _float_or_int(expression)):
+        return evaluate_metric
+
+    def evaluate_number(translated_metrics: TranslatedMetrics) -> tuple[Any, UnitInfo, str]:
+        if expression not in translated_metrics:
+            return float(val), unit_info[""], "#000000"
+        return evaluate_metric(translated_metrics)
+
+    return evaluate_number
+
+
 ExpressionParams = Sequence[Any]
 ExpressionFunc = Callable[[ExpressionParams, RRDData], Sequence[TimeSeries]]
 
@@ -165,6 +165,33 @@ class ConfigVariableNotificationPluginTimeout(ConfigVariable):
         )
 
 
+@config_variable_registry.register
+class ConfigVariableNotificationPluginWorkers(ConfigVariable):
+    def group(self) -> type[ConfigVariableGroup]:
+        return ConfigVariableGroupNotifications
+
+    def domain(self) -> type[ABCConfigDomain]:
+        return ConfigDomainCore
+
+    def ident(self) -> str:
+        return "notification_plugin_workers"
+
+    def valuespec(self) -> ValueSpec:
+        return Integer(
+            title=_("Parallel execution of HTTP based notification plugins"),
+            help=_(
+                "The notification plugins sending their notifications with a single HTTP request "
+                "(e.g. Slack, Microsoft Teams, PagerDuty) can be executed within the notification "
+                "process instead of starting a script for each notification. They are executed "
+                "in a pool of this number of threads and keep their connections to the "
+                "notification service open. Plugins customized in the local hierarchy are "
+                "still executed as scripts. Set this to 0 to execute all plugins as scripts."
+            ),
+            minvalue=0,
+            maxvalue=32,
+        )
+
+
 @config_variable_registry.register
 class ConfigVariableNotificationLogging(ConfigVariable):
     def group(self) -> type[ConfigVariableGroup]:
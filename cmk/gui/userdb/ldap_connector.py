@@ -30,12 +30,15 @@ from __future__ import annotations
 
 import abc
 import copy
+import hashlib
 import logging
 import os
+import pickle
 import shutil
 import sys
 import time
 from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import cast, IO, Literal, Set
@@ -108,18 +111,24 @@ ldap_attr_map = {
     "ad": {
         "user_id": "samaccountname",
         "pw_changed": "pwdlastset",
+        # change tracking
+        "changed": "usnchanged",
     },
     "openldap": {
         "user_id": "uid",
         "pw_changed": "pwdchangedtime",
         # group attributes
         "member": "uniquemember",
+        # change tracking
+        "changed": "modifytimestamp",
     },
     "389directoryserver": {
         "user_id": "uid",
         "pw_changed": "krbPasswordExpiration",
         # group attributes
         "member": "member",
+        # change tracking
+        "changed": "modifytimestamp",
     },
 }
 
@@ -153,6 +162,34 @@ DistinguishedName = str
 SearchResult = list[tuple[DistinguishedName, dict[str, list[str]]]]
 GroupMemberships = dict[DistinguishedName, dict[str, str | list[str]]]
 
+
+@dataclass
+class _SyncState:
+    """State of the incremental synchronization, kept between the synchronizations"""
+
+    # Of the configuration the synchronized users depend on
+    fingerprint: str
+    # The server the change numbers are valid for (Active Directory only)
+    source: str
+    # Lower bound of the change attribute of the objects to search with the next synchronization
+    since: str
+    last_full_sync: float
+    # Change attribute of the user filter group
+    filter_group_mark: str | None
+    users: Users
+    # Objects already found with the change attribute being the lower bound
+    since_seen: frozenset[DistinguishedName] = frozenset()
+    group_cache: dict = field(default_factory=dict)
+    group_search_cache: dict = field(default_factory=dict)
+
+
+def _seen_at_change_mark(
+    state: _SyncState, dn: DistinguishedName, attrs: object, changed_attr: str
+) -> bool:
+    values = cast(Mapping[str, list[str]], attrs).get(changed_attr, [])
+    return bool(values) and values[0] == state.since and dn in state.since_seen
+
+
 # .
 #   .--UserConnector-------------------------------------------------------.
 #   | _   _                ____                            _               |
@@ -872,12 +909,16 @@ class LDAPUserConnector(UserConnector):
             return (dn, user_id)
         return (dn.replace("\\", "\\\\"), user_id)
 
-    def get_users(self, add_filter: str = "") -> Users:
+    def get_users(self, add_filter: str = "", add_columns: Sequence[str] = ()) -> Users:
         user_id_attr = self._user_id_attr()
 
-        columns = [
-            user_id_attr,  # needed in all cases as uniq id
-        ] + self._needed_attributes()
+        columns = (
+            [
+                user_id_attr,  # needed in all cases as uniq id
+            ]
+            + self._needed_attributes()
+            + list(add_columns)
+        )
 
         filt = self._ldap_filter("users")
 
@@ -1283,7 +1324,14 @@ class LDAPUserConnector(UserConnector):
         self._logger.info("SYNC STARTED")
         self._logger.info("  SYNC PLUGINS: %s" % ", ".join(self._config["active_plugins"].keys()))
 
-        ldap_users = self.get_users()
+        # Users not changed since the last synchronization are skipped, None means all users
+        sync_state: _SyncState | None = None
+        users_to_sync: set[LdapUsername] | None = None
+        if only_username is None and "incremental_sync" in self._config:
+            sync_state, users_to_sync = self._prepare_incremental_sync()
+            ldap_users = sync_state.users
+        else:
+            ldap_users = self.get_users()
 
         users = load_users_func(True)  # too lazy to add a protocol for the "lock" kwarg...
 
@@ -1316,6 +1364,9 @@ class LDAPUserConnector(UserConnector):
         profiles_to_synchronize = {}
         all_active_connections: list[str] = [connection[0] for connection in active_connections()]
         for user_id, ldap_user in ldap_users.items():
+            if users_to_sync is not None and user_id not in users_to_sync and user_id in users:
+                continue  # Neither the user nor the groups changed since the last sync
+
             mode_create, user = load_user(user_id)
             user_connection_id = user.get("connector")
 
@@ -1428,8 +1479,185 @@ class LDAPUserConnector(UserConnector):
         else:
             release_users_lock()
 
+        if sync_state is not None:
+            self._save_sync_state(sync_state)
+
         self._set_last_sync_time()
 
+    def _prepare_incremental_sync(self) -> tuple[_SyncState, set[LdapUsername] | None]:
+        """Get the LDAP users, only searching the users changed since the last sync
+
+        The users of the last sync and the resolved group memberships are kept in the sync state.
+        Group changes may affect the memberships of all users, only the users themselves are taken
+        from the sync state in that case. Deleted users and users not matching the user filter
+        anymore can not be found by their changes, they are removed by the periodic full sync.
+        """
+        changed_attr = self._ldap_attr("changed")
+        source, since = self._change_tracking_start()
+        fingerprint = self._sync_state_fingerprint()
+        filter_group_mark = self._filter_group_mark()
+
+        state = self._load_sync_state()
+        if (
+            state is None
+            or not state.since
+            or state.fingerprint != fingerprint
+            or state.source != source
+            or state.filter_group_mark != filter_group_mark
+            or state.last_full_sync + self._config["incremental_sync"]["full_sync_interval"]
+            <= time.time()
+        ):
+            self._logger.info("  FULL SYNC")
+            ldap_users = self.get_users(add_columns=[changed_attr])
+            new_state = _SyncState(
+                fingerprint=fingerprint,
+                source=source,
+                since=since or "",
+                last_full_sync=time.time(),
+                filter_group_mark=filter_group_mark,
+                users=ldap_users,
+            )
+            if since is None:
+                self._update_change_mark(new_state, ldap_users, self._changed_groups(None))
+            return new_state, None
+
+        self._logger.info("  INCREMENTAL SYNC (%s >= %s)" % (changed_attr, state.since))
+        new_state = _SyncState(
+            fingerprint=fingerprint,
+            source=source,
+            since=since or state.since,
+            since_seen=state.since_seen,
+            last_full_sync=state.last_full_sync,
+            filter_group_mark=filter_group_mark,
+            users=state.users,
+        )
+        changed_users = {
+            user_id: ldap_user
+            for user_id, ldap_user in self.get_users(
+                add_filter="(%s>=%s)"
+                % (changed_attr, ldap.filter.escape_filter_chars(state.since)),
+                add_columns=[changed_attr],
+            ).items()
+            if not _seen_at_change_mark(state, ldap_user["dn"], ldap_user, changed_attr)
+        }
+        changed_groups = [
+            (dn, attrs)
+            for dn, attrs in self._changed_groups(state.since)
+            if not _seen_at_change_mark(state, dn, attrs, changed_attr)
+        ]
+        new_state.users = {**state.users, **changed_users}
+        if since is None:
+            self._update_change_mark(new_state, changed_users, changed_groups)
+
+        if changed_groups:
+            self._logger.info("  %d GROUPS CHANGED, SYNCING ALL USERS" % len(changed_groups))
+            return new_state, None
+
+        self._group_cache.update(state.group_cache)
+        self._group_search_cache.update(state.group_search_cache)
+        return new_state, set(changed_users)
+
+    def _change_tracking_start(self) -> tuple[str, str | None]:
+        """The server and the lower bound of the changes made from now on
+
+        Active Directory tracks the changes with update sequence numbers, which are local to each
+        domain controller. The other directories use the modification time of the objects, the
+        lower bound is taken from the objects found instead.
+        """
+        if not self._is_active_directory():
+            return "", None
+        root_dse = self._ldap_search(
+            "", columns=["dsservicename", "highestcommittedusn"], scope="base"
+        )
+        attrs = root_dse[0][1]
+        return attrs["dsservicename"][0], str(int(attrs["highestcommittedusn"][0]) + 1)
+
+    def _update_change_mark(
+        self, state: _SyncState, ldap_users: Users, groups: SearchResult
+    ) -> None:
+        """Move the lower bound to the latest modification time of the objects found
+
+        The modification times only have a resolution of seconds, so the objects of the latest
+        second are searched again by the next sync. They are only taken as changes if they were
+        not found before.
+        """
+        changed_attr = self._ldap_attr("changed")
+        for dn, attrs in [
+            *((ldap_user["dn"], ldap_user) for ldap_user in ldap_users.values()),
+            *groups,
+        ]:
+            if not (values := cast(Mapping[str, list[str]], attrs).get(changed_attr)):
+                continue
+            # Generalized time values of the same format can be compared as strings
+            if values[0] > state.since:
+                state.since, state.since_seen = values[0], frozenset([dn])
+            elif values[0] == state.since:
+                state.since_seen |= {dn}
+
+    def _changed_groups(self, since: str | None) -> SearchResult:
+        """The groups changed since the given lower bound, all groups without one
+
+        Nested groups are searched below the common base DN of the users and groups, like during
+        the resolution of the nested memberships.
+        """
+        if not self.has_group_base_dn_configured():
+            return []
+
+        changed_attr = self._ldap_attr("changed")
+        filt = "(|%s%s)" % (
+            self._ldap_filter("groups"),
+            self._ldap_filter("groups", handle_config=False),
+        )
+        if since is not None:
+            filt = "(&%s(%s>=%s))" % (filt, changed_attr, ldap.filter.escape_filter_chars(since))
+
+        try:
+            base_dn = self._group_and_user_base_dn()
+        except MKLDAPException:
+            base_dn = self.get_group_dn()
+        return self._ldap_search(base_dn, filt, [changed_attr], "sub")
+
+    def _filter_group_mark(self) -> str | None:
+        """The members of the user filter group are not tracked by the changes of the users"""
+        filter_group_dn = self._config.get("user_filter_group")
+        if not filter_group_dn:
+            return None
+
+        changed_attr = self._ldap_attr("changed")
+        group = self._ldap_search(
+            self._replace_macros(filter_group_dn), columns=[changed_attr], scope="base"
+        )
+        return group[0][1].get(changed_attr, [""])[0] if group else ""
+
+    def _sync_state_fingerprint(self) -> str:
+        # The sync plugins also depend on the roles and contact groups
+        return hashlib.sha256(
+            repr(
+                (
+                    self._config,
+                    active_config.default_user_profile,
+                    sorted(load_contact_group_information().items()),
+                )
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def _sync_state_filepath(self) -> Path:
+        return self._ldap_caches_filepath() / ("sync_state.%s" % self.id)
+
+    def _load_sync_state(self) -> _SyncState | None:
+        try:
+            state = store.load_object_from_pickle_file(self._sync_state_filepath(), default=None)
+        except (TypeError, AttributeError, EOFError, pickle.UnpicklingError) as e:
+            self._logger.warning("Unable to read the sync state: %s", e)
+            return None
+        return state if isinstance(state, _SyncState) else None
+
+    def _save_sync_state(self, state: _SyncState) -> None:
+        state.group_cache = self._group_cache
+        state.group_search_cache = self._group_search_cache
+        store.makedirs(self._ldap_caches_filepath())
+        store.save_bytes_to_file(self._sync_state_filepath(), pickle.dumps(state))
+
     def _find_changed_user_keys(self, keys: Set[str], user: Mapping, new_user: Mapping) -> dict:
         changed = {}
         for key in keys:
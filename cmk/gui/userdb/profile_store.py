@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Indexed store of the merged user profiles
+
+The user profiles are merged from contacts.mk, users.mk, the htpasswd file, the auth.serials file
+and several files in the profile directory of each user. Reading all of them takes seconds with
+tens of thousands of users. The merged profiles are kept in a SQLite database instead, one record
+per user. The files stay the primary storage: the database is built from them whenever one of the
+central files has changed, and the writers of the single attribute files update the record of the
+user.
+
+Each change increases the generation of the database. Every process keeps a snapshot of all
+profiles and only reads the records changed since the generation of its snapshot.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import sqlite3
+import uuid
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final
+
+from cmk.utils.user import UserId
+
+from cmk.gui.log import logger as gui_logger
+from cmk.gui.type_defs import Users, UserSpec
+
+logger = gui_logger.getChild("userdb.profile_store")
+
+# Writers wait for a rebuild, which reads all files of all users
+_TIMEOUT: Final = 60.0
+
+_SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    profile BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_generation ON users (generation);
+"""
+
+
+@dataclass
+class _Meta:
+    store_id: str
+    generation: int
+    # Generation of the last rebuild, it may have removed users
+    rebuilt: int
+    sources: str
+
+
+@dataclass
+class _Snapshot:
+    store_id: str = ""
+    generation: int = -1
+    profiles: dict[UserId, bytes] = field(default_factory=dict)
+
+
+class UserProfileStore:
+    """The merged user profiles, built by load_from_files() when the sources have changed"""
+
+    def __init__(
+        self,
+        path: Path,
+        sources: Callable[[], Sequence[Path]],
+        load_from_files: Callable[[], Users],
+    ) -> None:
+        self.path: Final = path
+        self._sources: Final = sources
+        self._load_from_files: Final = load_from_files
+        self._snapshot = _Snapshot()
+
+    def load_users(self) -> Users:
+        """All profiles, the caller may modify them"""
+        try:
+            profiles = self._update_snapshot()
+        except sqlite3.Error as e:
+            logger.warning("Cannot use the user profile store %s: %s", self.path, e)
+            self._discard()
+            return self._load_from_files()
+        return {user_id: pickle.loads(profile) for user_id, profile in profiles.items()}
+
+    def load_user(self, user_id: UserId) -> UserSpec | None:
+        try:
+            with self._connection() as conn:
+                self._ensure_current(conn)
+                row = conn.execute(
+                    "SELECT profile FROM users WHERE user_id = ?", (user_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Cannot use the user profile store %s: %s", self.path, e)
+            self._discard()
+            return self._load_from_files().get(user_id)
+        return None if row is None else pickle.loads(row[0])
+
+    def update_user(self, user_id: UserId, update: Callable[[UserSpec], None]) -> None:
+        """Apply a change of the files of a single user to the record of the user"""
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT profile FROM users WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                if row is None:
+                    # Not built yet or not a user yet, the next rebuild reads the files
+                    conn.rollback()
+                    return
+                profile = pickle.loads(row[0])
+                update(profile)
+                generation = self._read_meta(conn).generation + 1
+                conn.execute(
+                    "UPDATE users SET generation = ?, profile = ? WHERE user_id = ?",
+                    (generation, pickle.dumps(profile), user_id),
+                )
+                self._write_meta(conn, generation=str(generation))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Cannot update the user profile store %s: %s", self.path, e)
+            self._discard()
+
+    def invalidate(self) -> None:
+        """Rebuild from the files on the next access"""
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._write_meta(conn, sources="")
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Cannot invalidate the user profile store %s: %s", self.path, e)
+            self._discard()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        # Transactions are started explicitly
+        with closing(sqlite3.connect(self.path, timeout=_TIMEOUT, isolation_level=None)) as conn:
+            # The database can be rebuilt from the files at any time
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(_SCHEMA)
+            yield conn
+
+    def _discard(self) -> None:
+        self._snapshot = _Snapshot()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.unlink(f"{self.path}{suffix}")
+            except OSError:
+                pass
+
+    def _update_snapshot(self) -> dict[UserId, bytes]:
+        with self._connection() as conn:
+            self._ensure_current(conn)
+            # Reads the meta data and the records of one state of the database
+            conn.execute("BEGIN")
+            meta = self._read_meta(conn)
+            snapshot = self._snapshot
+            if snapshot.store_id != meta.store_id or snapshot.generation < meta.rebuilt:
+                snapshot = _Snapshot(
+                    meta.store_id,
+                    meta.generation,
+                    {
+                        UserId(user_id): profile
+                        for user_id, profile in conn.execute("SELECT user_id, profile FROM users")
+                    },
+                )
+            elif snapshot.generation < meta.generation:
+                snapshot = _Snapshot(meta.store_id, meta.generation, dict(snapshot.profiles))
+                snapshot.profiles.update(
+                    (UserId(user_id), profile)
+                    for user_id, profile in conn.execute(
+                        "SELECT user_id, profile FROM users WHERE generation > ?",
+                        (self._snapshot.generation,),
+                    )
+                )
+            conn.rollback()
+        self._snapshot = snapshot
+        return snapshot.profiles
+
+    def _ensure_current(self, conn: sqlite3.Connection) -> None:
+        if self._read_meta(conn).sources == self._sources_signature():
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            meta = self._read_meta(conn)
+            if meta.sources == (sources := self._sources_signature()):
+                conn.rollback()
+                return  # Rebuilt by another process meanwhile
+
+            # Changes of the files made while loading them are detected by the signature
+            profiles = self._load_from_files()
+            generation = meta.generation + 1
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (user_id, generation, profile) VALUES (?, ?, ?)",
+                (
+                    (user_id, generation, pickle.dumps(profile))
+                    for user_id, profile in profiles.items()
+                ),
+            )
+            self._write_meta(
+                conn,
+                store_id=meta.store_id,
+                generation=str(generation),
+                rebuilt=str(generation),
+                sources=sources,
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _sources_signature(self) -> str:
+        signature = []
+        for path in self._sources():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.append("-")
+                continue
+            signature.append(f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}")
+        return ",".join(signature)
+
+    @staticmethod
+    def _read_meta(conn: sqlite3.Connection) -> _Meta:
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        if "store_id" not in meta:
+            # A new database, identified to tell it from the one of the snapshot
+            meta["store_id"] = uuid.uuid4().hex
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('store_id', ?)", (meta["store_id"],))
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        return _Meta(
+            store_id=meta["store_id"],
+            generation=int(meta.get("generation", 0)),
+            rebuilt=int(meta.get("rebuilt", 0)),
+            sources=meta.get("sources", ""),
+        )
+
+    @staticmethod
+    def _write_meta(conn: sqlite3.Connection, **values: str) -> None:
+        conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", values.items())
@@ -13,7 +13,7 @@ import traceback
 from collections.abc import Callable, Mapping, Sequence
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Literal, TypeVar
+from typing import Any, Final, TypeVar
 
 from six import ensure_str
 
@@ -52,6 +52,7 @@ from cmk.gui.plugins.userdb.utils import (
     UserConnector,
 )
 from cmk.gui.type_defs import SessionInfo, TwoFactorCredentials, Users, UserSpec
+from cmk.gui.userdb.profile_store import UserProfileStore
 from cmk.gui.utils.roles import roles_of_user
 
 T = TypeVar("T")
@@ -73,11 +74,29 @@ def custom_attr_path(userid: UserId, key: str) -> str:
 
 
 def save_custom_attr(userid: UserId, key: str, val: Any) -> None:
+    _save_custom_attr_file(userid, key, val)
+    if (parser := _PROFILE_ATTRIBUTES.get(key)) is not None:
+        _profile_store().update_user(
+            userid, lambda profile: _set_profile_attribute(profile, key, parser, "%s" % val)
+        )
+
+
+def _save_custom_attr_file(userid: UserId, key: str, val: Any) -> None:
     path = custom_attr_path(userid, key)
     mkdir(os.path.dirname(path))
     save_text_to_file(path, "%s\n" % val)
 
 
+def _set_profile_attribute(
+    profile: UserSpec, key: str, parser: Callable[[str], object], text: str
+) -> None:
+    """Like load_users() reads the attribute from its file"""
+    if (text := text.strip()) == "":
+        profile.pop(key, None)  # type: ignore[misc]
+    else:
+        profile[key] = parser(text)  # type: ignore[literal-required]
+
+
 def save_two_factor_credentials(user_id: UserId, credentials: TwoFactorCredentials) -> None:
     save_custom_attr(user_id, "two_factor_credentials", repr(credentials))
 
@@ -94,13 +113,52 @@ def _multisite_dir() -> str:
     return cmk.utils.paths.default_config_dir + "/multisite.d/wato/"
 
 
+def _profile_store_path() -> Path:
+    # Not below the profile directories, which are replicated to the remote sites
+    return Path(cmk.utils.paths.var_dir, "user_profiles.sqlite")
+
+
+def _profile_store_sources() -> list[Path]:
+    """The files of all users, the single attribute files are updated in the store"""
+    htpasswd_path = Path(cmk.utils.paths.htpasswd_file)
+    return [
+        Path(_contacts_filepath()),
+        Path(_multisite_dir() + "users.mk"),
+        htpasswd_path,
+        htpasswd_path.with_name("auth.serials"),
+    ]
+
+
+_profile_stores: dict[Path, UserProfileStore] = {}
+
+
+def _profile_store() -> UserProfileStore:
+    """The store of the current site, kept for the lifetime of the process"""
+    if (path := _profile_store_path()) not in _profile_stores:
+        _profile_stores[path] = UserProfileStore(
+            path, _profile_store_sources, _load_users_from_files
+        )
+    return _profile_stores[path]
+
+
+def invalidate_profile_store() -> None:
+    _profile_store().invalidate()
+
+
+hooks.register_builtin("snapshot-pushed", invalidate_profile_store)
+
+
 @request_memoize()
-def load_users(lock: bool = False) -> Users:  # pylint: disable=too-many-branches
+def load_users(lock: bool = False) -> Users:
     if lock:
         # Note: the lock will be released on next save_users() call or at
         #       end of page request automatically.
         acquire_lock(_contacts_filepath())
 
+    return _profile_store().load_users()
+
+
+def _load_users_from_files() -> Users:  # pylint: disable=too-many-branches
     # First load monitoring contacts from Checkmk's world. If this is
     # the first time, then the file will be empty, which is no problem.
     # Execfile will the simply leave contacts = {} unchanged.
@@ -182,34 +240,6 @@ def load_users(lock: bool = False) -> Users:  # pylint: disable=too-many-branche
     except OSError:  # file not found
         pass
 
-    attributes: list[
-        tuple[
-            # This verbose type is required for accessing `result[uid][attr]` below
-            Literal[
-                "num_failed_logins",
-                "last_pw_change",
-                "enforce_pw_change",
-                "idle_timeout",
-                "session_info",
-                "start_url",
-                "ui_theme",
-                "two_factor_credentials",
-                "ui_sidebar_position",
-            ],
-            Callable,
-        ]
-    ] = [
-        ("num_failed_logins", utils.saveint),
-        ("last_pw_change", utils.saveint),
-        ("enforce_pw_change", lambda x: bool(utils.saveint(x))),
-        ("idle_timeout", convert_idle_timeout),
-        ("session_info", convert_session_info),
-        ("start_url", _convert_start_url),
-        ("ui_theme", lambda x: x),
-        ("two_factor_credentials", ast.literal_eval),
-        ("ui_sidebar_position", lambda x: None if x == "None" else x),
-    ]
-
     # Now read the user specific files
     for user_dir in os.listdir(cmk.utils.paths.profile_dir):
         if user_dir[0] == ".":
@@ -219,10 +249,10 @@ def load_users(lock: bool = False) -> Users:  # pylint: disable=too-many-branche
 
         # read special values from own files
         if uid in result:
-            for attr, conv_func in attributes:
+            for attr, conv_func in _PROFILE_ATTRIBUTES.items():
                 val = load_custom_attr(user_id=uid, key=attr, parser=conv_func)
                 if val is not None:
-                    result[uid][attr] = val
+                    result[uid][attr] = val  # type: ignore[literal-required]
 
         # read automation secrets and add them to existing users or create new users automatically
         try:
@@ -242,6 +272,14 @@ def load_users(lock: bool = False) -> Users:  # pylint: disable=too-many-branche
 
 
 def remove_custom_attr(userid: UserId, key: str) -> None:
+    _remove_custom_attr_file(userid, key)
+    if (parser := _PROFILE_ATTRIBUTES.get(key)) is not None:
+        _profile_store().update_user(
+            userid, lambda profile: _set_profile_attribute(profile, key, parser, "")
+        )
+
+
+def _remove_custom_attr_file(userid: UserId, key: str) -> None:
     try:
         os.unlink(custom_attr_path(userid, key))
     except OSError:
@@ -276,6 +314,8 @@ def save_users(profiles: Users, now: datetime) -> None:
     _save_auth_serials(updated_profiles)
     _save_user_profiles(updated_profiles, now)
     _cleanup_old_user_profiles(updated_profiles)
+    # The single attribute files have been written after the central files
+    invalidate_profile_store()
 
     # Release the lock to make other threads access possible again asap
     # This lock is set by load_users() only in the case something is expected
@@ -330,40 +370,42 @@ def _save_user_profiles(  # pylint: disable=too-many-branches
         # Write out user attributes which are written to dedicated files in the user
         # profile directory. The primary reason to have separate files, is to reduce
         # the amount of data to be loaded during regular page processing
-        save_custom_attr(user_id, "serial", str(user.get("serial", 0)))
-        save_custom_attr(user_id, "num_failed_logins", str(user.get("num_failed_logins", 0)))
-        save_custom_attr(
+        _save_custom_attr_file(user_id, "serial", str(user.get("serial", 0)))
+        _save_custom_attr_file(user_id, "num_failed_logins", str(user.get("num_failed_logins", 0)))
+        _save_custom_attr_file(
             user_id, "enforce_pw_change", str(int(bool(user.get("enforce_pw_change"))))
         )
-        save_custom_attr(
+        _save_custom_attr_file(
             user_id, "last_pw_change", str(user.get("last_pw_change", int(now.timestamp())))
         )
 
         if "idle_timeout" in user:
-            save_custom_attr(user_id, "idle_timeout", user["idle_timeout"])
+            _save_custom_attr_file(user_id, "idle_timeout", user["idle_timeout"])
         else:
-            remove_custom_attr(user_id, "idle_timeout")
+            _remove_custom_attr_file(user_id, "idle_timeout")
 
         if user.get("start_url") is not None:
-            save_custom_attr(user_id, "start_url", repr(user["start_url"]))
+            _save_custom_attr_file(user_id, "start_url", repr(user["start_url"]))
         else:
-            remove_custom_attr(user_id, "start_url")
+            _remove_custom_attr_file(user_id, "start_url")
 
         if user.get("two_factor_credentials") is not None:
-            save_two_factor_credentials(user_id, user["two_factor_credentials"])
+            _save_custom_attr_file(
+                user_id, "two_factor_credentials", repr(user["two_factor_credentials"])
+            )
         else:
-            remove_custom_attr(user_id, "two_factor_credentials")
+            _remove_custom_attr_file(user_id, "two_factor_credentials")
 
         # Is None on first load
         if user.get("ui_theme") is not None:
-            save_custom_attr(user_id, "ui_theme", user["ui_theme"])
+            _save_custom_attr_file(user_id, "ui_theme", user["ui_theme"])
         else:
-            remove_custom_attr(user_id, "ui_theme")
+            _remove_custom_attr_file(user_id, "ui_theme")
 
         if "ui_sidebar_position" in user:
-            save_custom_attr(user_id, "ui_sidebar_position", user["ui_sidebar_position"])
+            _save_custom_attr_file(user_id, "ui_sidebar_position", user["ui_sidebar_position"])
         else:
-            remove_custom_attr(user_id, "ui_sidebar_position")
+            _remove_custom_attr_file(user_id, "ui_sidebar_position")
 
         _save_cached_profile(user_id, user, multisite_keys, non_contact_keys)
 
@@ -605,9 +647,8 @@ def load_user(user_id: UserId) -> UserSpec:
     """
     user = load_cached_profile(user_id)
     if user is None:
-        # No cached profile present. Load all users to get the users data
-        user = load_users(lock=False).get(user_id, {})
-        assert user is not None  # help mypy
+        # No cached profile present. Look up the user in the profile store.
+        user = _profile_store().load_user(user_id) or {}
     return user
 
 
@@ -660,3 +701,17 @@ def convert_session_info(value: str) -> dict[str, SessionInfo]:
             flashes=[],
         ),
     }
+
+
+# The attributes stored in single files of the user profile directory
+_PROFILE_ATTRIBUTES: Final[Mapping[str, Callable[[str], object]]] = {
+    "num_failed_logins": utils.saveint,
+    "last_pw_change": utils.saveint,
+    "enforce_pw_change": lambda x: bool(utils.saveint(x)),
+    "idle_timeout": convert_idle_timeout,
+    "session_info": convert_session_info,
+    "start_url": _convert_start_url,
+    "ui_theme": lambda x: x,
+    "two_factor_credentials": ast.literal_eval,
+    "ui_sidebar_position": lambda x: None if x == "None" else x,
+}
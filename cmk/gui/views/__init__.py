@@ -8,7 +8,9 @@ from typing import Any
 
 import cmk.gui.utils as utils
 import cmk.gui.visuals as visuals
+from cmk.gui.availability_rollups import execute_availability_rollup_job
 from cmk.gui.config import default_authorized_builtin_role_ids
+from cmk.gui.cron import register_job
 from cmk.gui.data_source import data_source_registry, register_data_sources
 from cmk.gui.i18n import _, _u
 from cmk.gui.pages import PageRegistry
@@ -97,6 +99,7 @@ def register(
         register_post_config_load_hook,
     )
     inventory.register(page_registry)
+    register_job(execute_availability_rollup_job)
 
 
 class PermissionSectionViews(PermissionSection):
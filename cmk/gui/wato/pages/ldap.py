@@ -111,7 +111,7 @@ class LDAPConnectionValuespec(MigrateNotUpdated):
                 (_("Users"), [key for key, _vs in user_elements]),
                 (_("Groups"), [key for key, _vs in group_elements]),
                 (_("Attribute Sync Plugins"), ["active_plugins"]),
-                (_("Other"), ["cache_livetime"]),
+                (_("Other"), ["cache_livetime", "incremental_sync"]),
             ],
             render="form",
             form_narrow=True,
@@ -132,6 +132,7 @@ class LDAPConnectionValuespec(MigrateNotUpdated):
                 "group_member",
                 "suffix",
                 "create_only_on_login",
+                "incremental_sync",
             ],
             validate=self._validate_ldap_connection,
         )
@@ -622,6 +623,35 @@ class LDAPConnectionValuespec(MigrateNotUpdated):
                     display=["days", "hours", "minutes"],
                 ),
             ),
+            (
+                "incremental_sync",
+                Dictionary(
+                    title=_("Incremental synchronization"),
+                    help=_(
+                        "By default all users and groups are fetched from the LDAP directory during "
+                        "each synchronization. With this option enabled, only the users and groups "
+                        "which have been changed since the last synchronization are fetched, using "
+                        "the update sequence numbers (Active Directory) or the modification "
+                        "timestamps (other directories) of the objects. The users and the group "
+                        "memberships of the last synchronization are cached by the site.<br><br>"
+                        "Deleted users and users which do not match the user filter anymore can not "
+                        "be detected this way. They are removed during the full synchronizations, "
+                        "which are still done periodically."
+                    ),
+                    elements=[
+                        (
+                            "full_sync_interval",
+                            Age(
+                                title=_("Full synchronization interval"),
+                                minvalue=300,
+                                default_value=86400,
+                                display=["days", "hours", "minutes"],
+                            ),
+                        ),
+                    ],
+                    optional_keys=[],
+                ),
+            ),
         ]
 
         return other_elements
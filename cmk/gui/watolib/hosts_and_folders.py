@@ -10,17 +10,15 @@ import operator
 import os
 import pickle
 import shutil
-import subprocess
 import time
 import uuid
 from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, Sequence
 from contextlib import contextmanager, suppress
 from enum import Enum
+from hashlib import sha256
 from pathlib import Path
 from typing import Any, Final, Literal, NamedTuple, NotRequired, Protocol, TypedDict
 
-from redis.client import Pipeline
-
 from livestatus import SiteId
 
 import cmk.utils.paths
@@ -30,7 +28,6 @@ from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.hostaddress import HostName
 from cmk.utils.labels import Labels
 from cmk.utils.object_diff import make_diff_text
-from cmk.utils.redis import get_redis_client, redis_enabled, redis_server_reachable
 from cmk.utils.regex import regex, WATO_FOLDER_PATH_NAME_CHARS, WATO_FOLDER_PATH_NAME_REGEX
 from cmk.utils.site import omd_site
 from cmk.utils.store.host_storage import (
@@ -123,7 +120,7 @@ class WATOFolderInfo(TypedDict, total=False):
 
 class FolderMetaData:
     """Stores meta information for one Folder.
-    Usually this class is instantiated with data from Redis"""
+    Usually this class is instantiated with data from the folder index"""
 
     def __init__(
         self,
@@ -163,10 +160,10 @@ class FolderMetaData:
     @property
     def num_hosts_recursively(self) -> int:
         if self._num_hosts_recursively is None:
-            if may_use_redis():
-                self._num_hosts_recursively = get_wato_redis_client(
-                    self.tree
-                ).num_hosts_recursively_lua(self._path)
+            if may_use_folder_index():
+                self._num_hosts_recursively = get_folder_index(self.tree).num_hosts_recursively(
+                    self._path
+                )
             else:
                 self._num_hosts_recursively = self.tree.folder(
                     self._path.rstrip("/")
@@ -213,7 +210,7 @@ PermittedGroupsOfFolder = Mapping[PathWithoutSlash, _ContactGroupsInfo]
 
 
 def _get_permitted_groups_of_all_folders(
-    all_folders: Mapping[PathWithoutSlash, Folder]
+    folder_attributes: Mapping[PathWithoutSlash, HostAttributes]
 ) -> PermittedGroupsOfFolder:
     def _compute_tokens(folder_path: PathWithoutSlash) -> tuple[PathWithoutSlash, ...]:
         """Create tokens for each folder. The main folder requires some special treatment
@@ -223,7 +220,7 @@ def _get_permitted_groups_of_all_folders(
         # Some subfolder, prefix root dir
         return tuple([""] + folder_path.split("/"))
 
-    tokenized_folders = sorted(_compute_tokens(x) for x in all_folders.keys())
+    tokenized_folders = sorted(_compute_tokens(x) for x in folder_attributes.keys())
     effective_groups_per_folder: dict[tuple[str, ...], _ContactGroupsInfo] = {}
 
     for tokens in tokenized_folders:
@@ -244,7 +241,7 @@ def _get_permitted_groups_of_all_folders(
 
             parent_tokens = parent_tokens[:-1]
 
-        if contactgroups := all_folders["/".join(tokens[1:])].attributes.get("contactgroups"):
+        if contactgroups := folder_attributes["/".join(tokens[1:])].get("contactgroups"):
             assert isinstance(contactgroups, dict)
             configured_contactgroups = contactgroups.get("groups")
             inherit_groups = contactgroups["recurse_perms"]
@@ -269,66 +266,348 @@ def _get_permitted_groups_of_all_folders(
     }
 
 
-class _WATOFolderScanTimestamps(list):
-    pass
-
-
 class _MoveType(Enum):
     Host = "host"
     Folder = "folder"
 
 
-class _RedisHelper:
-    """
+# (file name, mtime in ns, size) of the .wato and hosts files of a folder
+_FolderSignature = tuple[tuple[str, int, int], ...]
+
+
+class _FolderIndexEntry(NamedTuple):
+    signature: _FolderSignature
+    info: WATOFolderInfo
+    host_names: tuple[HostName, ...]
+
+
+class _FolderIndex:
+    """Persistent index of all Setup folders and the hosts they contain
+
+    The index consists of a file holding the .wato data and the host names of all folders and one
+    file per folder holding its hosts. Each entry is validated against the modification times and
+    sizes of the .wato and hosts files of its folder. Saving a folder or its hosts updates the index
+    right away, within the same lock as writing the files.
+
+    Each request only compares the folder directories with the index. The entry of a folder is
+    validated when its data is used for the first time. Changes to the hosts made outside of the
+    GUI are found by validating all entries once per request when a host is not found where the
+    index expects it. Until then, the host counts and the metadata of the folders may not reflect
+    such changes.
+
     This class
-    - communicates with redis
-    - handles the entire redis cache and checks its integrity
-    - computes the metadata out of Folder instances and stores it in redis
-    - provides functions to compute the number of hosts and fetch the metadata for folders"""
+    - keeps the index in sync with the folders on disk
+    - computes the metadata and the inherited attributes of the folders
+    - provides functions to compute the number of hosts and fetch the metadata for folders
+    - answers host lookups and provides the hosts of the folders"""
+
+    _VERSION: Final = 1
 
     def __init__(self, tree: FolderTree) -> None:
         self.tree = tree
-        self._client = get_redis_client()
-        self._folder_metadata: dict[str, FolderMetaData] = {}
+        self._dir: Final = Path(cmk.utils.paths.var_dir, "wato", "folder_index")
+        self._index_path: Final = self._dir / "folders.pkl"
+        self._folder_metadata: dict[PathWithSlash, FolderMetaData] | None = None
+        self._host_folders: dict[HostName, PathWithoutSlash] | None = None
+        self._inherited_attributes: dict[PathWithoutSlash, HostAttributes] = {}
+        self._validated: set[PathWithoutSlash] = set()
+        self._fully_validated = False
+        self._entries = self._load_entries()
+        if self._entries.keys() != self._scan_folder_paths():
+            self.validate()
+
+    def _host_file_path(self, path: PathWithoutSlash) -> Path:
+        return self._dir / "hosts" / f"{sha256(path.encode('utf-8')).hexdigest()}.pkl"
+
+    def _load_entries(self) -> dict[PathWithoutSlash, _FolderIndexEntry]:
+        try:
+            index = store.load_object_from_pickle_file(self._index_path, default={})
+        except (TypeError, pickle.UnpicklingError) as e:
+            logger.warning("Unable to read the Setup folder index: %s", e)
+            return {}
+        if index.get("version") != self._VERSION or index.get("root") != self.tree.get_root_dir():
+            return {}
+        return index["folders"]
+
+    def _save_entries(self) -> None:
+        store.save_bytes_to_file(
+            self._index_path,
+            pickle.dumps(
+                {
+                    "version": self._VERSION,
+                    "root": self.tree.get_root_dir(),
+                    "folders": self._entries,
+                }
+            ),
+        )
 
-        self._loaded_wato_folders: Mapping[PathWithoutSlash, Folder] | None = None
-        self._folder_paths: tuple[PathWithSlash, ...] | None = None
+    def _entries_changed(self) -> None:
+        self._folder_metadata = None
+        self._host_folders = None
+        self._inherited_attributes = {}
 
-        if self._cache_integrity_ok():
-            return
+    def validate(self) -> bool:
+        """Validate all entries against the files of their folders, at most once per request
+
+        Returns whether entries have been updated."""
+        if self._fully_validated:
+            return False
+        self._fully_validated = True
+
+        with store.locked(self._index_path):
+            # Signatures have to be determined before reading the files, otherwise unobserved
+            # changes can slip through
+            entries = self._load_entries()
+            signatures = self._scan_signatures()
+            self._entries = {}
+            changed = entries.keys() != signatures.keys()
+            for path, signature in signatures.items():
+                if (entry := entries.get(path)) is not None and entry.signature == signature:
+                    self._entries[path] = entry
+                else:
+                    logger.debug("Updating Setup folder index of %r", path)
+                    self._entries[path] = self._read_folder(path, signature)
+                    changed = True
+
+            for path in entries.keys() - signatures.keys():
+                self._host_file_path(path).unlink(missing_ok=True)
+            if changed:
+                self._save_entries()
+
+        self._validated.update(self._entries)
+        self._entries_changed()
+        return changed
+
+    def _scan_folder_paths(self) -> set[PathWithoutSlash]:
+        """The paths of all folders, only the directories are listed"""
+        paths: set[PathWithoutSlash] = set()
+
+        def _scan(path: PathWithoutSlash, dir_path: str) -> None:
+            paths.add(path)
+            try:
+                with os.scandir(dir_path) as entries:
+                    subfolders = [entry.name for entry in entries if entry.is_dir()]
+            except FileNotFoundError:
+                return
+            for name in subfolders:
+                _scan(f"{path}/{name}" if path else name, os.path.join(dir_path, name))
+
+        _scan("", self.tree.get_root_dir())
+        return paths
+
+    def _scan_signatures(self) -> dict[PathWithoutSlash, _FolderSignature]:
+        signatures: dict[PathWithoutSlash, _FolderSignature] = {}
+
+        def _scan(path: PathWithoutSlash, dir_path: str) -> None:
+            files = []
+            subfolders = []
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            subfolders.append(entry.name)
+                        elif entry.name.startswith((".wato", "hosts.")):
+                            stat = entry.stat()
+                            files.append((entry.name, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                pass
+
+            signatures[path] = tuple(sorted(files))
+            for name in subfolders:
+                _scan(f"{path}/{name}" if path else name, os.path.join(dir_path, name))
+
+        _scan("", self.tree.get_root_dir())
+        return signatures
+
+    def _signature(self, path: PathWithoutSlash) -> _FolderSignature:
+        dir_path = _folder_filesystem_path(self.tree.get_root_dir(), path)
+        files = []
+        try:
+            names = os.listdir(dir_path)
+        except FileNotFoundError:
+            return ()
+        for name in names:
+            if name.startswith((".wato", "hosts.")) and os.path.isfile(
+                file_path := os.path.join(dir_path, name)
+            ):
+                stat = os.stat(file_path)
+                files.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(files))
+
+    def _read_folder(
+        self, path: PathWithoutSlash, signature: _FolderSignature
+    ) -> _FolderIndexEntry:
+        filesystem_path = _folder_filesystem_path(self.tree.get_root_dir(), path)
+        info = Folder.wato_info_storage_manager().read(
+            Path(_folder_wato_info_path(filesystem_path))
+        )
+        return self._make_entry(path, signature, info, _load_wato_hosts(filesystem_path + "/hosts"))
+
+    def _make_entry(
+        self,
+        path: PathWithoutSlash,
+        signature: _FolderSignature,
+        info: WATOFolderInfo,
+        wato_hosts: WATOHosts | None,
+    ) -> _FolderIndexEntry:
+        host_file_path = self._host_file_path(path)
+        if wato_hosts is None or not (wato_hosts["host_attributes"] or wato_hosts["locked"]):
+            host_file_path.unlink(missing_ok=True)
+            return _FolderIndexEntry(signature, info, ())
+
+        store.save_bytes_to_file(host_file_path, pickle.dumps(wato_hosts))
+        return _FolderIndexEntry(
+            signature, info, tuple(HostName(h) for h in wato_hosts["host_attributes"])
+        )
+
+    def _update_entry(
+        self,
+        path: PathWithoutSlash,
+        update: Callable[[_FolderIndexEntry | None], _FolderIndexEntry],
+    ) -> None:
+        with store.locked(self._index_path):
+            self._entries = self._load_entries()
+            self._entries[path] = update(self._entries.get(path))
+            self._save_entries()
+        self._validated.add(path)
+        self._entries_changed()
+
+    def _entry(self, path: PathWithoutSlash) -> _FolderIndexEntry | None:
+        if (entry := self._entries.get(path)) is None or path in self._validated:
+            return entry
+
+        self._validated.add(path)
+        if entry.signature != self._signature(path):
+            # Changed outside of the GUI
+            logger.debug("Updating Setup folder index of %r", path)
+            self._update_entry(path, lambda _entry: self._read_folder(path, self._signature(path)))
+        return self._entries.get(path)
+
+    def folder_info(self, path: PathWithoutSlash) -> WATOFolderInfo | None:
+        if (entry := self._entry(path)) is None:
+            return None
+        return entry.info
+
+    def save_folder_info(self, folder: Folder, write: Callable[[], None]) -> None:
+        """Write the .wato file of the folder and update its entry
+
+        The signature is determined within the lock of the index, right after writing."""
+
+        def _update(entry: _FolderIndexEntry | None) -> _FolderIndexEntry:
+            write()
+            signature = self._signature(folder.path())
+            if entry is None:
+                return self._read_folder(folder.path(), signature)
+            return entry._replace(signature=signature, info=folder.serialize())
 
-        # Store the fully loaded Setup folders. Maybe some process needs them later on
-        latest_timestamp, wato_folders = self._get_latest_timestamp_and_folders()
-        self._loaded_wato_folders = wato_folders
-        self._folder_paths = tuple(f"{path}/" for path in self._loaded_wato_folders)
-        self._create_cache_from_scratch(latest_timestamp, self._loaded_wato_folders)
+        self._update_entry(folder.path(), _update)
 
-    def _get_latest_timestamp_and_folders(self) -> tuple[str, Mapping[str, Folder]]:
-        # Timestamp has to be determined first, otherwise unobserved changes can slip through
-        latest_timestamp = self._get_latest_timestamps_from_disk()[-1]
-        wato_folders = _get_fully_loaded_wato_folders(self.tree)
-        return latest_timestamp, wato_folders
+    def save_hosts(self, folder: Folder, write: Callable[[], WATOHosts | None]) -> None:
+        """Write the hosts file of the folder and update its entry
+
+        The signature is determined within the lock of the index, right after writing."""
+
+        def _update(entry: _FolderIndexEntry | None) -> _FolderIndexEntry:
+            wato_hosts = write()
+            signature = self._signature(folder.path())
+            if entry is None:
+                return self._read_folder(folder.path(), signature)
+            return self._make_entry(folder.path(), signature, entry.info, wato_hosts)
+
+        self._update_entry(folder.path(), _update)
+
+    def wato_hosts(self, path: PathWithoutSlash) -> WATOHosts | None:
+        entry = self._entry(path)
+        try:
+            wato_hosts = store.load_object_from_pickle_file(
+                self._host_file_path(path), default=None
+            )
+        except (TypeError, pickle.UnpicklingError) as e:
+            logger.warning(
+                "Unable to read the hosts of %r from the Setup folder index: %s", path, e
+            )
+            wato_hosts = None
+
+        if wato_hosts is None and (entry is None or entry.host_names):
+            # Unknown folder or damaged index: Fall back to the hosts file
+            return _load_wato_hosts(
+                _folder_filesystem_path(self.tree.get_root_dir(), path) + "/hosts"
+            )
+        return wato_hosts
+
+    def host_folder(self, host_name: HostName) -> PathWithoutSlash | None:
+        if self._host_folders is None:
+            self._host_folders = {
+                host_name: path
+                for path, entry in self._entries.items()
+                for host_name in entry.host_names
+            }
+        return self._host_folders.get(host_name)
+
+    def inherited_attributes(self, path: PathWithoutSlash) -> HostAttributes | None:
+        """The attributes the folder inherits from its parents, None for unknown folders
+
+        Computed from the index, without loading the parent folders."""
+        if path in self._inherited_attributes:
+            return self._inherited_attributes[path]
+        if path not in self._entries:
+            return None
+
+        if not path:
+            inherited = HostAttributes()
+        else:
+            parent_path = path.rsplit("/", 1)[0] if "/" in path else ""
+            if (parent_inherited := self.inherited_attributes(parent_path)) is None or (
+                parent_entry := self._entry(parent_path)
+            ) is None:
+                return None
+            inherited = HostAttributes(parent_inherited)
+            inherited.update(parent_entry.info.get("attributes", {}))  # type: ignore[typeddict-item]
+        self._inherited_attributes[path] = inherited
+        return inherited
 
     @property
     def folder_paths(self) -> Sequence[PathWithSlash]:
-        if self._folder_paths is None:
-            self._folder_paths = tuple(self._client.smembers("wato:folder_list"))
-        return self._folder_paths
+        return tuple(f"{path}/" for path in self._entries)
 
     def recursive_subfolders_for_path(self, path: PathWithSlash) -> list[PathWithSlash]:
         return [x for x in self.folder_paths if x.startswith(path)]
 
-    @property
-    def loaded_wato_folders(self) -> Mapping[str, Folder] | None:
-        return self._loaded_wato_folders
+    def _all_metadata(self) -> dict[PathWithSlash, FolderMetaData]:
+        if self._folder_metadata is not None:
+            return self._folder_metadata
 
-    def clear_cached_folders(self) -> None:
-        self._loaded_wato_folders = None
-        self._folder_paths = None
+        folder_groups = _get_permitted_groups_of_all_folders(
+            {
+                path: HostAttributes(entry.info.get("attributes", {}))  # type: ignore[misc]
+                for path, entry in self._entries.items()
+            }
+        )
+
+        def _title(path: PathWithoutSlash) -> str:
+            return self._entries[path].info.get("title", _fallback_title(path))
+
+        self._folder_metadata = {}
+        for path in self._entries:
+            if _is_main_folder_path(path):
+                title_path_without_root = [_title(path)]
+            else:
+                parts = path.split("/")
+                title_path_without_root = [
+                    _title("/".join(parts[: i + 1])) for i in range(len(parts))
+                ]
+            self._folder_metadata[f"{path}/"] = FolderMetaData(
+                self.tree,
+                f"{path}/",
+                _title(path),
+                "/".join(title_path_without_root),
+                sorted(folder_groups[path].actual_groups),
+            )
+        return self._folder_metadata
 
     def choices_for_moving(self, path: PathWithoutSlash, move_type: _MoveType) -> Choices:
-        self._fetch_all_metadata()
-        path_to_title = {x.path: x.title_path_without_root for x in self._folder_metadata.values()}
+        folder_metadata = self._all_metadata()
+        path_to_title = {x.path: x.title_path_without_root for x in folder_metadata.values()}
 
         # Remove self
         del path_to_title[f"{path}/"]
@@ -341,7 +620,7 @@ class _RedisHelper:
 
             # Remove all subfolders (recursively)
             for possible_child_path in list(path_to_title.keys()):
-                if possible_child_path.startswith(path):
+                if possible_child_path.startswith(f"{path}/"):
                     del path_to_title[possible_child_path]
 
         # Check permissions
@@ -350,314 +629,55 @@ class _RedisHelper:
             user_cgs = set(userdb.contactgroups_of_user(user.id))
             # Remove folders without permission
             for check_path in list(path_to_title.keys()):
-                if permitted_groups := self._folder_metadata[check_path].permitted_groups:
+                if permitted_groups := folder_metadata[check_path].permitted_groups:
                     if not user_cgs.intersection(set(permitted_groups)):
                         del path_to_title[check_path]
 
         return [(key.rstrip("/"), value) for key, value in path_to_title.items()]
 
     def folder_metadata(self, path: PathWithoutSlash) -> FolderMetaData | None:
-        path_with_slash = f"{path}/"
-        if path_with_slash not in self._folder_metadata:
-            results = self._client.hmget(
-                f"wato:folders:{path_with_slash}",
-                "title",
-                "title_path_without_root",
-                "permitted_contact_groups",
-            )
-            if not results:
-                return None
+        return self._all_metadata().get(f"{path}/")
 
-            # Redis hmget typing states that the field can be None
-            # It won't happen if the key is found, adding fallbacks anyway.
-            permitted_groups = results[2].split(",") if results[2] is not None else []
-            self._folder_metadata[path_with_slash] = FolderMetaData(
-                self.tree,
-                path_with_slash,
-                results[0] or path_with_slash,
-                results[1] or path_with_slash,
-                permitted_groups,
-            )
-
-        return self._folder_metadata.get(path_with_slash)
-
-    def _fetch_all_metadata(self) -> None:
-        pipeline = self._client.pipeline()
-        all_metadata = self._client.register_script(
-            """
-            local cursor = 0;
-            local values = {}
-            repeat
-                local result = redis.call("SSCAN", "wato:folder_list", cursor, "COUNT", 100000)
-                cursor = tonumber(result[1])
-                local data = result[2]
-                for i=1, #data do
-                    table.insert(values, data[i])
-                    for i, v in ipairs(redis.call("HMGET", "wato:folders:" .. data[i], "title", "title_path_without_root", "permitted_contact_groups")) do
-                        table.insert(values, v)
-                    end
-                end
-            until cursor == 0;
-            return values;
-        """
-        )
-        all_metadata(client=pipeline)
-
-        def pairwise(iterable: Iterable[str]) -> Iterator[tuple[str, str, str, str]]:
-            """s -> (s0,s1,s2,s3), (s4,s5,s6,s7), ..."""
-            a = iter(iterable)
-            return zip(a, a, a, a)
-
-        results = pipeline.execute()
-        for folder_path, title, title_path_without_root, permitted_contact_groups in pairwise(
-            results[0]
-        ):
-            self._folder_metadata[folder_path] = FolderMetaData(
-                self.tree,
-                folder_path,
-                title,
-                title_path_without_root,
-                permitted_contact_groups.split(","),
-            )
-
-    def _create_cache_from_scratch(
-        self,
-        update_timestamp: str,
-        all_folders: Mapping[PathWithSlash, Folder],
-    ) -> None:
-        # Steps:
-        #  1) create a log entry, this shouldn't happen to often, helps to track down other effects
-        #  2) determine the latest timestamp from disk
-        #  3) load folder hierarchy
-        #  3) prepare pipeline
-        #  4) cleanup redis -> pipeline
-        #  5) compute new config -> pipeline
-        #  7) execute pipeline
-        # Note: Locking? Pipeline is an atomic operation
-
-        logger.info("Creating wato folder cache")
-        pipeline = self._client.pipeline()
-        self._add_redis_cleanup_to_pipeline(pipeline)
-        self._add_all_folder_details_to_pipeline(pipeline, all_folders)
-        self._add_last_folder_update_to_pipeline(pipeline, update_timestamp)
-        pipeline.execute()
-
-    def _add_redis_cleanup_to_pipeline(self, pipeline: Pipeline) -> None:
-        delete_keys = self._client.register_script(
-            """
-            local cursor = 0;
-            redis.call("DEL", "wato:folder_list");
-            redis.call("DEL", "wato:folder_list:last_update");
-            repeat
-                local result = redis.call("SCAN", cursor, "MATCH", "wato:folders:*", "COUNT", 100000);
-                cursor = tonumber(result[1]);
-                local data = result[2];
-                for i=1, #data do
-                    redis.call("DEL", data[i]);
-                end
-            until cursor == 0;
-        """
-        )
-        delete_keys(client=pipeline)
-
-    def _add_all_folder_details_to_pipeline(
-        self, pipeline: Pipeline, all_folders: Mapping[PathWithoutSlash, Folder]
-    ) -> None:
-        folder_groups = _get_permitted_groups_of_all_folders(all_folders)
-        folder_list_entries = []
-        for folder_path, folder in all_folders.items():
-            folder_list_entries.append(f"{folder_path}/")
-            self._add_folder_details_to_pipeline(
-                pipeline,
-                folder_path,
-                folder.num_hosts(),
-                folder.title(),
-                "/".join(str(p) for p in folder.title_path_without_root()),
-                folder_groups[folder_path].actual_groups,
-            )
-        pipeline.sadd("wato:folder_list", *folder_list_entries)
-
-    def _add_folder_details_to_pipeline(
-        self,
-        pipeline: Pipeline,
-        path: PathWithoutSlash,
-        num_hosts: int,
-        title: str,
-        title_path_without_root: str,
-        permitted_contact_groups: set[ContactgroupName],
-    ) -> None:
-        folder_key = f"wato:folders:{path}/"
-        mapping: Mapping[str | bytes, str | int] = {
-            "num_hosts": num_hosts,
-            "title": title,
-            "title_path_without_root": title_path_without_root,
-            "permitted_contact_groups": ",".join(permitted_contact_groups),
-        }
-        pipeline.hset(folder_key, mapping=mapping)
-
-    def _add_last_folder_update_to_pipeline(self, pipeline: Pipeline, timestamp: str) -> None:
-        pipeline.set("wato:folder_list:last_update", timestamp)
-
-    def num_hosts_recursively_lua(self, path_with_slash: PathWithSlash) -> int:
+    def num_hosts_recursively(self, path_with_slash: PathWithSlash) -> int:
         """Returns the number of hosts in subfolder, excluding hosts not visible to the current user"""
-        recursive_hosts = self._client.register_script(
-            """
-            local cursor = 0;
-            local values = {}
-            repeat
-                local result = redis.call("SSCAN", "wato:folder_list", cursor, "MATCH", KEYS[1], "COUNT", 100000)
-                cursor = tonumber(result[1])
-                local data = result[2]
-                for i=1, #data do
-                    for i, v in ipairs(redis.call("HMGET", "wato:folders:" .. data[i], ARGV[1], ARGV[2])) do
-                        table.insert(values, v)
-                    end
-                end
-            until cursor == 0;
-            return values;
-        """
-        )
-
-        pipeline = self._client.pipeline()
-        keys = [f"{path_with_slash}*"]
-        args = ["permitted_contact_groups", "num_hosts"]
-        recursive_hosts(keys=keys, args=args, client=pipeline)
-        results = pipeline.execute()
-
-        total_hosts = 0
-        if not results:
-            return total_hosts
+        folder_metadata = self._all_metadata()
+        # The main folder is "/", which is no prefix of its subfolders
+        prefix = path_with_slash.lstrip("/")
+        entries = [
+            (folder_metadata[f"{path}/"].permitted_groups, entry.info.get("num_hosts", 0))
+            for path, entry in self._entries.items()
+            if f"{path}/".startswith(prefix)
+        ]
 
         if (
             user.may("wato.see_all_folders")
             or not active_config.wato_hide_folders_without_read_permissions
         ):
-            return sum(map(int, results[0][1::2]))
-
-        def pairwise(iterable: Iterable[str]) -> Iterator[tuple[str, str]]:
-            """s -> (s0,s1), (s2,s3), (s4, s5), ..."""
-            a = iter(iterable)
-            return zip(a, a)
+            return sum(num_hosts for _groups, num_hosts in entries)
 
         assert user.id is not None
         user_cgs = set(userdb.contactgroups_of_user(user.id))
-        for folder_cgs, num_hosts in pairwise(results[0]):
-            cgs = set(folder_cgs.split(","))
-            if user_cgs.intersection(cgs):
-                total_hosts += int(num_hosts)
-
-        return total_hosts
-
-    def _cache_integrity_ok(self) -> bool:
-        return self._get_latest_timestamps_from_disk()[-1] == self._get_last_update_from_redis()
-
-    def _partial_data_update_possible(self, allowed_timestamps: list[str]) -> bool:
-        """Checks whether a partial update is possible at all
-        It is important that the in memory cache does not deviate from the data on disk.
-        The fasted way to accomplish this (with a sufficient reliability) is to compare
-        the latest changed timestamps from disk with
-         - the latest known timestamp of the cache itself
-         - the allowed timestamps, which reflect the file timestamps of the latest changed
-           host/folder/rule files
-
-        For example. Every time a .wato file is updated, the timestamp of the .wato file and its
-        folder updates. To check whether a partial update is possible
-        - Determine allowed_timestamps (.wato + folder)
-        - Get last_update from redis
-        - Get the latest few timestamps from disk and removed the allowed_timestamps from them
-        - The remaining newest timestamp must be equal or older than the last update from redis
-              If this condition is true, a partial update is possible since there were no
-              unobserved changes, again -> with a sufficient reliability.
-        """
+        return sum(num_hosts for groups, num_hosts in entries if user_cgs.intersection(groups))
 
-        remaining_timestamps = [
-            x for x in self._get_latest_timestamps_from_disk() if x not in allowed_timestamps
-        ]
 
-        if remaining_timestamps and remaining_timestamps[-1] > self._get_last_update_from_redis():
-            return False
-
-        return True
-
-    def _get_allowed_folder_timestamps(self, folder: Folder) -> list[str]:
-        wato_info_path = folder.wato_info_path()
-        return sorted(
-            [
-                self._timestamp_to_fixed_precision_str(os.stat(wato_info_path).st_mtime),
-                self._timestamp_to_fixed_precision_str(
-                    os.stat(os.path.dirname(wato_info_path)).st_mtime
-                ),
-            ]
-        )
-
-    def folder_updated(self, filesystem_path: str) -> None:
-        try:
-            folder_timestamp = self._timestamp_to_fixed_precision_str(
-                os.stat(filesystem_path).st_mtime
-            )
-        except FileNotFoundError:
-            return
+def _load_hosts_file(hosts_file_path_without_extension: str) -> HostsData:
+    variables = get_hosts_file_variables()
+    apply_hosts_file_to_object(
+        Path(hosts_file_path_without_extension),
+        get_host_storage_loaders(active_config.config_storage_format),
+        variables,
+    )
+    return variables
 
-        pipeline = self._client.pipeline()
-        self._add_last_folder_update_to_pipeline(pipeline, folder_timestamp)
-        pipeline.execute()
 
-    def save_folder_info(
-        self,
-        folder: Folder,
-    ) -> None:
-        allowed_timestamps = self._get_allowed_folder_timestamps(folder)
-        if not self._partial_data_update_possible(allowed_timestamps):
-            # Something unexpected was modified in the meantime, rewrite cache
-            self._create_cache_from_scratch(*self._get_latest_timestamp_and_folders())
-
-        pipeline = self._client.pipeline()
-        self._add_folder_details_to_pipeline(
-            pipeline,
-            folder.path(),
-            folder.num_hosts(),
-            folder.title(),
-            "/".join(str(p) for p in folder.title_path_without_root()),
-            folder.groups()[0],
-        )
-        pipeline.sadd("wato:folder_list", f"{folder.path()}/")
-        self._add_last_folder_update_to_pipeline(pipeline, allowed_timestamps[-1])
-        pipeline.execute()
-
-    def _timestamp_to_fixed_precision_str(self, timestamp: float) -> str:
-        return "%.5f" % timestamp
-
-    def _get_latest_timestamps_from_disk(self) -> _WATOFolderScanTimestamps:
-        """Note: We are using the find command from the command line since it is considerable
-        faster than any python implementation. For example 9k files:
-        Path.glob             -> 1.12 seconds
-        os.walk               -> 0.34 seconds
-        find (+spawn process) -> 0.14 seconds
-        """
-        result = subprocess.run(  # nosec
-            f"find {cmk.utils.paths.check_mk_config_dir}/wato -type d -printf '%T@\n' -o -name .wato -printf '%T@\n' | sort -n | tail -6 | uniq",
-            shell=True,
-            capture_output=True,
-            check=True,
-            encoding="utf-8",
-        )
-        try:
-            return _WATOFolderScanTimestamps(
-                self._timestamp_to_fixed_precision_str(float(x))
-                for x in result.stdout.split("\n")
-                if x
-            )
-        except ValueError:
-            fixed_zero = self._timestamp_to_fixed_precision_str(0.0)
-            return _WATOFolderScanTimestamps([fixed_zero] * 3)
-
-    def _get_last_update_from_redis(self) -> str:
-        try:
-            if (value := self._client.get("wato:folder_list:last_update")) is not None:
-                return value
-        except ValueError:
-            pass
-        return self._timestamp_to_fixed_precision_str(0.0)
+def _load_wato_hosts(hosts_file_path_without_extension: str) -> WATOHosts:
+    variables = _load_hosts_file(hosts_file_path_without_extension)
+    return WATOHosts(
+        locked=variables["_lock"],
+        host_attributes=variables["host_attributes"],
+        all_hosts=variables["all_hosts"],
+        clusters=variables["clusters"],
+    )
 
 
 def _get_fully_loaded_wato_folders(tree: FolderTree) -> Mapping[PathWithoutSlash, Folder]:
@@ -882,10 +902,10 @@ def update_metadata(
     return attributes_updated
 
 
-def get_wato_redis_client(tree: FolderTree) -> _RedisHelper:
-    if "wato_redis_client" not in g:
-        g.wato_redis_client = _RedisHelper(tree)
-    return g.wato_redis_client
+def get_folder_index(tree: FolderTree) -> _FolderIndex:
+    if "wato_folder_index" not in g:
+        g.wato_folder_index = _FolderIndex(tree)
+    return g.wato_folder_index
 
 
 class WATOHosts(TypedDict):
@@ -895,44 +915,35 @@ class WATOHosts(TypedDict):
     clusters: dict[HostName, list[HostName]]
 
 
-_REDIS_ENABLED_LOCALLY = True
+_FOLDER_INDEX_ENABLED_LOCALLY = True
 
 
-def may_use_redis() -> bool:
-    # Redis can't be used for certain scenarios. For example
-    # - Redis server is not running during cmk_update_config.py
-    # - Bulk operations which would update redis several thousand times, instead of just once
-    #     There is a special context manager which allows to disable redis handling in this case
-    return redis_enabled() and _REDIS_ENABLED_LOCALLY and _redis_available()
-
-
-@request_memoize()
-def _redis_available() -> bool:
-    return redis_server_reachable(get_redis_client())
+def may_use_folder_index() -> bool:
+    # The folder index can't be used for certain scenarios. For example
+    # - Bulk operations which would update the index several thousand times, instead of just once
+    #     There is a special context manager which allows to disable the index in this case
+    return _FOLDER_INDEX_ENABLED_LOCALLY
 
 
 @contextmanager
-def _disable_redis_locally() -> Iterator[None]:
-    global _REDIS_ENABLED_LOCALLY
-    last_value = _REDIS_ENABLED_LOCALLY
-    _REDIS_ENABLED_LOCALLY = False
+def _disable_folder_index_locally() -> Iterator[None]:
+    global _FOLDER_INDEX_ENABLED_LOCALLY
+    last_value = _FOLDER_INDEX_ENABLED_LOCALLY
+    _FOLDER_INDEX_ENABLED_LOCALLY = False
     try:
         yield
     finally:
-        _REDIS_ENABLED_LOCALLY = last_value
+        _FOLDER_INDEX_ENABLED_LOCALLY = last_value
 
 
 def _wato_folders_factory(tree: FolderTree) -> Mapping[PathWithoutSlash, Folder]:
-    if not may_use_redis():
+    if not may_use_folder_index():
         return _get_fully_loaded_wato_folders(tree)
 
-    wato_redis_client = get_wato_redis_client(tree)
-    if wato_redis_client.loaded_wato_folders is not None:
-        # Folders were already completely loaded during cache generation -> use these
-        return wato_redis_client.loaded_wato_folders
-
     # Provide a dict where the values are generated on demand
-    return WATOFoldersOnDemand(tree, {x.rstrip("/"): None for x in wato_redis_client.folder_paths})
+    return WATOFoldersOnDemand(
+        tree, {x.rstrip("/"): None for x in get_folder_index(tree).folder_paths}
+    )
 
 
 def _generate_domain_settings(
@@ -994,8 +1005,7 @@ class FolderTree:
 
     def invalidate_caches(self) -> None:
         self.root_folder().drop_caches()
-        if may_use_redis():
-            get_wato_redis_client(self).clear_cached_folders()
+        g.pop("wato_folder_index", None)
         g.pop("wato_folders", {})
         for cache_id in ["folder_choices", "folder_choices_full_title"]:
             g.pop(cache_id, None)
@@ -1162,9 +1172,17 @@ class Folder(FolderProtocol):
         parent_folder: Folder | None,
     ) -> Folder:
         folder_path = os.path.join(parent_folder.path(), name) if parent_folder else name
-        serialized = cls.wato_info_storage_manager().read(
-            Path(_folder_wato_info_path(_folder_filesystem_path(tree.get_root_dir(), folder_path)))
-        )
+        if (
+            not may_use_folder_index()
+            or (serialized := get_folder_index(tree).folder_info(folder_path)) is None
+        ):
+            serialized = cls.wato_info_storage_manager().read(
+                Path(
+                    _folder_wato_info_path(
+                        _folder_filesystem_path(tree.get_root_dir(), folder_path)
+                    )
+                )
+            )
 
         return cls(
             tree=tree,
@@ -1280,24 +1298,13 @@ class Folder(FolderProtocol):
         cluster_nodes = wato_hosts["clusters"].get(host_name)
         return Host(self, host_name, wato_hosts["host_attributes"][host_name], cluster_nodes)
 
-    def _load_hosts_file(self) -> HostsData | None:
-        variables = get_hosts_file_variables()
-        apply_hosts_file_to_object(
-            Path(self.hosts_file_path_without_extension()),
-            get_host_storage_loaders(active_config.config_storage_format),
-            variables,
-        )
-        return variables
+    def _load_hosts_file(self) -> HostsData:
+        return _load_hosts_file(self.hosts_file_path_without_extension())
 
     def _load_wato_hosts(self) -> WATOHosts | None:
-        if (variables := self._load_hosts_file()) is None:
-            return None
-        return WATOHosts(
-            locked=variables["_lock"],
-            host_attributes=variables["host_attributes"],
-            all_hosts=variables["all_hosts"],
-            clusters=variables["clusters"],
-        )
+        if may_use_folder_index():
+            return get_folder_index(self.tree).wato_hosts(self.path())
+        return _load_wato_hosts(self.hosts_file_path_without_extension())
 
     def save_hosts(self) -> None:
         self.need_unlocked_hosts()
@@ -1309,20 +1316,20 @@ class Folder(FolderProtocol):
             for host in self._hosts.values():
                 host.drop_caches()
 
-            self._save_hosts_file()
-            if may_use_redis():
-                # Inform redis that the modified-timestamp of the folder has been updated.
-                get_wato_redis_client(self.tree).folder_updated(self.filesystem_path())
+            if may_use_folder_index():
+                get_folder_index(self.tree).save_hosts(self, self._save_hosts_file)
+            else:
+                self._save_hosts_file()
 
         call_hook_hosts_changed(self)
 
-    def _save_hosts_file(self) -> None:  # pylint: disable=too-many-branches
+    def _save_hosts_file(self) -> WATOHosts | None:  # pylint: disable=too-many-branches
         store.makedirs(self.filesystem_path())
         exposed_folder_attributes_for_base = self._folder_attributes_for_base_config()
         if not self.has_hosts() and not exposed_folder_attributes_for_base:
             for storage in get_all_storage_readers():
                 storage.remove(Path(self.hosts_file_path_without_extension()))
-            return
+            return None
 
         all_hosts: list[HostName] = []
         clusters: dict[HostName, Sequence[HostName]] = {}
@@ -1452,6 +1459,13 @@ class Folder(FolderProtocol):
                 get_value_formatter(),
             )
 
+        return WATOHosts(
+            locked=False,
+            host_attributes=cleaned_hosts,
+            all_hosts=all_hosts,
+            clusters={k: list(v) for k, v in clusters.items()},
+        )
+
     def _folder_attributes_for_base_config(self) -> dict[str, FolderAttributesForBase]:
         # TODO:
         # At this time, this is the only attribute there is, at it only exists in the CEE.
@@ -1546,9 +1560,14 @@ class Folder(FolderProtocol):
         """Save the current state of the instance to a file."""
         self.attributes = update_metadata(self.attributes)
         store.makedirs(os.path.dirname(self.wato_info_path()))
-        self.wato_info_storage_manager().write(Path(self.wato_info_path()), self.serialize())
-        if may_use_redis():
-            get_wato_redis_client(self.tree).save_folder_info(self)
+
+        def _write() -> None:
+            self.wato_info_storage_manager().write(Path(self.wato_info_path()), self.serialize())
+
+        if may_use_folder_index():
+            get_folder_index(self.tree).save_folder_info(self, _write)
+        else:
+            _write()
 
     # .-----------------------------------------------------------------------.
     # | ELEMENT ACCESS                                                        |
@@ -1567,7 +1586,7 @@ class Folder(FolderProtocol):
         return self.path()
 
     def path(self) -> str:
-        if may_use_redis() and self._path is not None:
+        if may_use_folder_index() and self._path is not None:
             return self._path
 
         if (parent := self.parent()) and not parent.is_root() and not self.is_root():
@@ -1638,8 +1657,8 @@ class Folder(FolderProtocol):
         return self._num_hosts
 
     def num_hosts_recursively(self) -> int:
-        if may_use_redis():
-            if folder_metadata := get_wato_redis_client(self.tree).folder_metadata(self.path()):
+        if may_use_folder_index():
+            if folder_metadata := get_folder_index(self.tree).folder_metadata(self.path()):
                 return folder_metadata.num_hosts_recursively
             return 0
 
@@ -1780,9 +1799,9 @@ class Folder(FolderProtocol):
     def _choices_for_moving(self, what: str) -> Choices:
         choices: Choices = []
 
-        if may_use_redis():
+        if may_use_folder_index():
             return self._get_sorted_choices(
-                get_wato_redis_client(self.tree).choices_for_moving(self.path(), _MoveType(what))
+                get_folder_index(self.tree).choices_for_moving(self.path(), _MoveType(what))
             )
 
         for folder_path, folder in folder_tree().all_folders().items():
@@ -1861,8 +1880,15 @@ class Folder(FolderProtocol):
 
     def _compute_effective_attributes(self) -> HostAttributes:
         effective = HostAttributes()
-        for folder in parent_folder_chain(self):
-            effective.update(folder.attributes)
+        if (
+            may_use_folder_index()
+            and (inherited := get_folder_index(self.tree).inherited_attributes(self.path()))
+            is not None
+        ):
+            effective.update(inherited)
+        else:
+            for folder in parent_folder_chain(self):
+                effective.update(folder.attributes)
         effective.update(self.attributes)
 
         # now add default values of attributes for all missing values
@@ -2241,10 +2267,9 @@ class Folder(FolderProtocol):
 
         folder_tree().invalidate_caches()
 
-        # Since redis only updates on the next request, we can no longer use it here
-        # We COULD enforce a redis update here, but this would take too much time
-        # After the move action, the request is finished anyway.
-        with _disable_redis_locally():
+        # The folder index still knows the folders at their old location. It revalidates itself
+        # on the next request, after the move action the request is finished anyway.
+        with _disable_folder_index_locally():
             # Reload folder at new location and rewrite host files
             # Again, some special handling because of the missing slash in the main folder
             if not target_folder.is_root():
@@ -2252,8 +2277,7 @@ class Folder(FolderProtocol):
             else:
                 moved_subfolder = folder_tree().folder(subfolder.name())
 
-            # Do not update redis while rewriting a plethora of host files
-            # Redis automatically updates on the next request
+            # Do not update the index while rewriting a plethora of host files
             moved_subfolder.rewrite_hosts_files()  # fixes changed inheritance
 
         affected_sites = list(set(affected_sites + moved_subfolder.all_site_ids()))
@@ -3012,7 +3036,25 @@ class Host:
 
     @staticmethod
     def host(host_name: HostName) -> Host | None:
-        return folder_lookup_cache().get(host_name)
+        if not may_use_folder_index():
+            return folder_lookup_cache().get(host_name)
+
+        tree = folder_tree()
+        if (host := Host._indexed_host(tree, host_name)) is None and get_folder_index(
+            tree
+        ).validate():
+            # The hosts have been changed outside of the GUI
+            tree.invalidate_caches()
+            host = Host._indexed_host(tree, host_name)
+        return host
+
+    @staticmethod
+    def _indexed_host(tree: FolderTree, host_name: HostName) -> Host | None:
+        if (folder_path := get_folder_index(tree).host_folder(host_name)) is None or (
+            folder_path not in tree.all_folders()
+        ):
+            return None
+        return tree.folder(folder_path).host(host_name)
 
     @staticmethod
     def all() -> dict[HostName, Host]:
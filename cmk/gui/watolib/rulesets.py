@@ -50,9 +50,9 @@ from cmk.gui.watolib.hosts_and_folders import (
     Folder,
     folder_from_request,
     folder_tree,
-    get_wato_redis_client,
+    get_folder_index,
     Host,
-    may_use_redis,
+    may_use_folder_index,
 )
 from cmk.gui.watolib.objref import ObjectRef, ObjectRefType
 from cmk.gui.watolib.rulespecs import Rulespec, rulespec_group_registry, rulespec_registry
@@ -409,26 +409,22 @@ class RulesetCollection:
         ]
 
         rules_file_path = folder.rules_file_path()
-        try:
-            # Remove empty rules files. This prevents needless reads
-            if not content:
-                try:
-                    os.unlink(rules_file_path)
-                except FileNotFoundError:
-                    pass
-                return
+        # Remove empty rules files. This prevents needless reads
+        if not content:
+            try:
+                os.unlink(rules_file_path)
+            except FileNotFoundError:
+                pass
+            return
 
-            store.save_mk_file(
-                rules_file_path,
-                # Adding this instead of the full path makes it easy to move config
-                # files around. The real FOLDER_PATH will be added dynamically while
-                # loading the file in cmk.base.config
-                "".join(content).replace("'%s'" % _FOLDER_PATH_MACRO, "'/%s/' % FOLDER_PATH"),
-                add_header=not active_config.wato_use_git,
-            )
-        finally:
-            if may_use_redis():
-                get_wato_redis_client(folder.tree).folder_updated(folder.filesystem_path())
+        store.save_mk_file(
+            rules_file_path,
+            # Adding this instead of the full path makes it easy to move config
+            # files around. The real FOLDER_PATH will be added dynamically while
+            # loading the file in cmk.base.config
+            "".join(content).replace("'%s'" % _FOLDER_PATH_MACRO, "'/%s/' % FOLDER_PATH"),
+            add_header=not active_config.wato_use_git,
+        )
 
     def exists(self, name: RulesetName) -> bool:
         return name in self._rulesets
@@ -448,8 +444,8 @@ class RulesetCollection:
 
 class AllRulesets(RulesetCollection):
     def _load_rulesets_recursively(self, folder: Folder) -> None:
-        if may_use_redis():
-            self._load_rulesets_via_redis(folder)
+        if may_use_folder_index():
+            self._load_rulesets_via_folder_index(folder)
             return
 
         for subfolder in folder.subfolders():
@@ -457,13 +453,13 @@ class AllRulesets(RulesetCollection):
 
         self._load_folder_rulesets(folder)
 
-    def _load_rulesets_via_redis(self, folder: Folder) -> None:
+    def _load_rulesets_via_folder_index(self, folder: Folder) -> None:
         tree = folder_tree()
         # Search relevant folders with rules.mk files
         # Note: The sort order of the folders does not matter here
         #       self._load_folder_rulesets ultimately puts each folder into a dict
         #       and groups/sorts them later on with a different mechanism
-        all_folders = get_wato_redis_client(tree).recursive_subfolders_for_path(
+        all_folders = get_folder_index(tree).recursive_subfolders_for_path(
             f"{folder.path()}/".lstrip("/")
         )
 
@@ -504,8 +500,8 @@ class SingleRulesetRecursively(RulesetCollection):
     def _load_rulesets_recursively(self, folder: Folder, only_varname: RulesetName) -> None:
         # Copy/paste from AllRulesets
 
-        if may_use_redis():
-            self._load_rulesets_via_redis(folder, only_varname)
+        if may_use_folder_index():
+            self._load_rulesets_via_folder_index(folder, only_varname)
             return
 
         for subfolder in folder.subfolders():
@@ -513,7 +509,7 @@ class SingleRulesetRecursively(RulesetCollection):
 
         self._load_folder_rulesets(folder, only_varname)
 
-    def _load_rulesets_via_redis(self, folder: Folder, only_varname: RulesetName) -> None:
+    def _load_rulesets_via_folder_index(self, folder: Folder, only_varname: RulesetName) -> None:
         # Copy/paste from AllRulesets
 
         tree = folder_tree()
@@ -521,7 +517,7 @@ class SingleRulesetRecursively(RulesetCollection):
         # Note: The sort order of the folders does not matter here
         #       self._load_folder_rulesets ultimately puts each folder into a dict
         #       and groups/sorts them later on with a different mechanism
-        all_folders = get_wato_redis_client(tree).recursive_subfolders_for_path(
+        all_folders = get_folder_index(tree).recursive_subfolders_for_path(
             f"{folder.path()}/".lstrip("/")
         )
 
@@ -6,20 +6,23 @@
 import os
 import re
 import sys
+import threading
 from collections.abc import Callable, Iterable
 from email.utils import formataddr
 from http.client import responses as http_responses
 from quopri import encodestring
-from typing import Any, NamedTuple, NoReturn
+from typing import Any, Final, NamedTuple, NoReturn
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 
 import cmk.utils.password_store
 import cmk.utils.paths
 from cmk.utils.escaping import escape, escape_permissive
 from cmk.utils.http_proxy_config import deserialize_http_proxy_config
 from cmk.utils.misc import typeshed_issue_7724
-from cmk.utils.notify import find_wato_folder, NotificationContext
+from cmk.utils.notify import current_in_process_call, find_wato_folder, NotificationContext
 from cmk.utils.notify_types import PluginNotificationContext
 
 from cmk.utils.html import (  # noqa: F401  # pylint: disable=unused-import  # isort:skip
@@ -28,6 +31,8 @@ from cmk.utils.html import (  # noqa: F401  # pylint: disable=unused-import  # i
 
 
 def collect_context() -> PluginNotificationContext:
+    if (call := current_in_process_call()) is not None:
+        return dict(call.context)
     return {var[7:]: value for var, value in os.environ.items() if var.startswith("NOTIFY_")}
 
 
@@ -232,6 +237,28 @@ def retrieve_from_passwordstore(parameter: str) -> str:
     return value
 
 
+# Enough for the largest worker pool of the notification plugins executed in process
+_MAX_CONNECTIONS_PER_ENDPOINT: Final = 32
+
+_sessions: dict[tuple[str, str], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _session(url: str) -> requests.Session:
+    """Persistent session per endpoint
+
+    Plugins executed in process reuse the connections (and TLS handshakes) of earlier
+    notifications to the same endpoint."""
+    parts = urlsplit(url)
+    with _sessions_lock:
+        if (session := _sessions.get(key := (parts.scheme, parts.netloc))) is None:
+            session = _sessions[key] = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=_MAX_CONNECTIONS_PER_ENDPOINT)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        return session
+
+
 def post_request(
     message_constructor: Callable[[dict[str, str]], dict[str, str | object]],
     url: str | None = None,
@@ -251,8 +278,10 @@ def post_request(
     if "PARAMETER_IGNORE_SSL" in context:
         verify = False
 
+    # A subprocess is killed after the plugin timeout, a call in process can only give up
+    call = current_in_process_call()
     try:
-        response = requests.post(  # nosec B113
+        response = _session(url).post(  # nosec B113
             url=url,
             json=message_constructor(context),
             proxies=typeshed_issue_7724(
@@ -260,6 +289,7 @@ def post_request(
             ),
             headers=headers,
             verify=verify,
+            timeout=None if call is None else call.timeout,
         )
     except requests.exceptions.ProxyError:
         sys.stderr.write("Cannot connect to proxy: %s\n" % serialized_proxy_config)
@@ -17,8 +17,10 @@ import itertools
 import json
 import logging
 import sys
-from collections import Counter, defaultdict
+import threading
+from collections import Counter, defaultdict, deque
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum, StrEnum
@@ -349,6 +351,9 @@ class AWSConfig:
 #   '----------------------------------------------------------------------'
 
 
+_MAX_METRIC_DATA_QUERIES = 100
+
+
 def _chunks(list_: Sequence[T], length: int = 100) -> Sequence[Sequence[T]]:
     return [list_[i : i + length] for i in range(0, len(list_), length)]
 
@@ -586,9 +591,11 @@ class ResultDistributor:
         self._colleagues[sender_name].append(colleague)
 
     def distribute(self, sender: "AWSSection", result: "AWSComputedContent") -> None:
-        for colleague in self._colleagues[sender.name]:
-            if colleague.name != sender.name:
-                colleague.receive(sender, result)
+        for colleague in self.colleagues(sender.name):
+            colleague.receive(sender, result)
+
+    def colleagues(self, sender_name: str) -> Sequence["AWSSection"]:
+        return [c for c in self._colleagues.get(sender_name, []) if c.name != sender_name]
 
 
 class ResultDistributorS3Limits(ResultDistributor):
@@ -754,6 +761,10 @@ class AWSSection(DataCache):
     def receive(self, sender: "AWSSection", content: "AWSComputedContent") -> None:
         self._received_results.setdefault(sender.name, content)
 
+    def receivers(self) -> Sequence["AWSSection"]:
+        """The sections this section distributes its results to"""
+        return self._distributor.colleagues(self.name)
+
     def run(self, use_cache: bool = False) -> AWSSectionResults:
         colleague_contents = self._get_colleague_contents()
 
@@ -921,7 +932,116 @@ class AWSSectionLabels(AWSSection):
         assert isinstance(content, dict), "%s: Result content must be of type 'dict'" % self.name
 
 
+@dataclass
+class _MetricDataRequest:
+    results: list[Mapping[str, Any] | None]
+    missing: int
+    error: Exception | None = None
+
+
+_MetricDataKey = tuple[BaseClient, float, float]
+_MetricDataCall = tuple[_MetricDataKey, list[tuple[Metric, _MetricDataRequest, int]]]
+
+
+class MetricDataBatcher:
+    """
+    Packs the GetMetricData queries of concurrently running CloudWatch sections.
+    A single call can include up to 100 queries of the same client and time range.
+    The queries are collected until a call is full or until all running sections
+    wait for their metric data. The waiting sections then send the calls.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting = 0
+        self._closed = False
+        self._pending: dict[_MetricDataKey, list[tuple[Metric, _MetricDataRequest, int]]] = {}
+        self._calls: deque[_MetricDataCall] = deque()
+
+    def tasks_started(self, count: int) -> None:
+        with self._condition:
+            self._running += count
+
+    def tasks_done(self, count: int) -> None:
+        with self._condition:
+            self._running -= count
+            self._schedule_calls()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._schedule_calls()
+
+    def get_metric_data(
+        self, client: BaseClient, queries: Metrics, start_time: float, end_time: float
+    ) -> list[Mapping[str, Any]]:
+        request = _MetricDataRequest([None] * len(queries), len(queries))
+        with self._condition:
+            self._pending.setdefault((client, start_time, end_time), []).extend(
+                (query, request, index) for index, query in enumerate(queries)
+            )
+            self._waiting += 1
+            self._schedule_calls()
+            while request.missing:
+                if not self._calls:
+                    self._condition.wait()
+                    continue
+                call = self._calls.popleft()
+                self._condition.release()
+                try:
+                    self._send(call)
+                finally:
+                    self._condition.acquire()
+
+        if request.error is not None:
+            raise request.error
+        return [result for result in request.results if result is not None]
+
+    def _schedule_calls(self) -> None:
+        flush = self._closed or self._waiting >= self._running
+        for key, pending in list(self._pending.items()):
+            while len(pending) >= _MAX_METRIC_DATA_QUERIES or (pending and flush):
+                self._calls.append((key, pending[:_MAX_METRIC_DATA_QUERIES]))
+                del pending[:_MAX_METRIC_DATA_QUERIES]
+            if not pending:
+                del self._pending[key]
+        if self._calls:
+            self._condition.notify_all()
+
+    def _send(self, call: _MetricDataCall) -> None:
+        (client, start_time, end_time), entries = call
+        error = None
+        results = {}
+        try:
+            # The IDs must only be unique within a single call
+            response = client.get_metric_data(  # type: ignore[attr-defined]
+                MetricDataQueries=[
+                    {**query, "Id": f"q{number}"} for number, (query, _r, _i) in enumerate(entries)
+                ],
+                StartTime=start_time,
+                EndTime=end_time,
+            )
+            results = {result["Id"]: result for result in response.get("MetricDataResults", [])}
+        except Exception as e:
+            error = e
+
+        with self._condition:
+            for number, (query, request, index) in enumerate(entries):
+                if error is not None:
+                    request.error = error
+                elif (result := results.get(f"q{number}")) is not None:
+                    request.results[index] = {**result, "Id": query["Id"]}
+                request.missing -= 1
+                if not request.missing:
+                    self._waiting -= 1
+            self._condition.notify_all()
+
+
 class AWSSectionCloudwatch(AWSSection):
+    # Set when the section runs concurrently with other sections
+    metric_data_batcher: MetricDataBatcher | None = None
+
     def get_live_data(self, *args: AWSColleagueContents) -> Sequence[Mapping[str, object]]:
         (colleague_contents,) = args
         end_time = NOW.timestamp()
@@ -930,11 +1050,23 @@ class AWSSectionCloudwatch(AWSSection):
         if not metric_specs:
             return []
 
+        if self.metric_data_batcher is not None:
+            raw_content = self.metric_data_batcher.get_metric_data(
+                self._client, metric_specs, start_time, end_time
+            )
+        else:
+            raw_content = self._get_metric_data(metric_specs, start_time, end_time)
+
+        self._extend_metrics_by_period(metric_specs, raw_content)
+
+        return raw_content
+
+    def _get_metric_data(self, metric_specs: Metrics, start_time: float, end_time: float) -> list:
         # A single GetMetricData call can include up to 100 MetricDataQuery structures
         # There's no pagination for this operation:
         # self._client.can_paginate('get_metric_data') = False
         raw_content = []
-        for chunk in _chunks(metric_specs):
+        for chunk in _chunks(metric_specs, _MAX_METRIC_DATA_QUERIES):
             if not chunk:
                 continue
             response = self._client.get_metric_data(  # type: ignore[attr-defined]
@@ -947,9 +1079,6 @@ class AWSSectionCloudwatch(AWSSection):
             if not metrics:
                 continue
             raw_content.extend(metrics)
-
-        self._extend_metrics_by_period(metric_specs, raw_content)
-
         return raw_content
 
     @abc.abstractmethod
@@ -6260,6 +6389,7 @@ class AWSSections(abc.ABC):
         self._session = session
         self._debug = debug
         self._sections: list[AWSSection] = []
+        self._section_outcomes: dict[AWSSection, AWSSectionResults | Exception] = {}
         self.config = config
         self.account_id = account_id
 
@@ -6293,27 +6423,41 @@ class AWSSections(abc.ABC):
             logging.info("Invalid region name or client key %s: %s", client_key, e)
             raise
 
+    @property
+    def sections(self) -> Sequence[AWSSection]:
+        return self._sections
+
     def run(self, use_cache: bool = True) -> None:
+        for section in self._sections:
+            self.run_section(section, use_cache=use_cache)
+        self.write_results()
+
+    def run_section(self, section: AWSSection, use_cache: bool = True) -> None:
+        try:
+            self._section_outcomes[section] = section.run(use_cache=use_cache)
+        except AssertionError as e:
+            logging.info(e)
+            if self._debug:
+                raise
+        except Exception as e:
+            logging.info("%s: %s", section.__class__.__name__, e)
+            if self._debug:
+                raise
+            self._section_outcomes[section] = e
+
+    def write_results(self) -> None:
         exceptions = []
         results: Results = {}
 
         for section in self._sections:
-            try:
-                section_result = section.run(use_cache=use_cache)
-            except AssertionError as e:
-                logging.info(e)
-                if self._debug:
-                    raise
-            except Exception as e:
-                logging.info("%s: %s", section.__class__.__name__, e)
-                if self._debug:
-                    raise
-                exceptions.append(e)
-            else:
+            outcome = self._section_outcomes.get(section)
+            if isinstance(outcome, AWSSectionResults):
                 results.setdefault(
-                    (section.name, section_result.cache_timestamp, section.cache_interval),
-                    section_result.results,
+                    (section.name, outcome.cache_timestamp, section.cache_interval),
+                    outcome.results,
                 )
+            elif outcome is not None:
+                exceptions.append(outcome)
 
         self._write_exceptions(exceptions)
         self._write_host_labels(results)
@@ -6408,6 +6552,57 @@ class AWSSections(abc.ABC):
                 sys.stdout.write("<<<<>>>>\n")
 
 
+def run_sections_concurrently(
+    aws_sections: Sequence[AWSSections], use_cache: bool, threads: int
+) -> None:
+    """
+    Run the sections of several regions on a bounded thread pool. A section is
+    started as soon as the sections it receives results from are finished,
+    the sections run one after another would have received the same results.
+    The results are written afterwards with AWSSections.write_results.
+    """
+    owners = {section: sections for sections in aws_sections for section in sections.sections}
+    order = {section: number for number, section in enumerate(owners)}
+    senders: dict[AWSSection, set[AWSSection]] = {section: set() for section in owners}
+    receivers: dict[AWSSection, list[AWSSection]] = {section: [] for section in owners}
+    for section in owners:
+        for receiver in section.receivers():
+            if order.get(receiver, -1) > order[section]:
+                senders[receiver].add(section)
+                receivers[section].append(receiver)
+
+    batcher = MetricDataBatcher()
+    for section in owners:
+        if isinstance(section, AWSSectionCloudwatch):
+            section.metric_data_batcher = batcher
+
+    ready = deque(section for section in owners if not senders[section])
+    running: dict[Future[None], AWSSection] = {}
+    done: set[Future[None]] = set()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        try:
+            while ready or running:
+                started = [ready.popleft() for _ in range(min(len(ready), threads - len(running)))]
+                # The finished sections are counted out after the started ones are counted in,
+                # otherwise the queries of the started sections may miss a batch.
+                batcher.tasks_started(len(started))
+                batcher.tasks_done(len(done))
+                for section in started:
+                    future = executor.submit(owners[section].run_section, section, use_cache)
+                    running[future] = section
+
+                done, _not_done = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    section = running.pop(future)
+                    future.result()
+                    for receiver in receivers[section]:
+                        senders[receiver].discard(section)
+                        if not senders[receiver]:
+                            ready.append(receiver)
+        finally:
+            batcher.close()
+
+
 class AWSSectionsUSEast(AWSSections):
     """
     Some clients like CostExplorer only work with US East region:
@@ -6984,6 +7179,13 @@ def parse_arguments(argv: Sequence[str] | None) -> Args:
         action="store_true",
         help="Execute all sections, do not rely on cached data. Cached data will not be overwritten.",
     )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="Number of threads querying the sections of all regions concurrently. With the "
+        "default of 1 the sections are queried one after another.",
+    )
     parser.add_argument(
         "--access-key-id",
         required=True,
@@ -7223,6 +7425,19 @@ def _get_proxy(args: argparse.Namespace) -> botocore.config.Config | None:
     )
 
 
+def _get_client_config(args: Args) -> botocore.config.Config | None:
+    config = _get_proxy(args)
+    if args.threads <= 1:
+        return config
+    # The adaptive retry mode backs off on throttling errors and limits the request
+    # rate of each client, i.e. of each API per region.
+    concurrent_config = botocore.config.Config(
+        retries={"mode": "adaptive", "max_attempts": 10},
+        max_pool_connections=max(10, args.threads),
+    )
+    return concurrent_config if config is None else config.merge(concurrent_config)
+
+
 def _configure_aws(args: Args, sys_argv: Sequence[str]) -> AWSConfig:
     aws_config = AWSConfig(
         args.hostname,
@@ -7310,7 +7525,7 @@ def main(sys_argv: Sequence[str] | None = None) -> int:  # pylint: disable=too-m
     _setup_logging(args.debug, args.verbose)
 
     hostname = args.hostname
-    proxy_config = _get_proxy(args)
+    client_config = _get_client_config(args)
 
     aws_config = _configure_aws(args, sys_argv)
 
@@ -7346,6 +7561,7 @@ def main(sys_argv: Sequence[str] | None = None) -> int:  # pylint: disable=too-m
             raise
         return 1
 
+    concurrent_sections: list[AWSSections] = []
     for aws_services, aws_regions, aws_sections in [
         (global_services, [GLOBAL_SERVICE_REGION], AWSSectionsUSEast),
         (regional_services, args.regions, AWSSectionsGeneric),
@@ -7357,9 +7573,12 @@ def main(sys_argv: Sequence[str] | None = None) -> int:  # pylint: disable=too-m
             try:
                 session = _create_session_from_args(args, region)
                 sections = aws_sections(
-                    hostname, session, account_id, debug=args.debug, config=proxy_config
+                    hostname, session, account_id, debug=args.debug, config=client_config
                 )
                 sections.init_sections(aws_services, region, aws_config, s3_limits_distributor)
+                if args.threads > 1:
+                    concurrent_sections.append(sections)
+                    continue
                 sections.run(use_cache=use_cache)
             except AwsAccessError as ae:
                 # can not access AWS, retreat
@@ -7374,6 +7593,21 @@ def main(sys_argv: Sequence[str] | None = None) -> int:  # pylint: disable=too-m
                 has_exceptions = True
                 if args.debug:
                     raise
+
+    if concurrent_sections:
+        try:
+            run_sections_concurrently(concurrent_sections, use_cache, args.threads)
+            for sections in concurrent_sections:
+                sections.write_results()
+        except AssertionError:
+            if args.debug:
+                raise
+        except Exception as e:
+            logging.info(e)
+            has_exceptions = True
+            if args.debug:
+                raise
+
     if has_exceptions:
         return 1
     return 0
@@ -36,7 +36,7 @@ import cmk.utils.paths
 import cmk.utils.profile
 
 from cmk.special_agents.utils import vcrtrace
-from cmk.special_agents.utils.agent_common import ConditionalPiggybackSection, SectionWriter
+from cmk.special_agents.utils.agent_common import ConditionalPiggybackFrame, SectionWriter
 from cmk.special_agents.utils_kubernetes import common, performance, prometheus_section, query
 from cmk.special_agents.utils_kubernetes.agent_handlers import (
     cluster_handler,
@@ -82,8 +82,11 @@ from cmk.special_agents.utils_kubernetes.common import (
     PodsToHost,
     RawMetrics,
 )
+from cmk.special_agents.utils_kubernetes.list_cache import ListCache
 from cmk.special_agents.utils_kubernetes.schemata import api, section
 
+AGENT_TMP_PATH = cmk.utils.paths.tmp_dir / "agents" / "agent_kube"
+
 
 class MonitoredObject(enum.Enum):
     deployments = "deployments"
@@ -276,6 +279,12 @@ def parse_arguments(args: list[str]) -> argparse.Namespace:
         help="Verify certificate for the endpoint specified by --prometheus-endpoint or "
         "--cluster-collector-endpoint.",
     )
+    p.add_argument(
+        "--cache-api-lists",
+        action="store_true",
+        help="Keep the lists of the Kubernetes API in a cache and only fetch the changes since the "
+        "last run. This reduces the load on the API server of large clusters.",
+    )
     arguments = p.parse_args(args)
     return arguments
 
@@ -382,14 +391,30 @@ class ComposedEntities:
 # Pod specific helpers
 
 
-def filter_pods_by_namespace(
-    pods: Sequence[api.Pod], api_namespace: api.NamespaceName
-) -> Sequence[api.Pod]:
-    return [pod for pod in pods if kube_object_namespace_name(pod) == api_namespace]
+class PodIndex:
+    """Lookups of the pods of the objects, instead of scanning all pods for each object
 
+    The pods are returned in the order of the API data.
+    """
 
-def filter_pods_by_cron_job(pods: Sequence[api.Pod], cron_job: api.CronJob) -> Sequence[api.Pod]:
-    return [pod for pod in pods if pod.uid in cron_job.pod_uids]
+    def __init__(self, pods: Sequence[api.Pod]) -> None:
+        self._position = {pod.uid: position for position, pod in enumerate(pods)}
+        self._by_uid = {pod.uid: pod for pod in pods}
+        self._by_namespace: dict[api.NamespaceName, list[api.Pod]] = defaultdict(list)
+        for pod in pods:
+            self._by_namespace[kube_object_namespace_name(pod)].append(pod)
+
+    def of_namespace(self, api_namespace: api.NamespaceName) -> Sequence[api.Pod]:
+        return self._by_namespace.get(api_namespace, [])
+
+    def of_cron_job(self, cron_job: api.CronJob) -> Sequence[api.Pod]:
+        return [
+            self._by_uid[uid]
+            for uid in sorted(
+                {uid for uid in cron_job.pod_uids if uid in self._by_uid},
+                key=self._position.__getitem__,
+            )
+        ]
 
 
 def filter_pods_by_phase(pods: Iterable[api.Pod], phase: api.Phase) -> Sequence[api.Pod]:
@@ -415,7 +440,7 @@ def write_machine_sections(
     # make sure we only print sections for nodes currently visible via Kubernetes api:
     for api_node in composed_entities.nodes:
         if sections := machine_sections.get(str(api_node.metadata.name)):
-            with ConditionalPiggybackSection(piggyback_formatter(api_node)):
+            with ConditionalPiggybackFrame(piggyback_formatter(api_node)):
                 sys.stdout.write(sections)
 
 
@@ -568,10 +593,11 @@ def determine_pods_to_host(
 ) -> PodsToHost:
     piggybacks: list[Piggyback] = []
     namespace_piggies = []
+    pod_index = PodIndex(api_pods)
     if MonitoredObject.namespaces in monitored_objects:
         for api_namespace in monitored_api_namespaces:
             namespace_api_pods = filter_pods_by_phase(
-                filter_pods_by_namespace(api_pods, namespace_name(api_namespace)),
+                pod_index.of_namespace(namespace_name(api_namespace)),
                 api.Phase.RUNNING,
             )
             resource_quota = namespace_handler.filter_matching_namespace_resource_quota(
@@ -665,7 +691,7 @@ def determine_pods_to_host(
                 pod_names=[
                     pod_lookup_from_api_pod(pod)
                     for pod in filter_pods_by_phase(
-                        filter_pods_by_cron_job(api_pods, k),
+                        pod_index.of_cron_job(k),
                         api.Phase.RUNNING,
                     )
                 ],
@@ -826,12 +852,18 @@ def main(args: list[str] | None = None) -> int:  # pylint: disable=too-many-bran
             enabled=bool(arguments.profile), profile_file=arguments.profile
         ):
             client_config = query.parse_api_session_config(arguments)
+            list_cache = ListCache(
+                AGENT_TMP_PATH / f"{arguments.cluster}.lists.json"
+                if arguments.cache_api_lists
+                else None
+            )
             LOGGER.info("Collecting API data")
             try:
                 api_data = from_kubernetes(
                     client_config,
                     LOGGER,
                     query_kubelet_endpoints=MonitoredObject.pvcs in arguments.monitored_objects,
+                    list_cache=list_cache,
                 )
             except urllib3.exceptions.MaxRetryError as e:
                 raise ClusterConnectionError(
@@ -842,12 +874,14 @@ def main(args: list[str] | None = None) -> int:  # pylint: disable=too-many-bran
                 raise ClusterConnectionError(
                     f"Failed to establish a connection at URL {e.request.url} "
                 ) from e
+            list_cache.save()
 
             # Namespaces are handled independently from the cluster object in order to improve
             # testability. The long term goal is to remove all objects from the cluster object
             composed_entities = ComposedEntities.from_api_resources(
                 excluded_node_roles=arguments.roles or [], api_data=api_data
             )
+            pod_index = PodIndex(api_data.pods)
 
             # Sections based on API server data
             LOGGER.info("Write cluster sections based on API data")
@@ -937,9 +971,7 @@ def main(args: list[str] | None = None) -> int:  # pylint: disable=too-many-bran
                 LOGGER.info("Write namespaces sections based on API data")
                 for api_namespace in monitored_api_namespaces:
                     namespace_piggyback_name = piggyback_formatter(api_namespace)
-                    api_pods_from_namespace = filter_pods_by_namespace(
-                        api_data.pods, namespace_name(api_namespace)
-                    )
+                    api_pods_from_namespace = pod_index.of_namespace(namespace_name(api_namespace))
                     namespace_sections = namespace_handler.create_namespace_api_sections(
                         api_namespace,
                         api_pods_from_namespace,
@@ -1018,8 +1050,7 @@ def main(args: list[str] | None = None) -> int:  # pylint: disable=too-many-bran
             api_cron_job_pods = [
                 api_pod
                 for cron_job in api_data.cron_jobs
-                for api_pod in api_data.pods
-                if api_pod.uid in cron_job.pod_uids
+                for api_pod in pod_index.of_cron_job(cron_job)
             ]
             if MonitoredObject.cronjobs in arguments.monitored_objects:
                 api_jobs = {job.uid: job for job in api_data.jobs}
@@ -1028,7 +1059,7 @@ def main(args: list[str] | None = None) -> int:  # pylint: disable=too-many-bran
                 ):
                     sections = cronjob_handler.create_api_sections(
                         api_cron_job,
-                        filter_pods_by_cron_job(api_cron_job_pods, api_cron_job),
+                        pod_index.of_cron_job(api_cron_job),
                         sorted(
                             [api_jobs[uid] for uid in api_cron_job.job_uids],
                             key=lambda job: job.metadata.creation_timestamp,
@@ -12,12 +12,10 @@ import socket
 import sys
 import time
 from collections import Counter
-from collections.abc import Sequence
-from typing import Any
-from xml.dom import minidom
-
-# TODO: minicompat include internal impl details. But NodeList is only defined there for <3.11
-from xml.dom.minicompat import NodeList
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+from xml.etree import ElementTree
 
 import dateutil.parser
 import requests
@@ -44,6 +42,18 @@ USER_AGENT = f"checkmk-special-vsphere-{__version__}"
 
 AGENT_TMP_PATH = cmk.utils.paths.tmp_dir / "agents/agent_vsphere"
 
+# The responses are read and parsed in chunks of this size
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# The performance counters of this many host systems are queried with one request
+PERF_QUERY_HOSTS = 16
+
+# Number of concurrent requests for the performance counters
+MAX_CONCURRENT_QUERIES = 4
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 REQUESTED_COUNTERS_KEYS = (
     "disk.numberReadAveraged",
     "disk.numberWriteAveraged",
@@ -284,13 +294,15 @@ class SoapTemplates:
     )
     PERFCOUNTERDATA = (
         '<ns1:QueryPerf xsi:type="ns1:QueryPerfRequestType">'
-        '  <ns1:_this type="PerformanceManager">%(perfManager)s</ns1:_this>'
+        '  <ns1:_this type="PerformanceManager">%(perfManager)s</ns1:_this>%%(query_specs)s'
+        '</ns1:QueryPerf>'
+    )
+    PERFQUERYSPEC = (
         '  <ns1:querySpec>'
-        '    <ns1:entity type="HostSystem">%%(esxhost)s</ns1:entity>'
-        '    <ns1:maxSample>%%(samples)s</ns1:maxSample>%%(counters)s'
+        '    <ns1:entity type="HostSystem">%(esxhost)s</ns1:entity>'
+        '    <ns1:maxSample>%(samples)s</ns1:maxSample>%(counters)s'
         '    <ns1:intervalId>20</ns1:intervalId>'
         '  </ns1:querySpec>'
-        '</ns1:QueryPerf>'
     )
     NETWORKSYSTEM = (
         '<ns1:RetrievePropertiesEx xsi:type="ns1:RetrievePropertiesExRequestType">'
@@ -1092,11 +1104,11 @@ class ESXSession(requests.Session):
             }
         )
 
-    def postsoap(self, request):
+    def postsoap(self, request, stream=False):
         soapdata = ESXSession.ENVELOPE % request
         # Watch out: we must provide the verify keyword to every individual request call!
         # Else it will be overwritten by the REQUESTS_CA_BUNDLE env variable
-        return super().post(self._post_url, data=soapdata, verify=self.verify)
+        return super().post(self._post_url, data=soapdata, verify=self.verify, stream=stream)
 
 
 class ESXConnection:
@@ -1171,23 +1183,39 @@ class ESXConnection:
         return system_info
 
     def query_server(self, method, **kwargs):
+        return "".join(self.iter_query_server(method, **kwargs))
+
+    def iter_query_server(self, method: str, **kwargs: object) -> Iterator[str]:
+        """Yield the text of the responses in chunks, while they are received"""
         payload = getattr(self._soap_templates, method) % kwargs
 
-        response_data = []
         while True:
-            response = self._session.postsoap(payload)
-            response_data.append(response.text)
-            self._check_not_authenticated(response_data[-1][:512])
+            response = self._session.postsoap(payload, stream=True)
+            if response.encoding is None:
+                response.encoding = "utf-8"
+            chunks = response.iter_content(RESPONSE_CHUNK_SIZE, decode_unicode=True)
+
+            head_chunks = []
+            head = ""
+            for chunk in chunks:
+                head_chunks.append(chunk)
+                head += chunk
+                if len(head) >= 512:
+                    break
+            head = head[:512]
+            self._check_not_authenticated(head)
+
+            yield from head_chunks
+            yield from chunks
+
             # Look for a <token>0</token> field.
             # If it exists not all data was transmitted and we need to start a
             # ContinueRetrievePropertiesExResponse query...
-            token = re.findall("<token>(.*)</token>", response_data[-1][:512])
+            token = re.findall("<token>(.*)</token>", head)
             if not token:
                 break
             payload = self._soap_templates.continuetoken % {"token": token[0]}
 
-        return "".join(response_data)
-
     @property
     def perf_samples(self):
         """Return and cache the needed number of real-time samples
@@ -1251,21 +1279,29 @@ class ESXConnection:
 #   '----------------------------------------------------------------------'
 
 
+def query_concurrently(function: Callable[[T], R], arguments: Iterable[T]) -> list[R]:
+    """Call the function for all arguments with a bounded number of concurrent requests"""
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_QUERIES) as executor:
+        return list(executor.map(function, arguments))
+
+
 def fetch_available_counters(  # type: ignore[no-untyped-def]
     connection, hostsystems
 ) -> dict[str, dict[str, list[str]]]:
-    counters_available_by_host: dict[str, dict[str, list[str]]] = {}
-    for host in hostsystems:
+    # The available counters can only be queried for a single entity per request
+    def fetch(host: str) -> dict[str, list[str]]:
         counter_avail_response = connection.query_server("perfcounteravail", esxhost=host)
         elements = get_pattern(
             "<counterId>([0-9]*)</counterId><instance>([^<]*)", counter_avail_response
         )
 
-        data = counters_available_by_host.setdefault(host, {})
+        data: dict[str, list[str]] = {}
         for counter, instance in elements:
             data.setdefault(counter, []).append(instance)
+        return data
 
-    return counters_available_by_host
+    hosts = list(hostsystems)
+    return dict(zip(hosts, query_concurrently(fetch, hosts)))
 
 
 def fetch_counters_syntax(connection, counter_ids):
@@ -1311,22 +1347,46 @@ def fetch_extra_interface_counters(connection, opt):
     return net_extra_info
 
 
-def fetch_counters(connection, host, counters_selected):
-    counter_data: list[str] = []
-    for entry, instances in counters_selected:
-        counter_data.extend(
-            "<ns1:metricId><ns1:counterId>%s</ns1:counterId><ns1:instance>%s</ns1:instance>"
-            "</ns1:metricId>" % (entry, instance)
-            for instance in instances
+def fetch_counters(connection, counters_selected_by_host):
+    """Fetch the values of the selected counters of several hosts
+
+    The values of the hosts are queried in batches, one query specification per host.
+    """
+    samples = connection.perf_samples
+
+    def fetch(hosts: Sequence[str]) -> dict[str, list[tuple[str, str, list[str]]]]:
+        query_specs = []
+        for host in hosts:
+            counter_data: list[str] = []
+            for entry, instances in counters_selected_by_host[host]:
+                counter_data.extend(
+                    "<ns1:metricId><ns1:counterId>%s</ns1:counterId>"
+                    "<ns1:instance>%s</ns1:instance></ns1:metricId>" % (entry, instance)
+                    for instance in instances
+                )
+            query_specs.append(
+                SoapTemplates.PERFQUERYSPEC
+                % {"esxhost": host, "samples": samples, "counters": "".join(counter_data)}
+            )
+
+        response_chunks = connection.iter_query_server(
+            "perfcounterdata", query_specs="".join(query_specs)
         )
+        counters_value_by_host: dict[str, list[tuple[str, str, list[str]]]] = {}
+        for entity_metric in iter_elements(response_chunks, "returnval"):
+            entity = get_pattern("<entity[^>]*>(.*?)</entity>", entity_metric[:512])
+            if entity:
+                counters_value_by_host[entity[0]] = parse_counters_values(entity_metric, samples)
+        return counters_value_by_host
+
+    hosts = list(counters_selected_by_host)
+    counters_value_by_host = {}
+    for fetched in query_concurrently(fetch, _chunks(hosts, PERF_QUERY_HOSTS)):
+        counters_value_by_host.update(fetched)
+    return counters_value_by_host
 
-    response_text = connection.query_server(
-        "perfcounterdata",
-        esxhost=host,
-        counters="".join(counter_data),
-        samples=connection.perf_samples,
-    )
 
+def parse_counters_values(entity_metric: str, samples: int) -> list[tuple[str, str, list[str]]]:
     # Python regex only supports up to 100 match groups in a regex..
     # We are only extracting the whole value line and split it later on
     # This is a perfect candidate for "Catastrophic Backtracking" :)
@@ -1334,8 +1394,8 @@ def fetch_counters(connection, host, counters_selected):
     # one of these new and fancy xml parsers I've heard from
     elements = get_pattern(
         "<id><counterId>(.*?)</counterId><instance>(.*?)</instance></id>(%s)"
-        % ("<value>.*?</value>" * connection.perf_samples),
-        response_text,
+        % ("<value>.*?</value>" * samples),
+        entity_metric,
     )
     counters_value = []
     for entry in elements:
@@ -1358,19 +1418,21 @@ def get_section_counters(connection, hostsystems, datastores, opt):
     net_extra_info = fetch_extra_interface_counters(connection, opt)
     counters_description = fetch_counters_syntax(connection, counters_available_all)
 
-    for host in hostsystems:
-        counters_avail = counters_available_by_host[host]
-
-        counters_selected = [
-            (id_, instances)
-            for id_, instances in counters_avail.items()
-            if counters_description.get(id_, {}).get("key") in REQUESTED_COUNTERS_KEYS
-        ]
-
-        counters_value = fetch_counters(connection, host, counters_selected)
+    counters_value_by_host = fetch_counters(
+        connection,
+        {
+            host: [
+                (id_, instances)
+                for id_, instances in counters_available_by_host[host].items()
+                if counters_description.get(id_, {}).get("key") in REQUESTED_COUNTERS_KEYS
+            ]
+            for host in hostsystems
+        },
+    )
 
+    for host in hostsystems:
         counters_output = {}
-        for id_, instance, values in counters_value:
+        for id_, instance, values in counters_value_by_host.get(host, []):
             desc = counters_description.get(id_)
             if not desc:
                 continue
@@ -1504,12 +1566,9 @@ EVAL_FUNCTIONS = {
 
 
 def fetch_hostsystem_data(connection):
-    esxhostdetails_response = connection.query_server("esxhostdetails")
-    hostsystems_objects = get_pattern("<objects>(.*?)</objects>", esxhostdetails_response)
-
     hostsystems_properties: dict[str, dict[Any, Any]] = {}
     hostsystems_sensors: dict[str, dict[Any, Any]] = {}
-    for entry in hostsystems_objects:
+    for entry in iter_elements(connection.iter_query_server("esxhostdetails"), "objects"):
         hostname = get_pattern('<obj type="HostSystem">(.*)</obj>', entry[:512])[0]
         hostsystems_properties[hostname] = {}
         hostsystems_sensors[hostname] = {}
@@ -1652,6 +1711,37 @@ def get_pattern(pattern, line):
     return re.findall(pattern, line, re.DOTALL) if line else []
 
 
+def iter_elements(chunks: Iterable[str], tag: str) -> Iterator[str]:
+    """Yield the content of the elements with the tag while the chunks of a response are read
+
+    The same as get_pattern("<tag>(.*?)</tag>", response), but the whole response is never kept
+    in memory. The start tags may have attributes.
+    """
+    start_tag = re.compile(f"<{tag}[ >]")
+    end_tag = f"</{tag}>"
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        pos = 0
+        while True:
+            if (match := start_tag.search(buffer, pos)) is None:
+                # Keep the beginning of a start tag
+                pos = max(pos, len(buffer) - len(tag) - 1)
+                break
+            content_start = buffer.find(">", match.start()) + 1
+            end = buffer.find(end_tag, content_start)
+            if not content_start or end < 0:
+                pos = match.start()
+                break
+            yield buffer[content_start:end]
+            pos = end + len(end_tag)
+        buffer = buffer[pos:]
+
+
+def _chunks(list_: Sequence[T], length: int) -> Iterator[Sequence[T]]:
+    return (list_[i : i + length] for i in range(0, len(list_), length))
+
+
 # snapshot.rootSnapshotList.summary 871 1605626114 poweredOn SnapshotName| 834 1605632160 poweredOff Snapshotname2
 def get_section_snapshot_summary(vms):
     snapshots = []
@@ -1758,11 +1848,13 @@ def eval_datastores(info, datastores):
 
 
 def fetch_host_systems(connection):
-    hostsystems_response = connection.query_server("hostsystems")
-    elements = get_pattern(
-        '<obj type="HostSystem">(.*?)</obj>.*?<val xsi:type="xsd:string">(.*?)</val>',
-        hostsystems_response,
-    )
+    elements = [
+        element
+        for entry in iter_elements(connection.iter_query_server("hostsystems"), "objects")
+        for element in get_pattern(
+            '<obj type="HostSystem">(.*?)</obj>.*?<val xsi:type="xsd:string">(.*?)</val>', entry
+        )
+    ]
 
     # On some ESX systems the cookie login does not work as expected, when the agent_vsphere
     # is called only once or twice a day. The cookie is somehow outdated, but there is no
@@ -1776,12 +1868,11 @@ def fetch_host_systems(connection):
 
 
 def fetch_datastores(connection):
-    datastores_response = connection.query_server("datastores")
-    elements = get_pattern(
-        '<objects><obj type="Datastore">(.*?)</obj>(.*?)</objects>', datastores_response
-    )
     datastores: dict[str, dict[str, Any]] = {}
-    for datastore, content in elements:
+    for entry in iter_elements(connection.iter_query_server("datastores"), "objects"):
+        if (match := re.match('<obj type="Datastore">(.*?)</obj>(.*)', entry, re.DOTALL)) is None:
+            continue
+        datastore, content = match.groups()
         entries = get_pattern("<name>(.*?)</name><val xsi:type.*?>(.*?)</val>", content)
         datastores[datastore] = {}
         for name, value in entries:
@@ -1800,27 +1891,42 @@ def get_section_datastores(datastores):
     return section_lines
 
 
-def _get_text(node: NodeList[minidom.Element]) -> str:
-    first = node.item(0)
-    if first is None:
-        raise ValueError("Node has no item")
-    child = first.firstChild
-    if child is None or not isinstance(child, minidom.Text):
-        raise ValueError("Node has no text")
-    return child.data
+def _local_name(element: ElementTree.Element) -> str:
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _get_text(element: ElementTree.Element, name: str) -> str:
+    """The text of the first descendant with the name"""
+    for descendant in element.iter():
+        if descendant is not element and _local_name(descendant) == name:
+            if not descendant.text:
+                raise ValueError("Node has no text")
+            return descendant.text
+    raise ValueError("Node has no item")
+
+
+def iter_parsed_elements(chunks: Iterable[str], name: str) -> Iterator[ElementTree.Element]:
+    """Yield the parsed elements with the name while the chunks of a response are read"""
+    parser = ElementTree.XMLPullParser(events=("end",))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _event, element in parser.read_events():
+            if _local_name(element) == name:
+                yield element
+                element.clear()
+    parser.close()
 
 
 def get_section_licenses(connection):
     section_lines = ["<<<esx_vsphere_licenses:sep(9)>>>"]
-    licenses_response = connection.query_server("licensesused")
-    root_node = minidom.parseString(licenses_response)
-    licenses_node = root_node.getElementsByTagName("LicenseManagerLicenseInfo")
-    for license_node in licenses_node:
-        total = _get_text(license_node.getElementsByTagName("total"))
+    for license_node in iter_parsed_elements(
+        connection.iter_query_server("licensesused"), "LicenseManagerLicenseInfo"
+    ):
+        total = _get_text(license_node, "total")
         if total == "0":
             continue
-        name = _get_text(license_node.getElementsByTagName("name"))
-        used = _get_text(license_node.getElementsByTagName("used"))
+        name = _get_text(license_node, "name")
+        used = _get_text(license_node, "used")
         section_lines.append(f"{name}\t{used} {total}")
     return section_lines
 
@@ -1830,10 +1936,7 @@ def fetch_virtual_machines(connection, hostsystems, datastores, opt):
     vm_esx_host: dict[str, list[Any]] = {}
 
     # <objects><propSet><name>...</name><val ..>...</val></propSet></objects>
-    vmdetails_response = connection.query_server("vmdetails")
-
-    elements = get_pattern("<objects>(.*?)</objects>", vmdetails_response)
-    for entry in elements:
+    for entry in iter_elements(connection.iter_query_server("vmdetails"), "objects"):
         vm_data = dict(get_pattern("<name>(.*?)</name><val.*?>(.*?)</val>", entry))
         if opt.skip_placeholder_vm and is_placeholder_vm(vm_data.get("config.hardware.device")):
             continue
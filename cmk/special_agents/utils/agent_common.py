@@ -12,6 +12,8 @@ Current responsibilities include:
 """
 
 import argparse
+import contextlib
+import io
 import json
 import logging
 import sys
@@ -99,6 +101,43 @@ class ConditionalPiggybackSection(SectionManager):
         super().__exit__(*exc_info)
 
 
+class ConditionalPiggybackFrame:
+    """Exception-Safely write the output of a piggybacked host as one frame
+    The header of the frame contains the length of the output in bytes, so the fetcher stores the
+    output without parsing it line by line. Like with ConditionalPiggybackSection, the output is
+    written unchanged if @hostname is falsy.
+    >>> with ConditionalPiggybackFrame("horst"):
+    ...     with SectionWriter("foo") as writer:
+    ...         writer.append("bär")
+    <<<<horst:length(22)>>>>
+    <<<foo:sep(0)>>>
+    bär
+    <<<<>>>>
+    >>> with ConditionalPiggybackFrame(None):
+    ...     print("foo: bar")
+    foo: bar
+    """
+
+    def __init__(self, hostname: str | None) -> None:
+        self.hostname = hostname
+        self._buffer = io.StringIO()
+        self._redirect = contextlib.redirect_stdout(self._buffer)
+
+    def __enter__(self) -> "ConditionalPiggybackFrame":
+        if self.hostname:
+            self._redirect.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if not self.hostname:
+            return
+        self._redirect.__exit__(None, None, None)
+        output = self._buffer.getvalue()
+        length = len(output.encode(sys.stdout.encoding or "utf-8"))
+        sys.stdout.write(f"<<<<{self.hostname}:length({length})>>>>\n{output}<<<<>>>>\n")
+        sys.stdout.flush()
+
+
 class SectionWriter(SectionManager):
     """
     >>> with SectionWriter("foo") as writer:
@@ -11,6 +11,7 @@ import re
 import time
 import typing
 from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
 import requests
@@ -22,6 +23,7 @@ from cmk.special_agents.utils_kubernetes.controllers import (
     map_controllers,
     map_controllers_top_to_down,
 )
+from cmk.special_agents.utils_kubernetes.list_cache import ListCache
 from cmk.special_agents.utils_kubernetes.schemata import api
 from cmk.special_agents.utils_kubernetes.transform import (
     cron_job_from_client,
@@ -47,18 +49,20 @@ VERSION_MATCH_RE = re.compile(r"\s*v?([0-9]+(?:\.[0-9]+)*).*")
 SUPPORTED_VERSIONS = [(1, 22), (1, 23), (1, 24), (1, 25), (1, 26)]
 LOWEST_FUNCTIONING_VERSION = min(SUPPORTED_VERSIONS)
 SUPPORTED_VERSIONS_DISPLAY = ", ".join(f"v{major}.{minor}" for major, minor in SUPPORTED_VERSIONS)
+# Number of concurrent requests to the API server
+MAX_CONCURRENT_REQUESTS = 8
 
 
 class FakeResponse:
-    def __init__(self, response: requests.Response):
-        self.data: str = response.text
+    def __init__(self, data: str):
+        self.data = data
 
 
 class Deserializer:
     def __init__(self):
         self._api_client = client.ApiClient()
 
-    def run(self, response_type: str, data: requests.Response) -> typing.Any:
+    def run(self, response_type: str, data: str) -> typing.Any:
         return self._api_client.deserialize(FakeResponse(data), response_type)
 
 
@@ -68,74 +72,64 @@ class ClientAPI:
         client_config: query.APISessionConfig,
         request_client: requests.Session,
         deserizalizer: Deserializer,
+        list_cache: ListCache | None = None,
     ) -> None:
         self._config = client_config
         self._client = request_client
         self._deserializer = deserizalizer
+        self._list_cache = list_cache or ListCache(None)
+
+    def _query_list(self, response_type: str, resource_path: str) -> typing.Any:
+        data = self._list_cache.query(self._config, self._client, resource_path)
+        return self._deserializer.run(response_type, data).items
 
 
 class ClientBatchAPI(ClientAPI):
     def query_raw_cron_jobs(self) -> Sequence[client.V1CronJob]:
-        request = requests.Request("GET", self._config.url("/apis/batch/v1/cronjobs"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1CronJobList", response).items
+        return self._query_list("V1CronJobList", "/apis/batch/v1/cronjobs")
 
     def query_raw_jobs(self) -> Sequence[client.V1Job]:
-        request = requests.Request("GET", self._config.url("/apis/batch/v1/jobs"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1JobList", response).items
+        return self._query_list("V1JobList", "/apis/batch/v1/jobs")
 
 
 class ClientCoreAPI(ClientAPI):
     def query_raw_pods(self) -> Sequence[client.V1Pod]:
-        request = requests.Request("GET", self._config.url("/api/v1/pods"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1PodList", response).items
+        return self._query_list("V1PodList", "/api/v1/pods")
 
     def query_raw_resource_quotas(self) -> Sequence[client.V1ResourceQuota]:
-        request = requests.Request("GET", self._config.url("/api/v1/resourcequotas"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1ResourceQuotaList", response).items
+        return self._query_list("V1ResourceQuotaList", "/api/v1/resourcequotas")
 
     def query_raw_namespaces(self):
-        request = requests.Request("GET", self._config.url("/api/v1/namespaces"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1NamespaceList", response).items
+        return self._query_list("V1NamespaceList", "/api/v1/namespaces")
 
     def query_persistent_volume_claims(self) -> Sequence[client.V1PersistentVolumeClaim]:
-        request = requests.Request("GET", self._config.url("/api/v1/persistentvolumeclaims"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1PersistentVolumeClaimList", response).items
+        return self._query_list("V1PersistentVolumeClaimList", "/api/v1/persistentvolumeclaims")
 
     def query_persistent_volumes(self):
-        request = requests.Request("GET", self._config.url("/api/v1/persistentvolumes"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1PersistentVolumeList", response).items
+        return self._query_list("V1PersistentVolumeList", "/api/v1/persistentvolumes")
 
 
 class ClientAppsAPI(ClientAPI):
     def query_raw_deployments(self) -> Sequence[client.V1Deployment]:
-        request = requests.Request("GET", self._config.url("/apis/apps/v1/deployments"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1DeploymentList", response).items
+        return self._query_list("V1DeploymentList", "/apis/apps/v1/deployments")
 
     def query_raw_daemon_sets(self) -> Sequence[client.V1DaemonSet]:
-        request = requests.Request("GET", self._config.url("/apis/apps/v1/daemonsets"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1DaemonSetList", response).items
+        return self._query_list("V1DaemonSetList", "/apis/apps/v1/daemonsets")
 
     def query_raw_replica_sets(self) -> Sequence[client.V1ReplicaSet]:
-        request = requests.Request("GET", self._config.url("/apis/apps/v1/replicasets"))
-        response = send_request(self._config, self._client, request)
-        return self._deserializer.run("V1ReplicaSetList", response).items
+        return self._query_list("V1ReplicaSetList", "/apis/apps/v1/replicasets")
 
 
 class RawAPI:
     def __init__(
-        self, client_config: query.APISessionConfig, request_client: requests.Session
+        self,
+        client_config: query.APISessionConfig,
+        request_client: requests.Session,
+        list_cache: ListCache | None = None,
     ) -> None:
         self._config = client_config
         self._client = request_client
+        self._list_cache = list_cache or ListCache(None)
 
 
 def send_request(
@@ -174,8 +168,7 @@ class CoreAPI(RawAPI):
         return result
 
     def query_raw_nodes(self) -> JSONNodeList:
-        request = requests.Request("GET", self._config.url("/api/v1/nodes"))
-        return send_request(self._config, self._client, request).json()
+        return json.loads(self._list_cache.query(self._config, self._client, "/api/v1/nodes"))
 
     def query_api_health(self) -> api.APIHealth:
         # https://kubernetes.io/docs/reference/using-api/health-checks/
@@ -195,8 +188,9 @@ class CoreAPI(RawAPI):
 
 class AppsAPI(RawAPI):
     def query_raw_statefulsets(self) -> JSONStatefulSetList:
-        request = requests.Request("GET", self._config.url("/apis/apps/v1/statefulsets"))
-        return send_request(self._config, self._client, request).json()
+        return json.loads(
+            self._list_cache.query(self._config, self._client, "/apis/apps/v1/statefulsets")
+        )
 
 
 def _extract_sequence_based_identifier(git_version: str) -> str | None:
@@ -371,27 +365,45 @@ def query_raw_api_data_v2(
     client_apps_api: ClientAppsAPI,
     query_kubelet_endpoints: bool,
 ) -> UnparsedAPIData:
-    raw_nodes = core_api.query_raw_nodes()
-    node_names = [raw_node["metadata"]["name"] for raw_node in raw_nodes["items"]]
-    return UnparsedAPIData(
-        raw_jobs=client_batch_api.query_raw_jobs(),
-        raw_cron_jobs=client_batch_api.query_raw_cron_jobs(),
-        raw_pods=client_core_api.query_raw_pods(),
-        raw_nodes=raw_nodes,
-        raw_namespaces=client_core_api.query_raw_namespaces(),
-        raw_resource_quotas=client_core_api.query_raw_resource_quotas(),
-        raw_persistent_volume_claims=client_core_api.query_persistent_volume_claims(),
-        raw_persistent_volumes=client_core_api.query_persistent_volumes(),
-        raw_deployments=client_apps_api.query_raw_deployments(),
-        raw_daemonsets=client_apps_api.query_raw_daemon_sets(),
-        raw_statefulsets=apps_api.query_raw_statefulsets(),
-        raw_replica_sets=client_apps_api.query_raw_replica_sets(),
-        node_to_kubelet_health=core_api.query_kubelet_health(node_names),
-        api_health=core_api.query_api_health(),
-        raw_kubelet_open_metrics_dumps=core_api.query_kubelet_metrics(node_names)
-        if query_kubelet_endpoints
-        else [],
-    )
+    # The resource types are queried concurrently, the queries depending on the nodes are sent
+    # while the other ones are running.
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        raw_jobs = executor.submit(client_batch_api.query_raw_jobs)
+        raw_cron_jobs = executor.submit(client_batch_api.query_raw_cron_jobs)
+        raw_pods = executor.submit(client_core_api.query_raw_pods)
+        raw_namespaces = executor.submit(client_core_api.query_raw_namespaces)
+        raw_resource_quotas = executor.submit(client_core_api.query_raw_resource_quotas)
+        raw_persistent_volume_claims = executor.submit(
+            client_core_api.query_persistent_volume_claims
+        )
+        raw_persistent_volumes = executor.submit(client_core_api.query_persistent_volumes)
+        raw_deployments = executor.submit(client_apps_api.query_raw_deployments)
+        raw_daemonsets = executor.submit(client_apps_api.query_raw_daemon_sets)
+        raw_statefulsets = executor.submit(apps_api.query_raw_statefulsets)
+        raw_replica_sets = executor.submit(client_apps_api.query_raw_replica_sets)
+        api_health = executor.submit(core_api.query_api_health)
+
+        raw_nodes = core_api.query_raw_nodes()
+        node_names = [raw_node["metadata"]["name"] for raw_node in raw_nodes["items"]]
+        return UnparsedAPIData(
+            raw_jobs=raw_jobs.result(),
+            raw_cron_jobs=raw_cron_jobs.result(),
+            raw_pods=raw_pods.result(),
+            raw_nodes=raw_nodes,
+            raw_namespaces=raw_namespaces.result(),
+            raw_resource_quotas=raw_resource_quotas.result(),
+            raw_persistent_volume_claims=raw_persistent_volume_claims.result(),
+            raw_persistent_volumes=raw_persistent_volumes.result(),
+            raw_deployments=raw_deployments.result(),
+            raw_daemonsets=raw_daemonsets.result(),
+            raw_statefulsets=raw_statefulsets.result(),
+            raw_replica_sets=raw_replica_sets.result(),
+            node_to_kubelet_health=core_api.query_kubelet_health(node_names),
+            api_health=api_health.result(),
+            raw_kubelet_open_metrics_dumps=core_api.query_kubelet_metrics(node_names)
+            if query_kubelet_endpoints
+            else [],
+        )
 
 
 def parse_api_data(
@@ -547,6 +559,7 @@ def from_kubernetes(
     client_config: query.APISessionConfig,
     logger: logging.Logger,
     query_kubelet_endpoints: bool,
+    list_cache: ListCache | None = None,
 ) -> APIData:
     """
     This function provides a stable interface that should not change between kubernetes versions
@@ -554,12 +567,12 @@ def from_kubernetes(
     """
     deserizalizer = Deserializer()
     api_client_requests = query.make_api_client_requests(client_config, logger)
-    client_batch_api = ClientBatchAPI(client_config, api_client_requests, deserizalizer)
-    client_core_api = ClientCoreAPI(client_config, api_client_requests, deserizalizer)
-    client_apps_api = ClientAppsAPI(client_config, api_client_requests, deserizalizer)
+    client_batch_api = ClientBatchAPI(client_config, api_client_requests, deserizalizer, list_cache)
+    client_core_api = ClientCoreAPI(client_config, api_client_requests, deserizalizer, list_cache)
+    client_apps_api = ClientAppsAPI(client_config, api_client_requests, deserizalizer, list_cache)
 
-    core_api = CoreAPI(client_config, api_client_requests)
-    apps_api = AppsAPI(client_config, api_client_requests)
+    core_api = CoreAPI(client_config, api_client_requests, list_cache)
+    apps_api = AppsAPI(client_config, api_client_requests, list_cache)
     raw_version = core_api.query_raw_version()
     version = version_from_json(raw_version)
     _verify_version_support(version)
@@ -14,7 +14,7 @@ from typing import Generic, NewType, TypeVar
 
 from pydantic import BaseModel
 
-from cmk.special_agents.utils.agent_common import ConditionalPiggybackSection, SectionWriter
+from cmk.special_agents.utils.agent_common import ConditionalPiggybackFrame, SectionWriter
 from cmk.special_agents.utils_kubernetes.schemata import section
 
 LOGGER = logging.getLogger()
@@ -71,7 +71,7 @@ def write_sections(items: Iterable[WriteableSection]) -> None:
 
     # Optimize for size of agent output
     for key, group in itertools.groupby(sorted(items, key=key_function), key_function):
-        with ConditionalPiggybackSection(key):
+        with ConditionalPiggybackFrame(key):
             for item in group:
                 with SectionWriter(item.section_name) as writer:
                     writer.append(item.section.json())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Persistent cache of the resource lists of the Kubernetes API
+
+Listing all objects of a large cluster on every run is slow and puts a high load on the API
+server. With the cache, the lists are only fetched completely on the first run. The following runs
+fetch the changes since the resource version of the cached list with a short watch request. If the
+API server does not know the resource version anymore (410 Gone), the whole list is fetched again.
+"""
+
+import json
+import logging
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import Any, Final
+
+import requests
+
+import cmk.utils.store as store
+
+from cmk.special_agents.utils_kubernetes.query import APISessionConfig
+
+# The API server closes the watch requests after this number of seconds. The changes since the
+# resource version are sent right away.
+WATCH_TIMEOUT: Final = 1
+
+LOGGER = logging.getLogger()
+
+JSONObject = Mapping[str, Any]
+
+
+class ResourceVersionExpired(Exception):
+    pass
+
+
+def _item_key(item: JSONObject) -> str:
+    return item["metadata"]["uid"]
+
+
+def _sort_key(item: JSONObject) -> tuple[str, str]:
+    # The API server lists the resources ordered by namespace and name
+    metadata = item["metadata"]
+    return metadata.get("namespace", ""), metadata["name"]
+
+
+class ListCache:
+    """The lists of the resources of a cluster, kept up to date with the changes of each run
+
+    Without a path, the lists are always fetched completely.
+    """
+
+    def __init__(self, path: Path | None) -> None:
+        self._path = path
+        self._lists: dict[str, dict[str, Any]] = {}
+        if path is not None:
+            try:
+                self._lists = json.loads(path.read_text())
+            except (FileNotFoundError, ValueError):
+                pass
+
+    def query(
+        self,
+        client_config: APISessionConfig,
+        request_client: requests.Session,
+        resource_path: str,
+    ) -> str:
+        """The JSON text of the list of the resources, like the one sent by the API server"""
+        if self._path is None:
+            return self._get(client_config, request_client, resource_path).text
+
+        if (cached := self._lists.get(resource_path)) is not None:
+            try:
+                cached = self._apply_changes(client_config, request_client, resource_path, cached)
+            except (ResourceVersionExpired, requests.RequestException, ValueError, KeyError):
+                LOGGER.info("Could not fetch the changes of %s, listing it", resource_path)
+                cached = None
+
+        if cached is None:
+            response = self._get(client_config, request_client, resource_path)
+            try:
+                resource_list = response.json()
+                cached = {
+                    "resourceVersion": resource_list["metadata"]["resourceVersion"],
+                    "items": {_item_key(item): item for item in resource_list["items"]},
+                }
+            except (ValueError, KeyError, TypeError):
+                # Errors are left to the handling of the response
+                self._lists.pop(resource_path, None)
+                return response.text
+
+        self._lists[resource_path] = cached
+        return json.dumps(
+            {
+                "metadata": {"resourceVersion": cached["resourceVersion"]},
+                "items": sorted(cached["items"].values(), key=_sort_key),
+            }
+        )
+
+    def save(self) -> None:
+        if self._path is None:
+            return
+        store.makedirs(self._path.parent)
+        store.save_text_to_file(self._path, json.dumps(self._lists))
+
+    @staticmethod
+    def _get(
+        client_config: APISessionConfig,
+        request_client: requests.Session,
+        resource_path: str,
+        params: Mapping[str, str | int] | None = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        request = requests.Request("GET", client_config.url(resource_path), params=params)
+        return request_client.send(
+            request_client.prepare_request(request),
+            verify=client_config.verify_cert_api,
+            timeout=client_config.requests_timeout(),
+            stream=stream,
+        )
+
+    def _apply_changes(
+        self,
+        client_config: APISessionConfig,
+        request_client: requests.Session,
+        resource_path: str,
+        cached: Mapping[str, Any],
+    ) -> dict[str, Any]:
+        response = self._get(
+            client_config,
+            request_client,
+            resource_path,
+            params={
+                "watch": "true",
+                "resourceVersion": cached["resourceVersion"],
+                "allowWatchBookmarks": "true",
+                "timeoutSeconds": WATCH_TIMEOUT,
+            },
+            stream=True,
+        )
+        with response:
+            if response.status_code == 410:
+                raise ResourceVersionExpired(resource_path)
+            response.raise_for_status()
+            items = dict(cached["items"])
+            resource_version = cached["resourceVersion"]
+            for event_type, item in _watch_events(response):
+                if event_type == "ERROR":
+                    # A status object, most likely 410 Gone
+                    raise ResourceVersionExpired(f"{resource_path}: {item.get('message')}")
+                if event_type in ("ADDED", "MODIFIED"):
+                    items[_item_key(item)] = item
+                elif event_type == "DELETED":
+                    items.pop(_item_key(item), None)
+                resource_version = item["metadata"]["resourceVersion"]
+        return {"resourceVersion": resource_version, "items": items}
+
+
+def _watch_events(response: requests.Response) -> Iterator[tuple[str, JSONObject]]:
+    for line in response.iter_lines():
+        if line:
+            event = json.loads(line)
+            yield event["type"], event["object"]
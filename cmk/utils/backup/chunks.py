@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Incremental, deduplicating site backups
+
+Instead of writing the complete site tarball for each backup, the uncompressed tar stream produced
+by "omd backup" is split into chunks. Each chunk is stored once in a content addressed chunk store
+next to the backups of the target. A backup then only consists of a manifest listing the chunks
+needed to reassemble the tar stream.
+
+The chunk boundaries are derived from the tar stream itself: Members are grouped into chunks and a
+chunk is closed after a member whose header hash matches a bit mask. Since the tar headers contain
+the names and mtimes of the files, the boundaries only depend on the local content and are not
+shifted by added or removed files. Large files (e.g. RRDs) are split into pieces aligned to the
+start of the file, so that unchanged regions of modified files are deduplicated as well.
+
+A target, and thereby its chunk store, may be shared by the backups of several sites. Running
+backups hold a shared lock on the chunk store, unreferenced chunks are only removed while nobody
+else uses the store.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tarfile
+import time
+import zlib
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final, IO
+
+from cmk.utils.exceptions import MKGeneralException
+
+MANIFEST_SUFFIX: Final = ".manifest"
+MANIFEST_VERSION: Final = 1
+
+_MAX_CHUNK_SIZE: Final = 4 * 1024 * 1024
+# A chunk is closed after a member if the lower bits of its header hash are zero. With 4 bits
+# this results in 16 members per chunk on average.
+_MEMBER_BOUNDARY_MASK: Final = 0xF
+
+_RAW: Final = b"\x00"
+_ZLIB: Final = b"\x01"
+
+
+def iter_chunks(stream: IO[bytes], max_size: int = _MAX_CHUNK_SIZE) -> Iterator[bytes]:
+    """Split an uncompressed tar stream into content defined chunks
+
+    The concatenation of the chunks always equals the input, even if it is not a valid tar stream.
+
+    >>> import io
+    >>> b"".join(iter_chunks(io.BytesIO(b"not a tar stream"))) == b"not a tar stream"
+    True
+    """
+    pending = bytearray()
+    while len(header := _read(stream, tarfile.BLOCKSIZE)) == tarfile.BLOCKSIZE:
+        try:
+            member = tarfile.TarInfo.frombuf(header, tarfile.ENCODING, "surrogateescape")
+        except tarfile.HeaderError:
+            # End of archive marker or something we do not understand. Handle the rest of the
+            # stream as opaque data.
+            pending += header
+            break
+
+        data_size = -(-member.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        if data_size > max_size:
+            if pending:
+                yield bytes(pending)
+                pending.clear()
+            yield header
+            while data_size > 0 and (piece := _read(stream, min(max_size, data_size))):
+                data_size -= len(piece)
+                yield piece
+            continue
+
+        pending += header
+        pending += _read(stream, data_size)
+        if len(pending) >= max_size or not zlib.crc32(header) & _MEMBER_BOUNDARY_MASK:
+            yield bytes(pending)
+            pending.clear()
+    else:
+        pending += header
+
+    while True:
+        if len(pending) >= max_size:
+            yield bytes(pending)
+            pending.clear()
+        if not (data := _read(stream, max_size - len(pending))):
+            break
+        pending += data
+
+    if pending:
+        yield bytes(pending)
+
+
+def _read(stream: IO[bytes], size: int) -> bytes:
+    """Read exactly size bytes, unless the stream ends before"""
+    buf = stream.read(size)
+    while buf and len(buf) < size and (more := stream.read(size - len(buf))):
+        buf += more
+    return buf
+
+
+class ChunkStore:
+    """Content addressed storage of backup chunks below the backup target"""
+
+    def __init__(self, path: Path, compress: bool = True) -> None:
+        self.path: Final = path
+        self._compress: Final = compress
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.path / digest[:2] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self._chunk_path(digest).exists()
+
+    def add(self, digest: str, chunk: bytes) -> int:
+        """Store the chunk and return the number of bytes written to the store"""
+        data = _ZLIB + zlib.compress(chunk, 1) if self._compress else _RAW + chunk
+        path = self._chunk_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{digest}.new{os.getpid()}")
+        tmp_path.write_bytes(data)
+        tmp_path.rename(path)
+        return len(data)
+
+    def get(self, digest: str) -> bytes:
+        try:
+            data = self._chunk_path(digest).read_bytes()
+        except FileNotFoundError:
+            raise MKGeneralException(f"The backup chunk {digest} is missing in {self.path}")
+
+        chunk = zlib.decompress(data[1:]) if data[:1] == _ZLIB else data[1:]
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise MKGeneralException(f"The backup chunk {digest} in {self.path} is damaged")
+        return chunk
+
+    def digests(self) -> Iterator[str]:
+        for path in self.path.glob("??/*"):
+            if ".new" not in path.name:
+                yield path.name
+
+    @contextmanager
+    def in_use(self) -> Iterator[None]:
+        """Protect the chunks from being removed, e.g. while a backup is running"""
+        with self._locked(fcntl.LOCK_SH):
+            yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[bool]:
+        """Try to get the store for ourselves, without waiting for other backups to finish"""
+        with self._locked(fcntl.LOCK_EX | fcntl.LOCK_NB) as locked:
+            yield locked
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[bool]:
+        self.path.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path / ".lock", os.O_RDONLY | os.O_CREAT, 0o664)
+        try:
+            try:
+                fcntl.flock(fd, operation)
+            except BlockingIOError:  # Only raised for LOCK_NB
+                yield False
+            else:
+                yield True
+        finally:
+            os.close(fd)
+
+    def remove_unreferenced(self, referenced: set[str]) -> int:
+        """Remove the chunks not referenced by any backup
+
+        Has to be called within exclusive(), the chunks of running backups are not referenced yet.
+        """
+        removed = 0
+        for digest in list(self.digests()):
+            if digest not in referenced:
+                self._chunk_path(digest).unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+@dataclass(frozen=True)
+class ChunkRef:
+    digest: str
+    size: int
+
+
+@dataclass(frozen=True)
+class Manifest:
+    chunk_store: Path
+    chunks: list[ChunkRef]
+
+    @property
+    def size(self) -> int:
+        return sum(c.size for c in self.chunks)
+
+    @property
+    def checksum(self) -> str:
+        """Checksum of the backed up data, derived from the digests of the chunks"""
+        hash_md5 = hashlib.md5(usedforsecurity=False)  # pylint: disable=unexpected-keyword-arg
+        for ref in self.chunks:
+            hash_md5.update(ref.digest.encode("ascii"))
+        return hash_md5.hexdigest()
+
+    def dumps(self, directory: Path) -> bytes:
+        """Serialize the manifest to be written to the given directory
+
+        The chunk store is referenced relative to the manifest, so that the target can be mounted
+        at a different path or be copied.
+        """
+        return json.dumps(
+            {
+                "version": MANIFEST_VERSION,
+                "chunk_store": os.path.relpath(self.chunk_store, directory),
+                "chunks": [(c.digest, c.size) for c in self.chunks],
+            }
+        ).encode("utf-8")
+
+    @classmethod
+    def loads(cls, raw: bytes, directory: Path) -> "Manifest":
+        try:
+            parsed = json.loads(raw)
+            if parsed["version"] != MANIFEST_VERSION:
+                raise ValueError(f"unsupported version {parsed['version']}")
+            return cls(
+                chunk_store=directory / parsed["chunk_store"],
+                chunks=[ChunkRef(digest, size) for digest, size in parsed["chunks"]],
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            raise MKGeneralException(f"Failed to parse the backup manifest: {e}")
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        return cls.loads(path.read_bytes(), path.parent)
+
+    def missing_chunks(self) -> set[str]:
+        store = ChunkStore(self.chunk_store)
+        return {ref.digest for ref in self.chunks if not store.exists(ref.digest)}
+
+
+@dataclass(frozen=True)
+class ChunkingStats:
+    total_bytes: int
+    new_bytes: int
+    stored_bytes: int
+    duration: float
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Ratio of the backed up data to the data which actually had to be stored"""
+        return self.total_bytes / self.new_bytes if self.new_bytes else float("inf")
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.total_bytes / self.duration if self.duration > 0 else 0.0
+
+
+def store_chunked(
+    chunks: Iterable[bytes],
+    store: ChunkStore,
+    *,
+    max_workers: int | None = None,
+) -> tuple[Manifest, ChunkingStats]:
+    """Add all chunks which are not yet known to the store
+
+    Compressing and writing the chunks is done in a thread pool. zlib and hashlib release the GIL,
+    so this scales across the available cores.
+    """
+    start = time.monotonic()
+    max_workers = max_workers or os.cpu_count() or 1
+    refs: list[ChunkRef] = []
+    known: set[str] = set()
+    in_flight: deque[Future[int]] = deque()
+    new_bytes = stored_bytes = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for chunk in chunks:
+            digest = hashlib.sha256(chunk).hexdigest()
+            refs.append(ChunkRef(digest, len(chunk)))
+            if digest in known or store.exists(digest):
+                known.add(digest)
+                continue
+            known.add(digest)
+            new_bytes += len(chunk)
+            in_flight.append(executor.submit(store.add, digest, chunk))
+            # Bound the memory used by chunks waiting to be compressed
+            while len(in_flight) > 2 * max_workers:
+                stored_bytes += in_flight.popleft().result()
+
+        stored_bytes += sum(f.result() for f in in_flight)
+
+    return Manifest(chunk_store=store.path, chunks=refs), ChunkingStats(
+        total_bytes=sum(r.size for r in refs),
+        new_bytes=new_bytes,
+        stored_bytes=stored_bytes,
+        duration=time.monotonic() - start,
+    )
+
+
+class ManifestReader:
+    """File like object reassembling the tar stream of a manifest, e.g. for the RestoreStream"""
+
+    def __init__(self, manifest: Manifest) -> None:
+        self._store: Final = ChunkStore(manifest.chunk_store)
+        self._pending: Final = deque(manifest.chunks)
+        self._buffer = b""
+        self._offset = 0
+        self.closed = False
+
+    def read(self, size: int = -1) -> bytes:
+        parts = []
+        while size != 0:
+            if self._offset >= len(self._buffer):
+                if not self._pending:
+                    break
+                self._buffer = self._store.get(self._pending.popleft().digest)
+                self._offset = 0
+            end = len(self._buffer) if size < 0 else self._offset + size
+            part = self._buffer[self._offset : end]
+            self._offset += len(part)
+            if size > 0:
+                size -= len(part)
+            parts.append(part)
+        return b"".join(parts)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def referenced_digests(manifest_paths: Iterable[Path]) -> set[str]:
+    return {ref.digest for path in manifest_paths for ref in Manifest.load(path).chunks}
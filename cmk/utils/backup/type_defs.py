@@ -56,6 +56,10 @@ class Backup:
     id: str
     _path: Path
 
+    @property
+    def path(self) -> Path:
+        return self._path
+
     @contextmanager
     def open(self) -> Iterator[IO[bytes]]:
         with self._path.open(mode="rb") as fh:
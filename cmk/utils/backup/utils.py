@@ -13,11 +13,21 @@ import socket
 import subprocess
 import sys
 import time
+from dataclasses import replace
 from hashlib import md5
 from pathlib import Path
 from typing import Final
 
+import cmk.utils.render as render
 import cmk.utils.store as store
+from cmk.utils.backup.chunks import (
+    ChunkStore,
+    iter_chunks,
+    Manifest,
+    MANIFEST_SUFFIX,
+    ManifestReader,
+    store_chunked,
+)
 from cmk.utils.backup.job import Job, JobState
 from cmk.utils.backup.stream import BackupStream, RestoreStream
 from cmk.utils.backup.type_defs import Backup, RawBackupInfo, SiteBackupInfo
@@ -143,7 +153,17 @@ def save_backup_info(info: SiteBackupInfo, path: Path) -> None:
 
 def verify_backup_file(info: SiteBackupInfo, archive_path: Path) -> None:
     checksum = info.checksum
-    this_checksum = file_checksum(archive_path)
+    if info.filename.endswith(MANIFEST_SUFFIX):
+        manifest = Manifest.load(archive_path)
+        this_checksum = manifest.checksum
+        if missing := manifest.missing_chunks():
+            raise MKGeneralException(
+                "The backup seems to be damaged and can not be restored. "
+                "%d chunks referenced by %s are missing in %s."
+                % (len(missing), archive_path, manifest.chunk_store)
+            )
+    else:
+        this_checksum = file_checksum(archive_path)
     if this_checksum != checksum:
         raise MKGeneralException(
             "The backup seems to be damaged and can not be restored. "
@@ -296,7 +316,11 @@ def do_site_restore(
 
         with backup.open() as backup_file:
             s = RestoreStream(
-                stream=backup_file,
+                stream=(
+                    ManifestReader(Manifest.loads(backup_file.read(), backup.path.parent))
+                    if backup.info.filename.endswith(MANIFEST_SUFFIX)
+                    else backup_file
+                ),
                 is_alive=lambda: False,
                 key_ident=backup.info.config["encrypt"],
                 debug=debug,
@@ -320,8 +344,16 @@ def do_site_restore(
 
 
 def do_site_backup(
-    backup_path: Path, job: Job, state: State, verbose: int, debug: bool
+    backup_path: Path,
+    job: Job,
+    state: State,
+    verbose: int,
+    debug: bool,
+    chunk_store: ChunkStore | None = None,
 ) -> SiteBackupInfo:
+    if chunk_store is not None:
+        return _do_incremental_site_backup(backup_path, job, chunk_store, verbose)
+
     cmd = ["omd", "backup"]
     if not job.config["compress"]:
         cmd.append("--no-compression")
@@ -363,3 +395,60 @@ def do_site_backup(
         raise MKGeneralException("Site backup failed: %s" % err)
 
     return info.info(job, site_id=site)
+
+
+def _do_incremental_site_backup(
+    backup_path: Path, job: Job, chunk_store: ChunkStore, verbose: int
+) -> SiteBackupInfo:
+    """Store the site as deduplicated chunks and write the manifest as backup file
+
+    The uncompressed tar stream is requested from "omd backup" to be able to find identical chunks.
+    Compression is applied per chunk by the chunk store instead.
+    """
+    if job.config["encrypt"]:
+        raise MKGeneralException("Incremental backups can not be encrypted")
+
+    cmd = ["omd", "backup", "--no-compression"]
+    if job.config.get("no_history", False):
+        cmd.append("--no-past")
+    cmd.append("-")
+
+    site = current_site_id()
+    manifest_path = backup_path.with_name(f"site-{site}{MANIFEST_SUFFIX}")
+    if verbose > 0:
+        log("Command: %s" % " ".join(cmd))
+
+    with subprocess.Popen(
+        cmd,
+        close_fds=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.DEVNULL,
+    ) as p:
+        assert p.stdout is not None
+        assert p.stderr is not None
+
+        manifest, stats = store_chunked(iter_chunks(p.stdout), chunk_store)
+        err = p.stderr.read().decode()
+
+    if p.returncode != 0:
+        raise MKGeneralException("Site backup failed: %s" % err)
+
+    manifest_path.write_bytes(manifest.dumps(manifest_path.parent))
+
+    log(
+        "Deduplicated backup: %s of %s had to be stored (%s compressed, ratio %.1f, %s/s)"
+        % (
+            render.fmt_bytes(stats.new_bytes),
+            render.fmt_bytes(stats.total_bytes),
+            render.fmt_bytes(stats.stored_bytes),
+            stats.dedup_ratio,
+            render.fmt_bytes(stats.bytes_per_second),
+        )
+    )
+    # The info describes the backed up data, not the manifest
+    return replace(
+        InfoCalculator(manifest_path.name).info(job, site_id=site),
+        checksum=manifest.checksum,
+        size=manifest.size,
+    )
@@ -255,6 +255,20 @@ class Eventconsolestatus(Table):
     )
     """The number of rule tries"""
 
+    status_state_load_time = Column(
+        'status_state_load_time',
+        col_type='float',
+        description='The duration of loading the event state on startup in seconds',
+    )
+    """The duration of loading the event state on startup in seconds"""
+
+    status_state_save_time = Column(
+        'status_state_save_time',
+        col_type='float',
+        description='The duration of the last save of the event state in seconds',
+    )
+    """The duration of the last save of the event state in seconds"""
+
     status_virtual_memory_size = Column(
         'status_virtual_memory_size',
         col_type='int',
@@ -8,9 +8,12 @@ import os
 import subprocess
 import time
 import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from logging import Logger
 from pathlib import Path
-from typing import Final, Literal, NewType, TypedDict
+from typing import Final, Literal, NamedTuple, NewType, TypedDict
 
 import livestatus
 
@@ -20,6 +23,7 @@ from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.i18n import _
 from cmk.utils.notify_types import EventContext
 from cmk.utils.notify_types import NotificationContext as NotificationContext
+from cmk.utils.notify_types import PluginNotificationContext
 
 logger = logging.getLogger("cmk.utils.notify")
 
@@ -55,6 +59,30 @@ class NotificationViaPlugin(TypedDict):
     context: NotificationContext
 
 
+class InProcessCall(NamedTuple):
+    """A plugin executed within the notification process instead of a subprocess"""
+
+    context: PluginNotificationContext
+    timeout: float
+
+
+_in_process_call: ContextVar[InProcessCall | None] = ContextVar("in_process_call", default=None)
+
+
+@contextmanager
+def in_process_call(context: PluginNotificationContext, timeout: float) -> Iterator[None]:
+    """Provide the context of a plugin called in process, the plugin may run in any thread"""
+    token = _in_process_call.set(InProcessCall(context, timeout))
+    try:
+        yield
+    finally:
+        _in_process_call.reset(token)
+
+
+def current_in_process_call() -> InProcessCall | None:
+    return _in_process_call.get()
+
+
 def _state_for(exit_code: NotificationResultCode) -> str:
     return statename.service_state_name(exit_code, "UNKNOWN")
 
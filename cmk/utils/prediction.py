@@ -3,20 +3,26 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import copy
 import json
 import logging
+import os
 import time
-from collections.abc import Callable, Iterable, Iterator
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from contextlib import suppress
 from dataclasses import asdict, dataclass
 from pathlib import Path
 from statistics import fmean
-from typing import Any, Literal, NewType
+from typing import Any, Final, Literal, NewType
+
+import numpy as np
+import numpy.typing as npt
 
 import livestatus
 
 import cmk.utils.debug
 import cmk.utils.paths
+import cmk.utils.store as store
 from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.hostaddress import HostName
 from cmk.utils.log import VERBOSE
@@ -30,9 +36,11 @@ Timestamp = int
 TimeRange = tuple[int, int]
 
 TimeWindow = tuple[Timestamp, Timestamp, Seconds]
-RRDColumnFunction = Callable[[Timestamp, Timestamp], "TimeSeries"]
+RRDColumnFunction = Callable[[Sequence[TimeRange]], list["TimeSeries"]]
 TimeSeriesValue = float | None
 TimeSeriesValues = list[TimeSeriesValue]
+# None values are represented by NaN in the array representation of a time series
+TimeSeriesArray = npt.NDArray[np.float64]
 ConsolidationFunctionName = str
 Timegroup = NewType("Timegroup", str)
 EstimatedLevel = float | None
@@ -59,7 +67,10 @@ class PredictionInfo:
 
     @classmethod
     def loads(cls, raw: str, *, name: Timegroup) -> "PredictionInfo":
-        data = json.loads(raw)
+        return cls.from_dict(json.loads(raw), name=name)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], *, name: Timegroup) -> "PredictionInfo":
         range_ = data["range"]
         return cls(
             name=name,  # explicitly passed. (not in `data` before 2.1)
@@ -71,8 +82,11 @@ class PredictionInfo:
             params=dict(data["params"]),
         )
 
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
     def dumps(self) -> str:
-        return json.dumps(asdict(self))
+        return json.dumps(self.to_dict())
 
 
 @dataclass(frozen=True)
@@ -135,6 +149,69 @@ def aggregation_functions(
             raise ValueError(f"Invalid Aggregation function {aggr}, only max, min, average allowed")
 
 
+def values_to_array(values: Iterable[TimeSeriesValue]) -> TimeSeriesArray:
+    """
+    >>> values_to_array([1, None, 2.5])
+    array([1. , nan, 2.5])
+    """
+    return np.array(values if isinstance(values, list) else list(values), dtype=np.float64)
+
+
+def array_to_values(array: TimeSeriesArray) -> TimeSeriesValues:
+    """
+    >>> array_to_values(np.array([1.0, np.nan, 2.5]))
+    [1.0, None, 2.5]
+    """
+    return np.where(np.isnan(array), None, array).tolist()
+
+
+def _aggregate_bins(
+    values: TimeSeriesArray,
+    bins: npt.NDArray[np.intp],
+    num_bins: int,
+    aggr: ConsolidationFunctionName | None,
+) -> TimeSeriesArray:
+    """Vectorized version of aggregation_functions applied to each bin
+
+    bins must be sorted. Bins without any (non-None) values result in NaN."""
+    valid = ~np.isnan(values)
+    values, bins = values[valid], bins[valid]
+    result = np.full(num_bins, np.nan)
+    if not len(values):
+        return result
+
+    aggr = "max" if aggr is None else aggr.lower()
+    match aggr:
+        case "average":
+            counts = np.bincount(bins, minlength=num_bins)
+            sums = np.bincount(bins, weights=values, minlength=num_bins)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(counts > 0, sums / counts, np.nan)
+        case "max" | "min":
+            starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+            reduce = np.fmax.reduceat if aggr == "max" else np.fmin.reduceat
+            result[bins[starts]] = reduce(values, starts)
+            return result
+        case _:
+            raise ValueError(f"Invalid Aggregation function {aggr}, only max, min, average allowed")
+
+
+def _is_stepwise(indices: npt.NDArray[np.intp], limit: int) -> bool:
+    """Check whether the indices advance by at most one per element, starting at 0 or 1
+
+    This is what the element wise resampling algorithms do, so only in this case the vectorized
+    computation yields the identical result."""
+    return bool(
+        len(indices) == 0
+        or (
+            indices[0] <= 1
+            and indices[-1] < limit
+            and ((diff := np.diff(indices)) >= 0).all()
+            and (diff <= 1).all()
+        )
+    )
+
+
 class TimeSeries:
     """Describes the returned time series returned by livestatus
 
@@ -160,7 +237,7 @@ class TimeSeries:
         self,
         data: TimeSeriesValues,
         time_window: TimeWindow | None = None,
-        conversion: Callable[[float], float] = lambda v: v,
+        conversion: Callable[[float], float] | None = None,
         **metadata: str,
     ) -> None:
         if time_window is None:
@@ -174,9 +251,20 @@ class TimeSeries:
         self.start = int(time_window[0])
         self.end = int(time_window[1])
         self.step = int(time_window[2])
-        self.values = [v if v is None else conversion(v) for v in data]
+        self.values = (
+            list(data) if conversion is None else [v if v is None else conversion(v) for v in data]
+        )
         self.metadata = metadata
 
+    @classmethod
+    def from_array(
+        cls, array: TimeSeriesArray, time_window: TimeWindow, **metadata: str
+    ) -> "TimeSeries":
+        return cls(array_to_values(array), time_window, **metadata)
+
+    def as_array(self) -> TimeSeriesArray:
+        return values_to_array(self.values)
+
     @property
     def twindow(self) -> TimeWindow:
         return self.start, self.end, self.step
@@ -187,19 +275,30 @@ class TimeSeries:
         twindow : 3-tuple, (start, end, step)
              description of target time interval
         """
+        start, end, step = twindow
+        if start == self.start and end == self.end and step == self.step:
+            return self.values
+
+        if not self.step or not step:
+            return self._bfill_upsample_elementwise(twindow, shift)
+
+        thresholds = np.arange(self.start + self.step, self.end + self.step, self.step) + shift
+        indices = np.searchsorted(thresholds, np.arange(start, end, step), side="right")
+        if not _is_stepwise(indices, min(len(self.values), len(thresholds))):
+            return self._bfill_upsample_elementwise(twindow, shift)
+
+        return array_to_values(self.as_array()[indices])
+
+    def _bfill_upsample_elementwise(self, twindow: TimeWindow, shift: Seconds) -> TimeSeriesValues:
         upsa = []
         i = 0
         start, end, step = twindow
         current_times = rrd_timestamps(self.twindow)
-        if start != self.start or end != self.end or step != self.step:
-            for t in range(start, end, step):
-                if t >= current_times[i] + shift:
-                    i += 1
-                upsa.append(self.values[i])
-
-            return upsa
-
-        return self.values
+        for t in range(start, end, step):
+            if t >= current_times[i] + shift:
+                i += 1
+            upsa.append(self.values[i])
+        return upsa
 
     def downsample(
         self, twindow: TimeWindow, cf: ConsolidationFunctionName | None = "max"
@@ -211,26 +310,40 @@ class TimeSeries:
         cf : str ('max', 'average', 'min')
              consolidation function imitating RRD methods
         """
+        start, end, step = twindow
+        if start == self.start and end == self.end and step == self.step:
+            return self.values
+
+        desired_times = np.array(rrd_timestamps(twindow), dtype=np.int64)
+        current_times = np.array(rrd_timestamps(self.twindow), dtype=np.int64)
+        bins = np.searchsorted(desired_times, current_times[: len(self.values)], side="left")
+        if not _is_stepwise(bins, len(desired_times)):
+            return self._downsample_elementwise(twindow, cf)
+
+        return array_to_values(
+            _aggregate_bins(self.as_array()[: len(bins)], bins, len(desired_times), cf)
+        )
+
+    def _downsample_elementwise(
+        self, twindow: TimeWindow, cf: ConsolidationFunctionName | None
+    ) -> TimeSeriesValues:
         dwsa = []
         co: TimeSeriesValues = []
-        start, end, step = twindow
         desired_times = rrd_timestamps(twindow)
-        if start != self.start or end != self.end or step != self.step:
-            i = 0
-            for t, val in self.time_data_pairs():
-                if t > desired_times[i]:
-                    dwsa.append(aggregation_functions(co, cf))
-                    co = []
-                    i += 1
-                co.append(val)
-
-            diff_len = len(desired_times) - len(dwsa)
-            if diff_len > 0:
+        i = 0
+        for t, val in self.time_data_pairs():
+            if t > desired_times[i]:
                 dwsa.append(aggregation_functions(co, cf))
-                dwsa += [None] * (diff_len - 1)
+                co = []
+                i += 1
+            co.append(val)
+
+        diff_len = len(desired_times) - len(dwsa)
+        if diff_len > 0:
+            dwsa.append(aggregation_functions(co, cf))
+            dwsa += [None] * (diff_len - 1)
 
-            return dwsa
-        return self.values
+        return dwsa
 
     def time_data_pairs(self) -> list[tuple[Timestamp, TimeSeriesValue]]:
         return list(zip(rrd_timestamps(self.twindow), self.values))
@@ -319,27 +432,50 @@ def get_rrd_data(
           x---v---v---v---v---y
 
     """
+    return get_rrd_data_batch(
+        connection,
+        hostname,
+        service_description,
+        varname,
+        cf,
+        [(fromtime, untiltime)],
+        max_entries,
+    )[0]
+
+
+def get_rrd_data_batch(
+    connection: livestatus.SingleSiteConnection,
+    hostname: HostName,
+    service_description: ServiceName,
+    varname: MetricName,
+    cf: ConsolidationFunctionName,
+    time_ranges: Sequence[TimeRange],
+    max_entries: int = 400,
+) -> list[TimeSeries]:
+    """Fetch several time ranges of the same metric with a single Livestatus query
 
+    Each time range is requested as a separate rrddata column, see get_rrd_data."""
     step = 1
     rpn = f"{varname}.{cf.lower()}"  # "MAX" -> "max"
-    point_range = ":".join(
-        livestatus.lqencode(str(x)) for x in (fromtime, untiltime, step, max_entries)
-    )
-    column = f"rrddata:m1:{rpn}:{point_range}"
+    columns = [
+        f"rrddata:m{nr}:{rpn}:"
+        + ":".join(livestatus.lqencode(str(x)) for x in (fromtime, untiltime, step, max_entries))
+        for nr, (fromtime, untiltime) in enumerate(time_ranges)
+    ]
 
-    lql = livestatus_lql([hostname], [column], service_description) + "OutputFormat: python\n"
+    lql = livestatus_lql([hostname], columns, service_description) + "OutputFormat: python\n"
 
     try:
-        response = connection.query_value(lql)
+        response = connection.query_row(lql)
     except livestatus.MKLivestatusNotFoundError as e:
         if cmk.utils.debug.enabled():
             raise
         raise MKGeneralException(f"Cannot get historic metrics via Livestatus: {e}")
 
-    if response is None:
+    if any(r is None for r in response):
         raise MKGeneralException("Cannot retrieve historic data with Nagios Core")
 
-    return TimeSeries(response)
+    return [TimeSeries(r) for r in response]
 
 
 def rrd_datacolum(
@@ -349,23 +485,214 @@ def rrd_datacolum(
     varname: MetricName,
     cf: ConsolidationFunctionName,
 ) -> RRDColumnFunction:
-    "Partial helper function to get rrd data"
+    "Partial helper function to get rrd data of several time ranges at once"
 
-    def time_boundaries(fromtime: Timestamp, untiltime: Timestamp) -> TimeSeries:
-        return get_rrd_data(
-            connection, hostname, service_description, varname, cf, fromtime, untiltime
+    def time_boundaries(time_ranges: Sequence[TimeRange]) -> list[TimeSeries]:
+        return get_rrd_data_batch(
+            connection, hostname, service_description, varname, cf, time_ranges
         )
 
     return time_boundaries
 
 
+_PREDICTION_STORE_VERSION = 1
+
+# Parsed indexes of the host prediction stores, validated by the stat result of the index file
+_index_cache: dict[Path, tuple[tuple[int, int, int], dict[str, Any]]] = {}
+
+
+class _HostPredictionStore:
+    """All predictions of one host in two files instead of two files per prediction
+
+    The JSON index maps service, metric and time group to the prediction information and the
+    position of the prediction points in the data file. The points are stored as raw float64
+    values (NaN representing None) which are appended to the data file. Once more than half of
+    the data file is occupied by replaced predictions, it is rewritten.
+    """
+
+    def __init__(self, host_name: HostName) -> None:
+        self._dir: Final = Path(cmk.utils.paths.var_dir, "prediction_store")
+        self._host_name: Final = host_name
+        self._index_path: Final = self._dir / f"{host_name}.index"
+
+    def _empty_index(self) -> dict[str, Any]:
+        return {
+            "version": _PREDICTION_STORE_VERSION,
+            "generation": 0,
+            "garbage": 0,
+            "predictions": {},
+        }
+
+    def _load_index(self) -> dict[str, Any]:
+        try:
+            stat = self._index_path.stat()
+        except FileNotFoundError:
+            return self._empty_index()
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if (cached := _index_cache.get(self._index_path)) is not None and cached[0] == signature:
+            return cached[1]
+
+        try:
+            # The file is empty if it has only been created for locking
+            index = json.loads(raw) if (raw := self._index_path.read_bytes()) else None
+        except (OSError, ValueError) as e:
+            logger.log(VERBOSE, "Invalid prediction index %s: %s", self._index_path, e)
+            index = None
+        if index is None or index.get("version") != _PREDICTION_STORE_VERSION:
+            index = self._empty_index()
+
+        _index_cache[self._index_path] = signature, index
+        return index
+
+    def _data_path(self, index: Mapping[str, Any]) -> Path:
+        return self._dir / f"{self._host_name}.{index['generation']}.data"
+
+    def _entry(
+        self,
+        index: Mapping[str, Any],
+        service_description: ServiceName,
+        dsname: MetricName,
+        timegroup: Timegroup,
+    ) -> dict[str, Any] | None:
+        return index["predictions"].get(service_description, {}).get(dsname, {}).get(timegroup)
+
+    def infos(self, service_description: ServiceName, dsname: MetricName) -> list[PredictionInfo]:
+        return [
+            PredictionInfo.from_dict(entry["info"], name=Timegroup(timegroup))
+            for timegroup, entry in (
+                self._load_index()["predictions"].get(service_description, {}).get(dsname, {})
+            ).items()
+        ]
+
+    def get_info(
+        self, service_description: ServiceName, dsname: MetricName, timegroup: Timegroup
+    ) -> PredictionInfo | None:
+        entry = self._entry(self._load_index(), service_description, dsname, timegroup)
+        return None if entry is None else PredictionInfo.from_dict(entry["info"], name=timegroup)
+
+    def get_data(
+        self, service_description: ServiceName, dsname: MetricName, timegroup: Timegroup
+    ) -> PredictionData | None:
+        # The data file is replaced while it is rewritten. In case we hit this, the index has
+        # changed as well and we try once more.
+        for _attempt in range(2):
+            index = self._load_index()
+            if (entry := self._entry(index, service_description, dsname, timegroup)) is None:
+                return None
+            try:
+                points = self._read_points(self._data_path(index), entry)
+            except FileNotFoundError:
+                _index_cache.pop(self._index_path, None)
+                continue
+
+            return PredictionData(
+                columns=entry["columns"],
+                points=np.where(np.isnan(points), None, points).tolist(),
+                num_points=entry["num_points"],
+                data_twindow=entry["data_twindow"],
+                step=entry["step"],
+            )
+        return None
+
+    @staticmethod
+    def _read_points(data_path: Path, entry: Mapping[str, Any]) -> npt.NDArray[np.float64]:
+        shape = (entry["num_points"], len(entry["columns"]))
+        with data_path.open("rb") as f:
+            f.seek(entry["offset"])
+            raw = f.read(8 * shape[0] * shape[1])
+        return np.frombuffer(raw, dtype="<f8").reshape(shape)
+
+    def save(
+        self,
+        service_description: ServiceName,
+        dsname: MetricName,
+        info: PredictionInfo,
+        data_for_pred: PredictionData,
+    ) -> None:
+        raw_points = (
+            np.array(data_for_pred.points, dtype=np.float64)
+            .reshape(data_for_pred.num_points, len(data_for_pred.columns))
+            .astype("<f8")
+            .tobytes()
+        )
+        with store.locked(self._index_path):
+            index = copy.deepcopy(self._load_index())
+            data_path = self._data_path(index)
+            with data_path.open("ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(raw_points)
+
+            metric = index["predictions"].setdefault(service_description, {}).setdefault(dsname, {})
+            if (old := metric.get(info.name)) is not None:
+                index["garbage"] += self._size(old)
+            metric[info.name] = {
+                "info": info.to_dict(),
+                "columns": data_for_pred.columns,
+                "num_points": data_for_pred.num_points,
+                "data_twindow": data_for_pred.data_twindow,
+                "step": data_for_pred.step,
+                "offset": offset,
+            }
+            self._save_index(index, offset + len(raw_points))
+
+    def remove(
+        self, service_description: ServiceName, dsname: MetricName, timegroup: Timegroup
+    ) -> None:
+        if self._entry(self._load_index(), service_description, dsname, timegroup) is None:
+            return
+
+        with store.locked(self._index_path):
+            index = copy.deepcopy(self._load_index())
+            metric = index["predictions"].get(service_description, {}).get(dsname, {})
+            if (old := metric.pop(timegroup, None)) is None:
+                return
+            index["garbage"] += self._size(old)
+            self._save_index(index, self._data_path(index).stat().st_size)
+
+    @staticmethod
+    def _size(entry: Mapping[str, Any]) -> int:
+        return 8 * entry["num_points"] * len(entry["columns"])
+
+    def _save_index(self, index: dict[str, Any], data_size: int) -> None:
+        old_data_path = None
+        if 2 * index["garbage"] > data_size:
+            old_data_path = self._data_path(index)
+            self._rewrite_data(index)
+        store.save_bytes_to_file(self._index_path, json.dumps(index).encode("utf-8"))
+        if old_data_path is not None:
+            old_data_path.unlink(missing_ok=True)
+
+    def _rewrite_data(self, index: dict[str, Any]) -> None:
+        """Write the points of all current predictions to a new data file"""
+        old_data_path = self._data_path(index)
+        index["generation"] += 1
+        index["garbage"] = 0
+        with self._data_path(index).open("wb") as f:
+            for metrics in index["predictions"].values():
+                for timegroups in metrics.values():
+                    for entry in timegroups.values():
+                        points = self._read_points(old_data_path, entry)
+                        entry["offset"] = f.tell()
+                        f.write(points.tobytes())
+
+
 class PredictionStore:
+    """The predictions of the time groups of one metric
+
+    Predictions are kept in the store of the host. Predictions from previous versions, which used
+    separate files for each time group, are still used until they are recomputed.
+    """
+
     def __init__(
         self,
         host_name: HostName,
         service_description: ServiceName,
         dsname: MetricName,
     ) -> None:
+        self._host_store: Final = _HostPredictionStore(host_name)
+        self._service_description: Final = service_description
+        self._dsname: Final = dsname
         self._dir = Path(
             cmk.utils.paths.var_dir,
             "prediction",
@@ -375,10 +702,16 @@ class PredictionStore:
         )
 
     def available_predictions(self) -> Iterable[PredictionInfo]:
-        return (
+        infos = {
+            info.name: info
+            for info in self._host_store.infos(self._service_description, self._dsname)
+        }
+        yield from infos.values()
+        yield from (
             tg_info
             for f in self._dir.glob("*.info")
-            if (tg_info := self.get_info(Timegroup(f.stem))) is not None
+            if Timegroup(f.stem) not in infos
+            and (tg_info := self._get_legacy_info(Timegroup(f.stem))) is not None
         )
 
     def _data_file(self, timegroup: Timegroup) -> Path:
@@ -392,13 +725,15 @@ class PredictionStore:
         info: PredictionInfo,
         data_for_pred: PredictionData,
     ) -> None:
-        self._dir.mkdir(exist_ok=True, parents=True)
-        with self._info_file(info.name).open("w") as fname:
-            fname.write(info.dumps())
-        with self._data_file(info.name).open("w") as fname:
-            fname.write(data_for_pred.dumps())
+        self._host_store.save(self._service_description, self._dsname, info, data_for_pred)
+        self._remove_legacy_files(info.name, force=True)
 
     def clean_prediction_files(self, timegroup: Timegroup, force: bool = False) -> None:
+        self._remove_legacy_files(timegroup, force)
+        if force:
+            self._host_store.remove(self._service_description, self._dsname, timegroup)
+
+    def _remove_legacy_files(self, timegroup: Timegroup, force: bool) -> None:
         # In previous versions it could happen that the files were created with 0 bytes of size
         # which was never handled correctly so that the prediction could never be used again until
         # manual removal of the files. Clean this up.
@@ -409,10 +744,21 @@ class PredictionStore:
                     logger.log(VERBOSE, "Removed obsolete prediction %s", file_path.name)
 
     def get_info(self, timegroup: Timegroup) -> PredictionInfo | None:
+        if (
+            info := self._host_store.get_info(self._service_description, self._dsname, timegroup)
+        ) is not None:
+            return info
+        return self._get_legacy_info(timegroup)
+
+    def _get_legacy_info(self, timegroup: Timegroup) -> PredictionInfo | None:
         raw = self._read_file(self._info_file(timegroup))
         return None if raw is None else PredictionInfo.loads(raw, name=timegroup)
 
     def get_data(self, timegroup: Timegroup) -> PredictionData | None:
+        if (
+            data := self._host_store.get_data(self._service_description, self._dsname, timegroup)
+        ) is not None:
+            return data
         raw = self._read_file(self._data_file(timegroup))
         return None if raw is None else PredictionData.loads(raw)
 
@@ -424,7 +770,7 @@ class PredictionStore:
             logger.log(VERBOSE, "No previous prediction for group %s available.", file_path.stem)
         except ValueError:
             logger.log(VERBOSE, "Invalid prediction file %s, old format", file_path)
-            self.clean_prediction_files(Timegroup(file_path.stem), force=True)
+            self._remove_legacy_files(Timegroup(file_path.stem), force=True)
         return None
 
 
@@ -119,6 +119,15 @@ TableEventConsoleStatus::TableEventConsoleStatus(ICore *mc)
     addColumn(ECRow::makeIntColumn(
         "status_event_limit_active_overall",
         "Whether or not the overall event limit is in effect (0/1)", offsets));
+
+    addColumn(ECRow::makeDoubleColumn(
+        "status_state_save_time",
+        "The duration of the last save of the event state in seconds",
+        offsets));
+    addColumn(ECRow::makeDoubleColumn(
+        "status_state_load_time",
+        "The duration of loading the event state on startup in seconds",
+        offsets));
 }
 
 std::string TableEventConsoleStatus::name() const {
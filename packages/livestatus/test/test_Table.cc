@@ -657,6 +657,8 @@ static ColumnDefinitions event_console_status_columns() {
         {"status_rule_hits", ColumnType::int_},
         {"status_rule_trie_rate", ColumnType::double_},
         {"status_rule_tries", ColumnType::int_},
+        {"status_state_load_time", ColumnType::double_},
+        {"status_state_save_time", ColumnType::double_},
         {"status_virtual_memory_size", ColumnType::int_},
     };
 }
@@ -677,6 +677,50 @@ def test_agent_data_success(
     assert response.status_code == 204
 
 
+@pytest.mark.usefixtures("symlink_push_host")
+def test_agent_data_success_multiple_chunks(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    client: TestClient,
+    uuid: UUID4,
+    agent_data_headers: Mapping[str, str],
+) -> None:
+    mocker.patch("agent_receiver.endpoints._AGENT_DATA_CHUNK_SIZE", 16)
+    agent_output = b"".join(b"<<<section_%d>>>\nline %d\n" % (i, i) for i in range(1000))
+
+    response = client.post(
+        f"/agent_data/{uuid}",
+        headers=typeshed_issue_7724(agent_data_headers),
+        files={"monitoring_data": ("filename", io.BytesIO(compress(agent_output)))},
+    )
+
+    assert response.status_code == 204
+    assert (tmp_path / "push-agent" / "hostname" / "agent_output").read_bytes() == agent_output
+
+
+@pytest.mark.usefixtures("symlink_push_host")
+def test_agent_data_too_large(
+    tmp_path: Path,
+    mocker: MockerFixture,
+    client: TestClient,
+    uuid: UUID4,
+    agent_data_headers: Mapping[str, str],
+) -> None:
+    mocker.patch("agent_receiver.endpoints._AGENT_DATA_MAX_SIZE", 1024)
+
+    response = client.post(
+        f"/agent_data/{uuid}",
+        headers=typeshed_issue_7724(agent_data_headers),
+        files={"monitoring_data": ("filename", io.BytesIO(compress(2048 * b"a")))},
+    )
+
+    assert response.status_code == 413
+    assert response.json() == {
+        "detail": "Decompressed agent data exceeds the maximum size of 1024 bytes"
+    }
+    assert not list((tmp_path / "push-agent" / "hostname").iterdir())
+
+
 @pytest.fixture(name="registration_status_headers")
 def fixture_registration_status_headers(uuid: UUID4) -> Mapping[str, str]:
     return {
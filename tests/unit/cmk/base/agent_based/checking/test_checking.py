@@ -10,6 +10,7 @@ from pytest import MonkeyPatch
 
 from tests.testlib.base import Scenario
 
+from cmk.utils.cpu_tracking import Snapshot
 from cmk.utils.hostaddress import HostName
 
 from cmk.checkengine.checkresults import ServiceCheckResult
@@ -328,3 +329,16 @@ def test_config_cache_get_clustered_service_node_keys_clustered(monkeypatch: Mon
         cluster_nodes=[node1, node2],
         get_effective_host=lambda hn, *args, **kw: hn,
     )
+
+
+def test_timing_results_contain_the_phases() -> None:
+    result = checking._timing_results(
+        Snapshot.null(),
+        (),
+        {"parse": 0.5, "submit": 0.25, "fetch": 1.0},
+        perfdata_with_times=True,
+    )
+    assert [p for p in result.metrics if p.startswith("cmk_time_")] == [
+        "cmk_time_parse=0.500",
+        "cmk_time_submit=0.250",
+    ]
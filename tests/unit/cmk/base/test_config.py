@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import itertools
 import re
 import shutil
 import socket
@@ -31,18 +32,19 @@ from cmk.snmplib import SNMPBackendEnum
 
 from cmk.fetchers import Mode, TCPEncryptionHandling
 
-from cmk.checkengine.check_table import ConfiguredService, ServiceID
+from cmk.checkengine.check_table import ConfiguredService, HostCheckTable, ServiceID
 from cmk.checkengine.checking import CheckPluginName
 from cmk.checkengine.discovery import AutocheckEntry, DiscoveryCheckParameters, HostLabel
-from cmk.checkengine.inventory import InventoryPlugin
+from cmk.checkengine.inventory import InventoryPlugin, InventoryPluginName
 from cmk.checkengine.parameters import TimespecificParameters, TimespecificParameterSet
 from cmk.checkengine.sectionparser import ParsedSectionName
 
 import cmk.base.api.agent_based.register as agent_based_register
 import cmk.base.config as config
 from cmk.base.api.agent_based.checking_classes import CheckPlugin as CheckPluginAPI
+from cmk.base.api.agent_based.inventory_classes import InventoryPlugin as InventoryPluginAPI
 from cmk.base.api.agent_based.register.utils_legacy import LegacyCheckDefinition
-from cmk.base.api.agent_based.type_defs import SNMPSectionPlugin
+from cmk.base.api.agent_based.type_defs import AgentSectionPlugin, SNMPSectionPlugin
 from cmk.base.config import ConfigCache, ip_address_of
 from cmk.base.ip_lookup import AddressFamily
 
@@ -1648,6 +1650,78 @@ def test_get_sorted_check_table_no_cmc(
     ]
 
 
+@pytest.mark.parametrize(
+    "status_data_inventory, result",
+    [
+        (False, {"checked", "superseding"}),
+        (True, {"checked", "superseding", "inventorized"}),
+    ],
+)
+def test_needed_sections(
+    monkeypatch: MonkeyPatch,
+    service_list: list[ConfiguredService],
+    status_data_inventory: bool,
+    result: set[str],
+) -> None:
+    host_name = HostName("horst")
+    ts = Scenario()
+    ts.add_host(host_name)
+    ts.set_option(
+        "active_checks",
+        {"cmk_inv": [{"condition": {}, "value": {"status_data_inventory": status_data_inventory}}]},
+    )
+    config_cache = ts.apply(monkeypatch)
+
+    def section(name: str, supersedes: set[SectionName]) -> AgentSectionPlugin:
+        return AgentSectionPlugin(
+            SectionName(name),
+            ParsedSectionName(name),
+            lambda string_table: string_table,
+            lambda section: (),
+            None,
+            None,
+            "merged",
+            supersedes,
+            None,
+        )
+
+    monkeypatch.setattr(
+        config_cache,
+        "check_table",
+        lambda *args, **kwargs: HostCheckTable(services=service_list[:1]),
+    )
+    monkeypatch.setattr(
+        agent_based_register,
+        "iter_all_inventory_plugins",
+        lambda: [
+            InventoryPluginAPI(InventoryPluginName("inventorized"), [], lambda: (), {}, None, "")
+        ],
+    )
+    monkeypatch.setattr(
+        agent_based_register,
+        "get_relevant_raw_sections",
+        lambda *, check_plugin_names, inventory_plugin_names: {
+            SectionName(name): section(name, set())
+            for name in itertools.chain(
+                ("checked" for _name in check_plugin_names),
+                (str(name) for name in inventory_plugin_names),
+            )
+        },
+    )
+    monkeypatch.setattr(
+        agent_based_register,
+        "iter_all_agent_sections",
+        lambda: [
+            section("checked", set()),
+            section("superseding", {SectionName("checked")}),
+            section("superseding_other", {SectionName("other")}),
+        ],
+    )
+    monkeypatch.setattr(agent_based_register, "iter_all_snmp_sections", lambda: [])
+
+    assert config_cache.needed_sections(host_name) == {SectionName(name) for name in result}
+
+
 def test_resolve_service_dependencies_cyclic(
     monkeypatch: MonkeyPatch, service_list: list[ConfiguredService]
 ) -> None:
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import os
+import time
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from cmk.utils.notify import NotificationResultCode
+from cmk.utils.notify_types import NotificationContext
+
+from cmk.base import notify, notify_bulks
+from cmk.base.notify_bulks import BulkIndex
+
+
+@pytest.fixture(name="bulk_dir")
+def fixture_bulk_dir(monkeypatch: MonkeyPatch, tmp_path: Path) -> Path:
+    bulk_dir = tmp_path / "bulk"
+    monkeypatch.setattr(notify, "notification_bulkdir", str(bulk_dir))
+    monkeypatch.setattr(notify, "log_to_history", lambda message: None)
+    return bulk_dir
+
+
+def _store(contact: str, host: str, interval: int = 60, count: int = 3) -> None:
+    notify.do_bulk_notify(
+        "mail",
+        {},
+        NotificationContext(
+            {
+                "WHAT": "HOST",
+                "CONTACTNAME": contact,
+                "HOSTNAME": host,
+                "HOSTSTATE": "DOWN",
+                "HOSTOUTPUT": "Packet loss",
+            }
+        ),
+        {"interval": interval, "count": count, "groupby": ["host"]},
+    )
+
+
+def _index(bulk_dir: Path) -> BulkIndex:
+    return BulkIndex(bulk_dir, logging.getLogger("test"))
+
+
+def _hosts(bulk_dirs: list[str]) -> list[str]:
+    return [d.rsplit(",", 1)[-1] for d in bulk_dirs]
+
+
+def test_bulk_index_is_built_from_directories(bulk_dir: Path) -> None:
+    _store("alice", "host-1")
+    _store("alice", "host-1")
+    _store("bob", "host-2")
+    (bulk_dir / "alice" / "mail" / "invalid").mkdir()
+
+    index = _index(bulk_dir)
+    index.refresh(time.time())
+
+    assert sorted(len(b.notifications) for b in index.bulks().values()) == [1, 2]
+    assert [b[0] for b in notify.find_bulks(False)] == sorted(index.bulks())
+
+
+def test_other_processes_are_followed_by_the_journal(
+    bulk_dir: Path, monkeypatch: MonkeyPatch
+) -> None:
+    _store("alice", "host-1")
+    index = _index(bulk_dir)
+    index.refresh(now := time.time())
+
+    # Stored by another process
+    _store("alice", "host-2")
+    _store("alice", "host-2")
+    with monkeypatch.context() as m:
+        m.setattr(os, "listdir", lambda path: pytest.fail("Directory scanned"))
+        index.refresh(now)
+        assert sorted(_hosts(list(index.bulks()))) == ["host-1", "host-2"]
+
+        # Sent by another process
+        bulk_of_host_1 = next(d for d in index.bulks() if d.endswith("host-1"))
+        notify_bulks.BulkIndex(bulk_dir, logging.getLogger("test")).remove(
+            bulk_of_host_1, list(index.bulks()[bulk_of_host_1].notifications)
+        )
+        index.refresh(now)
+        assert _hosts(list(index.bulks())) == ["host-2"]
+
+
+def test_ripe_bulks(bulk_dir: Path) -> None:
+    _store("alice", "by-interval", interval=60, count=10)
+    _store("alice", "by-count", interval=60, count=2)
+    _store("alice", "by-count", interval=60, count=2)
+    index = _index(bulk_dir)
+    index.refresh(now := time.time())
+
+    assert _hosts(index.ripe_candidates(now)) == ["by-count"]
+    # Ripe bulks are found until they are sent
+    assert sorted(_hosts(index.ripe_candidates(now + 61))) == ["by-count", "by-interval"]
+    by_count = index.ripe_candidates(now)[0]
+    index.remove(by_count, list(index.bulks()[by_count].notifications))
+    assert _hosts(index.ripe_candidates(now + 61)) == ["by-interval"]
+
+
+def test_send_ripe_bulks(bulk_dir: Path, monkeypatch: MonkeyPatch) -> None:
+    sent = []
+
+    def call_bulk_notification_script(
+        plugin_name: str, context_lines: list[str]
+    ) -> tuple[NotificationResultCode, list[str]]:
+        sent.append(sum(line == "\n" for line in context_lines))
+        return NotificationResultCode(0), []
+
+    monkeypatch.setattr(notify, "call_bulk_notification_script", call_bulk_notification_script)
+    _store("alice", "host-1", count=2)
+    _store("alice", "host-1", count=2)
+    _store("alice", "host-2", count=2)
+
+    notify.send_ripe_bulks()
+
+    assert sent == [2]
+    assert _hosts([b[0] for b in notify.find_bulks(False)]) == ["host-2"]
+    assert sorted(p.name for p in (bulk_dir / "alice" / "mail").iterdir()) == ["60,2,host,host-2"]
+
+
+def test_truncated_journal_is_followed_by_a_scan(bulk_dir: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(notify_bulks, "_MAX_JOURNAL_SIZE", 0)
+    _store("alice", "host-1")
+    index = _index(bulk_dir)
+    other = _index(bulk_dir)
+    index.refresh(now := time.time())
+    other.refresh(now)
+
+    _store("alice", "host-2")
+    index.refresh(now)  # Replays and truncates
+    assert (bulk_dir / notify_bulks.JOURNAL_NAME).stat().st_size == 0
+    _store("alice", "host-3")
+
+    other.refresh(now)
+    assert sorted(_hosts(list(other.bulks()))) == ["host-1", "host-2", "host-3"]
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+from tests.testlib.utils import repo_path
+
+import cmk.utils.paths
+from cmk.utils.notify_types import NotificationContext
+
+import cmk.base.config as config
+from cmk.base import notify, notify_pool
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.status = 200
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/hook"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Keep the connections open
+    protocol_version = "HTTP/1.1"
+    server: _StubServer
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            self.server.requests += 1
+        body = b"stub response"
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(name="stub_server")
+def fixture_stub_server() -> Iterator[_StubServer]:
+    server = _StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(name="history")
+def fixture_history(
+    monkeypatch: MonkeyPatch, tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> list[str]:
+    messages: list[str] = []
+    monkeypatch.setattr(notify, "log_to_history", messages.append)
+    monkeypatch.setattr(cmk.utils.paths, "notifications_dir", repo_path() / "notifications")
+    monkeypatch.setattr(cmk.utils.paths, "local_notifications_dir", tmp_path)
+    # For the plugin scripts
+    monkeypatch.setenv("PYTHONPATH", str(repo_path()))
+    # Live logging of pytest swaps sys.stderr meanwhile, which bypasses the captured output
+    caplog.set_level(logging.WARNING, logger=notify.logger.name)
+    return messages
+
+
+def _context(url: str, host: str = "heute") -> NotificationContext:
+    return NotificationContext(
+        {
+            "PARAMETER_WEBHOOK_URL": f"webhook {url}",
+            "WHAT": "HOST",
+            "NOTIFICATIONTYPE": "PROBLEM",
+            "HOSTNAME": host,
+            "HOSTADDRESS": "127.0.0.1",
+            "HOSTSTATE": "DOWN",
+            "HOSTOUTPUT": "Packet loss",
+            "CONTACTNAME": "admin",
+            "LONGDATETIME": "Mon Oct 19 12:00:00 CEST 2026",
+        }
+    )
+
+
+def test_execute_plugin(stub_server: _StubServer) -> None:
+    context = dict(_context(stub_server.url))
+    assert notify_pool.execute_plugin("slack", context, 10) == (0, ["200: OK"])
+
+    stub_server.status = 503
+    assert notify_pool.execute_plugin("slack", context, 10) == (1, ["503: Service Unavailable"])
+
+    stub_server.status = 404
+    assert notify_pool.execute_plugin("slack", context, 10) == (
+        2,
+        ["Failed to send notification.", "Response: stub response", "404: Not Found"],
+    )
+
+    # Missing variables crash the plugin
+    exitcode, output = notify_pool.execute_plugin("slack", {"PARAMETER_WEBHOOK_URL": "x"}, 10)
+    assert exitcode == 1
+    assert output[-1] == "KeyError: 'HOSTSTATE'"
+
+
+def test_in_process_call_equals_script_call(
+    monkeypatch: MonkeyPatch, stub_server: _StubServer, history: list[str]
+) -> None:
+    stub_server.status = 404
+    assert notify.call_notification_script("slack", _context(stub_server.url)) == 2
+    monkeypatch.setattr(config, "notification_plugin_workers", 2)
+    assert notify.call_notification_script("slack", _context(stub_server.url)) == 2
+
+    assert stub_server.requests == 2
+    assert history[0:2] == history[2:4]
+    assert "404: Not Found" in history[1]
+
+
+def test_customized_plugins_are_executed_as_scripts(
+    monkeypatch: MonkeyPatch, history: list[str]
+) -> None:
+    monkeypatch.setattr(config, "notification_plugin_workers", 2)
+    assert notify._execute_in_process("slack")
+    assert not notify._execute_in_process("mail")
+
+    (cmk.utils.paths.local_notifications_dir / "slack").touch()
+    assert not notify._execute_in_process("slack")
+
+
+def test_pooled_calls_reuse_connections(
+    monkeypatch: MonkeyPatch, stub_server: _StubServer, history: list[str]
+) -> None:
+    monkeypatch.setattr(config, "notification_plugin_workers", 4)
+    for num in range(40):
+        notify._call_notification_script_pooled("slack", _context(stub_server.url, f"host-{num}"))
+    notify.wait_for_pooled_notification_scripts()
+
+    assert stub_server.requests == 40
+    assert stub_server.connections <= 4
+    results = [message for message in history if "200: OK" in message]
+    assert len(results) == 40
+
+
+def test_pooled_calls_are_faster_than_scripts(
+    monkeypatch: MonkeyPatch, stub_server: _StubServer, history: list[str]
+) -> None:
+    before = time.time()
+    for num in range(5):
+        notify._call_notification_script_pooled("slack", _context(stub_server.url, f"host-{num}"))
+    notify.wait_for_pooled_notification_scripts()
+    duration_scripts = time.time() - before
+
+    monkeypatch.setattr(config, "notification_plugin_workers", 4)
+    before = time.time()
+    for num in range(50):
+        notify._call_notification_script_pooled("slack", _context(stub_server.url, f"host-{num}"))
+    notify.wait_for_pooled_notification_scripts()
+    duration_pooled = time.time() - before
+
+    assert stub_server.requests == 55
+    # Starting the interpreter and importing the plugin dominates a script call
+    assert duration_pooled < duration_scripts
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import itertools
+from collections.abc import Iterator
+
+import pytest
+from pytest import MonkeyPatch
+
+from cmk.utils.notify_types import EventContext, EventRule
+
+import cmk.base.config as config
+from cmk.base import notify
+from cmk.base.notify_rule_index import NotificationRuleIndex
+
+
+def _rule(description: str, **conditions: object) -> EventRule:
+    rule = EventRule(
+        description=description,
+        comment="",
+        docu_url="",
+        disabled=False,
+        allow_disable=False,
+        contact_object=True,
+        contact_all=False,
+        contact_all_with_email=False,
+        notify_plugin=("mail", {}),
+    )
+    rule.update(conditions)  # type: ignore[typeddict-item]
+    return rule
+
+
+_RULES = [
+    _rule("all"),
+    _rule("disabled", disabled=True),
+    _rule("host events", match_host_event=["?d"]),
+    _rule("service events", match_service_event=["?c"]),
+    _rule("host and service events", match_host_event=["?d"], match_service_event=["?c"]),
+    _rule("services", match_services=["CPU"]),
+    _rule("check types", match_checktype=["cpu_loads"], match_host_event=["?d"]),
+    _rule("hosts", match_hosts=["heute", "gestern"]),
+    _rule("other hosts", match_hosts=["morgen"]),
+    _rule("no EC", match_ec=False),
+    _rule("EC", match_ec={}),
+    _rule("sites", match_site=["heute"]),
+    _rule("other sites", match_site=["other"]),
+    _rule("cancel", match_hosts=["heute"], notify_plugin=("mail", None)),
+]
+
+
+def _contexts() -> list[EventContext]:
+    contexts = []
+    for what, host, site, is_ec in itertools.product(
+        ["HOST", "SERVICE"], ["heute", "morgen", "other"], ["heute", "other"], [False, True]
+    ):
+        context = EventContext(
+            {
+                "WHAT": what,
+                "HOSTNAME": host,
+                "OMD_SITE": site,
+                "NOTIFICATIONTYPE": "PROBLEM",
+                "HOSTSTATE": "DOWN",
+                "PREVIOUSHOSTHARDSTATE": "UP",
+                "SERVICEDESC": "CPU load",
+                "SERVICESTATE": "CRITICAL",
+                "PREVIOUSSERVICEHARDSTATE": "OK",
+                "SERVICECHECKCOMMAND": "check_mk-cpu_loads",
+                "HOSTTAGS": "",
+                "CONTACTS": "",
+            }
+        )
+        if is_ec:
+            context["EC_ID"] = "1"
+            context["EC_RULE_ID"] = "rule"
+        contexts.append(context)
+    return contexts
+
+
+@pytest.mark.parametrize("context", _contexts())
+def test_candidates_contain_the_matching_rules(context: EventContext) -> None:
+    candidates = NotificationRuleIndex(_RULES).candidates(context)
+
+    # All conditions differing between the contexts are indexed
+    assert candidates == [r for r in _RULES if notify.rbn_match_rule(r, context) is None]
+
+
+def test_candidates_of_other_notifications() -> None:
+    context = EventContext({"WHAT": "UNKNOWN"})
+    assert NotificationRuleIndex(_RULES).candidates(context) == _RULES
+
+
+def test_analysis_shows_all_rules(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "notification_rules", _RULES)
+    monkeypatch.setattr(config, "contacts", {})
+    monkeypatch.setattr(notify, "_process_notifications", lambda *args: [])
+    context = _contexts()[0]
+
+    rule_info, _plugin_info = notify.notify_rulebased(context, analyse=True)
+
+    assert [info[1] for info in rule_info] == _RULES
+    assert [info[1]["description"] for info in rule_info if info[0] == "match"] == [
+        "all",
+        "host events",
+        "host and service events",
+        "hosts",
+        "no EC",
+        "sites",
+        "cancel",
+    ]
+
+
+@pytest.fixture(name="contactgroup_members")
+def fixture_contactgroup_members() -> Iterator[None]:
+    notify._contactgroup_members.cache_clear()
+    yield
+    # Other tests use different contacts
+    notify._contactgroup_members.cache_clear()
+
+
+@pytest.mark.usefixtures("contactgroup_members")
+def test_static_contacts_are_cached(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        config,
+        "contacts",
+        {"alice": {"contactgroups": ["admins"]}, "bob": {"contactgroups": []}},
+    )
+    rule = _rule("groups", contact_groups=["admins"], contact_emails=["ops@example.com"])
+    context = EventContext({"CONTACTS": "bob"})
+
+    assert notify.rbn_rule_contacts(rule, context) == {"alice", "bob", "mailto:ops@example.com"}
+    monkeypatch.setattr(notify, "rbn_groups_contacts", lambda groups: pytest.fail("Not cached"))
+    assert notify.rbn_rule_contacts(rule, EventContext({"CONTACTS": ""})) == {
+        "alice",
+        "mailto:ops@example.com",
+    }
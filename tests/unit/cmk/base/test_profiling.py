@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import json
+import os
+import signal
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+import cmk.utils.paths
+
+from cmk.base import profiling
+
+
+@pytest.fixture(name="sampler")
+def fixture_sampler(monkeypatch: MonkeyPatch) -> Iterator[profiling.SamplingProfiler]:
+    sampler = profiling.SamplingProfiler(interval=0.001)
+    monkeypatch.setattr(profiling, "_sampler", sampler)
+    monkeypatch.setattr(profiling, "_last_export", time.monotonic())
+    monkeypatch.setattr(profiling, "_force_export", False)
+    yield sampler
+    sampler.stop()
+
+
+def _busy(seconds: float) -> None:
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_phase_durations_since() -> None:
+    totals = profiling.phase_totals()
+    with profiling.phase("test_phase"):
+        time.sleep(0.01)
+
+    durations = profiling.phase_durations_since(totals)
+    assert list(durations) == ["test_phase"]
+    assert durations["test_phase"] >= 0.01
+    assert profiling.phase_stats()["test_phase"].count >= 1
+
+
+def test_sampling_is_switched_by_signal(sampler: profiling.SamplingProfiler) -> None:
+    profiling.register_signal_handler()
+    try:
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert sampler.running
+        _busy(0.1)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert not sampler.running
+    finally:
+        signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+
+    assert sum(sampler.stacks.values()) > 10
+    assert any(stack.endswith(":_busy") for stack in sampler.stacks)
+    samples = sum(sampler.stacks.values())
+    _busy(0.02)
+    assert sum(sampler.stacks.values()) == samples
+
+
+def test_export_stats(
+    sampler: profiling.SamplingProfiler, monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(cmk.utils.paths, "tmp_dir", tmp_path)
+    sampler.stacks["main;work"] = 3
+    sampler.used = True
+    with profiling.phase("test_phase"):
+        pass
+
+    profiling.export_stats()
+    assert not profiling.stats_dir().exists()
+
+    profiling.export_stats(force=True)
+    (stats_file,) = profiling.stats_dir().glob("*.json")
+    stats = json.loads(stats_file.read_text())
+    assert stats["pid"] == os.getpid()
+    assert stats["phases"]["test_phase"]["count"] >= 1
+    assert stats["sampling"]["samples"] == 3
+    assert stats_file.with_suffix(".folded").read_text() == "main;work 3\n"
+
+
+def test_export_stats_removes_stale_files(
+    sampler: profiling.SamplingProfiler, monkeypatch: MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(cmk.utils.paths, "tmp_dir", tmp_path)
+    profiling.stats_dir().mkdir()
+    # No such process
+    stale = profiling.stats_dir() / "cmk.4194305.json"
+    stale.touch()
+    stale.with_suffix(".folded").touch()
+    running = profiling.stats_dir() / f"cmk.{os.getppid()}.json"
+    running.touch()
+
+    profiling.export_stats(force=True)
+    assert not stale.exists()
+    assert not stale.with_suffix(".folded").exists()
+    assert running.exists()
+    assert len(list(profiling.stats_dir().glob("*.json"))) == 2
@@ -16,6 +16,8 @@ from typing import Mapping
 
 import pytest
 
+from tests.testlib.utils import repo_path
+
 import cmk.utils.debug
 from cmk.utils.agentdatatype import AgentRawData
 from cmk.utils.hostaddress import HostName
@@ -27,6 +29,7 @@ from cmk.snmplib import SNMPRawData
 from cmk.fetchers.cache import SectionStore
 
 from cmk.checkengine.parser import AgentParser, NO_SELECTION, SNMPParser
+from cmk.checkengine.parser._agent import _section_lines, NOOPParser, ParserState
 from cmk.checkengine.parser._markers import PiggybackMarker, SectionMarker
 from cmk.checkengine.type_defs import AgentRawDataSectionElem
 
@@ -697,6 +700,150 @@ class TestAgentParser:
         }
         assert store.load() == {}
 
+    @pytest.mark.parametrize(
+        "frames",
+        [
+            pytest.param(
+                [
+                    (b"piggy", b"<<<section>>>\nfirst line\n<<<other:sep(0)>>>\nsecond line\n"),
+                    (b"other piggy", b"<<<section:cached(10,20)>>>\n  indented line  \n"),
+                    (b"piggy", b"<<<other:sep(0)>>>\nthird line\n<<<empty>>>\n"),
+                ],
+                id="frames",
+            ),
+            pytest.param(
+                [
+                    (b"piggy", b"<<<section>>>\r\nfirst line\r\n\n  \nsecond line\n"),
+                    (b"piggy", b"ignored line\n<<<section>>>\nthird line\n<<<>>>\nignored\n"),
+                    (b"piggy", b"<<<section>>>\n<<<<nested>>>>\n<<<section>>>\nnested line\n"),
+                    (b"testhost", b"<<<host_section>>>\nhost line\n"),
+                ],
+                id="frames parsed line by line",
+            ),
+        ],
+    )
+    def test_piggyback_frames_are_parsed_like_piggyback_sections(
+        self,
+        parser: AgentParser,
+        monkeypatch: pytest.MonkeyPatch,
+        frames: Sequence[tuple[bytes, bytes]],
+    ) -> None:
+        monkeypatch.setattr(time, "time", lambda: 1000)
+        monkeypatch.setattr(parser, "cache_piggybacked_data_for", 900)
+
+        def parse(raw_data: bytes) -> tuple[object, object, dict[HostName, bytes]]:
+            ahs = parser.parse(
+                AgentRawData(b"<<<host>>>\nline\n" + raw_data), selection=NO_SELECTION
+            )
+            return (
+                ahs.sections,
+                ahs.cache_info,
+                {
+                    hostname: b"\n".join(lines)
+                    for hostname, lines in ahs.piggybacked_raw_data.items()
+                },
+            )
+
+        assert parse(
+            b"".join(
+                b"<<<<%s:length(%d)>>>>\n%s<<<<>>>>\n" % (hostname, len(output), output)
+                for hostname, output in frames
+            )
+        ) == parse(
+            b"".join(
+                b"<<<<%s>>>>\n%s<<<<>>>>\n" % (hostname, output) for hostname, output in frames
+            )
+        )
+
+    def test_piggyback_frames_are_not_split(self, parser: AgentParser) -> None:
+        output = (
+            b"<<<section:cached(10,20)>>>\nfirst line\nsecond line\n<<<section:cached(10,20)>>>\n"
+        )
+        ahs = parser.parse(
+            AgentRawData(b"<<<<piggy:length(%d)>>>>\n%s" % (len(output), output)),
+            selection=NO_SELECTION,
+        )
+        assert ahs.piggybacked_raw_data == {
+            "piggy": [b"<<<section:cached(10,20)>>>", b"first line\nsecond line"]
+        }
+
+    @pytest.mark.parametrize(
+        "raw_data",
+        [
+            pytest.param(
+                (repo_path() / "tests/plugins_integration/dumps/rpm_agent_docker").read_bytes(),
+                id="rpm_agent_docker",
+            ),
+            pytest.param(
+                (
+                    repo_path() / "tests/integration/cmk/base/test-files/linux-agent-output"
+                ).read_bytes(),
+                id="linux-agent-output",
+            ),
+            pytest.param(
+                b"ignored\n<<<a>>>\r\n  x  \r\n\n \t \n<<<b:nostrip:sep(0)>>>\n  y\x00z  \r\r\n"
+                b"<<<b:nostrip:sep(0)>>>\n<<<<piggy>>>>\n<<<c>>>\n <<<d>>>\n<<<:cached(1,2)>>>\n"
+                b"x\n<<<e>>>\n<<<<testhost>>>>\n<<<e>>>\n  w  \n<<<<>>>>\n<<<>>>\nignored\n"
+                b"<<<<>>>>\n<<<f>>> x\n<<<g>>>\n<<<>>>>\n<<<<h>>>\nv",
+                id="markers",
+            ),
+        ],
+    )
+    def test_parsed_like_line_by_line(self, parser: AgentParser, raw_data: bytes) -> None:
+        # Invalid markers are ignored
+        cmk.utils.debug.disable()
+        line_parser: ParserState = NOOPParser(
+            parser.hostname,
+            [],
+            {},
+            translation=parser.translation,
+            encoding_fallback=parser.encoding_fallback,
+            logger=parser._logger,
+        )
+        for line in raw_data.split(b"\n"):
+            line_parser = line_parser(line.rstrip(b"\r"))
+
+        sections, piggyback_sections = parser._parse_host_section(AgentRawData(raw_data))
+        assert [
+            (header, _section_lines(header, content)) for header, content in sections
+        ] == line_parser.sections
+        assert piggyback_sections == line_parser.piggyback_sections
+
+    def test_only_needed_sections_are_decoded(
+        self,
+        hostname: HostName,
+        store: SectionStore[Sequence[AgentRawDataSectionElem]],
+        logger: logging.Logger,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(time, "time", lambda: 1000)
+        parser = AgentParser(
+            hostname,
+            store,
+            check_interval=0,
+            keep_outdated=True,
+            translation=TranslationOptions(),
+            encoding_fallback="ascii",
+            simulation=False,
+            logger=logger,
+            needed_sections=frozenset({SectionName("needed")}),
+        )
+        raw_data = AgentRawData(
+            b"<<<needed>>>\nfirst line\n<<<other>>>\nsecond line\n"
+            b"<<<persisted:persist(2000)>>>\nthird line\n"
+            b"<<<<piggy>>>>\n<<<other>>>\nfourth line\n<<<<>>>>\n"
+        )
+
+        ahs = parser.parse(raw_data, selection=NO_SELECTION)
+        assert ahs.sections == {
+            SectionName("needed"): [["first", "line"]],
+            SectionName("persisted"): [["third", "line"]],
+        }
+        assert ahs.piggybacked_raw_data == {
+            "piggy": [b"<<<other:cached(1000,0)>>>", b"fourth line"]
+        }
+        assert store.load() == {SectionName("persisted"): (1000, 2000, [["third", "line"]])}
+
 
 class TestSectionMarker:
     def test_options_serialize_options(self) -> None:
@@ -783,6 +930,30 @@ class TestSectionMarker:
         assert section_header.persist is None
         assert section_header.separator is None
 
+    @pytest.mark.parametrize(
+        "headerline",
+        [
+            b"<<<name>>>",
+            b"<<<name:nostrip:sep(124)>>>",
+            b"<<<name:encoding(ascii)>>>",
+            b"<<<name:encoding(cp437)>>>",
+        ],
+    )
+    @pytest.mark.parametrize(
+        "lines",
+        [
+            [],
+            [b""],
+            [b"  a b\t", b"c|d |e", "\xa0f\u2028g\x85 ".encode()],
+            [b"utf-8 \xc3\xa4", b"latin-1 \xe4 "],
+        ],
+    )
+    def test_parse_lines(self, headerline: bytes, lines: Sequence[bytes]) -> None:
+        section_header = SectionMarker.from_headerline(headerline)
+        assert section_header.parse_lines(lines) == [
+            section_header.parse_line(line) for line in lines
+        ]
+
 
 class TestSNMPParser:
     @pytest.fixture
@@ -870,6 +1041,31 @@ class TestAgentPersistentSectionHandling:
     def logger(self):
         return logging.getLogger("test")
 
+    def test_unchanged_store_is_not_written(
+        self, logger: logging.Logger, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        section_store = MockStore(
+            "/dev/null",
+            {SectionName("stored"): (0, 0, [])},
+            logger=logger,
+        )
+        parser = AgentParser(
+            HostName("testhost"),
+            section_store,
+            check_interval=0,
+            keep_outdated=True,
+            translation=TranslationOptions(),
+            encoding_fallback="ascii",
+            simulation=False,
+            logger=logger,
+        )
+        stored: list[object] = []
+        monkeypatch.setattr(section_store, "store", stored.append)
+
+        ahs = parser.parse(AgentRawData(b"<<<fresh>>>\nline"), selection=NO_SELECTION)
+        assert ahs.sections == {SectionName("fresh"): [["line"]], SectionName("stored"): []}
+        assert not stored
+
     def test_update_with_empty_store_and_empty_raw_data(self, logger: logging.Logger) -> None:
         section_store = MockStore("/dev/null", {}, logger=logger)
         raw_data = AgentRawData(b"")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import os
+import select
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from pytest import MonkeyPatch
+
+import cmk.utils.paths
+from cmk.utils.exceptions import MKGeneralException
+from cmk.utils.hostaddress import HostName
+
+from cmk.checkengine.checkresults import ServiceCheckResult
+from cmk.checkengine.submitters import _batches, FileSubmitter, PipeSubmitter, Submittee
+
+
+@pytest.fixture(name="paths")
+def fixture_paths(monkeypatch: MonkeyPatch, tmp_path: Path) -> Iterator[tuple[Path, Path]]:
+    command_pipe = tmp_path / "nagios.cmd"
+    check_result_path = tmp_path / "checkresults"
+    check_result_path.mkdir()
+    monkeypatch.setattr(cmk.utils.paths, "nagios_command_pipe_path", str(command_pipe))
+    monkeypatch.setattr(cmk.utils.paths, "check_result_path", str(check_result_path))
+    monkeypatch.setattr(PipeSubmitter, "_nagios_command_pipe", None)
+    yield command_pipe, check_result_path
+    if PipeSubmitter._nagios_command_pipe:
+        PipeSubmitter._nagios_command_pipe.close()
+
+
+def _submittees(count: int) -> list[Submittee]:
+    return [
+        Submittee(
+            f"Service {index}",
+            ServiceCheckResult(
+                index % 4, f"Output {index}\nDetails", [("m", 1.5, 2.0, 3.0, None, None)]
+            ),
+            None,
+            False,
+        )
+        for index in range(count)
+    ]
+
+
+def _submit(submitter_type: type[PipeSubmitter] | type[FileSubmitter], **kwargs: bool) -> None:
+    submitter_type(
+        HostName("heute"),
+        dry_run=False,
+        perfdata_format="standard",
+        show_perfdata=False,
+        **kwargs,
+    ).submit(_submittees(1000))
+
+
+def _check_result_files(check_result_path: Path) -> list[str]:
+    assert all(
+        path.with_name(path.name + ".ok").exists()
+        for path in check_result_path.iterdir()
+        if path.suffix != ".ok"
+    )
+    return [path.read_text() for path in check_result_path.iterdir() if path.suffix != ".ok"]
+
+
+def test_batches() -> None:
+    commands = [b"x" * length for length in (3, 4, 2, 12, 1, 1)]
+    assert list(_batches(commands, 8)) == [
+        (b"xxxxxxx", 2),
+        (b"xx", 1),
+        (b"x" * 12, 1),
+        (b"xx", 2),
+    ]
+    assert not list(_batches([], 8))
+
+
+def test_pipe_submitter(paths: tuple[Path, Path]) -> None:
+    command_pipe, check_result_path = paths
+    command_pipe.touch()
+    _submit(PipeSubmitter)
+
+    lines = command_pipe.read_text().splitlines()
+    assert len(lines) == 1000
+    assert lines[7].split(" ", 1)[1] == (
+        "PROCESS_SERVICE_CHECK_RESULT;heute;Service 7;3;Output 7\\nDetails|m=1.5;2;3;;"
+    )
+    assert len(command_pipe.read_bytes()) > select.PIPE_BUF
+    assert not _check_result_files(check_result_path)
+
+
+def test_pipe_submitter_missing_pipe(paths: tuple[Path, Path]) -> None:
+    _command_pipe, check_result_path = paths
+    with pytest.raises(MKGeneralException):
+        _submit(PipeSubmitter)
+    assert not _check_result_files(check_result_path)
+
+
+def test_pipe_submitter_spool_fallback(paths: tuple[Path, Path]) -> None:
+    _command_pipe, check_result_path = paths
+    _submit(PipeSubmitter, spool_fallback=True)
+    _submit(FileSubmitter)
+
+    # The results of both runs, in the same format
+    for check_result_file in _check_result_files(check_result_path):
+        entries = check_result_file.split("\n\n")
+        assert len(entries) == 1001
+        assert entries[7].splitlines()[:2] == ["host_name=heute", "service_description=Service 7"]
+        assert entries[7].splitlines()[-2:] == [
+            "return_code=3",
+            "output=Output 7\\nDetails|m=1.5;2;3;;",
+        ]
+
+
+def test_pipe_submitter_broken_pipe(paths: tuple[Path, Path], monkeypatch: MonkeyPatch) -> None:
+    _command_pipe, check_result_path = paths
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    pipe = os.fdopen(write_fd, "wb")
+    monkeypatch.setattr(PipeSubmitter, "_nagios_command_pipe", pipe)
+
+    _submit(PipeSubmitter, spool_fallback=True)
+
+    assert pipe.closed
+    assert PipeSubmitter._nagios_command_pipe is None
+    (check_result_file,) = _check_result_files(check_result_path)
+    assert check_result_file.count("host_name=heute\n") == 1000
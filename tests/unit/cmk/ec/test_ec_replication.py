@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+from typing import Any
+
+import pytest
+
+from tests.testlib import CMKEventConsole
+
+from tests.unit.cmk.ec.helpers import FakeStatusSocket
+
+from cmk.utils.hostaddress import HostName
+
+from cmk.ec.changelog import ChangeLog
+from cmk.ec.config import Config
+from cmk.ec.helpers import ECLock
+from cmk.ec.history import History
+from cmk.ec.main import (
+    default_slave_status_sync,
+    EventServer,
+    EventStatus,
+    replication_request,
+    replication_update_state,
+    StatusServer,
+    StatusTableEvents,
+)
+from cmk.ec.perfcounters import Perfcounters
+from cmk.ec.settings import Settings
+
+
+@pytest.fixture(name="slave_event_status")
+def fixture_slave_event_status(
+    settings: Settings, config: Config, perfcounters: Perfcounters, history: History
+) -> EventStatus:
+    return EventStatus(
+        settings, config, perfcounters, history, logging.getLogger("cmk.mkeventd.EventStatus")
+    )
+
+
+@pytest.fixture(name="slave_event_server")
+def fixture_slave_event_server(
+    settings: Settings,
+    config: Config,
+    perfcounters: Perfcounters,
+    lock_configuration: ECLock,
+    history: History,
+    slave_event_status: EventStatus,
+) -> EventServer:
+    return EventServer(
+        logging.getLogger("cmk.mkeventd.EventServer"),
+        settings,
+        config,
+        default_slave_status_sync(),
+        perfcounters,
+        lock_configuration,
+        history,
+        slave_event_status,
+        StatusTableEvents.columns,
+        False,
+    )
+
+
+def _new_event(event_status: EventStatus, host: str) -> None:
+    event_status.new_event(
+        CMKEventConsole.new_event({"host": HostName(host), "core_host": HostName("")})
+    )
+
+
+def _sync(
+    status_server: StatusServer,
+    settings: Settings,
+    config: Config,
+    slave_event_status: EventStatus,
+    slave_event_server: EventServer,
+) -> dict[str, Any]:
+    """One replication cycle from the master's status server to the slave"""
+    request = replication_request(
+        # No rules needed in the response
+        {**default_slave_status_sync(), "last_sync": config["last_reload"] + 1},
+        slave_event_status.replication_position(),
+    )
+    s = FakeStatusSocket(request)
+    status_server.handle_client(s, True, "127.0.0.1")
+    response = s.get_response()
+    replication_update_state(settings, config, slave_event_status, slave_event_server, response)
+    return response
+
+
+def _hosts_and_phases(event_status: EventStatus) -> list[tuple[str, str]]:
+    return [(e["host"], e["phase"]) for e in event_status.events()]
+
+
+def test_delta_replication(
+    settings: Settings,
+    config: Config,
+    event_status: EventStatus,
+    status_server: StatusServer,
+    slave_event_status: EventStatus,
+    slave_event_server: EventServer,
+) -> None:
+    def sync() -> dict[str, Any]:
+        return _sync(status_server, settings, config, slave_event_status, slave_event_server)
+
+    for num in range(10):
+        _new_event(event_status, f"host-{num}")
+    assert "status" in sync()
+    assert _hosts_and_phases(slave_event_status) == _hosts_and_phases(event_status)
+
+    # Only the changed events are sent
+    event_status.events()[3]["phase"] = "ack"
+    event_status.remove_event(event_status.events()[5], "DELETE")
+    _new_event(event_status, "host-new")
+    response = sync()
+    assert "status" not in response
+    assert [e["host"] for e in response["changes"]["events"]] == ["host-3", "host-new"]
+    assert response["changes"]["deleted"] == [6]
+    assert _hosts_and_phases(slave_event_status) == _hosts_and_phases(event_status)
+    assert slave_event_status.num_existing_events == 10
+    assert slave_event_status.get_num_existing_events_by("by_rule", event_status.events()[0]) == 10
+
+    assert sync()["changes"]["events"] == []
+
+    # The slave changed events itself, e.g. during housekeeping
+    slave_event_status.remove_event(slave_event_status.events()[0], "AUTODELETE")
+    assert "status" in sync()
+    assert _hosts_and_phases(slave_event_status) == _hosts_and_phases(event_status)
+
+
+def test_replication_falls_back_to_full_sync(
+    settings: Settings,
+    config: Config,
+    event_status: EventStatus,
+    status_server: StatusServer,
+    slave_event_status: EventStatus,
+    slave_event_server: EventServer,
+) -> None:
+    def sync() -> dict[str, Any]:
+        return _sync(status_server, settings, config, slave_event_status, slave_event_server)
+
+    for num in range(10):
+        _new_event(event_status, f"host-{num}")
+    sync()
+
+    # Most of the events changed: the complete status is cheaper
+    for event in event_status.events()[:6]:
+        event["phase"] = "ack"
+    assert "status" in sync()
+
+    # Unknown epoch, e.g. a restarted master
+    _epoch, sequence = sync()["position"]
+    slave_event_status.set_replication_position(("other", sequence))
+    assert "status" in sync()
+
+
+def test_change_log_detects_changes_in_place() -> None:
+    event = CMKEventConsole.new_event({"host": HostName("host"), "text": "text"})
+    event["contact_groups"] = ["admins"]
+    event["match_groups"] = ("a",)
+    events = {1: event, 2: CMKEventConsole.new_event({"host": HostName("other")})}
+    change_log = ChangeLog()
+    sequence = change_log.commit(events)
+    assert not change_log.has_changes(events)
+
+    event["contact_groups"].append("operators")
+    assert change_log.has_changes(events)
+    assert change_log.commit(events) == sequence + 1
+    assert change_log.changed_since((change_log.epoch, sequence)) == {1}
+    assert not change_log.has_changes(events)
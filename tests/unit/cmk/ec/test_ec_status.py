@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import json
 import time
 
 import pytest
@@ -132,3 +133,65 @@ def test_mkevent_query_filters(
     status_server.handle_client(status_socket, True, "127.0.0.1")
     response = status_socket.get_response()
     assert (len(response) == 2) is is_match
+
+
+@pytest.mark.parametrize(
+    "filters, expected_ids",
+    [
+        pytest.param(b"Filter: event_id = 7\n", [7], id="id"),
+        pytest.param(b"Filter: event_host = host-1\n", [2, 7, 12, 17], id="host"),
+        pytest.param(b"Filter: event_host = HOST-1\n", [], id="host case sensitive"),
+        pytest.param(
+            b"Filter: event_host in HOST-1 host-3\n", [2, 4, 7, 9, 12, 14, 17, 19], id="hosts"
+        ),
+        pytest.param(
+            b"Filter: event_host in host-1\nFilter: event_state = 2\n", [12], id="host and state"
+        ),
+        pytest.param(
+            b"Filter: event_rule_id = rule-1\nFilter: event_phase = ack\n", [6, 16], id="rule"
+        ),
+        pytest.param(b"Filter: event_phase = ack\nLimit: 2\n", [1, 6], id="limit"),
+    ],
+)
+def test_query_uses_indexes(
+    event_status: EventStatus, status_server: StatusServer, filters: bytes, expected_ids: list[int]
+) -> None:
+    for num in range(20):
+        event_status.new_event(
+            CMKEventConsole.new_event(
+                {
+                    "host": HostName(f"host-{num % 5}"),
+                    "core_host": HostName(""),
+                    "rule_id": f"rule-{num % 2}",
+                    "state": num % 3,
+                    "phase": "ack" if num % 5 == 0 else "open",
+                }
+            )
+        )
+
+    s = FakeStatusSocket(b"GET events\nColumns: event_id event_host event_unknown\n" + filters)
+    status_server.handle_client(s, True, "127.0.0.1")
+
+    header, *rows = s.get_response()
+    assert header == ["event_id", "event_host", "event_unknown"]
+    assert [row[0] for row in rows] == expected_ids
+    assert all(row[2] is None for row in rows)
+
+
+@pytest.mark.parametrize("output_format", ["python", "json"])
+def test_query_response_is_streamed(
+    event_status: EventStatus, status_server: StatusServer, output_format: str
+) -> None:
+    for num in range(2500):
+        event_status.new_event(
+            CMKEventConsole.new_event({"host": HostName(f"host-{num}"), "core_host": HostName("")})
+        )
+
+    s = FakeStatusSocket(
+        b"GET events\nColumns: event_id event_host\nOutputFormat: %s\n" % output_format.encode()
+    )
+    status_server.handle_client(s, True, "127.0.0.1")
+
+    rows = [["event_id", "event_host"]] + [[num + 1, f"host-{num}"] for num in range(2500)]
+    expected = json.dumps(rows) if output_format == "json" else repr(rows)
+    assert s._response == (expected + "\n").encode("utf-8")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import time
+
+from tests.testlib import CMKEventConsole
+
+from cmk.utils.hostaddress import HostName
+
+from cmk.ec.config import Count, MatchGroups, Rule
+from cmk.ec.event import Event
+from cmk.ec.event_index import EventIndex
+from cmk.ec.main import EventServer, EventStatus
+
+
+def _event(host: str, rule_id: str = "rule", match_groups: tuple[str, ...] = ()) -> Event:
+    return CMKEventConsole.new_event(
+        {
+            "host": HostName(host),
+            # Without core host no host config is looked up
+            "core_host": HostName(""),
+            "rule_id": rule_id,
+            "match_groups": match_groups,
+            "host_in_downtime": False,
+        }
+    )
+
+
+def _message(host: str, rule_id: str = "rule", match_groups: tuple[str, ...] = ()) -> Event:
+    """A new message which is not an open event yet"""
+    event = _event(host, rule_id, match_groups)
+    del event["phase"]
+    return event
+
+
+def _count(**kwargs: bool) -> Count:
+    return Count(
+        count=3,
+        period=3600,
+        algorithm="interval",
+        count_duration=None,
+        count_ack=False,
+        separate_host=kwargs.get("separate_host", False),
+        separate_application=False,
+        separate_match_groups=kwargs.get("separate_match_groups", False),
+    )
+
+
+def test_event_index_keeps_creation_order() -> None:
+    index: EventIndex[HostName] = EventIndex(lambda e: e["host"])
+    events = [_event("a"), _event("b"), _event("a"), _event("b")]
+    for event_id, event in enumerate(events, start=1):
+        event["id"] = event_id
+        index.add(event)
+
+    assert index.get(HostName("a")) == [events[0], events[2]]
+    assert index.oldest(HostName("b")) is events[1]
+
+    # An older event moving to another key is sorted in
+    events[1]["host"] = HostName("a")
+    index.update(events[1])
+    assert [e["id"] for e in index.get(HostName("a"))] == [1, 2, 3]
+    assert index.count(HostName("b")) == 1
+
+    index.remove(events[3])
+    assert index.get(HostName("b")) == []
+    assert index.oldest(HostName("b")) is None
+    assert len(index) == 3
+
+
+def test_remove_oldest_event_of_host_and_rule(event_status: EventStatus) -> None:
+    for host, rule_id in (("a", "r1"), ("b", "r1"), ("a", "r2"), ("b", "r2")):
+        event_status.new_event(_event(host, rule_id))
+
+    event_status.remove_oldest_event("by_host", _event("b"))
+    assert [(e["host"], e["rule_id"]) for e in event_status.events()] == [
+        ("a", "r1"),
+        ("a", "r2"),
+        ("b", "r2"),
+    ]
+    event_status.remove_oldest_event("by_rule", _event("x", "r2"))
+    event_status.remove_oldest_event("overall", _event("x"))
+    assert [(e["host"], e["rule_id"]) for e in event_status.events()] == [("b", "r2")]
+    assert event_status.get_num_existing_events_by("by_rule", _event("x", "r1")) == 0
+
+
+def test_count_event_reindexes_counted_up_event(
+    event_status: EventStatus, event_server: EventServer
+) -> None:
+    event_status.count_event(event_server, _message("a", match_groups=("1",)), "rule", _count())
+    # Not separated by host: counting up takes over the host of the new message
+    event_status.count_event(event_server, _message("b", match_groups=("2",)), "rule", _count())
+
+    (event,) = event_status.events()
+    assert event["host"] == "b"
+    assert event["count"] == 2
+    assert event_status.num_existing_events_by_host == {("a", ""): 0, ("b", ""): 1}
+
+    found = event_status.count_event(
+        event_server, _message("b", match_groups=("2",)), "rule", _count(separate_match_groups=True)
+    )
+    assert found is event
+    assert event["phase"] == "open"
+
+    event_status.remove_oldest_event("by_host", _event("b"))
+    assert not event_status.events()
+
+
+def test_cancel_events_of_host(event_status: EventStatus, event_server: EventServer) -> None:
+    for host in ("a", "b", "a"):
+        event_status.new_event(_event(host, match_groups=("x",)))
+    rule = Rule(id="rule")
+    match_groups = MatchGroups(match_groups_message_ok=("x",))
+
+    event_status.cancel_events(event_server, [], _event("a"), match_groups, rule)
+
+    assert [e["host"] for e in event_status.events()] == ["b"]
+    assert event_status.get_num_existing_events_by("by_host", _event("a")) == 0
+
+
+def test_count_event_throughput(event_status: EventStatus, event_server: EventServer) -> None:
+    # Stay below the default event limits
+    for num in range(9000):
+        event_status.new_event(_event(f"host-{num}", rule_id=f"rule-{num % 100}"))
+
+    before = time.time()
+    for num in range(5000):
+        event_status.count_event(
+            event_server,
+            _message(f"host-{num % 500}", rule_id=f"counting-{num % 2}"),
+            f"counting-{num % 2}",
+            _count(separate_host=True),
+        )
+    duration = time.time() - before
+
+    assert len(event_status.events_of_rule("counting-0")) == 250
+    # Scanning all open events took several seconds per thousand messages
+    assert duration < 0.5
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import os
+import time
+from pathlib import Path
+
+from tests.testlib import CMKEventConsole
+
+from cmk.utils.hostaddress import HostName
+
+from cmk.ec.event import Event
+from cmk.ec.journal import PackedEventStatus, StatusJournal
+from cmk.ec.main import EventServer, EventStatus
+
+_LOGGER = logging.getLogger("cmk.mkeventd.EventStatus")
+
+
+def _journal(tmp_path: Path) -> StatusJournal:
+    return StatusJournal(tmp_path / "status.snapshot", tmp_path / "status.journal", _LOGGER)
+
+
+def _event(event_id: int) -> Event:
+    event = CMKEventConsole.new_event(
+        {"host": HostName(f"host-{event_id}"), "text": "text", "core_host": HostName("")}
+    )
+    event["id"] = event_id
+    return event
+
+
+def _status(events: list[Event]) -> PackedEventStatus:
+    return PackedEventStatus(
+        next_event_id=len(events) + 1,
+        events=events,
+        rule_stats={"rule": len(events)},
+        interval_starts={},
+    )
+
+
+def test_journal_replays_changes(tmp_path: Path) -> None:
+    journal = _journal(tmp_path)
+    status = _status([_event(1), _event(2), _event(3)])
+    assert journal.save(status, None).compacted
+
+    status["events"][0]["phase"] = "ack"
+    del status["events"][1]
+    status["events"].append(_event(4))
+    status["next_event_id"] = 5
+    stats = journal.save(status, {1: status["events"][0], 2: None, 4: status["events"][2]})
+    assert not stats.compacted
+    assert stats.records == 4  # changed, deleted, new event and counters
+
+    assert journal.save(status, {}).records == 0
+    assert _journal(tmp_path).load() == status
+
+
+def test_journal_is_compacted_periodically(tmp_path: Path) -> None:
+    status = _status([_event(1)])
+    _journal(tmp_path).save(status, None)
+    an_hour_ago = time.time() - 3601
+    os.utime(tmp_path / "status.snapshot", (an_hour_ago, an_hour_ago))
+
+    journal = _journal(tmp_path)
+    journal.load()
+    assert journal.save(status, {}).compacted
+    assert not journal.save(status, {}).compacted
+
+
+def test_journal_ignores_damaged_tail(tmp_path: Path) -> None:
+    journal = _journal(tmp_path)
+    status = _status([_event(1)])
+    journal.save(status, None)
+    status["events"].append(_event(2))
+    journal.save(status, {2: status["events"][1]})
+    with (tmp_path / "status.journal").open("ab") as f:
+        f.write(b"U\x00\x01")
+
+    reloaded = _journal(tmp_path)
+    assert reloaded.load() == status
+    # The damaged journal is not continued
+    assert reloaded.save(status, {}).compacted
+
+
+def test_journal_ignores_outdated_generation(tmp_path: Path) -> None:
+    journal = _journal(tmp_path)
+    journal.save(_status([_event(1)]), None)
+    journal.save(_status([_event(1), _event(2)]), {2: _event(2)})
+    outdated_journal = (tmp_path / "status.journal").read_bytes()
+
+    status = _status([_event(3)])
+    journal.compact(status)
+    (tmp_path / "status.journal").write_bytes(outdated_journal)
+
+    assert _journal(tmp_path).load() == status
+
+
+def test_event_status_switches_persistence(
+    event_status: EventStatus, event_server: EventServer
+) -> None:
+    paths = event_status.settings.paths
+    paths.status_file.value.parent.mkdir(parents=True, exist_ok=True)
+    event_status.new_event(_event(0))
+
+    event_status._config["state_persistence"] = "full"
+    event_status.save_status()
+    assert paths.status_file.value.exists()
+    assert not paths.status_snapshot_file.value.exists()
+
+    event_status._config["state_persistence"] = "journal"
+    event_status.save_status()
+    assert not paths.status_file.value.exists()
+    assert paths.status_snapshot_file.value.exists()
+
+    event_status.flush()
+    event_status.load_status(event_server)
+    assert [e["host"] for e in event_status.events()] == ["host-0"]
+    assert event_status.load_duration > 0
+
+
+def test_event_status_journals_touched_events(
+    event_status: EventStatus, event_server: EventServer
+) -> None:
+    event_status.settings.paths.status_file.value.parent.mkdir(parents=True, exist_ok=True)
+    event_status._config["state_persistence"] = "journal"
+    event_status.new_event(first := _event(0))
+    event_status.new_event(_event(0))
+    event_status.save_status()
+
+    first["contact_groups"] = ["admins"]
+    event_status.touch(first)
+    event_status.new_event(third := _event(0))
+    event_status.remove_event(third, "DELETE")
+    event_status.save_status()
+    events = event_status.events()
+
+    event_status.flush()
+    event_status.load_status(event_server)
+    assert event_status.events() == events
@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import shlex
 from collections.abc import Callable, Iterable, Mapping, Sequence
 
 import pytest
@@ -97,6 +98,25 @@ def test_parse_perf_data2(request_context: None, set_config: SetConfig) -> None:
         utils.parse_perf_data("hi ho", None)
 
 
+def test_parse_perf_data_cached(request_context: None) -> None:
+    perf_data, check_command = utils.parse_perf_data("hi=5;6 'no t'=6 [ihe]", "ter")
+    perf_data.append(("appended", 1, "", None, None, None, None))
+    assert utils.parse_perf_data("hi=5;6 'no t'=6 [ihe]", "ter") == (
+        [("hi", 5, "", 6, None, None, None), ("no_t", 6, "", None, None, None, None)],
+        "ihe",
+    )
+    # Invalid perf data is parsed as far as possible
+    assert utils.parse_perf_data("hi ho=5", None) == ([("ho", 5, "", None, None, None, None)], "")
+
+
+@pytest.mark.parametrize(
+    "data_string",
+    ["a=1 b=2", "  a=1\tb=2\r\n", "a=1 'b c'=2", 'a=1 "b c"=2', "a\\ b=1", "a=1\x0bb=2"],
+)
+def test_split_perf_data_like_shlex(data_string: str) -> None:
+    assert utils._split_perf_data(data_string) == shlex.split(data_string)
+
+
 @pytest.mark.parametrize(
     "perf_name, check_command, result",
     [
@@ -113,6 +133,19 @@ def test_perfvar_translation(perf_name: str, check_command: str, result: Transla
     assert utils.perfvar_translation(perf_name, check_command) == result
 
 
+def test_perfvar_translation_is_find_matching_translation() -> None:
+    for check_command, translations in utils.check_metrics.items():
+        for perfvar_name in [*translations, "fake", "in", "rta", "pl", "fs_used", "temp"]:
+            translation_entry = utils.find_matching_translation(
+                MetricName(perfvar_name), translations
+            )
+            assert utils.perfvar_translation(perfvar_name, check_command) == {
+                "name": translation_entry.get("name", perfvar_name),
+                "scale": translation_entry.get("scale", 1.0),
+                "auto_graph": translation_entry.get("auto_graph", True),
+            }
+
+
 @pytest.mark.parametrize(
     ["translations", "expected_result"],
     [
@@ -446,6 +479,43 @@ def test_evaluate_cpu_utilization(
     assert result[0] == expected_result
 
 
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "fs_used",
+        "fs_used.max",
+        "fs_used(%)",
+        "fs_used:warn",
+        "fs_used:crit(%)",
+        "fs_used:max,fs_used,-",
+        "fs_used,fs_size,/,100,*",
+        "fs_used,fs_used:warn,MAX",
+        "fs_used,1,>",
+        "10.172",
+        "10.172,2,*",
+        "5.5,fs_size,MIN",
+    ],
+)
+def test_compiled_rpn_is_evaluated_rpn(expression: str) -> None:
+    perfdata, check_command = utils.parse_perf_data(
+        "fs_used=4096;8192;9216;0;10240 fs_size=10240;;;; 10.172=6", "check_mk-df"
+    )
+    translated_metrics = utils.translate_metrics(perfdata, check_command)
+    assert utils._compile_rpn(expression)(translated_metrics) == utils.stack_resolver(
+        expression.split(","),
+        lambda x: x in utils.rpn_operators,
+        lambda op, a, b: utils.rpn_operators[op](a, b),
+        lambda x: utils._evaluate_literal(x, translated_metrics),
+    )
+
+
+def test_compiled_rpn_errors() -> None:
+    with pytest.raises(MKGeneralException):
+        utils._compile_rpn("fs_used,+")
+    with pytest.raises(KeyError):
+        utils.evaluate("fs_used,fs_free,+", {})
+
+
 def test_stack_resolver_str_to_nested() -> None:
     def apply_operator(op: str, f: Sequence[object], s: Sequence[object]) -> Sequence[object]:
         return (op, [f, s])
@@ -3,10 +3,14 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import copy
+import datetime
 from collections.abc import Iterator
 from contextlib import contextmanager
 
+import freezegun
 import pytest
+from pytest import MonkeyPatch
 
 from livestatus import SiteId
 
@@ -17,10 +21,16 @@ from cmk.utils.prediction import TimeSeries, TimeSeriesValues
 
 import cmk.gui.plugins.metrics.rrd_fetch as rf
 from cmk.gui.config import active_config
+from cmk.gui.ctx_stack import g
 from cmk.gui.plugins.metrics.utils import GraphDataRange, TemplateGraphRecipe
 from cmk.gui.utils.temperate_unit import TemperatureUnit
 
 
+@pytest.fixture(autouse=True)
+def fixture_empty_series_cache(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(rf, "_series_cache", {})
+
+
 def test_needed_elements_of_expression() -> None:
     assert set(
         rf.needed_elements_of_expression(
@@ -35,7 +45,9 @@ def test_needed_elements_of_expression() -> None:
 
 
 @contextmanager
-def _setup_livestatus(mock_livestatus: MockLiveStatusConnection) -> Iterator[None]:
+def _setup_livestatus(
+    mock_livestatus: MockLiveStatusConnection,
+) -> Iterator[MockLiveStatusConnection]:
     with mock_livestatus(expect_status_query=True) as mock_live:
         mock_live.add_table(
             "services",
@@ -57,7 +69,7 @@ ColumnHeaders: off
             """,
             sites=["NO_SITE"],
         )
-        yield
+        yield mock_live
 
 
 _GRAPH_RECIPE = TemplateGraphRecipe(
@@ -132,6 +144,97 @@ def test_fetch_rrd_data_for_graph_with_conversion(
         }
 
 
+def _temperature_graph(site: str, host_name: str) -> TemplateGraphRecipe:
+    graph_recipe = copy.deepcopy(_GRAPH_RECIPE)
+    graph_recipe["metrics"][0]["expression"] = (
+        "rrd",
+        site,
+        host_name,
+        "Temperature Zone 6",
+        "temp",
+        "max",
+        1,
+    )
+    return graph_recipe
+
+
+def test_fetch_rrd_data_for_graphs_batched(mock_livestatus: MockLiveStatusConnection) -> None:
+    column = "rrddata:temp:temp.max:1681985455:1681999855:20"
+    graphs = [
+        _temperature_graph("NO_SITE", "my-host"),
+        _temperature_graph("remote", "other-host"),
+        # Hosts of the same name on other sites are not asked for
+        _temperature_graph("remote", "my-host"),
+        _temperature_graph("NO_SITE", "my-host"),
+    ]
+    with mock_livestatus(expect_status_query=True) as mock_live:
+        for site, host_names in [("NO_SITE", ["my-host"]), ("remote", ["other-host", "my-host"])]:
+            mock_live.add_table(
+                "services",
+                [
+                    {
+                        "host_name": host_name,
+                        "service_description": "Temperature Zone 6",
+                        column: [1, 2, 3, 4, len(host_name), None],
+                    }
+                    for host_name in host_names
+                ],
+                site=site,
+            )
+        mock_live.expect_query(
+            f"""GET services
+Columns: host_name service_description {column}
+Filter: host_name = my-host
+Filter: service_description = Temperature Zone 6
+And: 2
+Filter: host_name = my-host
+Filter: service_description = Temperature Zone 6
+And: 2
+Filter: host_name = other-host
+Filter: service_description = Temperature Zone 6
+And: 2
+Or: 3""",
+            sites=["NO_SITE", "remote"],
+        )
+        rf.prefetch_rrd_data_for_graphs(
+            ((graph_recipe, _GRAPH_DATA_RANGE) for graph_recipe in graphs), lambda _specs: ()
+        )
+
+        # All graphs are computed from the prefetched data
+        assert [
+            list(
+                rf.fetch_rrd_data_for_graph(
+                    graph_recipe, _GRAPH_DATA_RANGE, lambda _specs: ()
+                ).values()
+            )
+            for graph_recipe in graphs
+        ] == [
+            [TimeSeries([4, 7, None], time_window=(1, 2, 3))],
+            [TimeSeries([4, 10, None], time_window=(1, 2, 3))],
+            [TimeSeries([4, 7, None], time_window=(1, 2, 3))],
+            [TimeSeries([4, 7, None], time_window=(1, 2, 3))],
+        ]
+
+
+def test_fetched_series_are_cached_shortly(mock_livestatus: MockLiveStatusConnection) -> None:
+    query = """GET services
+Columns: rrddata:temp:temp.max:1681985455:1681999855:20
+Filter: host_name = my-host
+Filter: service_description = Temperature Zone 6
+ColumnHeaders: off"""
+    with _setup_livestatus(mock_livestatus) as mock_live:
+        rf.fetch_rrd_data_for_graph(_GRAPH_RECIPE, _GRAPH_DATA_RANGE, lambda _specs: ())
+
+        # e.g. the next hover request
+        g.pop("rrd_fetch_planner")
+        assert rf.fetch_rrd_data_for_graph(_GRAPH_RECIPE, _GRAPH_DATA_RANGE, lambda _specs: ())
+
+        g.pop("rrd_fetch_planner")
+        mock_live.expect_query(query, sites=["NO_SITE"])
+        with freezegun.freeze_time(datetime.datetime.now() + datetime.timedelta(seconds=31)):
+            assert rf.fetch_rrd_data_for_graph(_GRAPH_RECIPE, _GRAPH_DATA_RANGE, lambda _specs: ())
+
+
 def test_translate_and_merge_rrd_columns() -> None:
     assert rf.translate_and_merge_rrd_columns(
         MetricName("my_metric"),
@@ -46,3 +46,28 @@ def test_time_series_math_exc(args: tuple[ts.Operator, list[TimeSeries]]) -> Non
 def test_time_series_math_stable_singles(operator: ts.Operator) -> None:
     test_ts = TimeSeries([0, 180, 60, 6, 5, 10, None, -2, -3.14])
     assert ts.time_series_math(operator, [test_ts]) == test_ts
+
+
+@pytest.mark.parametrize(
+    "operator, expected",
+    [
+        ("+", [1, None, 6.5, 2, 0, -1.5]),
+        ("*", [None, None, 10, None, 0, -4.5]),
+        ("-", [None, None, -1.5, None, 0, -4.5]),
+        ("/", [None, None, 0.625, None, None, -2]),
+        ("MAX", [1, None, 4, 2, 0, 1.5]),
+        ("MIN", [1, None, 2.5, 2, 0, -3]),
+        ("AVERAGE", [1, None, 3.25, 2, 0, -0.75]),
+        ("MERGE", [1, None, 2.5, 2, 0, -3]),
+    ],
+)
+def test_time_series_math_point_wise(operator: ts.Operator, expected: list[float | None]) -> None:
+    operands = [
+        TimeSeries([0, 60, 60, 1, None, 2.5, None, 0, -3]),
+        TimeSeries([0, 60, 60, None, None, 4, 2, 0, 1.5]),
+    ]
+
+    result = ts.time_series_math(operator, operands)
+
+    assert result is not None
+    assert result.values == expected
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import datetime
+import random
+import re
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+import freezegun
+import pytest
+from pytest import MonkeyPatch
+
+from livestatus import SiteId
+
+import cmk.utils.paths
+
+from cmk.gui import availability_rollups
+
+_COLUMNS = [
+    "host_name",
+    "service_description",
+    "duration",
+    "from",
+    "until",
+    "state",
+    "in_downtime",
+    "host_alias",
+    "log_output",
+]
+_DAY = 86400
+_START = int(datetime.datetime(2023, 1, 1).timestamp())
+
+# The changes of the objects at a time, the output can change without a new span
+Event = tuple[int, Mapping[str, Any]]
+
+
+class _Core:
+    """The state history of the core, spans computed like by the core
+
+    The aliases are the ones of the current configuration, for all spans."""
+
+    def __init__(self, histories: Mapping[tuple[str, str], Sequence[Event]]) -> None:
+        self.histories = histories
+        self.aliases = {host_name: f"alias of {host_name}" for host_name, _service in histories}
+        self.program_start = _START
+        self.queries: list[tuple[int, int]] = []
+
+    def statehist(self, since: int, until: int) -> list[list[Any]]:
+        rows = []
+        for (host_name, service), events in self.histories.items():
+            state = {"state": 0, "in_downtime": 0, "log_output": ""}
+            start = since
+            for time, changes in events:
+                if time >= until:
+                    break
+                if time >= since and any(
+                    state[key] != value for key, value in changes.items() if key != "log_output"
+                ):
+                    rows.append(self._row(host_name, service, start, time, state))
+                    start = time
+                state = {**state, **changes}
+            rows.append(self._row(host_name, service, start, until - 1, state))
+        return rows
+
+    def _row(
+        self, host_name: str, service: str, start: int, end: int, state: Mapping[str, Any]
+    ) -> list[Any]:
+        return [
+            host_name,
+            service,
+            end - start,
+            start,
+            end,
+            state["state"],
+            state["in_downtime"],
+            self.aliases[host_name],
+            state["log_output"],
+        ]
+
+
+class _Live:
+    """Answers the statehist queries of a single site"""
+
+    def __init__(self, core: _Core) -> None:
+        self.core = core
+        self.prepend_site = False
+
+    def alive_sites(self) -> list[SiteId]:
+        return [SiteId("site")]
+
+    def set_only_sites(self, sites: list[SiteId] | None = None) -> None:
+        pass
+
+    def set_prepend_site(self, prepend_site: bool) -> None:
+        self.prepend_site = prepend_site
+
+    def query(self, query: str) -> list[list[Any]]:
+        match = re.match(r"GET statehist\nFilter: time >= (\d+)\nFilter: time < (\d+)\n", query)
+        assert match is not None
+        since, until = int(match[1]), int(match[2])
+        self.core.queries.append((since, until))
+        columns = re.findall(r"^Columns: (.*)$", query, re.M)[0].split()
+        rows = [
+            [row[_COLUMNS.index(column)] for column in columns]
+            for row in self.core.statehist(since, until)
+        ]
+        return [["site"] + row for row in rows] if self.prepend_site else rows
+
+
+def _random_histories(seed: int) -> dict[tuple[str, str], list[Event]]:
+    rnd = random.Random(seed)
+    histories: dict[tuple[str, str], list[Event]] = {}
+    for service in ("CPU load", "Disk IO", "Memory"):
+        times = sorted(rnd.randrange(_START - 10 * _DAY, _START + 60 * _DAY) for _ in range(300))
+        # Changes at and around midnight
+        times += [_START + 20 * _DAY - 1, _START + 20 * _DAY, _START + 20 * _DAY]
+        histories["heute", service] = [
+            (
+                time,
+                {
+                    "state": rnd.choice((0, 0, 1, 2)),
+                    "in_downtime": rnd.choice((0, 0, 0, 1)),
+                    "log_output": f"output {time}",
+                }
+                if rnd.random() < 0.5
+                else {"log_output": f"only output {time}"},
+            )
+            for time in sorted(times)
+        ]
+    return histories
+
+
+@pytest.fixture(name="core")
+def fixture_core(
+    monkeypatch: MonkeyPatch, tmp_path: Path, request_context: None
+) -> Iterator[_Core]:
+    core = _Core(_random_histories(0))
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+    live = _Live(core)
+    monkeypatch.setattr(availability_rollups.sites, "live", lambda: live)
+    monkeypatch.setattr(
+        availability_rollups.sites,
+        "states",
+        lambda: {SiteId("site"): {"program_start": core.program_start}},
+    )
+    monkeypatch.setattr(availability_rollups, "_sees_all_objects", lambda: True)
+    yield core
+
+
+def _query(since: int, until: int, columns: Sequence[str] = _COLUMNS) -> list[list[Any]] | None:
+    return availability_rollups.query_statehist(
+        None,
+        "Filter: service_description !=\nColumns: %s\n" % " ".join(columns),
+        columns,
+        (since, until),
+        30,
+    )
+
+
+def _update(day: int) -> None:
+    with freezegun.freeze_time(datetime.datetime.fromtimestamp(_START + day * _DAY + 3600)):
+        availability_rollups.update_availability_rollups(float("inf"))
+
+
+def _days(since: int, until: int) -> list[tuple[int, int]]:
+    """The queries of the days materialized, the most recent first"""
+    return [(day, day + _DAY) for day in range(until - _DAY, since - 1, -_DAY)]
+
+
+def _by_object(rows: Sequence[list[Any]]) -> list[list[Any]]:
+    return sorted(rows, key=lambda row: (row[1], row[2]))
+
+
+def test_composed_spans_are_the_spans_of_the_core(core: _Core) -> None:
+    since = _START - 5 * _DAY
+    assert _query(since, _START + 20 * _DAY) is None
+    assert _query(since, _START + 20 * _DAY, _COLUMNS[:-1]) is None
+
+    # The missing days of both queries are materialized, one query per day
+    for day in range(10, 30):
+        _update(day)
+    assert core.queries[:30] == _days(since, _START + 10 * _DAY) * 2
+    assert core.queries[30:] == [
+        (_START + day * _DAY, _START + (day + 1) * _DAY) for day in range(10, 29) for _ in range(2)
+    ]
+
+    rnd = random.Random(1)
+    for _ in range(50):
+        start = rnd.randrange(since, _START + 25 * _DAY)
+        end = rnd.randrange(start + 7 * _DAY, _START + 40 * _DAY)
+        core.queries.clear()
+        composed = _query(start, end, _COLUMNS[:-1])
+        assert composed is not None
+        assert _by_object(composed) == _by_object(
+            [["site"] + row[:-1] for row in core.statehist(start, end)]
+        )
+        # Only the time after the last materialized day is fetched from the core
+        last_day_end = min(_START + 29 * _DAY, _START + (end - _START) // _DAY * _DAY)
+        assert core.queries == ([(last_day_end, end)] if end > last_day_end else [])
+
+    for start, end in [
+        (_START, _START + 35 * _DAY),
+        (_START, _START + 20 * _DAY),
+        (_START + 20 * _DAY, _START + 29 * _DAY),
+        (_START + 20 * _DAY - 1, _START + 29 * _DAY + 1),
+    ]:
+        assert _by_object(_query(start, end) or []) == _by_object(
+            [["site"] + row for row in core.statehist(start, end)]
+        )
+
+
+def test_days_of_a_previous_configuration_are_materialized_again(core: _Core) -> None:
+    assert _query(_START, _START + 20 * _DAY) is None
+    _update(10)
+    core.queries.clear()
+
+    # The completed days are kept
+    _update(10)
+    assert not core.queries
+
+    # The changed alias applies to the spans of all days
+    core.aliases["heute"] = "new alias"
+    core.program_start += 3600
+    assert _query(_START, _START + 20 * _DAY) is None
+
+    _update(15)
+    assert core.queries == _days(_START, _START + 15 * _DAY)
+    assert [path.name for path in availability_rollups.rollups_dir().glob("*/*/*")] == [
+        str(core.program_start)
+    ]
+    composed = _query(_START, _START + 20 * _DAY)
+    assert _by_object(composed or []) == _by_object(
+        [["site"] + row for row in core.statehist(_START, _START + 20 * _DAY)]
+    )
+
+    # Earlier starts only need the additional days
+    assert _query(_START - _DAY, _START + 20 * _DAY) is not None
+    core.queries.clear()
+    _update(15)
+    assert core.queries == [(_START - _DAY, _START)]
+
+
+def test_unused_rollups_are_removed(core: _Core) -> None:
+    assert _query(_START, _START + 20 * _DAY) is None
+    _update(1)
+    assert len(list(availability_rollups.rollups_dir().glob("*/*.request"))) == 1
+    assert len(list(availability_rollups.rollups_dir().glob("*/*/*/*.rollup"))) == 1
+
+    # Short time ranges are not materialized
+    assert _query(_START, _START + 6 * _DAY) is None
+
+    with freezegun.freeze_time(datetime.datetime.now() + datetime.timedelta(days=41)):
+        availability_rollups.update_availability_rollups(float("inf"))
+    assert not list(availability_rollups.rollups_dir().glob("*/*"))
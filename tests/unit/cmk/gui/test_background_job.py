@@ -57,6 +57,7 @@ def test_registered_background_jobs() -> None:
         "SyncRemoteSitesBackgroundJob",
         "HostRemovalBackgroundJob",
         "AutodiscoveryBackgroundJob",
+        "AvailabilityRollupBackgroundJob",
     ]
 
     if cmk_version.edition() is not cmk_version.Edition.CRE:
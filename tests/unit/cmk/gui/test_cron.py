@@ -10,6 +10,7 @@ import cmk.gui.cron as cron
 
 def test_registered_jobs() -> None:
     expected = [
+        "cmk.gui.availability_rollups.execute_availability_rollup_job",
         "cmk.gui.inventory.execute_inventory_housekeeping_job",
         "cmk.gui.background_job.execute_housekeeping_job",
         "cmk.gui.watolib.hosts_and_folders.rebuild_folder_lookup_cache",
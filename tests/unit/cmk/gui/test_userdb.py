@@ -692,6 +692,23 @@ def test_load_custom_attr_convert(user_id: UserId) -> None:
     )
 
 
+def test_saved_custom_attr_is_loaded_from_profile_store(user_id: UserId) -> None:
+    users = _load_users_uncached(lock=False)
+    assert "ui_theme" not in users[user_id]
+
+    userdb.save_custom_attr(user_id, "ui_theme", "modern-dark")
+    userdb.save_custom_attr(user_id, "num_failed_logins", 3)
+    userdb.remove_custom_attr(user_id, "last_pw_change")
+
+    users_from_store = _load_users_uncached(lock=False)
+    assert users_from_store[user_id]["ui_theme"] == "modern-dark"
+    assert users_from_store[user_id]["num_failed_logins"] == 3
+    assert "last_pw_change" not in users_from_store[user_id]
+
+    userdb.store.invalidate_profile_store()
+    assert _load_users_uncached(lock=False) == users_from_store
+
+
 def create_new_profile_dir(paths: Iterable[Path]) -> Path:
     profile_dir = cmk.utils.paths.profile_dir / "profile"
     assert not profile_dir.exists()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import datetime
+import re
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+import freezegun
+import pytest
+from pytest_mock import MockerFixture
+
+from cmk.utils.user import UserId
+
+from cmk.gui.type_defs import Users
+from cmk.gui.userdb import ldap_connector
+from cmk.gui.userdb.ldap_connector import LDAPUserConnector
+
+Attributes = Mapping[str, list[str]]
+
+
+def _parse_filter(filt: str, pos: int = 0) -> tuple[Callable[[Attributes], bool], int]:
+    """Parse the simple filters used by the connector, returns the matcher and the end"""
+    assert filt[pos] == "("
+    if (op := filt[pos + 1]) in "&|!":
+        pos += 2
+        matchers = []
+        while filt[pos] == "(":
+            matcher, pos = _parse_filter(filt, pos)
+            matchers.append(matcher)
+        if op == "&":
+            return lambda attrs: all(m(attrs) for m in matchers), pos + 1
+        if op == "|":
+            return lambda attrs: any(m(attrs) for m in matchers), pos + 1
+        return lambda attrs: not matchers[0](attrs), pos + 1
+
+    end = filt.index(")", pos)
+    match = re.fullmatch(r"([\w-]+)(>=|=)(.*)", filt[pos + 1 : end])
+    assert match is not None, filt
+    attr, op, value = match[1].lower(), match[2], match[3]
+    value = re.sub(r"\\([0-9a-f]{2})", lambda m: chr(int(m[1], 16)), value).lower()
+
+    def matches(attrs: Attributes) -> bool:
+        values = [v.lower() for v in attrs.get(attr, [])]
+        if op == ">=":
+            return any(v.isdigit() and int(v) >= int(value) or v >= value for v in values)
+        return bool(values) if value == "*" else value in values
+
+    return matches, end + 1
+
+
+class _Directory:
+    """In-memory directory, answering the searches of the connector"""
+
+    def __init__(self, change_attr: str) -> None:
+        self.change_attr = change_attr
+        self.entries: dict[str, dict[str, list[str]]] = {}
+        self.searches: list[tuple[str, str]] = []
+        self.usn = 100
+
+    def add(self, dn: str, **attrs: list[str]) -> None:
+        self.entries[dn] = {}
+        self.modify(dn, **attrs)
+
+    def modify(self, dn: str, **attrs: list[str]) -> None:
+        self.usn += 1
+        self.entries[dn].update(attrs)
+        self.entries[dn][self.change_attr] = [
+            str(self.usn) if self.change_attr == "usnchanged" else f"20231019{self.usn:06d}Z"
+        ]
+
+    def search(
+        self,
+        base: str,
+        filt: str = "(objectclass=*)",
+        columns: Sequence[str] | None = None,
+        scope: str = "sub",
+        implicit_connect: bool = True,
+    ) -> list[tuple[str, dict[str, list[str]]]]:
+        self.searches.append((base, filt))
+        if base == "":
+            return [
+                (
+                    "",
+                    {
+                        "dsservicename": ["cn=ntds settings,cn=dc1"],
+                        "highestcommittedusn": [str(self.usn)],
+                    },
+                )
+            ]
+
+        matcher = _parse_filter(filt)[0]
+        return [
+            (dn, {c: attrs[c] for c in columns or [] if c in attrs})
+            for dn, attrs in self.entries.items()
+            if (dn == base or (scope == "sub" and dn.endswith("," + base))) and matcher(attrs)
+        ]
+
+
+def _config(directory_type: tuple[str, dict], **config: Any) -> dict[str, Any]:
+    return {
+        "id": "incremental",
+        "description": "",
+        "comment": "",
+        "docu_url": "",
+        "disabled": False,
+        "directory_type": directory_type,
+        "user_dn": "ou=people,dc=example,dc=com",
+        "user_scope": "sub",
+        "user_id_umlauts": "keep",
+        "group_dn": "ou=groups,dc=example,dc=com",
+        "group_scope": "sub",
+        "active_plugins": {
+            "email": {},
+            "groups_to_roles": {"admin": [("cn=admins,ou=groups,dc=example,dc=com", None)]},
+        },
+        "cache_livetime": 300,
+        "incremental_sync": {"full_sync_interval": 86400},
+        "type": "ldap",
+        **config,
+    }
+
+
+_OPENLDAP = ("openldap", {"connect_to": ("fixed_list", {"server": "localhost"})})
+
+
+class _Site:
+    """The users of the site and the searches of the synchronizations"""
+
+    def __init__(self, mocker: MockerFixture, directory: _Directory, config: dict) -> None:
+        self.directory = directory
+        self.connector = LDAPUserConnector(config)
+        self.users: Users = {}
+        mocker.patch.object(self.connector, "_ldap_search", side_effect=directory.search)
+        mocker.patch.object(ldap_connector, "get_connection", return_value=self.connector)
+        self.plugin_runs = mocker.spy(self.connector, "_execute_active_sync_plugins")
+
+    def sync(self) -> list[UserId]:
+        """Synchronize, returns the users the sync plugins have been executed for"""
+
+        def save_users(users: Users, _now: datetime.datetime) -> None:
+            self.users = users
+
+        self.plugin_runs.reset_mock()
+        self.directory.searches.clear()
+        self.connector.do_sync(
+            add_to_changelog=False,
+            only_username=None,
+            load_users_func=lambda _lock: dict(self.users),
+            save_users_func=save_users,
+        )
+        return sorted(call.args[0] for call in self.plugin_runs.call_args_list)
+
+
+def _openldap_directory() -> _Directory:
+    directory = _Directory("modifytimestamp")
+    for name in ("alice", "bob"):
+        directory.add(
+            f"uid={name},ou=people,dc=example,dc=com",
+            objectclass=["person"],
+            uid=[name],
+            mail=[f"{name}@example.com"],
+        )
+    directory.add(
+        "cn=admins,ou=groups,dc=example,dc=com",
+        objectclass=["groupOfUniqueNames"],
+        cn=["admins"],
+        uniquemember=["uid=alice,ou=people,dc=example,dc=com"],
+    )
+    return directory
+
+
+@pytest.mark.usefixtures("load_config")
+def test_only_changed_users_are_synchronized(mocker: MockerFixture) -> None:
+    site = _Site(mocker, _openldap_directory(), _config(_OPENLDAP))
+    assert site.sync() == ["alice", "bob"]
+    assert site.users[UserId("alice")]["roles"] == ["admin"]
+    assert site.users[UserId("bob")]["roles"] == ["user"]
+
+    site.directory.modify("uid=bob,ou=people,dc=example,dc=com", mail=["robert@example.com"])
+    assert site.sync() == ["bob"]
+    assert site.users[UserId("bob")]["email"] == "robert@example.com"
+    assert site.users[UserId("alice")]["email"] == "alice@example.com"
+    # The group memberships are taken from the last synchronization
+    assert [base for base, _filt in site.directory.searches] == [
+        "ou=people,dc=example,dc=com",
+        "dc=example,dc=com",
+    ]
+    assert "(modifytimestamp>=20231019000103Z)" in site.directory.searches[0][1]
+
+    assert site.sync() == []
+
+
+@pytest.mark.usefixtures("load_config")
+def test_group_changes_synchronize_all_users(mocker: MockerFixture) -> None:
+    site = _Site(mocker, _openldap_directory(), _config(_OPENLDAP))
+    site.sync()
+
+    site.directory.modify(
+        "cn=admins,ou=groups,dc=example,dc=com",
+        uniquemember=[
+            "uid=alice,ou=people,dc=example,dc=com",
+            "uid=bob,ou=people,dc=example,dc=com",
+        ],
+    )
+    assert site.sync() == ["alice", "bob"]
+    assert site.users[UserId("bob")]["roles"] == ["admin"]
+
+
+@pytest.mark.usefixtures("load_config")
+def test_deleted_users_are_removed_by_full_sync(mocker: MockerFixture) -> None:
+    site = _Site(mocker, _openldap_directory(), _config(_OPENLDAP))
+    with freezegun.freeze_time(datetime.datetime(2023, 10, 19, 12, 0)) as frozen_time:
+        site.sync()
+        del site.directory.entries["uid=bob,ou=people,dc=example,dc=com"]
+        site.directory.add(
+            "uid=carol,ou=people,dc=example,dc=com",
+            objectclass=["person"],
+            uid=["carol"],
+            mail=["carol@example.com"],
+        )
+
+        assert site.sync() == ["carol"]
+        assert sorted(site.users) == ["alice", "bob", "carol"]
+
+        frozen_time.tick(datetime.timedelta(days=1))
+        assert site.sync() == ["alice", "carol"]
+        assert sorted(site.users) == ["alice", "carol"]
+
+
+@pytest.mark.usefixtures("load_config")
+def test_active_directory_tracks_update_sequence_numbers(mocker: MockerFixture) -> None:
+    directory = _Directory("usnchanged")
+    directory.add(
+        "cn=alice,ou=people,dc=example,dc=com",
+        objectclass=["user"],
+        objectcategory=["person"],
+        samaccountname=["alice"],
+        mail=["alice@example.com"],
+    )
+    site = _Site(
+        mocker,
+        directory,
+        _config(("ad", {"connect_to": ("fixed_list", {"server": "dc1"})}), active_plugins={}),
+    )
+    assert site.sync() == ["alice"]
+
+    assert site.sync() == []
+    assert "(usnchanged>=102)" in site.directory.searches[1][1]
+
+    directory.modify("cn=alice,ou=people,dc=example,dc=com", mail=["alice@example.org"])
+    assert site.sync() == ["alice"]
+    assert "(usnchanged>=102)" in site.directory.searches[1][1]
+    assert site.sync() == []
+    assert "(usnchanged>=103)" in site.directory.searches[1][1]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from pathlib import Path
+
+import pytest
+
+from cmk.utils.user import UserId
+
+from cmk.gui.type_defs import Users, UserSpec
+from cmk.gui.userdb.profile_store import UserProfileStore
+
+
+class _Files:
+    """The files of the users, counting the loads"""
+
+    def __init__(self, tmp_path: Path) -> None:
+        self.source = tmp_path / "users.mk"
+        self.source.write_text("1")
+        self.users: Users = {
+            UserId("alice"): {"alias": "Alice", "roles": ["admin"]},
+            UserId("bob"): {"alias": "Bob", "roles": ["user"]},
+        }
+        self.loads = 0
+
+    def sources(self) -> list[Path]:
+        return [self.source]
+
+    def load(self) -> Users:
+        self.loads += 1
+        return {user_id: UserSpec(**user) for user_id, user in self.users.items()}
+
+    def change(self, users: Users) -> None:
+        self.users = users
+        self.source.write_text(self.source.read_text() + "1")
+
+
+@pytest.fixture(name="files")
+def fixture_files(tmp_path: Path) -> _Files:
+    return _Files(tmp_path)
+
+
+def _store(tmp_path: Path, files: _Files) -> UserProfileStore:
+    return UserProfileStore(tmp_path / "user_profiles.sqlite", files.sources, files.load)
+
+
+def test_store_is_built_once(tmp_path: Path, files: _Files) -> None:
+    store = _store(tmp_path, files)
+    assert store.load_users() == files.users
+    # Another process
+    assert _store(tmp_path, files).load_users() == files.users
+    assert _store(tmp_path, files).load_user(UserId("bob")) == files.users[UserId("bob")]
+    assert _store(tmp_path, files).load_user(UserId("carol")) is None
+    assert files.loads == 1
+
+    # Copies are handed out
+    store.load_users()[UserId("alice")]["alias"] = "Mallory"
+    assert store.load_users()[UserId("alice")]["alias"] == "Alice"
+
+
+def test_store_is_rebuilt_on_changed_sources(tmp_path: Path, files: _Files) -> None:
+    store = _store(tmp_path, files)
+    store.load_users()
+
+    files.change({UserId("bob"): {"alias": "Robert"}})
+    assert store.load_users() == {UserId("bob"): {"alias": "Robert"}}
+    assert files.loads == 2
+
+    store.invalidate()
+    assert store.load_users() == {UserId("bob"): {"alias": "Robert"}}
+    assert files.loads == 3
+
+
+def test_updated_users_are_taken_over(tmp_path: Path, files: _Files) -> None:
+    store = _store(tmp_path, files)
+    other = _store(tmp_path, files)
+    store.load_users()
+    other.load_users()
+
+    other.update_user(UserId("bob"), lambda profile: profile.update({"ui_theme": "modern-dark"}))
+    # Not built for this user yet
+    other.update_user(UserId("carol"), lambda profile: pytest.fail("Not a user"))
+
+    assert store.load_users()[UserId("bob")]["ui_theme"] == "modern-dark"
+    assert store.load_users()[UserId("alice")] == files.users[UserId("alice")]
+    assert files.loads == 1
+
+
+def test_broken_store_is_rebuilt(tmp_path: Path, files: _Files) -> None:
+    store = _store(tmp_path, files)
+    store.load_users()
+    store.path.write_bytes(b"garbage" * 1000)
+    for suffix in ("-wal", "-shm"):
+        Path(f"{store.path}{suffix}").unlink(missing_ok=True)
+
+    assert store.load_users() == files.users
+    assert store.load_users() == files.users
+    assert files.loads == 3
@@ -8,6 +8,7 @@ from collections.abc import Sequence
 
 import pytest
 
+from cmk.gui.plugins.metrics import utils
 from cmk.gui.type_defs import Row
 from cmk.gui.views.perfometer import Perfometer
 from cmk.gui.views.perfometer.sorter import SorterPerfometer
@@ -41,3 +42,41 @@ def test_cmp_of_missing_values(sort_values: Sequence[float | None]) -> None:
 
     data.sort(key=functools.cmp_to_key(wrapped))
     assert [Perfometer(r).sort_value()[1] for r in data] == [None, -1.0, 0.0, 1.0]
+
+
+def _synthetic_view(num_rows: int) -> list[Row]:
+    services = [
+        ("check_mk-df", "fs_used={0};80000;90000;0;100000 fs_size=100000;;;; growth=-1.2;;;;"),
+        ("check_mk-cpu_loads", "load1=0.{0};8;16;0;4 load5=0.7;8;16;0;4 load15=0.9;8;16;0;4"),
+        ("check_mk-kernel_util", "user={0};;;; system=1.57;;;; io_wait=0.14;;;; util=6.3;80;90;0;"),
+        ("check_mk-mem_linux", "mem_used={0};;;0;16615555072 swap_used=0;;;0;2147479552"),
+        ("check_mk-lnx_thermal", "temp={0}.05;85.05;85.05;;"),
+        ("check_mk-if64", "in={0};;;0;125000000 out=1234.5;;;0;125000000 'in err'=0;0.01;0.1;;"),
+        ("check_mk-local", "10.172=6 value={0}"),
+    ]
+    return [
+        {
+            "service_check_command": check_command,
+            "service_perf_data": perf_data.format(idx % 89),
+        }
+        for idx in range(num_rows)
+        for check_command, perf_data in [services[idx % len(services)]]
+    ]
+
+
+def test_render_synthetic_view(request_context: None) -> None:
+    """The rendering of a view with the parsed perf data, translations and expressions cached"""
+    rows = _synthetic_view(2000)
+
+    rendered = []
+    for row in rows:
+        utils._parse_valid_perf_data.cache_clear()
+        utils._compiled_translations.cache_clear()
+        utils._compile_rpn.cache_clear()
+        rendered.append(Perfometer(row).render())
+
+    assert [Perfometer(row).render() for row in rows] == rendered
+    # Each perf data is parsed once
+    assert utils._parse_valid_perf_data.cache_info().currsize == len(
+        {row["service_perf_data"] for row in rows}
+    )
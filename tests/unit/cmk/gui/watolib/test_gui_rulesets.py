@@ -16,7 +16,6 @@ from tests.unit.cmk.gui.conftest import SetConfig
 import cmk.utils.rulesets.ruleset_matcher as ruleset_matcher
 from cmk.utils import version
 from cmk.utils.exceptions import MKGeneralException
-from cmk.utils.redis import disable_redis
 from cmk.utils.rulesets.ruleset_matcher import RuleOptionsSpec, RulesetName, RuleSpec
 from cmk.utils.tags import TagGroupID, TagID
 from cmk.utils.user import UserId
@@ -26,7 +25,7 @@ import cmk.gui.watolib.rulesets as rulesets
 from cmk.gui.config import active_config
 from cmk.gui.plugins.wato.check_parameters.local import _parameter_valuespec_local
 from cmk.gui.plugins.wato.check_parameters.ps import _valuespec_inventory_processes_rules
-from cmk.gui.watolib.hosts_and_folders import Folder, folder_tree
+from cmk.gui.watolib.hosts_and_folders import _disable_folder_index_locally, Folder, folder_tree
 from cmk.gui.watolib.rulesets import Rule, RuleOptions, Ruleset, RuleValue
 from cmk.gui.watolib.utils import NEGATE
 
@@ -793,7 +792,7 @@ def test_rules_grouped_by_folder() -> None:
     sorted_rules = sorted(
         rules, key=lambda x: (x[0].path().split("/"), len(rules) - x[1]), reverse=True
     )
-    with disable_redis():
+    with _disable_folder_index_locally():
         assert (
             list(rule[0].path() for rule in rulesets.rules_grouped_by_folder(sorted_rules, root))
             == expected_folder_order
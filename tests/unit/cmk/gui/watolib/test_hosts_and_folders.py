@@ -26,7 +26,6 @@ from livestatus import SiteId
 
 from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.hostaddress import HostAddress, HostName
-from cmk.utils.redis import disable_redis
 from cmk.utils.store.host_storage import ContactgroupName
 from cmk.utils.user import UserId
 
@@ -760,7 +759,7 @@ def dump_wato_folder_structure(wato_folder: hosts_and_folders.Folder) -> None:
 def test_folder_permissions(
     structure: _TreeStructure, testfolder_expected_groups: set[str]
 ) -> None:
-    with disable_redis():
+    with hosts_and_folders._disable_folder_index_locally():
         wato_folder = make_monkeyfree_folder(structure)
         # dump_wato_folder_structure(wato_folder)
         testfolder = wato_folder._subfolders["sub1"]._subfolders["testfolder"]
@@ -768,7 +767,9 @@ def test_folder_permissions(
         assert permitted_groups_cre_folder == testfolder_expected_groups
 
         all_folders = _convert_folder_tree_to_all_folders(wato_folder)
-        permitted_groups_bulk = hosts_and_folders._get_permitted_groups_of_all_folders(all_folders)
+        permitted_groups_bulk = hosts_and_folders._get_permitted_groups_of_all_folders(
+            {path: folder.attributes for path, folder in all_folders.items()}
+        )
         assert permitted_groups_bulk["sub1/testfolder"].actual_groups == testfolder_expected_groups
 
 
@@ -871,15 +872,14 @@ group_tree_test = (
 def test_num_hosts_normal_user(
     structure: _TreeStructure, user_tests: list[_UserTest], monkeypatch: MonkeyPatch
 ) -> None:
-    with disable_redis():
-        for user_test in user_tests:
-            _run_num_host_test(
-                structure,
-                user_test,
-                user_test.expected_num_hosts,
-                False,
-                monkeypatch,
-            )
+    for user_test in user_tests:
+        _run_num_host_test(
+            structure,
+            user_test,
+            user_test.expected_num_hosts,
+            False,
+            monkeypatch,
+        )
 
 
 @pytest.mark.usefixtures("with_admin_login")
@@ -890,9 +890,8 @@ def test_num_hosts_normal_user(
 def test_num_hosts_admin_user(
     structure: _TreeStructure, user_tests: list[_UserTest], monkeypatch: MonkeyPatch
 ) -> None:
-    with disable_redis():
-        for user_test in user_tests:
-            _run_num_host_test(structure, user_test, 117, True, monkeypatch)
+    for user_test in user_tests:
+        _run_num_host_test(structure, user_test, 117, True, monkeypatch)
 
 
 def _run_num_host_test(
@@ -902,7 +901,10 @@ def _run_num_host_test(
     is_admin: bool,
     monkeypatch: MonkeyPatch,
 ) -> None:
-    wato_folder = make_monkeyfree_folder(structure)
+    with hosts_and_folders._disable_folder_index_locally():
+        wato_folder = make_monkeyfree_folder(structure)
+        _persist_folders(wato_folder)
+
     with hide_folders_without_permission(user_test.hide_folders_without_permission):
         # The algorithm implemented in Folder actually computes the num_hosts_recursively wrong.
         # It does not exclude hosts in the questioned base folder, even when it should adhere
@@ -915,101 +917,116 @@ def _run_num_host_test(
         )
 
         # Old mechanism
-        with patch.dict(logged_in_user._attributes, {"contactgroups": user_test.contactgroups}):
+        with hosts_and_folders._disable_folder_index_locally(), patch.dict(
+            logged_in_user._attributes, {"contactgroups": user_test.contactgroups}
+        ):
             assert (
                 wato_folder.num_hosts_recursively()
                 == expected_host_count + legacy_base_folder_host_offset
             )
 
-        # New mechanism
+        # Folder index
         monkeypatch.setattr(userdb, "contactgroups_of_user", lambda u: user_test.contactgroups)
-        with get_fake_setup_redis_client(
-            monkeypatch,
-            _convert_folder_tree_to_all_folders(wato_folder),
-            [_fake_redis_num_hosts_answer(wato_folder)],
-        ):
-            assert wato_folder.num_hosts_recursively() == expected_host_count
+        tree = folder_tree()
+        tree.invalidate_caches()
+        assert tree.root_folder().num_hosts_recursively() == expected_host_count
 
 
-def _fake_redis_num_hosts_answer(wato_folder: hosts_and_folders.Folder) -> list[list[str]]:
-    redis_answer = []
+def _persist_folders(wato_folder: hosts_and_folders.Folder) -> None:
     for folder in _convert_folder_tree_to_all_folders(wato_folder).values():
-        redis_answer.extend([",".join(folder.groups()[0]), str(folder._num_hosts)])
-    return [redis_answer]
+        folder.persist_instance()
+
 
+@pytest.mark.usefixtures("with_admin_login")
+def test_load_folders_on_demand() -> None:
+    with hosts_and_folders._disable_folder_index_locally():
+        _persist_folders(make_monkeyfree_folder(group_tree_structure))
+    folder_tree().invalidate_caches()
 
-class MockRedisClient:
-    def __init__(self, answers: list[list[list[str]]]) -> None:
-        class FakePipeline:
-            def __init__(self, answers: list[list[list[str]]]) -> None:
-                self._answers = answers
+    folder_tree().all_folders()
+    # Check if wato_folders class matches
+    assert isinstance(g.wato_folders, hosts_and_folders.WATOFoldersOnDemand)
+    # Check if item is None
+    assert g.wato_folders._raw_dict["sub1.1"] is None
+    # Check if item is generated on access
+    assert isinstance(g.wato_folders["sub1.1"], hosts_and_folders.Folder)
+    # Check if item is now set in dict
+    assert isinstance(g.wato_folders._raw_dict["sub1.1"], hosts_and_folders.Folder)
 
-            def execute(self):
-                return self._answers.pop(0)
+    # Check if other folder is still None
+    assert g.wato_folders._raw_dict["sub1.2"] is None
+    # Check if parent(main) folder got instantiated as well
+    assert isinstance(g.wato_folders._raw_dict[""], hosts_and_folders.Folder)
 
-            def __getattr__(self, name):
-                return lambda *args, **kwargs: None
 
-        self._fake_pipeline = FakePipeline(answers)
-        self._answers = answers
+@pytest.mark.usefixtures("with_admin_login")
+def test_folder_index_hosts() -> None:
+    tree = folder_tree()
+    folder = tree.root_folder().create_subfolder("foo", "Foo", {})
+    folder.create_hosts([(HostName("host1"), {}, None)])
+    tree.invalidate_caches()
+
+    index = hosts_and_folders.get_folder_index(tree)
+    assert index.host_folder(HostName("host1")) == "foo"
+    assert index.host_folder(HostName("unknown")) is None
+    host = hosts_and_folders.Host.host(HostName("host1"))
+    assert host is not None
+    assert host.folder().path() == "foo"
 
-    def __getattr__(self, name):
-        if name == "pipeline":
-            return lambda: self._fake_pipeline
+    with hosts_and_folders._disable_folder_index_locally():
+        tree.folder("foo").create_hosts([(HostName("host2"), {}, None)])
+        tree.folder("foo").edit("Bar", {})
+    tree.invalidate_caches()
 
-        return lambda *args, **kwargs: lambda *args, **kwargs: None
+    index = hosts_and_folders.get_folder_index(tree)
+    folder_info = index.folder_info("foo")
+    assert folder_info is not None
+    assert folder_info["title"] == "Bar"
+    assert set(tree.folder("foo").hosts()) == {HostName("host1"), HostName("host2")}
+    assert index.host_folder(HostName("host2")) == "foo"
 
 
-@contextmanager
-def get_fake_setup_redis_client(
-    monkeypatch: MonkeyPatch,
-    all_folders: dict[hosts_and_folders.PathWithoutSlash, hosts_and_folders.Folder],
-    redis_answers: list[list[list[str]]],
-) -> Iterator[MockRedisClient]:
-    monkeypatch.setattr(hosts_and_folders, "may_use_redis", lambda: True)
-    mock_redis_client = MockRedisClient(redis_answers)
-    monkeypatch.setattr(hosts_and_folders._RedisHelper, "_cache_integrity_ok", lambda x: True)
+@pytest.mark.usefixtures("with_admin_login")
+def test_folder_index_finds_hosts_changed_outside() -> None:
     tree = folder_tree()
-    redis_helper = hosts_and_folders.get_wato_redis_client(tree)
-    monkeypatch.setattr(redis_helper, "_client", mock_redis_client)
-    monkeypatch.setattr(redis_helper, "_folder_paths", [f"{x}/" for x in all_folders.keys()])
-    monkeypatch.setattr(
-        redis_helper,
-        "_folder_metadata",
-        {
-            f"{x}/": hosts_and_folders.FolderMetaData(tree, f"{x}/", "nix", "nix", [])
-            for x in all_folders.keys()
-        },
-    )
-    try:
-        yield mock_redis_client
-    finally:
-        monkeypatch.setattr(hosts_and_folders, "may_use_redis", lambda: False)
-        # I have no idea if this is actually working..
-        monkeypatch.undo()
+    tree.root_folder().create_subfolder("foo", "Foo", {})
+    tree.root_folder().create_subfolder("bar", "Bar", {})
+    index = hosts_and_folders.get_folder_index(tree)
+    assert index.host_folder(HostName("host1")) is None
+    with hosts_and_folders._disable_folder_index_locally():
+        tree.folder("bar").create_hosts([(HostName("host1"), {}, None)])
+    assert index.host_folder(HostName("host1")) is None
+
+    # Not found where the index expects it, so the index is validated
+    host = hosts_and_folders.Host.host(HostName("host1"))
+    assert host is not None
+    assert host.folder().path() == "bar"
+    assert hosts_and_folders.get_folder_index(tree).host_folder(HostName("host1")) == "bar"
+    assert not index.validate()
 
 
 @pytest.mark.usefixtures("with_admin_login")
-def test_load_redis_folders_on_demand(monkeypatch: MonkeyPatch) -> None:
-    wato_folder = make_monkeyfree_folder(group_tree_structure)
-    folder_tree().invalidate_caches()
-    with get_fake_setup_redis_client(
-        monkeypatch, _convert_folder_tree_to_all_folders(wato_folder), []
-    ):
-        folder_tree().all_folders()
-        # Check if wato_folders class matches
-        assert isinstance(g.wato_folders, hosts_and_folders.WATOFoldersOnDemand)
-        # Check if item is None
-        assert g.wato_folders._raw_dict["sub1.1"] is None
-        # Check if item is generated on access
-        assert isinstance(g.wato_folders["sub1.1"], hosts_and_folders.Folder)
-        # Check if item is now set in dict
-        assert isinstance(g.wato_folders._raw_dict["sub1.1"], hosts_and_folders.Folder)
-
-        # Check if other folder is still None
-        assert g.wato_folders._raw_dict["sub1.2"] is None
-        # Check if parent(main) folder got instantiated as well
-        assert isinstance(g.wato_folders._raw_dict[""], hosts_and_folders.Folder)
+def test_folder_index_inherited_attributes() -> None:
+    tree = folder_tree()
+    tree.root_folder().edit("Main", {"site": "site1", "tag_criticality": "test"})
+    folder = tree.root_folder().create_subfolder("foo", "Foo", {"tag_criticality": "prod"})
+    folder.create_subfolder("sub", "Sub", {"alias": "sub"})
+    tree.invalidate_caches()
+
+    index = hosts_and_folders.get_folder_index(tree)
+    assert index.inherited_attributes("foo/sub") == {
+        "site": "site1",
+        "tag_criticality": "prod",
+        "meta_data": tree.folder("foo").attributes["meta_data"],
+    }
+    assert index.inherited_attributes("unknown") is None
+
+    effective = tree.folder("foo/sub").effective_attributes()
+    assert effective["tag_criticality"] == "prod"
+    assert effective["alias"] == "sub"
+    with hosts_and_folders._disable_folder_index_locally():
+        tree.invalidate_caches()
+        assert tree.folder("foo/sub").effective_attributes() == effective
 
 
 def test_folder_exists() -> None:
@@ -135,6 +135,7 @@ def test_registered_configvars() -> None:
         "notification_fallback_format",
         "notification_logging",
         "notification_plugin_timeout",
+        "notification_plugin_workers",
         "page_heading",
         "pagetitle_date_format",
         "password_policy",
@@ -167,6 +168,7 @@ def test_registered_configvars() -> None:
         "soft_query_limit",
         "staleness_threshold",
         "start_url",
+        "state_persistence",
         "statistics_interval",
         "table_row_limit",
         "tcp_connect_timeout",
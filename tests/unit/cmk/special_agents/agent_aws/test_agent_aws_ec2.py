@@ -21,93 +21,7 @@ from cmk.special_agents.agent_aws import (
     ResultDistributor,
 )
 
-from .agent_aws_fake_clients import (
-    EC2DescribeAddressesIB,
-    EC2DescribeInstancesIB,
-    EC2DescribeNetworkInterfacesIB,
-    EC2DescribeReservedInstancesIB,
-    EC2DescribeSecurityGroupsIB,
-    EC2DescribeSpotFleetRequestsIB,
-    EC2DescribeSpotInstanceRequestsIB,
-    EC2DescribeTagsIB,
-    FakeCloudwatchClient,
-    FakeServiceQuotasClient,
-)
-
-
-class FakeEC2Client:
-    def __init__(self, skip_entities: Mapping[str, object] | None = None) -> None:
-        self._skip_entities = {} if not skip_entities else skip_entities
-
-    def describe_instances(self, InstanceIds=None, Filters=None):
-        return {
-            "Reservations": [
-                {
-                    "Groups": [
-                        {"GroupName": "string", "GroupId": "string"},
-                    ],
-                    "Instances": EC2DescribeInstancesIB.create_instances(
-                        amount=3, skip_entities=self._skip_entities.get("Instances")
-                    ),
-                    "OwnerId": "string",
-                    "RequesterId": "string",
-                    "ReservationId": "string",
-                },
-            ],
-            "NextToken": "string",
-        }
-
-    def describe_reserved_instances(self):
-        return {
-            "ReservedInstances": EC2DescribeReservedInstancesIB.create_instances(
-                amount=3,
-                skip_entities=self._skip_entities.get("ReservedInstances", []),
-            ),
-        }
-
-    def describe_addresses(self):
-        return {
-            "Addresses": EC2DescribeAddressesIB.create_instances(amount=3),
-        }
-
-    def describe_security_groups(self, InstanceIds=None, Filters=None):
-        return {
-            "SecurityGroups": EC2DescribeSecurityGroupsIB.create_instances(amount=3),
-            "NextToken": "string",
-        }
-
-    def describe_network_interfaces(self):
-        return {
-            "NetworkInterfaces": EC2DescribeNetworkInterfacesIB.create_instances(amount=3),
-            "NextToken": "string",
-        }
-
-    def describe_spot_instance_requests(self):
-        return {
-            "SpotInstanceRequests": EC2DescribeSpotInstanceRequestsIB.create_instances(amount=3),
-            "NextToken": "string",
-        }
-
-    def describe_spot_fleet_requests(self):
-        return {
-            "SpotFleetRequestConfigs": EC2DescribeSpotFleetRequestsIB.create_instances(amount=3),
-            "NextToken": "string",
-        }
-
-    def describe_tags(self, Filters=None):
-        tags = []
-        for filter_ in Filters:
-            for value in filter_["Values"]:
-                if value == "InstanceId-0":
-                    tags = EC2DescribeTagsIB.create_instances(amount=1)
-                    break
-        for tag in tags:
-            tag["ResourceId"] = tag["ResourceId"].replace("ResourceId", "InstanceId")
-        return {
-            "Tags": tags,
-            "NextToken": "string",
-        }
-
+from .agent_aws_fake_clients import FakeCloudwatchClient, FakeEC2Client, FakeServiceQuotasClient
 
 EC2Sections = Callable[
     [object | None, OverallTags, list[object], Mapping[str, object] | None],
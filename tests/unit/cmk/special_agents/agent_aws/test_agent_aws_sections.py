@@ -3,12 +3,23 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import random
 from collections.abc import Sequence
 from unittest import mock
 
 import pytest
 
-from cmk.special_agents.agent_aws import AWSSectionResult, AWSSectionsGeneric, Results
+from cmk.special_agents.agent_aws import (
+    AWSConfig,
+    AWSSectionResult,
+    AWSSectionsGeneric,
+    NamingConvention,
+    ResultDistributorS3Limits,
+    Results,
+    run_sections_concurrently,
+)
+
+from .agent_aws_fake_clients import FakeCloudwatchClient, FakeEC2Client, FakeServiceQuotasClient
 
 
 class TestAWSSections:
@@ -126,3 +137,64 @@ class TestAWSHostLabelSections:
         generic_section._write_host_labels(cached_data)
         section_stdout = capsys.readouterr().out
         assert section_stdout.strip().split("\n") == expected_lines
+
+
+class CountingCloudwatchClient(FakeCloudwatchClient):
+    def __init__(self) -> None:
+        self.calls: list[int] = []
+
+    def get_metric_data(self, MetricDataQueries, StartTime="START", EndTime="END"):
+        self.calls.append(len(MetricDataQueries))
+        return super().get_metric_data(MetricDataQueries, StartTime=StartTime, EndTime=EndTime)
+
+
+class FakeSession:
+    def __init__(self, cloudwatch_client: CountingCloudwatchClient) -> None:
+        self._cloudwatch_client = cloudwatch_client
+
+    def client(self, client_key, config=None):
+        return {
+            "cloudwatch": self._cloudwatch_client,
+            "ec2": FakeEC2Client(),
+            "service-quotas": FakeServiceQuotasClient(),
+        }.get(client_key)
+
+
+def _ec2_sections(cloudwatch_client: CountingCloudwatchClient) -> list[AWSSectionsGeneric]:
+    config = AWSConfig("hostname", [], ([], []), NamingConvention.ip_region_instance)
+    for service in ("ec2", "ebs"):
+        config.add_single_service_config(f"{service}_names", None)
+        config.add_service_tags(f"{service}_tags", (None, None))
+    config.add_single_service_config("ec2_limits", True)
+    aws_sections = []
+    # The regions share the client in order to have more queries to pack
+    for region in ("eu-central-1", "eu-west-1", "us-east-2"):
+        sections = AWSSectionsGeneric(
+            "hostname", FakeSession(cloudwatch_client), "account-id"  # type: ignore[arg-type]
+        )
+        sections.init_sections(["ec2"], region, config, ResultDistributorS3Limits())
+        aws_sections.append(sections)
+    return aws_sections
+
+
+def test_concurrent_sections_write_the_results_of_serial_sections(
+    capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # The fake clients return random values otherwise
+    monkeypatch.setattr(random, "choice", lambda choices: choices[0])
+    serial_client = CountingCloudwatchClient()
+    for sections in _ec2_sections(serial_client):
+        sections.run(use_cache=False)
+    serial_output = capsys.readouterr().out
+
+    concurrent_client = CountingCloudwatchClient()
+    aws_sections = _ec2_sections(concurrent_client)
+    run_sections_concurrently(aws_sections, use_cache=False, threads=4)
+    for sections in aws_sections:
+        sections.write_results()
+
+    assert capsys.readouterr().out == serial_output
+    assert "<<<aws_ec2:" in serial_output
+    assert sum(concurrent_client.calls) == sum(serial_client.calls)
+    assert len(concurrent_client.calls) < len(serial_client.calls)
+    assert concurrent_client.calls[:-1] == [100] * (len(concurrent_client.calls) - 1)
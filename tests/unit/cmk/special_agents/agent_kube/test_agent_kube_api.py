@@ -148,7 +148,7 @@ def test_pod_name() -> None:
     assert pod_namespaced_name == f"{namespace}_{name}"
 
 
-def test_filter_pods_by_namespace() -> None:
+def test_pod_index_of_namespace() -> None:
     pod_one = APIPodFactory.build(
         metadata=MetaDataFactory.build(name="pod_one", namespace="one", factory_use_construct=True)
     )
@@ -156,12 +156,12 @@ def test_filter_pods_by_namespace() -> None:
         metadata=MetaDataFactory.build(name="pod_two", namespace="two", factory_use_construct=True)
     )
 
-    filtered_pods = agent.filter_pods_by_namespace([pod_one, pod_two], api.NamespaceName("one"))
+    filtered_pods = agent.PodIndex([pod_one, pod_two]).of_namespace(api.NamespaceName("one"))
 
     assert [pod.metadata.name for pod in filtered_pods] == ["pod_one"]
 
 
-def test_filter_pods_by_cron_job() -> None:
+def test_pod_index_of_cron_job() -> None:
     pod_one = APIPodFactory.build(
         uid="in_cron_job",
     )
@@ -173,10 +173,30 @@ def test_filter_pods_by_cron_job() -> None:
             "in_cron_job",
         ]
     )
-    filtered_pods = agent.filter_pods_by_cron_job([pod_one, pod_two], cron_job)
+    filtered_pods = agent.PodIndex([pod_one, pod_two]).of_cron_job(cron_job)
     assert [pod.uid for pod in filtered_pods] == ["in_cron_job"]
 
 
+def test_pod_index() -> None:
+    pods = [
+        APIPodFactory.build(
+            uid=uid,
+            metadata=MetaDataFactory.build(
+                name=uid, namespace=namespace, factory_use_construct=True
+            ),
+        )
+        for uid, namespace in [("a", "one"), ("b", "two"), ("c", "one"), ("d", "one")]
+    ]
+    cron_job = APICronJobFactory.build(pod_uids=["d", "unknown", "a"])
+
+    pod_index = agent.PodIndex(pods)
+
+    assert [pod.uid for pod in pod_index.of_namespace(api.NamespaceName("one"))] == ["a", "c", "d"]
+    assert not pod_index.of_namespace(api.NamespaceName("three"))
+    # In the order of the pods, not of the cron job
+    assert [pod.uid for pod in pod_index.of_cron_job(cron_job)] == ["a", "d"]
+
+
 @pytest.mark.parametrize(
     "phase",
     [
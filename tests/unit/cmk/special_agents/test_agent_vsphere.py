@@ -9,11 +9,19 @@ import pytest
 
 from cmk.special_agents.agent_vsphere import (
     eval_multipath_info,
+    fetch_counters,
     fetch_virtual_machines,
+    get_pattern,
+    get_section_licenses,
     get_section_snapshot_summary,
+    iter_elements,
 )
 
 
+def _chunked(data: str, size: int = 7) -> list[str]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
 def _build_id(lun_id):
     # Taken from https://kb.vmware.com/s/article/2078730
     assert len(lun_id) == 32 or len(lun_id) == 0
@@ -96,7 +104,7 @@ def test_cloning_vm_is_processed(mocker: Mock) -> None:
     )
 
     connection = mocker.Mock()
-    connection.query_server = mocker.Mock(return_value=data)
+    connection.iter_query_server = mocker.Mock(return_value=_chunked(data))
     opt = mocker.Mock()
     opt.skip_placeholder_vm = False
 
@@ -124,6 +132,70 @@ def test_cloning_vm_is_processed(mocker: Mock) -> None:
     )
 
 
+@pytest.mark.parametrize("size", [1, 7, 64, 10000])
+def test_iter_elements_of_chunks(size: int) -> None:
+    data = (
+        "<returnval><token>1</token><objects><obj>vm-1</obj></objects><objects>"
+        "<propSet>a</propSet></objects><objectsList>other</objectsList><objects></objects>"
+        "</returnval><returnval><objects><obj>vm-2</obj></objects></returnval><objec"
+    )
+    assert list(iter_elements(_chunked(data, size), "objects")) == get_pattern(
+        "<objects>(.*?)</objects>", data
+    )
+
+
+def test_get_section_licenses(mocker: Mock) -> None:
+    data = (
+        '<?xml version="1.0" encoding="UTF-8"?><soapenv:Envelope xmlns:soapenv="http://schemas.xml'
+        'soap.org/soap/envelope/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soapenv:Bo'
+        'dy><RetrievePropertiesExResponse xmlns="urn:vim25"><returnval><objects><obj type="LicenseMa'
+        'nager">LicenseManager</obj><propSet><name>licenses</name><val xsi:type="ArrayOfLicenseMana'
+        'gerLicenseInfo"><LicenseManagerLicenseInfo xsi:type="LicenseManagerLicenseInfo"><licenseKe'
+        "y>00000-00000</licenseKey><editionKey>eval</editionKey><name>Evaluation Mode</name><total>"
+        "0</total></LicenseManagerLicenseInfo><LicenseManagerLicenseInfo xsi:type="
+        '"LicenseManagerLicenseInfo"><licenseKey>11111-11111</licenseKey><editionKey>esx.enterprise'
+        "Plus.cpuPackage</editionKey><name>VMware vSphere 7 Enterprise Plus</name><total>16</total>"
+        "<used>12</used><costUnit>cpuPackage</costUnit><properties><key>ProductName</key><value xsi"
+        ':type="xsd:string">VMware ESX Server</value></properties></LicenseManagerLicenseInfo></val>'
+        "</propSet></objects></returnval></RetrievePropertiesExResponse></soapenv:Body></soapenv:En"
+        "velope>"
+    )
+    connection = mocker.Mock()
+    connection.iter_query_server = mocker.Mock(return_value=_chunked(data))
+
+    assert get_section_licenses(connection) == [
+        "<<<esx_vsphere_licenses:sep(9)>>>",
+        "VMware vSphere 7 Enterprise Plus\t12 16",
+    ]
+
+
+def test_fetch_counters_of_several_hosts(mocker: Mock) -> None:
+    def entity_metric(host: str, values: str) -> str:
+        return (
+            '<returnval xsi:type="PerfEntityMetric"><entity type="HostSystem">%s</entity><sampleI'
+            "nfo><timestamp>2023-10-19T12:00:00Z</timestamp><interval>20</interval></sampleInfo>"
+            '<value xsi:type="PerfMetricIntSeries"><id><counterId>2</counterId><instance></instan'
+            "ce></id><value>%s</value></value></returnval>" % (host, values)
+        )
+
+    data = (
+        '<?xml version="1.0" encoding="UTF-8"?><soapenv:Envelope><soapenv:Body><QueryPerfResponse'
+        ' xmlns="urn:vim25">%s%s</QueryPerfResponse></soapenv:Body></soapenv:Envelope>'
+        % (entity_metric("host-1", "10"), entity_metric("host-2", "20"))
+    )
+    connection = mocker.Mock()
+    connection.perf_samples = 1
+    connection.iter_query_server = mocker.Mock(return_value=_chunked(data))
+
+    assert fetch_counters(connection, {"host-1": [("2", [""])], "host-2": [("2", [""])]}) == {
+        "host-1": [("2", "", ["10"])],
+        "host-2": [("2", "", ["20"])],
+    }
+    # Both hosts are queried with a single request
+    ((_method,), kwargs) = connection.iter_query_server.call_args
+    assert kwargs["query_specs"].count("<ns1:querySpec>") == 2
+
+
 @pytest.mark.parametrize(
     "virtual_machines, expected_output",
     [
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+import requests
+import responses
+
+from cmk.special_agents.utils_kubernetes import query
+from cmk.special_agents.utils_kubernetes.list_cache import ListCache
+
+_URL = "https://api-unittest/api/v1/pods"
+
+
+def _pod(namespace: str, name: str, resource_version: str, phase: str = "Running") -> dict:
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "uid": f"uid-{namespace}-{name}",
+            "resourceVersion": resource_version,
+        },
+        "status": {"phase": phase},
+    }
+
+
+def _pod_list(resource_version: str, *pods: dict) -> dict[str, Any]:
+    # As sent by the API server
+    return {
+        "kind": "PodList",
+        "apiVersion": "v1",
+        "metadata": {"resourceVersion": resource_version},
+        "items": list(pods),
+    }
+
+
+def _watch_events(*events: tuple[str, dict]) -> str:
+    return "".join(
+        json.dumps({"type": event_type, "object": {"kind": "Pod", "apiVersion": "v1", **obj}})
+        + "\n"
+        for event_type, obj in events
+    )
+
+
+@pytest.fixture(name="client_config")
+def fixture_client_config() -> query.APISessionConfig:
+    return query.APISessionConfig(
+        api_server_endpoint="https://api-unittest",
+        token="token",
+        api_server_proxy="NO_PROXY",
+        k8s_api_read_timeout=10,
+        k8s_api_connect_timeout=10,
+        verify_cert_api=False,
+    )
+
+
+def _items(text: str) -> list[tuple[str, str]]:
+    return [
+        (item["metadata"]["name"], item["metadata"]["resourceVersion"])
+        for item in json.loads(text)["items"]
+    ]
+
+
+def _add_list(resource_version: str, *pods: dict) -> None:
+    responses.add(
+        responses.GET,
+        _URL,
+        json=_pod_list(resource_version, *pods),
+        match=[responses.matchers.query_param_matcher({})],
+    )
+
+
+def _add_watch(since: str, body: str, status: int = 200) -> None:
+    responses.add(
+        responses.GET,
+        _URL,
+        body=body,
+        status=status,
+        match=[
+            responses.matchers.query_param_matcher({"resourceVersion": since}, strict_match=False)
+        ],
+    )
+
+
+@responses.activate
+def test_changes_are_applied_to_the_cached_list(
+    client_config: query.APISessionConfig, tmp_path: Path
+) -> None:
+    cache_path = tmp_path / "cluster.lists.json"
+    _add_list(
+        "100", _pod("default", "a", "90"), _pod("default", "b", "91"), _pod("kube", "c", "92")
+    )
+    assert _items(
+        ListCache(cache_path).query(client_config, requests.Session(), "/api/v1/pods")
+    ) == [
+        ("a", "90"),
+        ("b", "91"),
+        ("c", "92"),
+    ]
+
+    list_cache = ListCache(cache_path)
+    list_cache.query(client_config, requests.Session(), "/api/v1/pods")
+    list_cache.save()
+
+    _add_watch(
+        "100",
+        _watch_events(
+            ("MODIFIED", _pod("default", "b", "101", "Failed")),
+            ("ADDED", _pod("default", "aa", "102")),
+            ("DELETED", _pod("kube", "c", "103")),
+            ("BOOKMARK", {"metadata": {"resourceVersion": "110"}}),
+        ),
+    )
+    _add_watch("110", "")
+    for _run in range(2):
+        list_cache = ListCache(cache_path)
+        text = list_cache.query(client_config, requests.Session(), "/api/v1/pods")
+        list_cache.save()
+        # The order of the API server
+        assert _items(text) == [("a", "90"), ("aa", "102"), ("b", "101")]
+        assert json.loads(text)["metadata"]["resourceVersion"] == "110"
+
+    # Only the first run lists all pods
+    assert [call.request.params.get("watch") for call in responses.calls] == [
+        None,
+        None,
+        "true",
+        "true",
+    ]
+
+
+@pytest.mark.parametrize(
+    "status, body",
+    [
+        pytest.param(410, "", id="gone"),
+        pytest.param(
+            200,
+            json.dumps(
+                {
+                    "type": "ERROR",
+                    "object": {
+                        "kind": "Status",
+                        "status": "Failure",
+                        "message": "too old resource version: 100 (150)",
+                        "reason": "Expired",
+                        "code": 410,
+                    },
+                }
+            ),
+            id="expired",
+        ),
+    ],
+)
+@responses.activate
+def test_expired_resource_versions_are_listed_again(
+    client_config: query.APISessionConfig, tmp_path: Path, status: int, body: str
+) -> None:
+    cache_path = tmp_path / "cluster.lists.json"
+    _add_list("100", _pod("default", "a", "90"))
+    list_cache = ListCache(cache_path)
+    list_cache.query(client_config, requests.Session(), "/api/v1/pods")
+    list_cache.save()
+
+    responses.reset()
+    _add_watch("100", body, status)
+    _add_list("200", _pod("default", "b", "190"))
+    assert _items(
+        ListCache(cache_path).query(client_config, requests.Session(), "/api/v1/pods")
+    ) == [("b", "190")]
+
+
+@responses.activate
+def test_errors_are_not_cached(client_config: query.APISessionConfig, tmp_path: Path) -> None:
+    status = {"kind": "Status", "status": "Failure", "reason": "Forbidden", "code": 403}
+    responses.add(responses.GET, _URL, json=status, status=403)
+    list_cache = ListCache(tmp_path / "cluster.lists.json")
+
+    assert json.loads(list_cache.query(client_config, requests.Session(), "/api/v1/pods")) == status
+    list_cache.save()
+    assert json.loads((tmp_path / "cluster.lists.json").read_text()) == {}
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# Copyright (C) 2023 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import io
+import random
+import shutil
+import tarfile
+from collections.abc import Mapping
+from pathlib import Path
+
+import pytest
+
+from cmk.utils.backup.chunks import (
+    ChunkStore,
+    iter_chunks,
+    Manifest,
+    ManifestReader,
+    referenced_digests,
+    store_chunked,
+)
+from cmk.utils.backup.stream import RestoreStream
+from cmk.utils.exceptions import MKGeneralException
+
+
+def _tar_stream(files: Mapping[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w|") as tar:
+        for name, content in files.items():
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = len(content)
+            tar.addfile(tarinfo, io.BytesIO(content))
+    return buf.getvalue()
+
+
+def _site_files(seed: int, count: int) -> dict[str, bytes]:
+    rng = random.Random(seed)
+    return {
+        f"heute/var/file-{i}": rng.randbytes(rng.choice((10, 3000, 70000))) for i in range(count)
+    }
+
+
+@pytest.mark.parametrize("max_size", [1024, 8192, 100000])
+def test_iter_chunks_reassembles_stream(max_size: int) -> None:
+    files = _site_files(0, 50)
+    files["heute/var/rrd"] = random.Random(1).randbytes(5 * max_size + 17)
+    raw = _tar_stream(files)
+
+    chunks = list(iter_chunks(io.BytesIO(raw), max_size))
+
+    assert b"".join(chunks) == raw
+    assert len(chunks) > 1
+
+
+def test_store_chunked_deduplicates(tmp_path: Path) -> None:
+    store = ChunkStore(tmp_path / "chunks")
+    files = _site_files(0, 200)
+
+    _manifest, first = store_chunked(iter_chunks(io.BytesIO(_tar_stream(files)), 8192), store)
+    assert first.new_bytes == first.total_bytes
+
+    files["heute/var/file-100"] = b"changed"
+    manifest, second = store_chunked(iter_chunks(io.BytesIO(_tar_stream(files)), 8192), store)
+
+    assert second.total_bytes == manifest.size
+    assert 0 < second.new_bytes < second.total_bytes / 10
+    assert second.dedup_ratio > 10
+
+
+def test_restore_from_manifest(tmp_path: Path) -> None:
+    store = ChunkStore(tmp_path / "target" / "chunks")
+    first_raw = _tar_stream(_site_files(0, 100))
+    second_raw = _tar_stream(_site_files(1, 100))
+    first, _stats = store_chunked(iter_chunks(io.BytesIO(first_raw), 8192), store)
+    second, _stats = store_chunked(iter_chunks(io.BytesIO(second_raw), 8192), store)
+    for name, manifest in (("first", first), ("second", second)):
+        (backup_dir := tmp_path / "target" / f"{name}-complete").mkdir()
+        (backup_dir / "site-heute.manifest").write_bytes(manifest.dumps(backup_dir))
+
+    # The manifests reference the chunk store relative to themselves
+    shutil.move(tmp_path / "target", tmp_path / "moved")
+
+    for name, raw in (("first", first_raw), ("second", second_raw)):
+        manifest = Manifest.load(tmp_path / "moved" / f"{name}-complete" / "site-heute.manifest")
+        assert not manifest.missing_chunks()
+        restore_stream = RestoreStream(
+            stream=ManifestReader(manifest),  # type: ignore[arg-type]
+            is_alive=lambda: False,
+            key_ident=None,
+            debug=False,
+        )
+        assert b"".join(restore_stream.process()) == raw
+
+
+def test_damaged_chunk(tmp_path: Path) -> None:
+    store = ChunkStore(tmp_path / "chunks", compress=False)
+    manifest, _stats = store_chunked([b"abc"], store)
+    (chunk_path,) = (tmp_path / "chunks").glob("??/*")
+    chunk_path.write_bytes(b"\x00abd")
+
+    with pytest.raises(MKGeneralException, match="damaged"):
+        ManifestReader(manifest).read()
+
+
+def test_manifest_checksum_covers_chunks(tmp_path: Path) -> None:
+    store = ChunkStore(tmp_path / "chunks")
+    manifest, _stats = store_chunked([b"a", b"b"], store)
+    changed, _stats = store_chunked([b"a", b"c"], store)
+
+    assert manifest.checksum != changed.checksum
+    assert manifest.checksum == Manifest.loads(manifest.dumps(tmp_path), tmp_path).checksum
+
+
+def test_remove_unreferenced(tmp_path: Path) -> None:
+    store = ChunkStore(tmp_path / "chunks")
+    old, _stats = store_chunked([b"a", b"b"], store)
+    new, _stats = store_chunked([b"b", b"c"], store)
+    (manifest_path := tmp_path / "site-heute.manifest").write_bytes(new.dumps(tmp_path))
+
+    with store.exclusive() as is_exclusive:
+        assert is_exclusive
+        assert store.remove_unreferenced(referenced_digests([manifest_path])) == 1
+    assert set(store.digests()) == {r.digest for r in new.chunks}
+    assert not set(store.digests()) >= {r.digest for r in old.chunks}
+
+
+def test_no_exclusive_access_while_in_use(tmp_path: Path) -> None:
+    # E.g. the backup of another site to the same target
+    other_site_store = ChunkStore(tmp_path / "chunks")
+    store = ChunkStore(tmp_path / "chunks")
+
+    with other_site_store.in_use():
+        with store.exclusive() as is_exclusive:
+            assert not is_exclusive
+
+    with store.exclusive() as is_exclusive:
+        assert is_exclusive
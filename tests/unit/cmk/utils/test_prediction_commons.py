@@ -4,11 +4,17 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 from collections.abc import Mapping
+from pathlib import Path
 
 import pytest
 
+import livestatus
+
+import cmk.utils.paths
 import cmk.utils.prediction as prediction
 from cmk.utils.hostaddress import HostName
+from cmk.utils.metrics import MetricName
+from cmk.utils.servicename import ServiceName
 
 
 @pytest.mark.parametrize(
@@ -261,3 +267,128 @@ class TestTimeseries:
             ).count(None)
             == 2
         )
+
+
+class _FakeConnection(livestatus.SingleSiteConnection):
+    def __init__(self, row: livestatus.LivestatusRow) -> None:
+        super().__init__("unix:/dev/null")
+        self.row = row
+        self.queries: list[str] = []
+
+    def query_row(self, query: livestatus.QueryTypes) -> livestatus.LivestatusRow:
+        self.queries.append(str(query))
+        return self.row
+
+
+def test_get_rrd_data_batch_single_query() -> None:
+    connection = _FakeConnection([[0, 60, 60, 1, 2], [3600, 3720, 60, 3, None]])
+
+    result = prediction.get_rrd_data_batch(
+        connection,
+        HostName("heute"),
+        ServiceName("CPU load"),
+        MetricName("load1"),
+        "MAX",
+        [(0, 60), (3600, 3720)],
+    )
+
+    assert result == [
+        prediction.TimeSeries([0, 60, 60, 1, 2]),
+        prediction.TimeSeries([3600, 3720, 60, 3, None]),
+    ]
+    assert connection.queries == [
+        "GET services\n"
+        "Columns: rrddata:m0:load1.max:0:60:1:400 rrddata:m1:load1.max:3600:3720:1:400\n"
+        "Filter: host_name = heute\n"
+        "Filter: service_description = CPU load\n"
+        "OutputFormat: python\n"
+    ]
+
+
+def _prediction(
+    timegroup: str, points: prediction.DataStats
+) -> tuple[prediction.PredictionInfo, prediction.PredictionData]:
+    return (
+        prediction.PredictionInfo(
+            name=prediction.Timegroup(timegroup),
+            time=1000,
+            range=(0, 86400),
+            cf="MAX",
+            dsname=MetricName("load1"),
+            slice=86400,
+            params={"period": "wday", "horizon": 90},
+        ),
+        prediction.PredictionData(
+            columns=["average", "min", "max", "stdev"],
+            points=points,
+            num_points=len(points),
+            data_twindow=[0, 86400],
+            step=43200,
+        ),
+    )
+
+
+@pytest.fixture(name="var_dir")
+def fixture_var_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.usefixtures("var_dir")
+def test_prediction_store_roundtrip() -> None:
+    store = prediction.PredictionStore(
+        HostName("heute"), ServiceName("CPU load"), MetricName("load1")
+    )
+    info, data = _prediction("monday", [[1.0, 0.5, 2.0, 0.1], [None, None, None, None]])
+
+    store.save_predictions(info, data)
+
+    assert store.get_info(info.name) == info
+    assert store.get_data(info.name) == data
+    assert list(store.available_predictions()) == [info]
+    assert (
+        prediction.PredictionStore(
+            HostName("heute"), ServiceName("CPU load"), MetricName("load15")
+        ).get_info(info.name)
+        is None
+    )
+
+    store.clean_prediction_files(info.name, force=True)
+    assert store.get_info(info.name) is None
+    assert store.get_data(info.name) is None
+
+
+def test_prediction_store_rewrites_data(var_dir: Path) -> None:
+    store = prediction.PredictionStore(
+        HostName("heute"), ServiceName("CPU load"), MetricName("load1")
+    )
+    tuesday = _prediction("tuesday", [[3.0, 2.0, 4.0, 1.0]] * 2)
+    store.save_predictions(*tuesday)
+
+    for value in range(5):
+        monday = _prediction("monday", [[float(value), 0.0, 0.0, 0.0]] * 2)
+        store.save_predictions(*monday)
+
+    assert store.get_data(prediction.Timegroup("monday")) == monday[1]
+    assert store.get_data(prediction.Timegroup("tuesday")) == tuesday[1]
+    (data_file,) = (var_dir / "prediction_store").glob("*.data")
+    assert data_file.stat().st_size < 5 * 2 * 4 * 8
+
+
+def test_prediction_store_legacy_files(var_dir: Path) -> None:
+    info, data = _prediction("monday", [[1.0, 0.5, 2.0, 0.1]])
+    legacy_dir = var_dir / "prediction" / "heute" / "CPU_load" / "load1"
+    legacy_dir.mkdir(parents=True)
+    (legacy_dir / "monday.info").write_text(info.dumps())
+    (legacy_dir / "monday").write_text(data.dumps())
+    store = prediction.PredictionStore(
+        HostName("heute"), ServiceName("CPU load"), MetricName("load1")
+    )
+
+    assert list(store.available_predictions()) == [info]
+    assert store.get_data(info.name) == data
+
+    store.save_predictions(info, data)
+
+    assert not list(legacy_dir.iterdir())
+    assert store.get_data(info.name) == data